@@ -205,6 +205,54 @@ describe("POST /api/flinks/poll", () => {
   });
 });
 
+describe("POST /api/flinks/sync/submit", () => {
+  beforeEach(() => vi.clearAllMocks());
+
+  it("returns one job per login without waiting for pending data", async () => {
+    mockQuery.mockResolvedValueOnce(
+      dbResult([
+        { flinks_login_id: "login-ready", institution_name: "FlinksCapital" },
+        { flinks_login_id: "login-slow", institution_name: "SlowBank" },
+        { flinks_login_id: "login-bad", institution_name: "BadBank" },
+      ])
+    );
+    mockAuthorize.mockImplementation(async (loginId: string) =>
+      loginId === "login-bad"
+        ? { HttpStatusCode: 401, RequestId: "", FlinksCode: "INVALID_LOGIN" }
+        : { ...FLINKS_AUTH_OK, RequestId: `req-${loginId}` }
+    );
+    mockGetAccountsDetail.mockImplementation(async (requestId: string) =>
+      requestId === "req-login-ready" ? FLINKS_ACCOUNTS : { HttpStatusCode: 202, RequestId: requestId }
+    );
+    mockQuery.mockResolvedValue(dbResult([{ id: "acc-f1" }], 1));
+
+    const res = await request(app).post("/api/flinks/sync/submit");
+    expect(res.status).toBe(202);
+    expect(res.body.status).toBe("submitted");
+    const byLogin = Object.fromEntries(res.body.jobs.map((j: { login_id: string }) => [j.login_id, j]));
+    expect(byLogin["login-ready"]).toMatchObject({ status: "connected", accounts_synced: 1 });
+    expect(byLogin["login-slow"]).toMatchObject({ status: "pending", request_id: "req-login-slow", institution: "SlowBank" });
+    expect(byLogin["login-bad"]).toMatchObject({ status: "error", error: "Authorize failed: INVALID_LOGIN" });
+    expect(mockGetAccountsDetailAsync).not.toHaveBeenCalled();
+  });
+
+  it("filters to one login when login_id is given", async () => {
+    mockQuery.mockResolvedValueOnce(dbResult([]));
+
+    const res = await request(app).post("/api/flinks/sync/submit").send({ login_id: "login-xyz" });
+    expect(res.status).toBe(202);
+    expect(res.body.jobs).toEqual([]);
+    expect(mockQuery.mock.calls[0][1]).toEqual(["login-xyz"]);
+  });
+
+  it("returns 500 on DB error", async () => {
+    mockQuery.mockRejectedValueOnce(new Error("DB error"));
+
+    const res = await request(app).post("/api/flinks/sync/submit");
+    expect(res.status).toBe(500);
+  });
+});
+
 describe("GET /api/flinks/connections", () => {
   beforeEach(() => vi.clearAllMocks());
 
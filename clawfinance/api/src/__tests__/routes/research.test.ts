@@ -144,6 +144,16 @@ describe("GET /api/research/sentiment/:ticker", () => {
     expect(res.body.data[0].composite_score).toBe(0.72);
   });
 
+  it("includes rollup trend signals and joins on the snapshot date", async () => {
+    mockQuery.mockResolvedValueOnce(
+      dbResult([{ ...SENTIMENT_ROW, ewma: 0.61, zscore: 1.4, slope_per_day: 0.012, trend: "improving" }])
+    );
+    const res = await request(app).get("/api/research/sentiment/AAPL");
+    expect(res.body.data[0].trend).toBe("improving");
+    expect(mockQuery.mock.calls[0][0]).toContain("sentiment_daily_rollups");
+    expect(mockQuery.mock.calls[0][1]).toEqual(["AAPL"]);
+  });
+
   it("returns 500 on DB error", async () => {
     mockQuery.mockRejectedValueOnce(new Error("DB error"));
     const res = await request(app).get("/api/research/sentiment/AAPL");
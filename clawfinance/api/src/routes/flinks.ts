@@ -97,6 +97,52 @@ router.post("/poll", async (req, res) => {
   }
 });
 
+// ── POST /api/flinks/sync/submit ────────────────────────────────────────────
+// Starts a refresh for every active Flinks login (or only { login_id }) and
+// returns immediately with one job per login. Logins whose data is ready are
+// saved right away ("connected"); the rest come back "pending" with a
+// request_id to poll via /api/flinks/poll. Logins are authorized in parallel,
+// so one slow bank does not hold up the others.
+
+router.post("/sync/submit", async (req, res) => {
+  const loginId: string | null = req.body?.login_id ?? null;
+  try {
+    const accounts = await pool.query(
+      `SELECT flinks_login_id, MIN(institution_name) AS institution_name
+       FROM accounts
+       WHERE api_source = 'flinks' AND is_active = true AND flinks_login_id IS NOT NULL
+         AND ($1::text IS NULL OR flinks_login_id = $1)
+       GROUP BY flinks_login_id`,
+      [loginId]
+    );
+
+    const jobs = await Promise.all(
+      accounts.rows.map(async (row) => {
+        const job = { login_id: row.flinks_login_id as string, institution: row.institution_name as string };
+        try {
+          const auth = await authorize(job.login_id);
+          if (auth.HttpStatusCode !== 200 || !auth.RequestId) {
+            return { ...job, status: "error", error: `Authorize failed: ${auth.FlinksCode ?? "unknown"}` };
+          }
+          const detail = await getAccountsDetail(auth.RequestId);
+          if (detail.HttpStatusCode === 200 && detail.Accounts) {
+            const saved = await upsertAccounts(detail.Accounts, job.login_id, job.institution);
+            return { ...job, status: "connected", request_id: auth.RequestId, accounts_synced: saved };
+          }
+          return { ...job, status: "pending", request_id: auth.RequestId };
+        } catch (err) {
+          return { ...job, status: "error", error: (err as Error).message };
+        }
+      })
+    );
+
+    res.status(202).json({ status: "submitted", jobs });
+  } catch (err) {
+    console.error("[flinks/sync/submit] error:", err);
+    res.status(500).json({ error: "Internal server error" });
+  }
+});
+
 // ── POST /api/flinks/sync ───────────────────────────────────────────────────
 // Re-sync accounts and transactions for all active Flinks connections.
 
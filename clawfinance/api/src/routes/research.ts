@@ -26,16 +26,19 @@ router.get("/portfolio-news", async (_req, res) => {
   }
 });
 
-// GET /api/research/sentiment/:ticker — sentiment history
+// GET /api/research/sentiment/:ticker — sentiment history with precomputed trend signals
 router.get("/sentiment/:ticker", async (req, res) => {
   const ticker = req.params.ticker.toUpperCase();
   try {
     const result = await pool.query(
-      `SELECT snapshot_date, twitter_sentiment, composite_score,
-              tweet_volume, bull_tweets, bear_tweets
-       FROM sentiment_snapshots
-       WHERE ticker_symbol = $1
-       ORDER BY snapshot_date DESC
+      `SELECT s.snapshot_date, s.twitter_sentiment, s.composite_score,
+              s.tweet_volume, s.bull_tweets, s.bear_tweets,
+              r.ewma, r.zscore, r.slope_per_day, r.trend
+       FROM sentiment_snapshots s
+       LEFT JOIN sentiment_daily_rollups r
+         ON r.ticker_symbol = s.ticker_symbol AND r.rollup_date = s.snapshot_date
+       WHERE s.ticker_symbol = $1
+       ORDER BY s.snapshot_date DESC
        LIMIT 90`,
       [ticker]
     );
@@ -0,0 +1,144 @@
+-- Per-year tax aggregates (income by form, withholding, estimated payments,
+-- itemized deductions). Kept current by row triggers on tax_documents,
+-- estimated_tax_payments and deductions, which apply +NEW / -OLD deltas, so
+-- the estimated-payment planner reads one row instead of rescanning documents.
+CREATE TABLE IF NOT EXISTS tax_year_summaries (
+  user_id UUID NOT NULL DEFAULT '00000000-0000-0000-0000-000000000001',
+  year INTEGER NOT NULL,
+  w2_wages DECIMAL(18, 4) NOT NULL DEFAULT 0,        -- W-2 wages_tips_other_compensation
+  interest DECIMAL(18, 4) NOT NULL DEFAULT 0,        -- 1099-INT interest_income
+  dividends DECIMAL(18, 4) NOT NULL DEFAULT 0,       -- 1099-DIV ordinary_dividends
+  proceeds DECIMAL(18, 4) NOT NULL DEFAULT 0,        -- 1099-B net_proceeds
+  cost_basis DECIMAL(18, 4) NOT NULL DEFAULT 0,      -- 1099-B cost_basis
+  withheld DECIMAL(18, 4) NOT NULL DEFAULT 0,        -- federal withholding, all forms
+  state_withheld DECIMAL(18, 4) NOT NULL DEFAULT 0,
+  es_q1 DECIMAL(18, 4) NOT NULL DEFAULT 0,
+  es_q2 DECIMAL(18, 4) NOT NULL DEFAULT 0,
+  es_q3 DECIMAL(18, 4) NOT NULL DEFAULT 0,
+  es_q4 DECIMAL(18, 4) NOT NULL DEFAULT 0,
+  itemized_deductions DECIMAL(18, 4) NOT NULL DEFAULT 0,
+  document_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (user_id, year)
+);
+
+-- ── tax_documents ───────────────────────────────────────────────────────────
+-- extracted_data comes from document parsing, so an amount may be text such as
+-- "N/A"; it counts as missing (NULL) instead of failing the document's INSERT.
+CREATE OR REPLACE FUNCTION tax_numeric(value TEXT) RETURNS NUMERIC AS $$
+  SELECT CASE WHEN value ~ '^\s*[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?\s*$' THEN value::numeric END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION tax_summary_apply_document(doc tax_documents, sign INTEGER)
+RETURNS void AS $$
+BEGIN
+  INSERT INTO tax_year_summaries AS s
+    (user_id, year, w2_wages, interest, dividends, proceeds, cost_basis,
+     withheld, state_withheld, document_count)
+  VALUES (
+    doc.user_id, doc.year,
+    sign * CASE WHEN doc.form_type = 'W-2' THEN COALESCE(tax_numeric(doc.extracted_data->>'wages_tips_other_compensation'), 0) ELSE 0 END,
+    sign * CASE WHEN doc.form_type = '1099-INT' THEN COALESCE(tax_numeric(doc.extracted_data->>'interest_income'), 0) ELSE 0 END,
+    sign * CASE WHEN doc.form_type = '1099-DIV' THEN COALESCE(tax_numeric(doc.extracted_data->>'ordinary_dividends'), 0) ELSE 0 END,
+    sign * CASE WHEN doc.form_type = '1099-B' THEN COALESCE(tax_numeric(doc.extracted_data->>'net_proceeds'), 0) ELSE 0 END,
+    sign * CASE WHEN doc.form_type = '1099-B' THEN COALESCE(tax_numeric(doc.extracted_data->>'cost_basis'), 0) ELSE 0 END,
+    sign * COALESCE(doc.total_tax_withheld, 0),
+    sign * COALESCE(doc.state_tax, 0),
+    sign
+  )
+  ON CONFLICT (user_id, year) DO UPDATE SET
+    w2_wages = s.w2_wages + EXCLUDED.w2_wages,
+    interest = s.interest + EXCLUDED.interest,
+    dividends = s.dividends + EXCLUDED.dividends,
+    proceeds = s.proceeds + EXCLUDED.proceeds,
+    cost_basis = s.cost_basis + EXCLUDED.cost_basis,
+    withheld = s.withheld + EXCLUDED.withheld,
+    state_withheld = s.state_withheld + EXCLUDED.state_withheld,
+    document_count = s.document_count + EXCLUDED.document_count,
+    updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tax_documents_summary_trigger() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN PERFORM tax_summary_apply_document(OLD, -1); END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN PERFORM tax_summary_apply_document(NEW, 1); END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_tax_documents_summary ON tax_documents;
+CREATE TRIGGER trg_tax_documents_summary
+  AFTER INSERT OR UPDATE OR DELETE ON tax_documents
+  FOR EACH ROW EXECUTE FUNCTION tax_documents_summary_trigger();
+
+-- ── estimated_tax_payments ──────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION tax_summary_apply_payment(p estimated_tax_payments, sign INTEGER)
+RETURNS void AS $$
+BEGIN
+  INSERT INTO tax_year_summaries AS s (user_id, year, es_q1, es_q2, es_q3, es_q4)
+  VALUES (
+    p.user_id, p.year,
+    CASE WHEN p.quarter = 1 THEN sign * p.amount_paid ELSE 0 END,
+    CASE WHEN p.quarter = 2 THEN sign * p.amount_paid ELSE 0 END,
+    CASE WHEN p.quarter = 3 THEN sign * p.amount_paid ELSE 0 END,
+    CASE WHEN p.quarter = 4 THEN sign * p.amount_paid ELSE 0 END
+  )
+  ON CONFLICT (user_id, year) DO UPDATE SET
+    es_q1 = s.es_q1 + EXCLUDED.es_q1,
+    es_q2 = s.es_q2 + EXCLUDED.es_q2,
+    es_q3 = s.es_q3 + EXCLUDED.es_q3,
+    es_q4 = s.es_q4 + EXCLUDED.es_q4,
+    updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION estimated_tax_payments_summary_trigger() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN PERFORM tax_summary_apply_payment(OLD, -1); END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN PERFORM tax_summary_apply_payment(NEW, 1); END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_estimated_tax_payments_summary ON estimated_tax_payments;
+CREATE TRIGGER trg_estimated_tax_payments_summary
+  AFTER INSERT OR UPDATE OR DELETE ON estimated_tax_payments
+  FOR EACH ROW EXECUTE FUNCTION estimated_tax_payments_summary_trigger();
+
+-- ── deductions ──────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION deductions_summary_trigger() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    INSERT INTO tax_year_summaries AS s (user_id, year, itemized_deductions)
+    VALUES (OLD.user_id, OLD.year, -OLD.amount)
+    ON CONFLICT (user_id, year) DO UPDATE SET
+      itemized_deductions = s.itemized_deductions + EXCLUDED.itemized_deductions, updated_at = NOW();
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO tax_year_summaries AS s (user_id, year, itemized_deductions)
+    VALUES (NEW.user_id, NEW.year, NEW.amount)
+    ON CONFLICT (user_id, year) DO UPDATE SET
+      itemized_deductions = s.itemized_deductions + EXCLUDED.itemized_deductions, updated_at = NOW();
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_deductions_summary ON deductions;
+CREATE TRIGGER trg_deductions_summary
+  AFTER INSERT OR UPDATE OR DELETE ON deductions
+  FOR EACH ROW EXECUTE FUNCTION deductions_summary_trigger();
+
+-- ── One-time backfill for databases that already hold tax data ──────────────
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM tax_year_summaries) THEN
+    PERFORM tax_summary_apply_document(t, 1) FROM tax_documents t;
+    PERFORM tax_summary_apply_payment(p, 1) FROM estimated_tax_payments p;
+    INSERT INTO tax_year_summaries AS s (user_id, year, itemized_deductions)
+    SELECT user_id, year, SUM(amount) FROM deductions GROUP BY user_id, year
+    ON CONFLICT (user_id, year) DO UPDATE SET
+      itemized_deductions = s.itemized_deductions + EXCLUDED.itemized_deductions;
+  END IF;
+END $$;
@@ -0,0 +1,21 @@
+-- Per-ticker daily sentiment trend signals derived from sentiment_snapshots.
+-- Maintained by skills/skill-research/scripts/sentiment_trends.py, which
+-- recomputes only from the changed date forward (seeded by the previous
+-- row's EWMA), so dashboards read precomputed trend values.
+CREATE TABLE IF NOT EXISTS sentiment_daily_rollups (
+  ticker_symbol VARCHAR(20) NOT NULL,
+  rollup_date DATE NOT NULL,
+  composite_score NUMERIC(4,3),
+  ewma NUMERIC(8,6),                 -- exponentially weighted mean of composite_score
+  rolling_mean NUMERIC(8,6),         -- over the last `window_size` snapshots
+  rolling_std NUMERIC(8,6),
+  zscore NUMERIC(8,4),               -- (composite_score - rolling_mean) / rolling_std
+  slope_per_day NUMERIC(10,6),       -- least-squares slope over the window, per calendar day
+  trend VARCHAR(20),                 -- improving | worsening | stable
+  window_size INTEGER NOT NULL,
+  observations INTEGER NOT NULL,     -- snapshots inside the window
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (ticker_symbol, rollup_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sentiment_rollups_date ON sentiment_daily_rollups(rollup_date DESC);
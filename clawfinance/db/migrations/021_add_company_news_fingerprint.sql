@@ -0,0 +1,8 @@
+-- Normalized article identity (canonical URL hash, headline hash fallback),
+-- computed by skills/skill-research/scripts/news_fingerprint.py. Rows written
+-- before this migration keep a NULL fingerprint, which the unique index
+-- ignores, until dedupe_company_news.py backfills them and deletes duplicates.
+ALTER TABLE company_news ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(34);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_company_news_ticker_fingerprint
+  ON company_news(ticker_symbol, fingerprint);
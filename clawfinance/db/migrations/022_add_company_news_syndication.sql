@@ -0,0 +1,5 @@
+-- Near-duplicate (syndicated) copies collapsed into the canonical article at
+-- ingest by skills/skill-research/scripts/near_duplicates.py. The copies'
+-- fingerprints are kept so a re-fetched copy is not counted twice.
+ALTER TABLE company_news ADD COLUMN IF NOT EXISTS syndicated_fingerprints TEXT[] NOT NULL DEFAULT '{}';
+ALTER TABLE company_news ADD COLUMN IF NOT EXISTS syndicated_count INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,10 @@
+-- Resolution of an alt_data_metrics row. Raw points are 'day' (or 'week' for
+-- weekly Google Trends series); skills/skill-research/scripts/compact_alt_data.py
+-- folds old rows into 'week' and then 'month' averages dated at the period
+-- start, with sample_count = number of raw points the average covers.
+ALTER TABLE alt_data_metrics ADD COLUMN IF NOT EXISTS granularity VARCHAR(5) NOT NULL DEFAULT 'day'
+  CHECK (granularity IN ('day', 'week', 'month'));
+ALTER TABLE alt_data_metrics ADD COLUMN IF NOT EXISTS sample_count INTEGER NOT NULL DEFAULT 1;
+
+CREATE INDEX IF NOT EXISTS idx_alt_data_ticker_type_date
+  ON alt_data_metrics(ticker_symbol, metric_type, metric_date);
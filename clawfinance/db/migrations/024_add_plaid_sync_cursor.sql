@@ -0,0 +1,5 @@
+-- Plaid /transactions/sync cursor per account (sync is requested with
+-- options.account_id). NULL means the next sync pulls the full history;
+-- skills/skill-data-ingestion/scripts/sync_plaid.py advances it in the same
+-- transaction that applies the account's added / modified / removed rows.
+ALTER TABLE accounts ADD COLUMN IF NOT EXISTS plaid_cursor TEXT;
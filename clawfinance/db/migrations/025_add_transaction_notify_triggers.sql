@@ -0,0 +1,50 @@
+-- Change feed for skills/skill-budget/scripts/transaction_worker.py.
+-- Statement-level triggers publish the ids of inserted transactions, and of
+-- updated ones whose amount, date, pending flag, category or account changed,
+-- on the 'transactions_changed' channel as comma-separated lists of at most
+-- 200 ids (NOTIFY payloads are limited to 8000 bytes). One bulk upsert sends
+-- a handful of notifications rather than one per row. Sessions that set
+-- clawfinance.skip_notify = 'on' (the worker, for its own category updates)
+-- publish nothing.
+
+CREATE OR REPLACE FUNCTION notify_transactions_inserted() RETURNS trigger AS $$
+BEGIN
+  IF current_setting('clawfinance.skip_notify', true) = 'on' THEN
+    RETURN NULL;
+  END IF;
+  PERFORM pg_notify('transactions_changed', string_agg(id::text, ','))
+  FROM (SELECT id, (row_number() OVER () - 1) / 200 AS chunk FROM new_rows) r
+  GROUP BY chunk;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_transactions_updated() RETURNS trigger AS $$
+BEGIN
+  IF current_setting('clawfinance.skip_notify', true) = 'on' THEN
+    RETURN NULL;
+  END IF;
+  PERFORM pg_notify('transactions_changed', string_agg(id::text, ','))
+  FROM (
+    SELECT n.id, (row_number() OVER () - 1) / 200 AS chunk
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    WHERE (n.amount, n.date, n.pending, n.category, n.account_id)
+          IS DISTINCT FROM (o.amount, o.date, o.pending, o.category, o.account_id)
+  ) r
+  GROUP BY chunk;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_notify_insert ON transactions;
+CREATE TRIGGER transactions_notify_insert
+  AFTER INSERT ON transactions
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_transactions_inserted();
+
+DROP TRIGGER IF EXISTS transactions_notify_update ON transactions;
+CREATE TRIGGER transactions_notify_update
+  AFTER UPDATE ON transactions
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION notify_transactions_updated();
@@ -21,11 +21,6 @@ except ImportError:
     print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
     sys.exit(1)
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
-    sys.exit(1)
-
 # Simple keyword → category mapping for common merchants
 KEYWORD_CATEGORIES: list[tuple[re.Pattern, str, str]] = [
     (re.compile(r"netflix|spotify|hulu|disney\+|apple tv|hbo|peacock|paramount", re.I), "Entertainment", "Streaming"),
@@ -55,7 +50,12 @@ def categorize_by_merchant(merchant_name: str | None, transaction_name: str) ->
 
 
 def main():
-    conn = psycopg2.connect(DATABASE_URL)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
     cur = conn.cursor(cursor_factory=RealDictCursor)
 
     # Fetch uncategorized transactions
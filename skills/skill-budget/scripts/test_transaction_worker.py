@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for transaction_worker.py's notification batching and alert rules
+(no database).
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest import TestCase, main
+
+from transaction_worker import Batcher, high_spend_alerts, parse_payload, unusual_alerts
+
+USER = "00000000-0000-0000-0000-000000000001"
+
+
+class TestBatcher(TestCase):
+    def test_batch_closes_after_window_from_first_id(self):
+        b = Batcher(window=1.0, max_size=100)
+        self.assertFalse(b.ready(0.0))
+        self.assertEqual(b.timeout(0.0, idle=60), 60)
+        b.add(["a", "b"], now=10.0)
+        b.add(["b", "c"], now=10.6)                     # duplicates coalesce, window does not restart
+        self.assertFalse(b.ready(10.9))
+        self.assertAlmostEqual(b.timeout(10.6, idle=60), 0.4)
+        self.assertTrue(b.ready(11.0))
+        self.assertEqual(b.drain(), ["a", "b", "c"])
+        self.assertFalse(b.ready(100.0))
+
+    def test_batch_closes_early_when_full(self):
+        b = Batcher(window=60, max_size=3)
+        b.add(["a", "b"], now=0.0)
+        self.assertFalse(b.ready(0.1))
+        b.add(["c"], now=0.1)
+        self.assertTrue(b.ready(0.1))
+
+    def test_parse_payload(self):
+        self.assertEqual(parse_payload("id-1,id-2,"), ["id-1", "id-2"])
+        self.assertEqual(parse_payload(""), [])
+
+
+class TestAlerts(TestCase):
+    def test_high_spend_over_120_percent(self):
+        month = date(2026, 10, 1)
+        rows = [(USER, "Food & Dining", month, Decimal("500"), Decimal("650.00")),
+                (USER, "Shopping", month, Decimal("500"), Decimal("600.00")),       # exactly 120%: no alert
+                (USER, "Travel", month, Decimal("0"), Decimal("100.00"))]
+        (alert,) = high_spend_alerts(rows)
+        self.assertEqual((alert["type"], alert["severity"]), ("high_spend_alert", "warning"))
+        self.assertEqual(alert["title"], "Food & Dining spending is at 130% of budget")
+        self.assertEqual(alert["data"]["key"], "Food & Dining:2026-10")
+        self.assertIn("October 2026", alert["description"])
+
+    def test_unusual_transaction(self):
+        (alert,) = unusual_alerts([(USER, "t-1", "Best Buy", "Shopping", Decimal("900"), date(2026, 10, 3),
+                                    Decimal("75.50"))])
+        self.assertEqual(alert["data"]["key"], "t-1")
+        self.assertEqual(alert["data"]["multiple"], 11.9)
+        self.assertEqual(alert["title"], "Unusual Shopping charge: Best Buy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+transaction_worker.py — Categorizes new transactions and raises budget alerts
+as soon as they are written.
+
+A long-lived process that LISTENs on the 'transactions_changed' channel,
+fed by the statement-level triggers of migration 025 (ids of inserted
+transactions, and of updated ones whose amount, date, pending flag,
+category or account changed). Notifications are coalesced into
+micro-batches: a batch closes --window seconds after its first id arrives,
+or at --max-batch ids, and is then processed in one transaction touching
+only the affected rows:
+
+  1. Uncategorized transactions in the batch are categorized with
+     categorize_transactions.py's merchant rules, in one bulk UPDATE
+     (made with clawfinance.skip_notify on, so it does not echo back)
+  2. Budgets of the categories the batch touched in the current month are
+     re-evaluated; a category past HIGH_SPEND_RATIO of its monthly limit
+     gets a high_spend_alert insight
+  3. Posted transactions in the batch over UNUSUAL_MULTIPLE times their
+     category's 90-day average get an unusual_transaction insight
+
+Insights carry a data.key (category:month, or the transaction id) and are
+only written once per key. On start, transactions still uncategorized (e.g.
+written while the worker was down) are processed as a first batch.
+
+Usage:
+    python3 transaction_worker.py [--window 1.0] [--max-batch 5000] [--once]
+
+--once processes the start-up batch and exits.
+
+Output: one JSON line per batch to stdout
+"""
+
+import os
+import sys
+import json
+import time
+import select
+import argparse
+from datetime import date
+from decimal import Decimal
+
+from categorize_transactions import categorize_by_merchant
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+CHANNEL = "transactions_changed"
+WINDOW_SECONDS = 1.0
+MAX_BATCH = 5000
+HIGH_SPEND_RATIO = Decimal("1.2")        # high_spend_alert: spend > 120% of the monthly budget
+UNUSUAL_MULTIPLE = Decimal("3")          # unusual_transaction: > 3x the category's 90-day average
+UNUSUAL_RECENT_DAYS = 30
+AGENT = "skill-budget"
+
+
+class Batcher:
+    """Coalesces notified ids: a batch is ready `window` seconds after its first
+    id, or as soon as it holds `max_size` ids."""
+
+    def __init__(self, window: float = WINDOW_SECONDS, max_size: int = MAX_BATCH):
+        self.window = window
+        self.max_size = max_size
+        self.ids: set[str] = set()
+        self.opened: float | None = None
+
+    def add(self, ids, now: float):
+        if not self.ids:
+            self.opened = now
+        self.ids.update(ids)
+
+    def ready(self, now: float) -> bool:
+        return bool(self.ids) and (len(self.ids) >= self.max_size or now - self.opened >= self.window)
+
+    def timeout(self, now: float, idle: float) -> float:
+        """Seconds to wait for more notifications before the batch is due."""
+        return idle if not self.ids else max(0.0, self.opened + self.window - now)
+
+    def drain(self) -> list[str]:
+        ids, self.ids, self.opened = sorted(self.ids), set(), None
+        return ids
+
+
+def parse_payload(payload: str) -> list[str]:
+    return [i for i in (p.strip() for p in payload.split(",")) if i]
+
+
+# ── Alert rules ────────────────────────────────────────────────────────────────
+
+def high_spend_alerts(rows: list[tuple], ratio: Decimal = HIGH_SPEND_RATIO) -> list[dict]:
+    """rows: (user_id, category, month, monthly_limit, spent)."""
+    alerts = []
+    for user_id, category, month, limit, spent in rows:
+        if not limit or limit <= 0 or spent <= limit * ratio:
+            continue
+        pct = spent / limit * 100
+        alerts.append({
+            "user_id": user_id, "type": "high_spend_alert", "severity": "warning",
+            "title": f"{category} spending is at {pct:.0f}% of budget",
+            "description": (f"You have spent ${spent:,.2f} on {category} in {month:%B %Y}, "
+                            f"against a monthly budget of ${limit:,.2f}."),
+            "data": {"key": f"{category}:{month:%Y-%m}", "category": category, "month": f"{month:%Y-%m}",
+                     "budget": float(limit), "spent": float(spent), "pct_used": round(float(pct), 1)},
+        })
+    return alerts
+
+
+def unusual_alerts(rows: list[tuple]) -> list[dict]:
+    """rows: (user_id, transaction_id, name, category, amount, date, category_avg)."""
+    return [{
+        "user_id": user_id, "type": "unusual_transaction", "severity": "warning",
+        "title": f"Unusual {category} charge: {name}",
+        "description": (f"${amount:,.2f} at {name} on {day.isoformat()} is {amount / avg:.1f}x your "
+                        f"average {category} transaction (${avg:,.2f})."),
+        "data": {"key": str(txn_id), "transaction_id": str(txn_id), "category": category,
+                 "amount": float(amount), "date": day.isoformat(), "category_avg": round(float(avg), 2),
+                 "multiple": round(float(amount / avg), 1)},
+    } for user_id, txn_id, name, category, amount, day, avg in rows]
+
+
+# ── Batch processing ───────────────────────────────────────────────────────────
+
+def categorize(cur, ids: list[str]) -> int:
+    cur.execute("SELECT id, name, merchant_name FROM transactions WHERE id = ANY(%s::uuid[]) AND category IS NULL",
+                [ids])
+    rows = [(str(i), *categorize_by_merchant(merchant, name)) for i, name, merchant in cur.fetchall()]
+    if rows:
+        execute_values(cur, """
+            UPDATE transactions t
+            SET category = v.category, subcategory = v.subcategory
+            FROM (VALUES %s) AS v(id, category, subcategory)
+            WHERE t.id = v.id
+        """, rows, template="(%s::uuid, %s, %s)")
+    return len(rows)
+
+
+def budget_rows(cur, ids: list[str], month_start: date) -> list[tuple]:
+    """(user_id, category, month, monthly_limit, spent) for active budgets of the
+    categories the batch touched this month."""
+    cur.execute("""
+        WITH touched AS (
+            SELECT DISTINCT category
+            FROM transactions
+            WHERE id = ANY(%s::uuid[]) AND category IS NOT NULL AND date >= %s
+        )
+        SELECT b.user_id, b.category, %s::date, b.monthly_limit,
+               COALESCE(SUM(t.amount) FILTER (WHERE t.amount > 0), 0)
+        FROM budgets b
+        JOIN touched USING (category)
+        LEFT JOIN transactions t
+          ON t.category = b.category AND t.pending = false
+         AND t.date >= %s AND t.date < (%s::date + INTERVAL '1 month')
+        WHERE b.is_active = true
+        GROUP BY b.user_id, b.category, b.monthly_limit
+    """, [ids, month_start, month_start, month_start, month_start])
+    return cur.fetchall()
+
+
+def unusual_rows(cur, ids: list[str]) -> list[tuple]:
+    cur.execute("""
+        WITH batch AS (
+            SELECT t.id, a.user_id, t.name, t.category, t.amount, t.date
+            FROM transactions t
+            JOIN accounts a ON a.id = t.account_id
+            WHERE t.id = ANY(%s::uuid[]) AND t.amount > 0 AND t.pending = false
+              AND t.category IS NOT NULL AND t.date >= CURRENT_DATE - %s
+        ), averages AS (
+            SELECT category, AVG(amount) AS avg_amount
+            FROM transactions
+            WHERE category IN (SELECT category FROM batch)
+              AND date >= CURRENT_DATE - 90 AND amount > 0 AND pending = false
+            GROUP BY category
+        )
+        SELECT b.user_id, b.id, b.name, b.category, b.amount, b.date, a.avg_amount
+        FROM batch b
+        JOIN averages a USING (category)
+        WHERE b.amount > a.avg_amount * %s
+    """, [ids, UNUSUAL_RECENT_DAYS, UNUSUAL_MULTIPLE])
+    return cur.fetchall()
+
+
+def insert_insights(cur, alerts: list[dict]) -> int:
+    """Writes alerts whose (type, data.key) has no insight yet."""
+    if not alerts:
+        return 0
+    cur.execute("SELECT type, data->>'key' FROM insights WHERE agent = %s AND type = ANY(%s) AND data->>'key' = ANY(%s)",
+                [AGENT, sorted({a["type"] for a in alerts}), [a["data"]["key"] for a in alerts]])
+    seen = set(cur.fetchall())
+    fresh = [a for a in alerts if (a["type"], a["data"]["key"]) not in seen]
+    if fresh:
+        execute_values(cur, """
+            INSERT INTO insights (user_id, agent, type, severity, title, description, data)
+            VALUES %s
+        """, [(a["user_id"], AGENT, a["type"], a["severity"], a["title"][:255], a["description"],
+               json.dumps(a["data"])) for a in fresh],
+            template="(%s::uuid, %s, %s, %s, %s, %s, %s::jsonb)")
+    return len(fresh)
+
+
+def process(conn, ids: list[str]) -> dict:
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL clawfinance.skip_notify = 'on'")
+        categorized = categorize(cur, ids)
+        alerts = high_spend_alerts(budget_rows(cur, ids, date.today().replace(day=1))) + \
+            unusual_alerts(unusual_rows(cur, ids))
+        written = insert_insights(cur, alerts)
+    conn.commit()
+    return {"transactions": len(ids), "categorized": categorized, "alerts": written,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def backlog(conn, limit: int) -> list[str]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM transactions WHERE category IS NULL ORDER BY date DESC LIMIT %s", [limit])
+        ids = [str(r[0]) for r in cur.fetchall()]
+    conn.commit()
+    return ids
+
+
+def run(database_url: str, window: float, max_batch: int, once: bool = False):
+    listener = psycopg2.connect(database_url)
+    listener.autocommit = True
+    listener.cursor().execute(f"LISTEN {CHANNEL}")
+    conn = psycopg2.connect(database_url)
+
+    # LISTEN is active before the backlog is read, so nothing falls in between
+    ids = backlog(conn, max_batch)
+    if ids:
+        print(json.dumps({"status": "ok", "batch": "startup", **process(conn, ids)}), flush=True)
+    if once:
+        return
+
+    batcher = Batcher(window, max_batch)
+    while True:
+        now = time.monotonic()
+        if select.select([listener], [], [], batcher.timeout(now, idle=60.0)) != ([], [], []):
+            listener.poll()
+            while listener.notifies:
+                batcher.add(parse_payload(listener.notifies.pop(0).payload), time.monotonic())
+        if batcher.ready(time.monotonic()):
+            try:
+                print(json.dumps({"status": "ok", **process(conn, batcher.drain())}), flush=True)
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(json.dumps({"status": "error", "message": str(e).strip()}), flush=True)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Seconds a batch stays open")
+    p.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Ids that close a batch early")
+    p.add_argument("--once", action="store_true", help="Process uncategorized transactions and exit")
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    try:
+        run(database_url, args.window, args.max_batch, args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
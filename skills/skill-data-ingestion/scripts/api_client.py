@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+api_client.py — Shared HTTP client for skill scripts that call the ClawFinance API.
+
+    from api_client import get_client
+    client = get_client()
+    resp = client.post("/api/flinks/poll", json={...})
+
+One process-wide ApiClient (get_client) keeps a pool of keep-alive
+connections to CLAWFINANCE_API_URL, so batch jobs pay one TCP handshake per
+pooled connection instead of one per request. It is safe to share across
+threads; the pool holds up to CLAWFINANCE_API_POOL_SIZE connections.
+
+    retries      429 / 5xx responses and connection errors are retried up to
+                 CLAWFINANCE_API_RETRIES times, after Retry-After or an
+                 exponential backoff with jitter (CLAWFINANCE_API_BACKOFF base);
+                 pass retries=0 for a POST that must not be sent twice
+    compression  responses are accepted gzip/deflate-encoded; JSON request
+                 bodies over COMPRESS_MIN_BYTES are sent gzipped (the API's
+                 express.json() inflates them)
+    latency      every attempt is recorded in a per-endpoint histogram
+                 ("POST /api/flinks/poll", ids collapsed to :id); stats()
+                 returns counts, errors, retries, bucket counts, p50/p95/max
+
+Environment:
+    CLAWFINANCE_API_URL, CLAWFINANCE_API_KEY, CLAWFINANCE_API_RETRIES (3),
+    CLAWFINANCE_API_BACKOFF (0.5 s), CLAWFINANCE_API_POOL_SIZE (10)
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import bisect
+import threading
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    print(json.dumps({"status": "error", "message": "requests library not installed. Run: pip install requests"}))
+    sys.exit(1)
+
+API_BASE = os.environ.get("CLAWFINANCE_API_URL", "http://localhost:3001")
+API_KEY = os.environ.get("CLAWFINANCE_API_KEY", "")
+API_RETRIES = int(os.environ.get("CLAWFINANCE_API_RETRIES", "3"))
+API_BACKOFF = float(os.environ.get("CLAWFINANCE_API_BACKOFF", "0.5"))
+API_POOL_SIZE = int(os.environ.get("CLAWFINANCE_API_POOL_SIZE", "10"))
+
+REQUEST_TIMEOUT = 60
+BACKOFF_CAP = 30.0
+COMPRESS_MIN_BYTES = 1024
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F-]{32,36}|[A-Za-z0-9_-]*\d[A-Za-z0-9_-]{5,})$")
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """'GET /api/accounts/:id' — query dropped and id-like segments collapsed, for histogram keys."""
+    segments = path.split("?", 1)[0].split("/")
+    return f"{method.upper()} " + "/".join(":id" if s and _ID_SEGMENT.match(s) else s for s in segments)
+
+
+class LatencyHistogram:
+    """Thread-safe latency histograms keyed by endpoint, with fixed millisecond buckets."""
+
+    def __init__(self, buckets_ms: tuple = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool = True, retried: bool = False):
+        ms = seconds * 1000
+        with self._lock:
+            d = self._data.setdefault(endpoint, {"count": 0, "errors": 0, "retries": 0, "total_ms": 0.0,
+                                                 "max_ms": 0.0, "counts": [0] * (len(self.buckets_ms) + 1)})
+            d["count"] += 1
+            d["errors"] += 0 if ok else 1
+            d["retries"] += 1 if retried else 0
+            d["total_ms"] += ms
+            d["max_ms"] = max(d["max_ms"], ms)
+            d["counts"][bisect.bisect_left(self.buckets_ms, ms)] += 1
+
+    def _quantile(self, counts: list[int], q: float, max_ms: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)."""
+        target = q * sum(counts)
+        running = 0
+        for i, n in enumerate(counts):
+            running += n
+            if running >= target and n:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else round(max_ms, 1)
+        return round(max_ms, 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {k: {**v, "counts": list(v["counts"])} for k, v in self._data.items()}
+        labels = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+        return {
+            endpoint: {
+                "count": d["count"],
+                "errors": d["errors"],
+                "retries": d["retries"],
+                "mean_ms": round(d["total_ms"] / d["count"], 1),
+                "p50_ms": self._quantile(d["counts"], 0.5, d["max_ms"]),
+                "p95_ms": self._quantile(d["counts"], 0.95, d["max_ms"]),
+                "max_ms": round(d["max_ms"], 1),
+                "buckets": {label: n for label, n in zip(labels, d["counts"]) if n},
+            }
+            for endpoint, d in sorted(data.items())
+        }
+
+
+def retry_delay(resp, attempt: int, backoff: float) -> float:
+    """Retry-After when the server sent one, else exponential backoff with jitter."""
+    if resp is not None:
+        try:
+            return min(BACKOFF_CAP, max(0.0, float(resp.headers.get("Retry-After", ""))))
+        except ValueError:
+            pass
+    delay = min(BACKOFF_CAP, backoff * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+class ApiClient:
+    """Pooled, retrying ClawFinance API client; `get` / `post` return requests.Response."""
+
+    def __init__(self, base_url: str = API_BASE, api_key: str = API_KEY, retries: int = API_RETRIES,
+                 backoff: float = API_BACKOFF, pool_size: int = API_POOL_SIZE, timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.latency = LatencyHistogram()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        if api_key:
+            self.session.headers["x-api-key"] = api_key
+
+    def get(self, path: str, params: dict | None = None, timeout: float | None = None,
+            retries: int | None = None):
+        return self.request("GET", path, params=params, timeout=timeout, retries=retries)
+
+    def post(self, path: str, json: dict | list | None = None, timeout: float | None = None,
+             retries: int | None = None):
+        return self.request("POST", path, json=json, timeout=timeout, retries=retries)
+
+    def request(self, method: str, path: str, json=None, params: dict | None = None,
+                timeout: float | None = None, retries: int | None = None):
+        """`retries` overrides the client's retry count for this call."""
+        retries = self.retries if retries is None else retries
+        endpoint = endpoint_name(method, path)
+        headers, data = {}, None
+        if json is not None:
+            data = _json_dumps(json)
+            headers["Content-Type"] = "application/json"
+            if len(data) >= COMPRESS_MIN_BYTES:
+                data = gzip.compress(data, compresslevel=6)
+                headers["Content-Encoding"] = "gzip"
+        for attempt in range(retries + 1):
+            started = time.perf_counter()
+            resp = None
+            try:
+                resp = self.session.request(method, f"{self.base_url}{path}", data=data, params=params,
+                                            headers=headers, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.latency.record(endpoint, time.perf_counter() - started, ok=False, retried=attempt > 0)
+                if attempt == retries:
+                    raise
+            else:
+                transient = resp.status_code == 429 or resp.status_code >= 500
+                self.latency.record(endpoint, time.perf_counter() - started, ok=resp.status_code < 400,
+                                    retried=attempt > 0)
+                if not transient or attempt == retries:
+                    return resp
+            time.sleep(retry_delay(resp, attempt, self.backoff))
+
+    def stats(self) -> dict:
+        return self.latency.snapshot()
+
+    def close(self):
+        self.session.close()
+
+
+def _json_dumps(body) -> bytes:
+    return json.dumps(body, separators=(",", ":"), default=str).encode()
+
+
+_client: ApiClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ApiClient:
+    """The process-wide client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient()
+        return _client
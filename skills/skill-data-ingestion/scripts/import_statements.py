@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+import_statements.py — Imports historical transactions from bank statement files.
+
+For history older than what Plaid or Flinks return. Supported formats:
+
+    csv        any column layout, mapped by header name (common headers are
+               recognised) or set with --mapping / the --*-col flags
+    ofx, qfx   OFX 1.x (SGML) and 2.x (XML); QFX is OFX with Intuit tags
+
+Each file flows through a generator pipeline — read, parse, normalize,
+filter, format as COPY text — straight into COPY, so memory stays constant
+however many rows a file holds:
+
+  1. Amounts are normalized to transactions.amount's rule, positive = spend:
+     OFX TRNAMT is negated (OFX is negative = money out); CSV amounts follow
+     --amount-sign (default spend-negative, the usual bank export), and
+     separate debit / credit columns become debit - credit
+  2. Each row gets a deterministic external_id — from the OFX FITID, or for
+     CSV a hash of account, date, amount, description and its occurrence
+     among identical rows that day — so re-importing a file, or an
+     overlapping one, adds nothing twice
+  3. Rows on or after the account's earliest synced (Plaid / Flinks)
+     transaction are skipped, so imports never duplicate synced history;
+     --no-cutoff imports everything
+  4. Rows are COPYed into a staging table and inserted with
+     ON CONFLICT (external_id) DO NOTHING, one transaction per file
+
+Imported rows have api_source 'statement' and no category; the categorizer
+picks them up as for any new transaction.
+
+Usage:
+    python3 import_statements.py --account-id UUID FILE [FILE ...]
+        [--format csv|ofx|qfx] [--mapping mapping.json] [--amount-sign spend-negative|spend-positive]
+        [--date-col C] [--amount-col C] [--debit-col C] [--credit-col C] [--description-col C]
+        [--merchant-col C] [--id-col C] [--date-format FMT] [--delimiter ,] [--no-cutoff]
+
+A mapping file holds the same settings as JSON, e.g.
+    {"date": "Posting Date", "amount": "Amount", "description": "Description",
+     "date_format": "%m/%d/%Y", "amount_sign": "spend-negative"}
+
+Output: JSON to stdout
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import html
+import time
+import hashlib
+import argparse
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from pg_copy import copy_line
+
+try:
+    import psycopg2
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+API_SOURCE = "statement"
+CHUNK_SIZE = 1 << 16
+OCCURRENCE_DATES = 32                    # dates whose duplicate counters are kept (input is near date order)
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d-%b-%Y", "%d %b %Y", "%b %d, %Y", "%Y%m%d")
+
+# Recognised CSV headers per field, lower-case
+HEADERS = {
+    "date": ("date", "transaction date", "trans date", "posted date", "posting date", "post date"),
+    "amount": ("amount", "transaction amount", "amount (usd)"),
+    "debit": ("debit", "debits", "withdrawal", "withdrawals", "withdrawal amount", "money out"),
+    "credit": ("credit", "credits", "deposit", "deposits", "deposit amount", "money in"),
+    "description": ("description", "name", "payee", "details", "transaction description", "memo"),
+    "merchant": ("merchant", "merchant name"),
+    "id": ("transaction id", "reference", "reference number", "ref", "fitid"),
+}
+MAPPING_KEYS = set(HEADERS) | {"date_format", "amount_sign", "delimiter"}
+AMOUNT_SIGNS = ("spend-negative", "spend-positive")
+
+TXN_COLUMNS = ["account_id", "amount", "date", "name", "merchant_name", "pending", "api_source", "external_id"]
+
+
+class StatementError(ValueError):
+    """A file that cannot be imported as given (unknown format, unmapped columns)."""
+
+
+# ── Field parsing ──────────────────────────────────────────────────────────────
+
+_AMOUNT_JUNK = re.compile(r"[^\d.\-+]")
+
+
+def parse_amount(text: str | None) -> Decimal | None:
+    """'$1,234.56', '(12.00)', '12.00-', '-5' -> Decimal; None when blank or unparseable."""
+    if text is None:
+        return None
+    s = text.strip()
+    if not s:
+        return None
+    negative = (s.startswith("(") and s.endswith(")")) or s.endswith("-")
+    s = _AMOUNT_JUNK.sub("", s.rstrip("-"))
+    try:
+        value = Decimal(s)
+    except InvalidOperation:
+        return None
+    return -abs(value) if negative else value
+
+
+class DateParser:
+    """strptime with one format, or the first of DATE_FORMATS that parses (then kept)."""
+
+    def __init__(self, fmt: str | None = None):
+        self.formats = (fmt,) if fmt else DATE_FORMATS
+
+    def __call__(self, text: str) -> date | None:
+        text = (text or "").strip()
+        for i, fmt in enumerate(self.formats):
+            try:
+                parsed = datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+            if i:
+                self.formats = (fmt, *self.formats[:i], *self.formats[i + 1:])
+            return parsed
+        return None
+
+
+def ofx_date(text: str) -> date | None:
+    """OFX datetime ('20240115', '20240115120000.000[-5:EST]') -> date."""
+    try:
+        return datetime.strptime(text.strip()[:8], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+# ── Readers: yield {"date", "amount" (positive = spend), "name", "merchant", "ref"} ──
+
+def resolve_columns(header: list[str], mapping: dict) -> dict:
+    """Field -> column index from explicit names / indexes in `mapping`, else recognised headers."""
+    lowered = [h.strip().lower() for h in header]
+    columns = {}
+    for field, names in HEADERS.items():
+        wanted = mapping.get(field)
+        if wanted is None:
+            found = next((lowered.index(n) for n in names if n in lowered), None)
+        elif isinstance(wanted, int) or str(wanted).isdigit():
+            found = int(wanted)
+        elif str(wanted).strip().lower() in lowered:
+            found = lowered.index(str(wanted).strip().lower())
+        else:
+            raise StatementError(f"Column {wanted!r} for {field} not in header {header}")
+        if found is not None:
+            columns[field] = found
+    if "date" not in columns or "description" not in columns:
+        raise StatementError(f"Map the date and description columns (header: {header})")
+    if "amount" not in columns and not ({"debit", "credit"} & columns.keys()):
+        raise StatementError(f"Map an amount column or debit / credit columns (header: {header})")
+    if mapping.get("amount") is None and (mapping.get("debit") is not None or mapping.get("credit") is not None):
+        columns.pop("amount", None)
+    elif "amount" in columns:
+        columns.pop("debit", None)
+        columns.pop("credit", None)
+    return columns
+
+
+def read_csv(fh, mapping: dict):
+    reader = csv.reader(fh, delimiter=mapping.get("delimiter") or ",")
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = resolve_columns(header, mapping)
+    parse_date = DateParser(mapping.get("date_format"))
+    spend_sign = -1 if (mapping.get("amount_sign") or "spend-negative") == "spend-negative" else 1
+
+    def cell(row, field):
+        i = columns.get(field)
+        return row[i].strip() if i is not None and i < len(row) else None
+
+    for row in reader:
+        if not any(c.strip() for c in row):
+            continue
+        if "amount" in columns:
+            amount = parse_amount(cell(row, "amount"))
+            amount = amount * spend_sign if amount is not None else None
+        else:
+            debit, credit = parse_amount(cell(row, "debit")), parse_amount(cell(row, "credit"))
+            amount = None if debit is None and credit is None else abs(debit or 0) - abs(credit or 0)
+        yield {"date": parse_date(cell(row, "date")), "amount": amount, "name": cell(row, "description"),
+               "merchant": cell(row, "merchant") or None, "ref": cell(row, "id") or None}
+
+
+def ofx_elements(fh, chunk_size: int = CHUNK_SIZE):
+    """(tag, text) for every tag of an OFX document read in chunks; closing tags
+    come as '/TAG'. SGML (unclosed leaf tags) and XML are handled alike."""
+    buf = ""
+    eof = False
+    while not eof:
+        data = fh.read(chunk_size)
+        eof = not data
+        buf += data
+        pos = 0
+        while True:
+            lt = buf.find("<", pos)
+            if lt < 0:
+                pos = len(buf)
+                break
+            gt = buf.find(">", lt)
+            nxt = buf.find("<", gt) if gt >= 0 else -1
+            if gt < 0 or (nxt < 0 and not eof):
+                pos = lt                             # element continues in the next chunk
+                break
+            end = nxt if nxt >= 0 else len(buf)
+            tag = buf[lt + 1:gt].strip()
+            if tag and tag[0] not in "?!":
+                yield tag.upper(), html.unescape(buf[gt + 1:end].strip())
+            pos = end
+        buf = buf[pos:]
+
+
+def read_ofx(fh):
+    txn = None
+    for tag, text in ofx_elements(fh):
+        if tag == "STMTTRN":
+            txn = {}
+        elif tag == "/STMTTRN" and txn is not None:
+            amount = parse_amount(txn.get("TRNAMT"))
+            name = txn.get("NAME") or txn.get("MEMO") or txn.get("TRNTYPE")
+            yield {"date": ofx_date(txn.get("DTPOSTED", "")), "amount": -amount if amount is not None else None,
+                   "name": name, "merchant": txn.get("NAME") or None, "ref": txn.get("FITID") or None}
+            txn = None
+        elif txn is not None and not tag.startswith("/") and text:
+            txn.setdefault(tag, text)
+
+
+# ── Normalization ──────────────────────────────────────────────────────────────
+
+def external_id(account_id: str, record: dict, occurrence: int) -> str:
+    """'stmt_' + 40 hex chars, stable across re-imports of the same transaction."""
+    if record["ref"]:
+        key = f"{account_id}|ref|{record['ref']}"
+    else:
+        name = " ".join((record["name"] or "").lower().split())
+        key = f"{account_id}|{record['date'].isoformat()}|{record['amount']:.2f}|{name}|{occurrence}"
+    return "stmt_" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def transaction_rows(records, account_id: str, cutoff: date | None, counts: dict):
+    """transactions rows (TXN_COLUMNS) for valid records before `cutoff`; tallies
+    counts["invalid"] and counts["skipped_overlap"]."""
+    occurrences: OrderedDict = OrderedDict()            # date -> {row key: count}, bounded
+    for record in records:
+        if record["date"] is None or record["amount"] is None or not record["name"]:
+            counts["invalid"] += 1
+            continue
+        if cutoff is not None and record["date"] >= cutoff:
+            counts["skipped_overlap"] += 1
+            continue
+        occurrence = 0
+        if not record["ref"]:
+            day = occurrences.get(record["date"])
+            if day is None:
+                day = occurrences[record["date"]] = {}
+                if len(occurrences) > OCCURRENCE_DATES:
+                    occurrences.popitem(last=False)
+            key = (record["amount"], " ".join(record["name"].lower().split()))
+            occurrence = day[key] = day.get(key, -1) + 1
+        amount = record["amount"].quantize(Decimal("0.0001"))
+        yield (account_id, amount, record["date"], record["name"][:500],
+               record["merchant"][:255] if record["merchant"] else None, False, API_SOURCE,
+               external_id(account_id, record, occurrence))
+
+
+class LineStream:
+    """Read-only file object over an iterator of lines, for cursor.copy_expert:
+    lines are pulled as COPY reads, so nothing is buffered beyond one read."""
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.pending = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        parts, have = [self.pending], len(self.pending)
+        while size < 0 or have < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.rows += 1
+            parts.append(line)
+            have += len(line)
+        data = "".join(parts)
+        if size < 0 or len(data) <= size:
+            self.pending = ""
+            return data
+        self.pending = data[size:]
+        return data[:size]
+
+    def readline(self, size: int = -1) -> str:
+        if self.pending:
+            line, self.pending = self.pending, ""
+            return line
+        line = next(self.lines, "")
+        self.rows += 1 if line else 0
+        return line
+
+
+# ── Import ─────────────────────────────────────────────────────────────────────
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("csv", "ofx", "qfx"):
+        return ext
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        head = f.read(4096).upper()
+    if "OFXHEADER" in head or "<OFX>" in head:
+        return "ofx"
+    raise StatementError(f"Cannot tell the format of {path}; pass --format")
+
+
+def records(path: str, fmt: str, mapping: dict):
+    # newline="" for csv; OFX is read as text in chunks
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as fh:
+        yield from (read_csv(fh, mapping) if fmt == "csv" else read_ofx(fh))
+
+
+def synced_cutoff(cur, account_id: str) -> date | None:
+    """Earliest date of the account's synced (non-statement) transactions."""
+    cur.execute("SELECT MIN(date) FROM transactions WHERE account_id = %s AND api_source IS DISTINCT FROM %s",
+                [account_id, API_SOURCE])
+    return cur.fetchone()[0]
+
+
+def import_file(conn, path: str, fmt: str, account_id: str, mapping: dict, cutoff: date | None) -> dict:
+    start = time.perf_counter()
+    counts = {"invalid": 0, "skipped_overlap": 0}
+    rows = transaction_rows(records(path, fmt, mapping), account_id, cutoff, counts)
+    stream = LineStream(copy_line(row) for row in rows)
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE stage_statement_transactions (
+              account_id UUID, amount NUMERIC(18,4), date DATE, name VARCHAR(500), merchant_name VARCHAR(255),
+              pending BOOLEAN, api_source VARCHAR(50), external_id VARCHAR(255)
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert(f"COPY stage_statement_transactions ({', '.join(TXN_COLUMNS)}) FROM STDIN", stream)
+        cur.execute(f"""
+            INSERT INTO transactions ({', '.join(TXN_COLUMNS)})
+            SELECT {', '.join(TXN_COLUMNS)} FROM stage_statement_transactions
+            ON CONFLICT (external_id) DO NOTHING
+        """)
+        inserted = cur.rowcount
+    conn.commit()
+    return {"file": path, "format": fmt, "rows": stream.rows, "inserted": inserted,
+            "duplicates": stream.rows - inserted, **counts, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def load_mapping(args) -> dict:
+    mapping = {}
+    if args.mapping:
+        with open(args.mapping) as f:
+            mapping = json.load(f)
+        unknown = set(mapping) - MAPPING_KEYS
+        if unknown:
+            raise StatementError(f"Unknown mapping keys: {sorted(unknown)}")
+    for key in ("date", "amount", "debit", "credit", "description", "merchant", "id"):
+        if getattr(args, f"{key}_col") is not None:
+            mapping[key] = getattr(args, f"{key}_col")
+    for key in ("date_format", "amount_sign", "delimiter"):
+        if getattr(args, key) is not None:
+            mapping[key] = getattr(args, key)
+    if mapping.get("amount_sign", AMOUNT_SIGNS[0]) not in AMOUNT_SIGNS:
+        raise StatementError(f"amount_sign must be one of {AMOUNT_SIGNS}")
+    return mapping
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("files", nargs="+", help="Statement files (.csv, .ofx, .qfx)")
+    p.add_argument("--account-id", required=True, help="accounts.id the statements belong to")
+    p.add_argument("--format", choices=("csv", "ofx", "qfx"), help="Default: from the file extension")
+    p.add_argument("--mapping", help="JSON file with the CSV column mapping")
+    for key in ("date", "amount", "debit", "credit", "description", "merchant", "id"):
+        p.add_argument(f"--{key}-col", help=f"CSV {key} column (header name or 0-based index)")
+    p.add_argument("--date-format", help="strptime format of CSV dates (default: detected)")
+    p.add_argument("--amount-sign", choices=AMOUNT_SIGNS, help="How the CSV amount column signs spending")
+    p.add_argument("--delimiter", help="CSV delimiter (default ,)")
+    p.add_argument("--no-cutoff", action="store_true", help="Also import rows overlapping synced history")
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    try:
+        mapping = load_mapping(args)
+        formats = [args.format or detect_format(path) for path in args.files]
+    except (StatementError, OSError, ValueError) as e:
+        print(json.dumps({"status": "error", "message": str(e)}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM accounts WHERE id = %s", [args.account_id])
+        if cur.fetchone() is None:
+            print(json.dumps({"status": "error", "message": f"Account {args.account_id} not found"}))
+            sys.exit(1)
+        cutoff = None if args.no_cutoff else synced_cutoff(cur, args.account_id)
+    conn.commit()
+
+    results, errors = [], []
+    for path, fmt in zip(args.files, formats):
+        try:
+            results.append(import_file(conn, path, fmt, args.account_id, mapping, cutoff))
+        except (StatementError, OSError, psycopg2.Error) as e:
+            conn.rollback()
+            errors.append({"file": path, "error": str(e).strip()})
+    conn.close()
+
+    print(json.dumps({
+        "status": "ok" if not errors else ("partial" if results else "error"),
+        "account_id": args.account_id,
+        "cutoff": cutoff.isoformat() if cutoff else None,
+        "inserted": sum(r["inserted"] for r in results),
+        "files": results,
+        "errors": errors or None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+pg_copy.py — PostgreSQL COPY helpers shared by the bulk loaders.
+
+Rows are written in COPY's text format: tab-separated, \\N for NULL, and
+backslash, tab, newline and carriage return escaped, so any text (including
+JSON documents) round-trips unchanged. Dates and timestamps are written as
+ISO 8601.
+
+    copy_line(row)                         one row as a COPY text line
+    copy_rows(cur, table, columns, rows)   COPY rows into a staging table,
+                                           with a trailing seq column
+"""
+
+from datetime import date
+from io import StringIO
+
+
+def copy_value(v) -> str:
+    if v is None:
+        return r"\N"
+    if isinstance(v, date):
+        return v.isoformat()
+    return str(v).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_line(row) -> str:
+    return "\t".join(copy_value(v) for v in row) + "\n"
+
+
+def copy_rows(cur, table: str, columns: list[str], rows: list[tuple]):
+    """COPY rows into `table` (text format), with a trailing seq for last-write-wins."""
+    buf = StringIO()
+    for seq, row in enumerate(rows):
+        buf.write(copy_line((*row, seq)))
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}, seq) FROM STDIN", buf)
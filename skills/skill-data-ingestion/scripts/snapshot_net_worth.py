@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+snapshot_net_worth.py — Writes net_worth_snapshots.
+
+Snapshot (default): one aggregate INSERT ... SELECT over accounts and
+holdings computes each user's total assets (depository + investment),
+total liabilities (credit, loan, mortgage; absolute balances) and a
+breakdown, and upserts today's row:
+
+    {"assets": {"depository": {"checking": 5200.0, ...}, "investment": {...}},
+     "liabilities": {"credit": {"credit_card": 812.4}, ...},
+     "securities": {"equity": 41000.0, "etf": ...}}
+
+An investment account is valued at balance_current (SnapTrade's total value,
+see sync_portfolio.py), or at the sum of its holdings when that is unset.
+
+Backfill (--backfill): rebuilds daily history for days without a snapshot.
+Each account's end-of-day balance is its current balance with every later
+posted transaction reversed, up to today even when --date ends the range
+earlier — positive amounts are money out, so an asset account held
+`amount` more before a spend and a liability owed `amount` less. Transactions are summed per account and day in SQL, scattered into an
+(accounts x days) matrix of 1/10000 units (int64, exact) and turned into
+balances with one reverse cumulative sum; days before an account's first
+transaction carry its earliest reconstructed balance. The per-type totals
+are summed with the same matrix and all rows are COPYed into a staging
+table and inserted in one statement. Existing snapshots are kept unless
+--overwrite. Investment accounts reflect cash flows only: past market
+prices are not known, so holdings are valued at today's prices and every
+backfilled day carries today's "securities" mix.
+
+Usage:
+    python3 snapshot_net_worth.py [--date YYYY-MM-DD]
+    python3 snapshot_net_worth.py --backfill [--start YYYY-MM-DD] [--date YYYY-MM-DD] [--overwrite]
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+from pg_copy import copy_rows
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "numpy not installed. Run: pip install numpy"}))
+    sys.exit(1)
+
+try:
+    import psycopg2
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+ASSET_TYPES = ("depository", "investment")
+LIABILITY_TYPES = ("credit", "loan", "mortgage")
+SCALE = 10_000                           # DECIMAL(18, 4) amounts as exact integers
+
+SECURITIES_SQL = """
+        SELECT user_id, jsonb_object_agg(security_type, ROUND(value, 2)) AS mix
+        FROM (
+            SELECT a.user_id, COALESCE(h.security_type, 'other') AS security_type, SUM(h.market_value) AS value
+            FROM holdings h
+            JOIN accounts a ON a.id = h.account_id AND a.is_active = true
+            WHERE h.market_value IS NOT NULL
+            GROUP BY 1, 2
+        ) s
+        GROUP BY user_id
+"""
+
+SNAPSHOT_SQL = """
+    WITH held AS (
+        SELECT account_id, SUM(market_value) AS value
+        FROM holdings
+        GROUP BY account_id
+    ), valued AS (
+        SELECT a.user_id, a.type, COALESCE(a.subtype, a.type) AS subtype,
+               CASE WHEN a.type IN ('credit', 'loan', 'mortgage') THEN 'liabilities' ELSE 'assets' END AS side,
+               COALESCE(a.balance_current, held.value, 0) AS value
+        FROM accounts a
+        LEFT JOIN held ON held.account_id = a.id
+        WHERE a.is_active = true
+          AND a.type IN ('depository', 'investment', 'credit', 'loan', 'mortgage')
+    ), by_subtype AS (
+        SELECT user_id, side, type, subtype,
+               SUM(CASE WHEN side = 'liabilities' THEN ABS(value) ELSE value END) AS value
+        FROM valued
+        GROUP BY user_id, side, type, subtype
+    ), by_type AS (
+        SELECT user_id, side, type, SUM(value) AS value,
+               jsonb_object_agg(subtype, ROUND(value, 2)) AS subtypes
+        FROM by_subtype
+        GROUP BY user_id, side, type
+    ), by_side AS (
+        SELECT user_id, side, SUM(value) AS value, jsonb_object_agg(type, subtypes) AS types
+        FROM by_type
+        GROUP BY user_id, side
+    ), securities AS (
+        SECURITIES_SQL
+    )
+    INSERT INTO net_worth_snapshots (user_id, date, total_assets, total_liabilities, net_worth, breakdown)
+    SELECT u.user_id, %s,
+           COALESCE(a.value, 0), COALESCE(l.value, 0), COALESCE(a.value, 0) - COALESCE(l.value, 0),
+           jsonb_build_object('assets', COALESCE(a.types, '{}'::jsonb),
+                              'liabilities', COALESCE(l.types, '{}'::jsonb),
+                              'securities', COALESCE(s.mix, '{}'::jsonb))
+    FROM (SELECT DISTINCT user_id FROM valued) u
+    LEFT JOIN by_side a ON a.user_id = u.user_id AND a.side = 'assets'
+    LEFT JOIN by_side l ON l.user_id = u.user_id AND l.side = 'liabilities'
+    LEFT JOIN securities s ON s.user_id = u.user_id
+    ON CONFLICT (user_id, date) DO UPDATE
+      SET total_assets = EXCLUDED.total_assets,
+          total_liabilities = EXCLUDED.total_liabilities,
+          net_worth = EXCLUDED.net_worth,
+          breakdown = EXCLUDED.breakdown
+    RETURNING user_id, total_assets, total_liabilities, net_worth
+""".replace("SECURITIES_SQL", SECURITIES_SQL.strip())
+
+
+def snapshot(cur, day: date) -> list[dict]:
+    cur.execute(SNAPSHOT_SQL, [day])
+    return [{"user_id": str(user), "total_assets": float(assets), "total_liabilities": float(liabilities),
+             "net_worth": float(net)} for user, assets, liabilities, net in cur.fetchall()]
+
+
+# ── Backfill ───────────────────────────────────────────────────────────────────
+
+def reconstruct(current, liability, acc_idx, day_idx, amounts, n_days: int):
+    """End-of-day balances, shape (accounts, days), from current balances.
+
+    current    int64 (accounts,)   balance now, in 1/SCALE units
+    liability  bool (accounts,)    owed-balance accounts: a spend raises the balance
+    acc_idx, day_idx, amounts      one entry per (account, day) of summed posted
+                                   transactions; day 0 is the first day of the window
+    """
+    flows = np.zeros((len(current), n_days), dtype=np.int64)
+    np.add.at(flows, (acc_idx, day_idx), amounts)
+    # Flows after each day's close: total minus the running sum through that day
+    later = flows.sum(axis=1, keepdims=True) - np.cumsum(flows, axis=1)
+    # An owed balance recorded as negative moves like an asset balance
+    sign = np.where(liability & (current >= 0), -1, 1)
+    return current[:, None] + sign[:, None] * later
+
+
+def group_totals(balances, liability, group_idx, n_groups: int):
+    """Per-group daily totals, shape (groups, days); liabilities counted as absolute amounts."""
+    values = np.where(liability[:, None], np.abs(balances), balances)
+    totals = np.zeros((n_groups, balances.shape[1]), dtype=np.int64)
+    np.add.at(totals, group_idx, values)
+    return totals
+
+
+def history_rows(days: list[date], groups: list[tuple], totals, securities: dict | None = None) -> list[tuple]:
+    """net_worth_snapshots rows (user_id, date, assets, liabilities, net_worth, breakdown)
+    from per-(user_id, side, type, subtype) totals; `securities` is each user's mix."""
+    securities = securities or {}
+    rows = []
+    for user in sorted({g[0] for g in groups}):
+        idx = [i for i, g in enumerate(groups) if g[0] == user]
+        sides = np.array([groups[i][1] for i in idx])
+        assets = totals[idx][sides == "assets"].sum(axis=0)
+        liabilities = totals[idx][sides == "liabilities"].sum(axis=0)
+        net = assets - liabilities
+        for d, day in enumerate(days):
+            breakdown = {"assets": {}, "liabilities": {}, "securities": securities.get(user, {})}
+            for i in idx:
+                _, side, type_, subtype = groups[i]
+                breakdown[side].setdefault(type_, {})[subtype] = round(int(totals[i, d]) / SCALE, 2)
+            rows.append((user, day, Decimal(int(assets[d])) / SCALE, Decimal(int(liabilities[d])) / SCALE,
+                         Decimal(int(net[d])) / SCALE, json.dumps(breakdown)))
+    return rows
+
+
+def load_accounts(cur) -> list[tuple]:
+    """(id, user_id, side, type, subtype, current balance) per active balance-sheet account."""
+    cur.execute("""
+        SELECT a.id, a.user_id,
+               CASE WHEN a.type IN ('credit', 'loan', 'mortgage') THEN 'liabilities' ELSE 'assets' END,
+               a.type, COALESCE(a.subtype, a.type),
+               COALESCE(a.balance_current, (SELECT SUM(market_value) FROM holdings h WHERE h.account_id = a.id), 0)
+        FROM accounts a
+        WHERE a.is_active = true
+          AND a.type IN ('depository', 'investment', 'credit', 'loan', 'mortgage')
+        ORDER BY a.user_id, a.type, 5, a.id
+    """)
+    return [(str(i), str(u), side, t, st, bal) for i, u, side, t, st, bal in cur.fetchall()]
+
+
+def load_securities(cur) -> dict[str, dict]:
+    """Today's security-type mix per user, as snapshot() records it."""
+    cur.execute(SECURITIES_SQL)
+    return {str(user): {k: float(v) for k, v in mix.items()} for user, mix in cur.fetchall()}
+
+
+def backfill(cur, start: date | None, end: date, overwrite: bool = False, today: date | None = None) -> dict:
+    """Writes start..end; balances are reconstructed back from today whatever `end` is."""
+    today = today or date.today()
+    accounts = load_accounts(cur)
+    if not accounts:
+        return {"accounts": 0, "days": 0, "rows_written": 0}
+    ids = [a[0] for a in accounts]
+    if start is None:
+        cur.execute("SELECT MIN(date) FROM transactions WHERE account_id = ANY(%s::uuid[]) AND pending = false",
+                    [ids])
+        start = cur.fetchone()[0] or end
+    start = min(start, end)
+    n_days = (end - start).days + 1
+    # Current balances include everything posted through today, so reconstruct from there
+    horizon = max(end, today)
+
+    cur.execute("""
+        SELECT account_id, date, SUM(amount)
+        FROM transactions
+        WHERE account_id = ANY(%s::uuid[]) AND pending = false AND date > %s AND date <= %s
+        GROUP BY account_id, date
+    """, [ids, start, horizon])
+    flows = cur.fetchall()
+    position = {account_id: i for i, account_id in enumerate(ids)}
+    acc_idx = np.fromiter((position[str(a)] for a, _, _ in flows), dtype=np.int64, count=len(flows))
+    day_idx = np.fromiter(((d - start).days for _, d, _ in flows), dtype=np.int64, count=len(flows))
+    amounts = np.fromiter((int(amount * SCALE) for _, _, amount in flows), dtype=np.int64, count=len(flows))
+
+    current = np.array([int(Decimal(a[5]) * SCALE) for a in accounts], dtype=np.int64)
+    liability = np.array([a[2] == "liabilities" for a in accounts])
+    balances = reconstruct(current, liability, acc_idx, day_idx, amounts, (horizon - start).days + 1)[:, :n_days]
+
+    groups = sorted({(a[1], a[2], a[3], a[4]) for a in accounts})
+    group_of = {g: i for i, g in enumerate(groups)}
+    group_idx = np.array([group_of[(a[1], a[2], a[3], a[4])] for a in accounts], dtype=np.int64)
+    totals = group_totals(balances, liability, group_idx, len(groups))
+    days = [start + timedelta(days=d) for d in range(n_days)]
+    rows = history_rows(days, groups, totals, load_securities(cur))
+
+    cur.execute("""
+        CREATE TEMP TABLE stage_net_worth_snapshots (
+          user_id UUID, date DATE, total_assets NUMERIC(18,4), total_liabilities NUMERIC(18,4),
+          net_worth NUMERIC(18,4), breakdown JSONB, seq INTEGER
+        ) ON COMMIT DROP
+    """)
+    copy_rows(cur, "stage_net_worth_snapshots",
+              ["user_id", "date", "total_assets", "total_liabilities", "net_worth", "breakdown"], rows)
+    cur.execute(f"""
+        INSERT INTO net_worth_snapshots (user_id, date, total_assets, total_liabilities, net_worth, breakdown)
+        SELECT user_id, date, total_assets, total_liabilities, net_worth, breakdown
+        FROM stage_net_worth_snapshots
+        ON CONFLICT (user_id, date) DO {'''UPDATE
+          SET total_assets = EXCLUDED.total_assets,
+              total_liabilities = EXCLUDED.total_liabilities,
+              net_worth = EXCLUDED.net_worth,
+              breakdown = EXCLUDED.breakdown''' if overwrite else 'NOTHING'}
+    """)
+    return {"accounts": len(accounts), "days": n_days, "start": start.isoformat(), "end": end.isoformat(),
+            "transaction_days": len(flows), "rows_written": cur.rowcount}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--date", type=date.fromisoformat, default=date.today(), help="Snapshot date (default today)")
+    p.add_argument("--backfill", action="store_true", help="Rebuild daily history from transactions")
+    p.add_argument("--start", type=date.fromisoformat, help="First backfill day (default: earliest transaction)")
+    p.add_argument("--overwrite", action="store_true", help="Replace existing snapshots when backfilling")
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    if args.backfill:
+        result = {"mode": "backfill", **backfill(cur, args.start, args.date, args.overwrite)}
+    else:
+        result = {"mode": "snapshot", "date": args.date.isoformat(), "snapshots": snapshot(cur, args.date)}
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    print(json.dumps({"status": "ok", **result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+sync_accounts.py — Refreshes every linked institution concurrently.
+
+One job per Plaid account (/transactions/sync from its cursor, see
+sync_plaid.py) and per Flinks login (submitted and polled as in sync_flinks.py).
+Jobs run on a bounded worker pool:
+
+    --max-workers      jobs in flight overall (default 8)
+    --per-institution  jobs in flight per institution_name (default 2), so
+                       one bank is never hit by the whole pool at once
+    --retries          retries of transient failures (network errors, 429/5xx,
+                       Plaid INSTITUTION_DOWN etc.) after a full-jitter
+                       exponential backoff; a retrying job gives up its slot
+                       while it waits
+    --deadline         seconds for the whole run; jobs still waiting then are
+                       skipped. Running jobs get the remaining time as their
+                       budget (Plaid request timeouts and paging stop at it);
+                       one still running at the deadline is abandoned as timed
+                       out on its daemon thread, so it cannot hold the process
+
+Plaid changes from all accounts are applied in one transaction at the end
+(COPY + upsert, cursors advance only for accounts that succeeded). Every
+job's outcome, attempts and timing is recorded in agent_state
+(agent_name 'skill-data-ingestion', task_name 'account_sync'), plus one
+'sync_accounts' summary row.
+
+Usage:
+    python3 sync_accounts.py [--sources plaid,flinks] [--max-workers 8] [--per-institution 2]
+                             [--retries 3] [--deadline 600]
+
+Environment:
+    DATABASE_URL, DB_ENCRYPTION_KEY and PLAID_* (see sync_plaid.py),
+    CLAWFINANCE_API_URL, CLAWFINANCE_API_KEY (Flinks)
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from api_client import get_client
+from sync_flinks import SUBMIT_TIMEOUT, submit, wait
+from sync_plaid import PlaidClient, PlaidError, apply_changes, load_accounts, pull
+
+import requests
+import psycopg2
+from psycopg2.extras import execute_values
+
+MAX_WORKERS = int(os.environ.get("SYNC_MAX_WORKERS", "8"))
+PER_INSTITUTION = int(os.environ.get("SYNC_PER_INSTITUTION", "2"))
+MAX_RETRIES = 3
+DEADLINE_SECONDS = 600
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+SOURCES = ("plaid", "flinks")
+
+TRANSIENT_PLAID_CODES = {"RATE_LIMIT_EXCEEDED", "INSTITUTION_DOWN", "INSTITUTION_NOT_RESPONDING",
+                         "INSTITUTION_NOT_AVAILABLE", "INTERNAL_SERVER_ERROR", "PLANNED_MAINTENANCE",
+                         "PRODUCT_NOT_READY"}
+
+
+class Job:
+    """One refresh: `run(timeout)` does the blocking work within `timeout`
+    seconds and returns a result dict."""
+
+    def __init__(self, source: str, key: str, institution: str, run):
+        self.source = source
+        self.key = key
+        self.institution = institution or "unknown"
+        self.run = run
+
+
+class TransientError(Exception):
+    """A failure worth retrying."""
+
+
+def backoff(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_transient(exc: Exception) -> bool:
+    if isinstance(exc, TransientError):
+        return True
+    if isinstance(exc, PlaidError):
+        return exc.status == 429 or exc.status >= 500 or exc.code in TRANSIENT_PLAID_CODES
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def in_daemon_thread(loop, fn, *args) -> asyncio.Future:
+    """fn(*args) on a new daemon thread, as a future of `loop`. Unlike an executor
+    thread, one abandoned at the deadline is not joined at interpreter exit."""
+    future = loop.create_future()
+
+    def settle(result, error):
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def target():
+        try:
+            outcome = (fn(*args), None)
+        except Exception as e:
+            outcome = (None, e)
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:                    # loop already closed: the job was abandoned
+            pass
+
+    threading.Thread(target=target, name="sync-accounts", daemon=True).start()
+    return future
+
+
+async def schedule(jobs: list[Job], max_workers: int = MAX_WORKERS, per_institution: int = PER_INSTITUTION,
+                   retries: int = MAX_RETRIES, deadline: float = DEADLINE_SECONDS) -> list[dict]:
+    """Runs `jobs` under the caps; returns one outcome dict per job, in job order.
+
+    status is "success", "error", "timeout" (running when the deadline hit) or
+    "skipped" (never started before the deadline)."""
+    loop = asyncio.get_running_loop()
+    workers = asyncio.Semaphore(max_workers)
+    caps = defaultdict(lambda: asyncio.Semaphore(per_institution))
+    end = loop.time() + deadline
+
+    async def attempt(job: Job, outcome: dict):
+        async with caps[job.institution]:
+            async with workers:
+                remaining = end - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                # Timing starts once the job holds a slot, not while it queues
+                outcome["started_at"] = outcome["started_at"] or datetime.now(timezone.utc)
+                outcome["_start"] = outcome.get("_start") or loop.time()
+                outcome["attempts"] += 1
+                return await asyncio.wait_for(in_daemon_thread(loop, job.run, remaining), remaining)
+
+    async def one(job: Job) -> dict:
+        outcome = {"source": job.source, "key": job.key, "institution": job.institution, "status": "skipped",
+                   "attempts": 0, "started_at": None, "completed_at": None, "seconds": None,
+                   "error": None, "result": None}
+        for n in range(retries + 1):
+            try:
+                outcome["result"] = await attempt(job, outcome)
+                outcome["status"], outcome["error"] = "success", None
+                break
+            except asyncio.TimeoutError:
+                outcome["status"] = "timeout" if outcome["attempts"] else "skipped"
+                outcome["error"] = "deadline reached"
+                break
+            except Exception as e:
+                outcome["status"], outcome["error"] = "error", str(e)[:500]
+                delay = backoff(n)
+                if not is_transient(e) or n == retries or loop.time() + delay >= end:
+                    break
+                await asyncio.sleep(delay)
+        start = outcome.pop("_start", None)
+        if start is not None:
+            outcome["completed_at"] = datetime.now(timezone.utc)
+            outcome["seconds"] = round(loop.time() - start, 3)
+        return outcome
+
+    return await asyncio.gather(*(one(job) for job in jobs))
+
+
+# ── Jobs ───────────────────────────────────────────────────────────────────────
+
+def plaid_jobs(cur, encryption_key: str, client: PlaidClient) -> list[Job]:
+    jobs = []
+    for uuid, plaid_id, token, cursor, institution in load_accounts(cur, encryption_key):
+        def run(timeout, token=token, cursor=cursor, plaid_id=plaid_id):
+            changes = pull(client, token, cursor, plaid_id, deadline=time.monotonic() + timeout)
+            return {"plaid_account_id": plaid_id, "changes": changes}
+        jobs.append(Job("plaid", uuid, institution, run))
+    return jobs
+
+
+def flinks_jobs(cur) -> list[Job]:
+    cur.execute("""
+        SELECT flinks_login_id, MIN(institution_name)
+        FROM accounts
+        WHERE api_source = 'flinks' AND is_active = true AND flinks_login_id IS NOT NULL
+        GROUP BY flinks_login_id
+        ORDER BY 2, 1
+    """)
+    client = get_client()
+
+    def run(timeout, login_id):
+        deadline = time.monotonic() + timeout
+        jobs = submit(client, login_id, timeout=min(SUBMIT_TIMEOUT, timeout))
+        if not jobs:
+            raise RuntimeError(f"Flinks login {login_id} is no longer active")
+        job = jobs[0]
+        if job["status"] == "pending":
+            job = wait(client, job, deadline)
+        if job["status"] == "timeout":
+            raise TransientError(job["error"])
+        if job["status"] != "connected":
+            raise RuntimeError(job.get("error") or job["status"])
+        return {"accounts_synced": job.get("accounts_synced", 0), "polls": job.get("polls", 0)}
+
+    return [Job("flinks", login_id, institution, lambda timeout, login_id=login_id: run(timeout, login_id))
+            for login_id, institution in cur.fetchall()]
+
+
+def record(cur, outcomes: list[dict], summary: dict):
+    """One agent_state row per job plus a summary row."""
+    rows = []
+    for o in outcomes:
+        result = o["result"] or {}
+        changes = result.get("changes")
+        counts = ({k: len(changes[k]) for k in ("added", "modified", "removed")} if changes
+                  else {k: v for k, v in result.items() if isinstance(v, (int, float))})
+        metadata = {"source": o["source"], "key": o["key"], "institution": o["institution"],
+                    "outcome": o["status"], "attempts": o["attempts"], "seconds": o["seconds"], **counts}
+        rows.append(("skill-data-ingestion", "account_sync", "success" if o["status"] == "success" else "error",
+                     o["started_at"], o["completed_at"], o["error"], json.dumps(metadata)))
+    rows.append(("skill-data-ingestion", "sync_accounts", "success" if not summary["failed"] else "error",
+                 summary["started_at"], datetime.now(timezone.utc), None,
+                 json.dumps({k: v for k, v in summary.items() if k != "started_at"})))
+    execute_values(cur, """
+        INSERT INTO agent_state (agent_name, task_name, status, started_at, completed_at, error_message, metadata)
+        VALUES %s
+    """, rows, template="(%s, %s, %s, COALESCE(%s, NOW()), %s, %s, %s::jsonb)")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sources", default=",".join(SOURCES), help="Comma-separated: plaid,flinks")
+    p.add_argument("--max-workers", type=int, default=MAX_WORKERS)
+    p.add_argument("--per-institution", type=int, default=PER_INSTITUTION)
+    p.add_argument("--retries", type=int, default=MAX_RETRIES)
+    p.add_argument("--deadline", type=float, default=DEADLINE_SECONDS, help="Seconds for the whole run")
+    args = p.parse_args()
+    sources = [s.strip() for s in args.sources.split(",") if s.strip() in SOURCES]
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+    encryption_key = os.environ.get("DB_ENCRYPTION_KEY")
+    if "plaid" in sources and not encryption_key:
+        print(json.dumps({"status": "error", "message": "DB_ENCRYPTION_KEY not set"}))
+        sys.exit(1)
+
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    client = PlaidClient()
+    jobs = (plaid_jobs(cur, encryption_key, client) if "plaid" in sources else []) \
+        + (flinks_jobs(cur) if "flinks" in sources else [])
+    conn.commit()
+
+    outcomes = asyncio.run(schedule(jobs, args.max_workers, args.per_institution, args.retries, args.deadline))
+    client.close()
+
+    synced = [(o["key"], o["result"]["plaid_account_id"], o["result"]["changes"])
+              for o in outcomes if o["source"] == "plaid" and o["status"] == "success"]
+    counts = apply_changes(cur, synced)
+    by_status: dict[str, int] = defaultdict(int)
+    for o in outcomes:
+        by_status[o["status"]] += 1
+    summary = {"started_at": started_at, "jobs": len(jobs), **by_status, **counts,
+               "failed": len(jobs) - by_status["success"], "seconds": round(time.perf_counter() - start, 3)}
+    record(cur, outcomes, summary)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    print(json.dumps({
+        "status": "ok" if not summary["failed"] else "partial",
+        **{k: v for k, v in summary.items() if k != "started_at"},
+        "slowest": sorted(({"source": o["source"], "key": o["key"], "institution": o["institution"],
+                            "seconds": o["seconds"]} for o in outcomes if o["seconds"] is not None),
+                          key=lambda o: -o["seconds"])[:5],
+        "http": get_client().stats() if "flinks" in sources else None,
+        "errors": [{"source": o["source"], "key": o["key"], "institution": o["institution"],
+                    "status": o["status"], "error": o["error"]}
+                   for o in outcomes if o["status"] != "success"] or None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+sync_all.py — Runs the whole ingestion pipeline as a dependency DAG.
+
+Each stage is one existing script, run as its own process:
+
+    accounts    sync_accounts.py                 (Plaid + Flinks)
+    portfolio   sync_portfolio.py                (only with --holdings)
+    categorize  categorize_transactions.py       after accounts
+    news        sync_news.py                     after portfolio
+    budgets     check_budgets.py                 after categorize
+    snapshot    snapshot_net_worth.py            after accounts, portfolio
+
+A stage starts as soon as all the stages it depends on have finished, so
+independent branches (bank data, holdings, news) run concurrently, at most
+--max-parallel at a time. A stage that fails (non-zero exit, "status":
+"error" output, or --stage-timeout) marks its dependents "blocked"; every
+other branch keeps going. A stage that was not requested or has no input
+("skipped") does not block its dependents.
+
+Every stage that runs gets a cron_executions row (job_name
+'sync_all.<stage>', inserted as 'running' when it starts) with its
+duration, the numeric counts from its JSON output and its error; blocked
+stages get an 'error' row naming the failed dependency, and the run
+itself one 'sync_all' row.
+
+Usage:
+    python3 sync_all.py [--holdings get_holdings.json | -] [--stages accounts,categorize,...]
+                        [--max-parallel 4] [--stage-timeout 1800]
+
+The snaptrade MCP get_holdings output for the portfolio stage is passed with
+--holdings (a file, or - for stdin); without it the portfolio stage is skipped.
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+try:
+    import psycopg2
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+SKILLS = os.path.dirname(os.path.dirname(SCRIPTS))
+MAX_PARALLEL = 4
+STAGE_TIMEOUT = 1800
+ERROR_CHARS = 2000
+
+
+class Stage:
+    """One pipeline step: `argv` runs after every stage named in `after` has finished."""
+
+    def __init__(self, name: str, argv: list[str], after: tuple = (), stdin: bytes | None = None,
+                 skip: str | None = None):
+        self.name = name
+        self.argv = argv
+        self.after = tuple(after)
+        self.stdin = stdin
+        self.skip = skip
+
+
+def script(skill: str, name: str, *args: str) -> list[str]:
+    return [sys.executable, os.path.join(SKILLS, skill, "scripts", name), *args]
+
+
+def pipeline(holdings: bytes | None = None) -> list[Stage]:
+    return [
+        Stage("accounts", script("skill-data-ingestion", "sync_accounts.py")),
+        Stage("portfolio", script("skill-data-ingestion", "sync_portfolio.py"), stdin=holdings,
+              skip=None if holdings is not None else "no --holdings payload"),
+        Stage("categorize", script("skill-budget", "categorize_transactions.py"), after=("accounts",)),
+        Stage("news", script("skill-data-ingestion", "sync_news.py"), after=("portfolio",)),
+        Stage("budgets", script("skill-budget", "check_budgets.py"), after=("categorize",)),
+        Stage("snapshot", script("skill-data-ingestion", "snapshot_net_worth.py"), after=("accounts", "portfolio")),
+    ]
+
+
+def validate(stages: list[Stage]):
+    """Raises ValueError on duplicate names, unknown dependencies or cycles."""
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names: {names}")
+    deps = {s.name: set(s.after) for s in stages}
+    unknown = {d for after in deps.values() for d in after} - set(names)
+    if unknown:
+        raise ValueError(f"Unknown dependencies: {sorted(unknown)}")
+    while deps:
+        ready = [n for n, after in deps.items() if not after & deps.keys()]
+        if not ready:
+            raise ValueError(f"Dependency cycle among: {sorted(deps)}")
+        for n in ready:
+            del deps[n]
+
+
+def parse_output(stdout: bytes) -> dict:
+    """The last JSON object line a stage printed (NDJSON-producing scripts end with a summary)."""
+    for line in reversed(stdout.decode(errors="replace").splitlines()):
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+    return {}
+
+
+def counts(result: dict) -> dict:
+    """Top-level numeric fields of a stage's output: its row counts and timings."""
+    return {k: v for k, v in result.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+
+async def run_stage(stage: Stage, timeout: float) -> dict:
+    """Runs one stage's process; returns {"status": "success" | "error", "result", "error"}."""
+    proc = await asyncio.create_subprocess_exec(
+        *stage.argv, stdin=asyncio.subprocess.PIPE if stage.stdin is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(stage.stdin), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return {"status": "error", "result": {}, "error": f"timed out after {timeout:g}s"}
+    result = parse_output(stdout)
+    if proc.returncode != 0 or result.get("status") == "error":
+        message = result.get("message") or stderr.decode(errors="replace").strip() or f"exit code {proc.returncode}"
+        return {"status": "error", "result": result, "error": message[-ERROR_CHARS:]}
+    return {"status": "success", "result": result, "error": None}
+
+
+class CronLog:
+    """cron_executions rows for the run and each stage, on an autocommit connection."""
+
+    def __init__(self, conn):
+        conn.autocommit = True
+        self.cur = conn.cursor()
+
+    def start(self, job_name: str) -> str:
+        self.cur.execute("INSERT INTO cron_executions (job_name, status) VALUES (%s, 'running') RETURNING id",
+                         [job_name])
+        return self.cur.fetchone()[0]
+
+    def finish(self, execution_id: str, status: str, duration_ms: int, output: dict, error: str | None):
+        self.cur.execute("""
+            UPDATE cron_executions
+            SET finished_at = NOW(), status = %s, duration_ms = %s, output = %s::jsonb, error_message = %s
+            WHERE id = %s
+        """, [status, duration_ms, json.dumps(output, default=str), error, execution_id])
+
+    def blocked(self, job_name: str, error: str):
+        self.cur.execute("""
+            INSERT INTO cron_executions (job_name, finished_at, status, duration_ms, output, error_message)
+            VALUES (%s, NOW(), 'error', 0, '{"blocked": true}', %s)
+        """, [job_name, error])
+
+
+async def run_dag(stages: list[Stage], max_parallel: int = MAX_PARALLEL, stage_timeout: float = STAGE_TIMEOUT,
+                  log: CronLog | None = None, runner=run_stage) -> list[dict]:
+    """Runs `stages` in dependency order, independent ones concurrently; one
+    outcome per stage, in stage order. status is "success", "error",
+    "blocked" (a dependency failed or was blocked) or "skipped"."""
+    validate(stages)
+    loop = asyncio.get_running_loop()
+    finished = {s.name: loop.create_future() for s in stages}
+    slots = asyncio.Semaphore(max_parallel)
+
+    async def one(stage: Stage) -> dict:
+        deps = [await finished[d] for d in stage.after]
+        outcome = {"stage": stage.name, "status": "skipped", "after": list(stage.after), "started_at": None,
+                   "seconds": None, "counts": {}, "error": None}
+        failed = [d["stage"] for d in deps if d["status"] in ("error", "blocked")]
+        if failed:
+            outcome.update(status="blocked", error=f"dependency failed: {', '.join(failed)}")
+            if log:
+                log.blocked(f"sync_all.{stage.name}", outcome["error"])
+        elif stage.skip:
+            outcome["error"] = stage.skip
+        else:
+            async with slots:
+                execution_id = log.start(f"sync_all.{stage.name}") if log else None
+                outcome["started_at"] = datetime.now(timezone.utc).isoformat()
+                start = time.perf_counter()
+                try:
+                    ran = await runner(stage, stage_timeout)
+                except Exception as e:              # e.g. the script could not be started
+                    ran = {"status": "error", "result": {}, "error": str(e)[:ERROR_CHARS]}
+                outcome["seconds"] = round(time.perf_counter() - start, 3)
+            outcome.update(status=ran["status"], counts=counts(ran["result"]), error=ran["error"])
+            if ran["result"].get("status") not in (None, "ok"):
+                outcome["result_status"] = ran["result"]["status"]
+            if log:
+                log.finish(execution_id, ran["status"], int(outcome["seconds"] * 1000),
+                           {"counts": outcome["counts"], "result_status": ran["result"].get("status")},
+                           ran["error"])
+        finished[stage.name].set_result(outcome)
+        return outcome
+
+    return await asyncio.gather(*(one(s) for s in stages))
+
+
+def select(stages: list[Stage], names: list[str] | None) -> list[Stage]:
+    """Only the named stages; dependencies outside the selection count as satisfied."""
+    if not names:
+        return stages
+    unknown = set(names) - {s.name for s in stages}
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+    chosen = [s for s in stages if s.name in names]
+    for s in chosen:
+        s.after = tuple(d for d in s.after if d in names)
+    return chosen
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--holdings", help="snaptrade get_holdings JSON for the portfolio stage (file, or - for stdin)")
+    p.add_argument("--stages", help="Comma-separated subset of stages to run")
+    p.add_argument("--max-parallel", type=int, default=MAX_PARALLEL, help="Stages running at once")
+    p.add_argument("--stage-timeout", type=float, default=STAGE_TIMEOUT, help="Seconds before a stage is killed")
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    holdings = None
+    if args.holdings == "-":
+        holdings = sys.stdin.buffer.read()
+    elif args.holdings:
+        with open(args.holdings, "rb") as f:
+            holdings = f.read()
+    try:
+        stages = select(pipeline(holdings), [s.strip() for s in (args.stages or "").split(",") if s.strip()])
+        validate(stages)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    log = CronLog(conn)
+    run_id = log.start("sync_all")
+    start = time.perf_counter()
+    outcomes = asyncio.run(run_dag(stages, args.max_parallel, args.stage_timeout, log))
+    seconds = round(time.perf_counter() - start, 3)
+
+    by_status: dict[str, int] = {}
+    for o in outcomes:
+        by_status[o["status"]] = by_status.get(o["status"], 0) + 1
+    failed = [o["stage"] for o in outcomes if o["status"] in ("error", "blocked")]
+    log.finish(run_id, "error" if failed else "success", int(seconds * 1000),
+               {"stages": by_status, "failed": failed}, f"failed: {', '.join(failed)}" if failed else None)
+    conn.close()
+
+    print(json.dumps({
+        "status": "ok" if not failed else "partial",
+        "seconds": seconds,
+        **by_status,
+        "stages": outcomes,
+    }))
+
+
+if __name__ == "__main__":
+    main()
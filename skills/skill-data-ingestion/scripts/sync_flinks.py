@@ -4,45 +4,132 @@ sync_flinks.py — Syncs bank accounts and transactions from Flinks.
 
 Flinks is a Canadian open-banking platform (Montreal) that aggregates data from
 15,000+ North American financial institutions. This script refreshes all active
-Flinks-linked accounts by:
-  1. Querying accounts WHERE api_source = 'flinks' AND is_active = true
-  2. Grouping by flinks_login_id (one login = one bank connection)
-  3. Calling POST /api/flinks/sync on the ClawFinance API to trigger a refresh
+Flinks-linked accounts as one job per bank connection:
+  1. POST /api/flinks/sync/submit on the ClawFinance API, which groups active
+     Flinks accounts by flinks_login_id (one login = one bank connection),
+     authorizes every login in parallel and answers at once with one job per
+     login — "connected" when the data was ready, "pending" with a request_id
+     while Flinks is still processing (HTTP 202), or "error"
+  2. Pending jobs are polled in parallel via POST /api/flinks/poll with
+     exponential backoff and jitter, until connected or --timeout
+  3. Each login's result is printed as one JSON line as soon as it is final,
+     followed by a summary line, so one slow bank never blocks the rest
+
+Usage:
+    python3 sync_flinks.py [--login-id ID] [--timeout 600] [--max-parallel 8]
+
+Output: JSON lines to stdout — {"login_id", "institution", "status", ...} per
+login, then {"status": "ok" | "partial", "summary": true, ...}
 """
 
-import os
 import sys
 import json
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api_client import API_BASE, ApiClient, get_client
+
+import requests
+
+SUBMIT_TIMEOUT = 120                     # authorize + first GetAccountsDetail for every login
+POLL_REQUEST_TIMEOUT = 60
+POLL_INITIAL = 2.0                       # seconds before the first poll
+POLL_CAP = 30.0
+MAX_PARALLEL = 8
+SYNC_TIMEOUT = 600
+
+
+def poll_delay(attempt: int, initial: float = POLL_INITIAL, cap: float = POLL_CAP) -> float:
+    """Exponential backoff with jitter: between half and all of min(cap, initial * 2**attempt)."""
+    delay = min(cap, initial * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def submit(client: ApiClient, login_id: str | None = None, timeout: float = SUBMIT_TIMEOUT) -> list[dict]:
+    """One job per Flinks login (or only `login_id`), returned without waiting on Flinks.
+    Not retried: a submit that reached the API starts Flinks jobs even if its answer is lost."""
+    resp = client.post("/api/flinks/sync/submit", json={"login_id": login_id} if login_id else {},
+                       timeout=timeout, retries=0)
+    resp.raise_for_status()
+    return resp.json().get("jobs", [])
+
+
+def wait(client: ApiClient, job: dict, deadline: float, initial: float = POLL_INITIAL,
+         cap: float = POLL_CAP) -> dict:
+    """Polls a pending job until it is connected or `deadline` (time.monotonic()) passes.
+    Polls that still fail after the client's own retries are retried within the same
+    budget; a 4xx answer ends the job as "error". Returns the final job."""
+    job = {**job, "polls": 0}
+    started = time.monotonic()
+    attempt = 0
+    while job.get("status") == "pending":
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            job.update(status="timeout", error="Flinks data still processing at deadline")
+            break
+        time.sleep(min(poll_delay(attempt, initial, cap), remaining))
+        attempt += 1
+        job["polls"] += 1
+        try:
+            resp = client.post("/api/flinks/poll", timeout=min(POLL_REQUEST_TIMEOUT, max(remaining, 1)),
+                               json={"request_id": job["request_id"], "login_id": job["login_id"],
+                                     "institution": job.get("institution")})
+            if resp.status_code == 429 or resp.status_code >= 500:
+                continue
+            if resp.status_code >= 400:
+                job.update(status="error", error=f"Poll returned {resp.status_code}: {resp.text}")
+                break
+            body = resp.json()
+        except (requests.ConnectionError, requests.Timeout):
+            continue
+        if body.get("status") == "connected":
+            job.update(status="connected", accounts_synced=body.get("accounts_synced", 0))
+    job["seconds"] = round(time.monotonic() - started, 3)
+    return job
 
-try:
-    import requests
-except ImportError:
-    print(json.dumps({"status": "error", "message": "requests library not installed. Run: pip install requests"}))
-    sys.exit(1)
 
-API_BASE = os.environ.get("CLAWFINANCE_API_URL", "http://localhost:3001")
-API_KEY = os.environ.get("CLAWFINANCE_API_KEY", "")
+def run(client: ApiClient, jobs: list[dict], timeout: float = SYNC_TIMEOUT, max_parallel: int = MAX_PARALLEL,
+        **poll):
+    """Yields each job once it is final: already-final jobs first, then pending
+    ones in the order they finish."""
+    deadline = time.monotonic() + timeout
+    pending = [j for j in jobs if j.get("status") == "pending"]
+    for job in jobs:
+        if job.get("status") != "pending":
+            yield job
+    if not pending:
+        return
+    with ThreadPoolExecutor(min(max_parallel, len(pending)), thread_name_prefix="flinks-poll") as pool:
+        futures = [pool.submit(wait, client, job, deadline, **poll) for job in pending]
+        for future in as_completed(futures):
+            yield future.result()
+
 
 def main():
-    headers = {"Content-Type": "application/json"}
-    if API_KEY:
-        headers["x-api-key"] = API_KEY
+    p = argparse.ArgumentParser()
+    p.add_argument("--login-id", help="Only this Flinks login")
+    p.add_argument("--timeout", type=float, default=SYNC_TIMEOUT, help="Seconds to wait for pending logins")
+    p.add_argument("--max-parallel", type=int, default=MAX_PARALLEL, help="Logins polled at once")
+    args = p.parse_args()
 
+    start = time.perf_counter()
+    client = get_client()
     try:
-        resp = requests.post(f"{API_BASE}/api/flinks/sync", headers=headers, timeout=120)
-        resp.raise_for_status()
-        result = resp.json()
-        print(json.dumps({
-            "status": "ok",
-            "accounts_synced": result.get("accounts_synced", 0),
-            "errors": result.get("errors"),
-        }))
+        jobs = submit(client, args.login_id)
     except requests.exceptions.ConnectionError:
         print(json.dumps({
             "status": "error",
             "message": f"Could not connect to ClawFinance API at {API_BASE}",
         }))
         sys.exit(1)
+    except requests.exceptions.Timeout:
+        print(json.dumps({
+            "status": "error",
+            "message": f"ClawFinance API at {API_BASE} did not answer the sync submit in time",
+        }))
+        sys.exit(1)
     except requests.exceptions.HTTPError as e:
         print(json.dumps({
             "status": "error",
@@ -50,5 +137,23 @@ def main():
         }))
         sys.exit(1)
 
+    counts = {"connected": 0, "error": 0, "timeout": 0}
+    accounts_synced = 0
+    for job in run(client, jobs, args.timeout, args.max_parallel):
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+        accounts_synced += job.get("accounts_synced") or 0
+        print(json.dumps(job), flush=True)
+
+    print(json.dumps({
+        "status": "ok" if counts["connected"] == len(jobs) else "partial",
+        "summary": True,
+        "logins": len(jobs),
+        **counts,
+        "accounts_synced": accounts_synced,
+        "seconds": round(time.perf_counter() - start, 3),
+        "http": client.stats(),
+    }))
+
+
 if __name__ == "__main__":
     main()
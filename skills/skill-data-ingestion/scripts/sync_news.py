@@ -2,19 +2,402 @@
 """
 sync_news.py — Syncs news and SEC filings for portfolio holdings.
 
-Phase 5 stub.
+For every ticker in `holdings`, fetches Finnhub company news and SEC EDGAR
+filings (8-K, 10-Q, 10-K) concurrently and stores them:
+
+    Finnhub /company-news        -> company_news (fingerprinted, near-duplicates
+                                    collapsed, lexicon-scored; see skill-research)
+    SEC /submissions/CIK*.json   -> company_intelligence.sec_filings (merged by accession)
+
+Only items newer than each ticker's high-water mark are fetched and kept:
+MAX(company_news.published_at) for news, the latest stored filing date for
+filings (first sync: NEWS_LOOKBACK_DAYS / FILINGS_LOOKBACK_DAYS).
+
+Requests run on an asyncio event loop over pooled HTTP sessions. Each provider
+has a token-bucket rate limiter (Finnhub free plan: 60/min, SEC fair access:
+10/s) and at most --max-in-flight requests are outstanding overall; 429 and
+5xx responses are retried after Retry-After or an exponential backoff.
+Results stream through a bounded queue to a single writer thread that
+bulk-upserts every FLUSH_ROWS items and commits, so an interrupted run keeps
+what it wrote and the next run resumes from the stored high-water marks.
+
+Usage:
+    python3 sync_news.py [--tickers AAPL,MSFT] [--max-in-flight 8]
+
+Environment:
+    DATABASE_URL, FINNHUB_API_KEY (news is skipped without it),
+    FINNHUB_API_URL, SEC_DATA_URL, SEC_TICKERS_URL, SEC_USER_AGENT,
+    FINNHUB_RATE_PER_SEC, SEC_RATE_PER_SEC, SYNC_NEWS_MAX_IN_FLIGHT
+
+Output: JSON to stdout
 """
 
+import os
+import sys
 import json
+import time
+import asyncio
+import argparse
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "skill-research", "scripts"))
+from fetch_company_intel import collapse_news, insert_news_articles, record_syndication
+from near_duplicates import NearDuplicateIndex
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    print(json.dumps({"status": "error", "message": "requests library not installed. Run: pip install requests"}))
+    sys.exit(1)
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+FINNHUB_API_URL = os.environ.get("FINNHUB_API_URL", "https://finnhub.io/api/v1")
+FINNHUB_API_KEY = os.environ.get("FINNHUB_API_KEY", "")
+SEC_DATA_URL = os.environ.get("SEC_DATA_URL", "https://data.sec.gov")
+SEC_TICKERS_URL = os.environ.get("SEC_TICKERS_URL", "https://www.sec.gov/files/company_tickers.json")
+SEC_USER_AGENT = os.environ.get("SEC_USER_AGENT", "ClawFinance/1.0 (personal-finance-app)")
+
+FINNHUB_RATE_PER_SEC = float(os.environ.get("FINNHUB_RATE_PER_SEC", "1"))    # free plan: 60 calls/minute
+SEC_RATE_PER_SEC = float(os.environ.get("SEC_RATE_PER_SEC", "8"))            # SEC allows at most 10/s
+MAX_IN_FLIGHT = int(os.environ.get("SYNC_NEWS_MAX_IN_FLIGHT", "8"))
+
+NEWS_LOOKBACK_DAYS = 7
+FILINGS_LOOKBACK_DAYS = 90
+FILING_FORMS = {"8-K", "10-Q", "10-K"}
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 30
+FLUSH_ROWS = 2000                      # buffered articles + filings per bulk write
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursting up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:          # waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Provider:
+    """One upstream API: a pooled session, default query params and its rate limit."""
+
+    def __init__(self, name: str, rate: float, burst: float = 1.0, pool_size: int = MAX_IN_FLIGHT,
+                 headers: dict | None = None, params: dict | None = None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.params = params or {}
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"requests": 0, "retries": 0}
+
+
+def retry_delay(resp, attempt: int) -> float:
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After", "")))
+    except ValueError:
+        return min(30.0, 0.5 * 2 ** attempt)
+
+
+class Fetcher:
+    """Runs blocking session requests on a thread pool, at most `max_in_flight` at a time."""
+
+    def __init__(self, max_in_flight: int):
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.executor = ThreadPoolExecutor(max_in_flight, thread_name_prefix="sync-news-http")
+
+    async def get_json(self, provider: Provider, url: str, params: dict | None = None):
+        return (await self.get(provider, url, params)).json()
+
+    async def get_text(self, provider: Provider, url: str, params: dict | None = None) -> str:
+        return (await self.get(provider, url, params)).text
+
+    async def get(self, provider: Provider, url: str, params: dict | None = None):
+        loop = asyncio.get_running_loop()
+        request = partial(provider.session.get, url, params={**provider.params, **(params or {})},
+                          timeout=REQUEST_TIMEOUT)
+        for attempt in range(MAX_RETRIES + 1):
+            await provider.bucket.acquire()
+            async with self.in_flight:
+                provider.stats["requests"] += 1
+                resp = await loop.run_in_executor(self.executor, request)
+            if (resp.status_code == 429 or resp.status_code >= 500) and attempt < MAX_RETRIES:
+                provider.stats["retries"] += 1
+                await asyncio.sleep(retry_delay(resp, attempt))
+                continue
+            resp.raise_for_status()
+            return resp
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+# ── Providers ──────────────────────────────────────────────────────────────────
+
+def build_providers(max_in_flight: int) -> dict:
+    providers = {"sec": Provider("sec", SEC_RATE_PER_SEC, burst=SEC_RATE_PER_SEC, pool_size=max_in_flight,
+                                 headers={"User-Agent": SEC_USER_AGENT})}
+    if FINNHUB_API_KEY:
+        providers["finnhub"] = Provider("finnhub", FINNHUB_RATE_PER_SEC, pool_size=max_in_flight,
+                                        params={"token": FINNHUB_API_KEY})
+    return providers
+
+
+async def fetch_news(fetcher: Fetcher, finnhub: Provider, ticker: str, since: datetime | None,
+                     today: date, base_url: str = FINNHUB_API_URL) -> list[dict]:
+    """Finnhub articles published after `since` (default: the last NEWS_LOOKBACK_DAYS)."""
+    start = since.date() if since else today - timedelta(days=NEWS_LOOKBACK_DAYS)
+    articles = await fetcher.get_json(finnhub, f"{base_url}/company-news",
+                                      {"symbol": ticker, "from": start.isoformat(), "to": today.isoformat()})
+    cutoff = since.timestamp() if since else 0
+    return [a for a in articles or [] if (a.get("datetime") or 0) > cutoff]
+
+
+async def fetch_cik_map(fetcher: Fetcher, sec: Provider, url: str = SEC_TICKERS_URL) -> dict[str, str]:
+    data = await fetcher.get_json(sec, url)
+    return {e["ticker"].upper(): str(e["cik_str"]).zfill(10) for e in data.values()}
+
+
+async def fetch_filings(fetcher: Fetcher, sec: Provider, cik: str, since: date | None, today: date,
+                        base_url: str = SEC_DATA_URL) -> list[dict]:
+    """FILING_FORMS filings filed on or after `since` (same-day filings are merged by accession)."""
+    data = await fetcher.get_json(sec, f"{base_url}/submissions/CIK{cik}.json")
+    recent = (data.get("filings") or {}).get("recent") or {}
+    floor = (since or today - timedelta(days=FILINGS_LOOKBACK_DAYS)).isoformat()
+    return [
+        {"form": form, "filed": filed, "accession": accession, "primary_doc": doc, "cik": cik}
+        for form, filed, accession, doc in zip(recent.get("form", []), recent.get("filingDate", []),
+                                               recent.get("accessionNumber", []), recent.get("primaryDocument", []))
+        if form in FILING_FORMS and filed >= floor
+    ]
+
+
+# ── Pipeline ───────────────────────────────────────────────────────────────────
+
+async def sync(tickers: list[str], news_marks: dict, filing_marks: dict, providers: dict, sink,
+               max_in_flight: int = MAX_IN_FLIGHT, today: date | None = None, urls: dict | None = None) -> dict:
+    """Fetches every ticker concurrently and hands ("news" | "filings", ticker, items)
+    to `sink.add` on one writer thread, then calls `sink.flush`. If the sink
+    raises, outstanding fetches are cancelled and its error is re-raised.
+
+    `urls` overrides the provider base URLs (finnhub, sec_data, sec_tickers).
+    """
+    today = today or date.today()
+    urls = {"finnhub": FINNHUB_API_URL, "sec_data": SEC_DATA_URL, "sec_tickers": SEC_TICKERS_URL, **(urls or {})}
+    fetcher = Fetcher(max_in_flight)
+    writer_thread = ThreadPoolExecutor(1, thread_name_prefix="sync-news-db")
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_in_flight * 4)
+    errors: list[dict] = []
+    fetched = {"news": 0, "filings": 0}
+
+    async def write():
+        while (item := await queue.get()) is not None:
+            await loop.run_in_executor(writer_thread, sink.add, *item)
+        await loop.run_in_executor(writer_thread, sink.flush)
+
+    async def run(kind: str, provider: str, ticker: str, fetch):
+        try:
+            items = await fetch
+        except Exception as e:
+            errors.append({"ticker": ticker, "provider": provider, "message": str(e)})
+            return
+        fetched[kind] += len(items)
+        if items:
+            await queue.put((kind, ticker, items))
+
+    async def produce():
+        tasks = []
+        try:
+            if "finnhub" in providers:
+                tasks += [asyncio.create_task(run("news", "finnhub", t, fetch_news(
+                              fetcher, providers["finnhub"], t, news_marks.get(t), today, urls["finnhub"])))
+                          for t in tickers]
+            if "sec" in providers:
+                sec = providers["sec"]
+                try:
+                    ciks = await fetch_cik_map(fetcher, sec, urls["sec_tickers"])
+                except Exception as e:
+                    errors.append({"ticker": None, "provider": "sec", "message": f"ticker map: {e}"})
+                    ciks = {}
+                for t in tickers:
+                    if t in ciks:
+                        tasks.append(asyncio.create_task(run("filings", "sec", t, fetch_filings(
+                            fetcher, sec, ciks[t], filing_marks.get(t), today, urls["sec_data"]))))
+                    elif ciks:
+                        errors.append({"ticker": t, "provider": "sec", "message": "CIK not found"})
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def unless_writer_fails(aw):
+        """Awaits `aw`; if the writer dies first (sink.add / sink.flush raised),
+        cancels `aw` and re-raises the writer's error instead of blocking on a
+        queue nobody drains."""
+        task = asyncio.ensure_future(aw)
+        await asyncio.wait({task, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
+            writer.result()
+        return task.result()
+
+    writer = asyncio.create_task(write())
+    try:
+        await unless_writer_fails(produce())
+        await unless_writer_fails(queue.put(None))
+        await writer
+    finally:
+        writer.cancel()
+        fetcher.close()
+        writer_thread.shutdown(wait=True)
+
+    return {
+        "news_fetched": fetched["news"],
+        "filings_fetched": fetched["filings"],
+        "requests": {name: p.stats for name, p in providers.items()},
+        "errors": errors,
+    }
+
+
+class DatabaseSink:
+    """Buffers fetched items and bulk-writes them, committing after each flush."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.index = NearDuplicateIndex()
+        self.news: dict[str, list] = {}
+        self.filings: dict[str, list] = {}
+        self.buffered = 0
+        self.counts = {"articles_inserted": 0, "syndicated_copies_collapsed": 0, "tickers_with_filings": 0}
+
+    def add(self, kind: str, ticker: str, items: list):
+        (self.news if kind == "news" else self.filings).setdefault(ticker, []).extend(items)
+        self.buffered += len(items)
+        if self.buffered >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        rows, syndicated = [], {}
+        for ticker, articles in self.news.items():
+            keep, copies, _ = collapse_news(self.cur, self.index, ticker, articles)
+            rows.extend(keep)
+            syndicated.update({(ticker, fp): c for fp, c in copies.items()})
+        self.counts["articles_inserted"] += insert_news_articles(self.cur, rows)
+        self.counts["syndicated_copies_collapsed"] += record_syndication(self.cur, syndicated)
+
+        if self.filings:
+            execute_values(self.cur, """
+                INSERT INTO company_intelligence (ticker_symbol, sec_filings, last_updated)
+                VALUES %s
+                ON CONFLICT (ticker_symbol) DO UPDATE SET
+                  sec_filings = (
+                    SELECT COALESCE(jsonb_agg(d.f ORDER BY d.f->>'filed' DESC, d.f->>'accession' DESC), '[]'::jsonb)
+                    FROM (
+                      SELECT DISTINCT ON (f->>'accession') f
+                      FROM jsonb_array_elements(EXCLUDED.sec_filings
+                                                || COALESCE(company_intelligence.sec_filings, '[]'::jsonb)) AS f
+                      ORDER BY f->>'accession'
+                    ) d
+                  ),
+                  last_updated = NOW()
+            """, [(t, json.dumps(f)) for t, f in self.filings.items()], template="(%s, %s::jsonb, NOW())")
+            self.counts["tickers_with_filings"] += len(self.filings)
+
+        self.conn.commit()
+        self.news.clear()
+        self.filings.clear()
+        self.buffered = 0
+
+
+def high_water_marks(cur, tickers: list[str]) -> tuple[dict, dict]:
+    cur.execute("""
+        SELECT ticker_symbol, MAX(published_at)
+        FROM company_news
+        WHERE ticker_symbol = ANY(%s) AND source_type = 'news'
+        GROUP BY ticker_symbol
+    """, (tickers,))
+    news_marks = {t: ts for t, ts in cur.fetchall() if ts is not None}
+    cur.execute("""
+        SELECT ci.ticker_symbol, MAX(f->>'filed')
+        FROM company_intelligence ci
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(ci.sec_filings, '[]'::jsonb)) AS f
+        WHERE ci.ticker_symbol = ANY(%s)
+        GROUP BY ci.ticker_symbol
+    """, (tickers,))
+    filing_marks = {t: date.fromisoformat(filed) for t, filed in cur.fetchall() if filed}
+    return news_marks, filing_marks
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tickers", help="Comma-separated tickers (default: every ticker in holdings)")
+    p.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    if args.tickers:
+        tickers = sorted({t.strip().upper() for t in args.tickers.split(",") if t.strip()})
+    else:
+        cur.execute("SELECT DISTINCT ticker_symbol FROM holdings WHERE ticker_symbol IS NOT NULL ORDER BY 1")
+        tickers = [r[0] for r in cur.fetchall()]
+    news_marks, filing_marks = high_water_marks(cur, tickers)
+    conn.commit()
+    cur.close()
+
+    providers = build_providers(args.max_in_flight)
+    sink = DatabaseSink(conn)
+    start = time.perf_counter()
+    try:
+        result = asyncio.run(sync(tickers, news_marks, filing_marks, providers, sink, args.max_in_flight))
+    except psycopg2.Error as e:
+        # Flushes already committed stay; the high-water marks resume from them next run
+        conn.rollback()
+        conn.close()
+        print(json.dumps({"status": "error", "message": str(e).strip()}))
+        sys.exit(1)
+    conn.close()
+
+    print(json.dumps({
+        "status": "ok" if not result["errors"] else "partial",
+        "tickers": len(tickers),
+        **result,
+        **sink.counts,
+        "skipped": [] if "finnhub" in providers else ["finnhub: FINNHUB_API_KEY not set"],
+        "seconds": round(time.perf_counter() - start, 2),
+    }, default=str))
+
 
-# TODO (Phase 5):
-# 1. Connect to PostgreSQL
-# 2. SELECT DISTINCT ticker_symbol FROM holdings
-# 3. For each ticker, call finnhub MCP: get_company_news, get_earnings_calendar
-# 4. Call sec MCP: get_company_filings for recent 8-K and 10-Q
-# 5. Upsert into company_intelligence table
-
-print(json.dumps({
-    "status": "stub",
-    "message": "sync_news.py is a Phase 5 stub. Implement after Finnhub and SEC MCP servers are built.",
-}))
+if __name__ == "__main__":
+    main()
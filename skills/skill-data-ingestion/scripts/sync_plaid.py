@@ -2,29 +2,294 @@
 """
 sync_plaid.py — Syncs bank transactions and balances from Plaid.
 
-Phase 1 stub. Full implementation in Phase 2.
+Incremental, cursor-based sync over Plaid's /transactions/sync:
+
+  1. One query reads every active Plaid account with its access token
+     decrypted by pgcrypto (DB_ENCRYPTION_KEY) and its stored plaid_cursor
+  2. For each account, /transactions/sync is paged (options.account_id) from
+     the stored cursor until has_more is false, collecting only the deltas —
+     added, modified and removed transactions — plus current balances. A
+     TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION error restarts the account
+     from its stored cursor, as Plaid requires
+  3. All accounts' added/modified transactions are COPYed into a staging
+     table and applied with one set-based upsert keyed on external_id
+     (the Plaid transaction_id); removed ones are deleted in one statement
+  4. Balances and the new cursors are written in the same transaction, so a
+     cursor only advances together with the rows it covers
+
+An account whose pages fail keeps its old cursor and is retried next run.
+Amounts keep Plaid's sign convention, which is the transactions table's:
+positive = money out.
+
+Usage:
+    python3 sync_plaid.py [--account-id UUID] [--page-size 500]
+
+Environment:
+    DATABASE_URL, DB_ENCRYPTION_KEY, PLAID_CLIENT_ID, PLAID_SECRET,
+    PLAID_ENV (sandbox | development | production), PLAID_API_URL (overrides
+    the environment's base URL, e.g. a local mock server)
+
+Output: JSON to stdout
 """
 
 import os
 import sys
 import json
-from datetime import date, timedelta
+import time
+import argparse
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+from pg_copy import copy_rows
+
+try:
+    import requests
+except ImportError:
+    print(json.dumps({"status": "error", "message": "requests library not installed. Run: pip install requests"}))
+    sys.exit(1)
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
     sys.exit(1)
 
-# TODO (Phase 2):
-# 1. Connect to PostgreSQL using psycopg2
-# 2. SELECT accounts WHERE api_source = 'plaid' AND is_active = true
-# 3. For each account, decrypt access_token_encrypted with pgcrypto
-# 4. Call Plaid API (or MCP server) to fetch transactions
-# 5. Upsert into transactions table
-# 6. Update account balances
-# 7. Write net_worth_snapshot
-
-print(json.dumps({
-    "status": "stub",
-    "message": "sync_plaid.py is a Phase 2 stub. Implement after linking a Plaid account.",
-}))
+PLAID_CLIENT_ID = os.environ.get("PLAID_CLIENT_ID", "")
+PLAID_SECRET = os.environ.get("PLAID_SECRET", "")
+PLAID_ENV = os.environ.get("PLAID_ENV", "sandbox")
+PLAID_API_URL = os.environ.get("PLAID_API_URL", f"https://{PLAID_ENV}.plaid.com")
+
+PAGE_SIZE = 500                          # /transactions/sync maximum
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 60
+MUTATION_RESTARTS = 3
+MUTATION_DURING_PAGINATION = "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+
+TXN_COLUMNS = ["external_id", "account_id", "amount", "date", "authorized_date", "name",
+               "merchant_name", "category", "subcategory", "pending"]
+
+
+class PlaidError(Exception):
+    def __init__(self, status: int, body: dict):
+        self.status = status
+        self.code = body.get("error_code")
+        super().__init__(f"Plaid {status} {self.code}: {body.get('error_message', '')}")
+
+
+class PlaidClient:
+    """Minimal Plaid JSON client: credentials in the body, 429/5xx retried with backoff."""
+
+    def __init__(self, base_url: str = PLAID_API_URL, client_id: str = PLAID_CLIENT_ID,
+                 secret: str = PLAID_SECRET):
+        self.base_url = base_url.rstrip("/")
+        self.credentials = {"client_id": client_id, "secret": secret}
+        self.session = requests.Session()
+        self.requests = 0
+
+    def post(self, path: str, body: dict, deadline: float | None = None) -> dict:
+        """`deadline` (time.monotonic()) caps each request's timeout and backoff;
+        TimeoutError once it has passed."""
+        for attempt in range(MAX_RETRIES + 1):
+            timeout = REQUEST_TIMEOUT if deadline is None else min(REQUEST_TIMEOUT, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError(f"deadline reached before {path}")
+            self.requests += 1
+            resp = self.session.post(f"{self.base_url}{path}", json={**self.credentials, **body}, timeout=timeout)
+            if (resp.status_code == 429 or resp.status_code >= 500) and attempt < MAX_RETRIES:
+                delay = min(30.0, 0.5 * 2 ** attempt)
+                time.sleep(delay if deadline is None else max(0.0, min(delay, deadline - time.monotonic())))
+                continue
+            try:
+                data = resp.json()
+            except ValueError:
+                data = {"error_message": resp.text[:200]}
+            if resp.status_code >= 400:
+                raise PlaidError(resp.status_code, data)
+            return data
+
+    def close(self):
+        self.session.close()
+
+
+def pull(client: PlaidClient, access_token: str, cursor: str | None, account_id: str | None = None,
+         page_size: int = PAGE_SIZE, deadline: float | None = None) -> dict:
+    """All changes since `cursor`: {"added", "modified", "removed" (transaction ids),
+    "accounts" (balances), "next_cursor", "pages"}. Raises TimeoutError when
+    `deadline` (time.monotonic()) passes before the last page."""
+    for restart in range(MUTATION_RESTARTS + 1):
+        changes = {"added": [], "modified": [], "removed": [], "accounts": [], "pages": 0}
+        page_cursor = cursor
+        try:
+            while True:
+                body = {"access_token": access_token, "count": page_size}
+                if page_cursor:
+                    body["cursor"] = page_cursor
+                if account_id:
+                    body["options"] = {"account_id": account_id}
+                page = client.post("/transactions/sync", body, deadline)
+                changes["pages"] += 1
+                changes["added"].extend(page.get("added") or [])
+                changes["modified"].extend(page.get("modified") or [])
+                changes["removed"].extend(r["transaction_id"] for r in page.get("removed") or [])
+                changes["accounts"] = page.get("accounts") or changes["accounts"]
+                page_cursor = page.get("next_cursor") or page_cursor
+                if not page.get("has_more"):
+                    changes["next_cursor"] = page_cursor
+                    return changes
+        except PlaidError as e:
+            if e.code != MUTATION_DURING_PAGINATION or restart == MUTATION_RESTARTS:
+                raise
+
+
+def transaction_row(account_uuid: str, txn: dict) -> tuple:
+    """transactions row (TXN_COLUMNS order) for a Plaid transaction."""
+    pfc = txn.get("personal_finance_category") or {}
+    legacy = txn.get("category") or []
+    category = pfc.get("primary") or (legacy[0] if legacy else None)
+    subcategory = pfc.get("detailed") or (legacy[1] if len(legacy) > 1 else None)
+    merchant = txn.get("merchant_name") or None
+    name = (txn.get("name") or merchant or "Unknown")[:500]
+    return (txn["transaction_id"], account_uuid, txn["amount"], txn["date"], txn.get("authorized_date"),
+            name, merchant and merchant[:255], category and category[:100], subcategory and subcategory[:100],
+            bool(txn.get("pending")))
+
+
+# ── Database ───────────────────────────────────────────────────────────────────
+
+def load_accounts(cur, encryption_key: str, account_id: str | None = None) -> list[tuple]:
+    """(id, plaid account_id, access token, cursor, institution) for active Plaid accounts —
+    one decrypt query."""
+    cur.execute("""
+        SELECT id::text, external_id, pgp_sym_decrypt(access_token_encrypted, %s), plaid_cursor,
+               institution_name
+        FROM accounts
+        WHERE api_source = 'plaid' AND is_active = true AND access_token_encrypted IS NOT NULL
+          AND (%s::uuid IS NULL OR id = %s::uuid)
+        ORDER BY institution_name, id
+    """, (encryption_key, account_id, account_id))
+    return cur.fetchall()
+
+
+def apply_changes(cur, synced: list[tuple[str, str, dict]]) -> dict:
+    """Applies (account uuid, plaid account_id, changes) for every synced account in one
+    transaction: COPY + upsert for added/modified, one DELETE for removed, then
+    balances and cursors."""
+    rows = [transaction_row(uuid, txn) for uuid, _, changes in synced
+            for txn in changes["added"] + changes["modified"]]
+    removed = [tid for _, _, changes in synced for tid in changes["removed"]]
+    counts = {"transactions_upserted": 0, "transactions_removed": 0}
+
+    if rows:
+        cur.execute("""
+            CREATE TEMP TABLE stage_plaid_transactions (
+              external_id VARCHAR(255), account_id UUID, amount DECIMAL(18, 4), date DATE,
+              authorized_date DATE, name VARCHAR(500), merchant_name VARCHAR(255),
+              category VARCHAR(100), subcategory VARCHAR(100), pending BOOLEAN, seq INTEGER
+            ) ON COMMIT DROP
+        """)
+        copy_rows(cur, "stage_plaid_transactions", TXN_COLUMNS, rows)
+        # Categories set locally (rules, manual edits) win over Plaid's
+        cur.execute("""
+            INSERT INTO transactions
+              (external_id, account_id, amount, date, authorized_date, name, merchant_name,
+               category, subcategory, pending, api_source)
+            SELECT DISTINCT ON (external_id)
+                   external_id, account_id, amount, date, authorized_date, name, merchant_name,
+                   category, subcategory, pending, 'plaid'
+            FROM stage_plaid_transactions
+            ORDER BY external_id, seq DESC
+            ON CONFLICT (external_id) DO UPDATE SET
+              account_id = EXCLUDED.account_id,
+              amount = EXCLUDED.amount,
+              date = EXCLUDED.date,
+              authorized_date = EXCLUDED.authorized_date,
+              name = EXCLUDED.name,
+              merchant_name = EXCLUDED.merchant_name,
+              category = COALESCE(transactions.category, EXCLUDED.category),
+              subcategory = COALESCE(transactions.subcategory, EXCLUDED.subcategory),
+              pending = EXCLUDED.pending
+        """)
+        counts["transactions_upserted"] = cur.rowcount
+
+    if removed:
+        cur.execute("DELETE FROM transactions WHERE api_source = 'plaid' AND external_id = ANY(%s)", (removed,))
+        counts["transactions_removed"] = cur.rowcount
+
+    updates = []
+    for uuid, plaid_id, changes in synced:
+        balances = next((a.get("balances") or {} for a in changes["accounts"] if a.get("account_id") == plaid_id), {})
+        updates.append((uuid, changes["next_cursor"], bool(balances), balances.get("current"),
+                        balances.get("available"), balances.get("limit")))
+    if updates:
+        execute_values(cur, """
+            UPDATE accounts a SET
+              plaid_cursor = v.cursor,
+              balance_current = CASE WHEN v.has_balances THEN v.current ELSE a.balance_current END,
+              balance_available = CASE WHEN v.has_balances THEN v.available ELSE a.balance_available END,
+              balance_limit = CASE WHEN v.has_balances THEN v.lim ELSE a.balance_limit END,
+              updated_at = NOW()
+            FROM (VALUES %s) AS v (id, cursor, has_balances, current, available, lim)
+            WHERE a.id = v.id
+        """, updates, template="(%s::uuid, %s, %s, %s::numeric, %s::numeric, %s::numeric)")
+    return counts
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--account-id", help="Only this accounts.id")
+    p.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+    encryption_key = os.environ.get("DB_ENCRYPTION_KEY")
+    if not encryption_key:
+        print(json.dumps({"status": "error", "message": "DB_ENCRYPTION_KEY not set"}))
+        sys.exit(1)
+    if not PLAID_CLIENT_ID or not PLAID_SECRET:
+        print(json.dumps({"status": "error", "message": "PLAID_CLIENT_ID and PLAID_SECRET are required"}))
+        sys.exit(1)
+
+    start = time.perf_counter()
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    accounts = load_accounts(cur, encryption_key, args.account_id)
+    conn.commit()
+
+    client = PlaidClient()
+    synced, errors, pages = [], [], 0
+    for uuid, plaid_id, token, cursor, _ in accounts:
+        try:
+            changes = pull(client, token, cursor, plaid_id, args.page_size)
+        except (PlaidError, requests.RequestException) as e:
+            errors.append({"account_id": uuid, "error": str(e),
+                           "code": getattr(e, "code", None)})
+            continue
+        pages += changes["pages"]
+        synced.append((uuid, plaid_id, changes))
+    client.close()
+
+    counts = apply_changes(cur, synced)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    print(json.dumps({
+        "status": "ok" if not errors else "partial",
+        "accounts": len(accounts),
+        "accounts_synced": len(synced),
+        "pages": pages,
+        "added": sum(len(c["added"]) for _, _, c in synced),
+        "modified": sum(len(c["modified"]) for _, _, c in synced),
+        "removed": sum(len(c["removed"]) for _, _, c in synced),
+        **counts,
+        "errors": errors or None,
+        "seconds": round(time.perf_counter() - start, 3),
+    }))
+    if errors and not synced:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,319 @@
 #!/usr/bin/env python3
 """
-sync_portfolio.py — Syncs investment holdings from SnapTrade/Alpaca.
+sync_portfolio.py — Syncs investment holdings from SnapTrade.
 
-Phase 3 stub.
+The skill calls the snaptrade MCP server's get_holdings tool (or
+get_account_positions for one account) and passes its JSON output to this
+script on stdin or via --data. Holdings are then synced as a diff rather
+than rewritten:
+
+  1. The SnapTrade accounts in the payload are matched to accounts rows
+     (api_source = 'snaptrade', external_id = SnapTrade account id)
+  2. Their current holdings are loaded (and row-locked) into a map keyed by
+     (account, ticker); positions of the same ticker are merged
+  3. Only the differences are written — one bulk INSERT for new positions,
+     one UPDATE ... FROM (VALUES ...) for positions whose quantity, price,
+     cost basis or name changed, one DELETE for positions no longer held.
+     Unchanged rows (and their indexes) are not touched
+  4. accounts.balance_current is set to SnapTrade's total account value
+     where it changed
+
+Accounts missing from the payload are left alone, so a partial payload never
+deletes holdings. The output lists every inserted, updated and deleted
+position so downstream revaluation only touches what changed.
+
+Usage:
+    python3 sync_portfolio.py --data '<get_holdings JSON>'
+    python3 sync_portfolio.py < holdings.json
+    python3 sync_portfolio.py --account-id SNAPTRADE_ACCOUNT_ID < positions.json
+
+Input: get_holdings output — a list of {"account": {...}, "positions": [...],
+"total_value": {...}} — or, with --account-id, a get_account_positions list.
+
+Output: JSON to stdout
 """
 
+import os
+import sys
 import json
+import argparse
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+# holdings columns the diff owns, with their DECIMAL scales (None: text)
+FIELDS = {
+    "security_name": None,
+    "security_type": None,
+    "quantity": 8,
+    "cost_basis_per_share": 6,
+    "cost_basis_total": 4,
+    "market_price": 6,
+    "market_value": 4,
+    "unrealized_gain_loss": 4,
+    "unrealized_gain_loss_pct": 4,
+}
+PCT_LIMIT = Decimal("10000")             # DECIMAL(8, 4)
+
+# SnapTrade security type codes -> holdings.security_type
+SECURITY_TYPES = {
+    "cs": "equity", "ad": "equity", "ps": "equity", "ut": "equity",
+    "et": "etf",
+    "oef": "mutual_fund", "cef": "mutual_fund",
+    "bnd": "bond",
+    "crypto": "crypto",
+    "op": "option", "opt": "option",
+}
+
+
+def dec(value, scale: int | None) -> Decimal | None:
+    """Decimal rounded to a column's scale; None for missing or non-numeric values."""
+    if value is None or value == "":
+        return None
+    try:
+        d = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not d.is_finite():
+        return None
+    return d.quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP) if scale is not None else d
+
+
+def _symbol(position: dict) -> dict:
+    """The innermost security object: SnapTrade nests it as position.symbol.symbol."""
+    sym = position.get("symbol") or {}
+    if isinstance(sym, dict) and isinstance(sym.get("symbol"), dict):
+        sym = sym["symbol"]
+    return sym if isinstance(sym, dict) else {"symbol": sym}
+
+
+def position_values(position: dict) -> tuple[str, dict] | None:
+    """(ticker, holdings fields) for one SnapTrade position; None without a ticker or units."""
+    sym = _symbol(position)
+    ticker = (sym.get("symbol") or sym.get("raw_symbol") or "").strip().upper()
+    units = dec(position.get("units", position.get("fractional_units")), None)
+    if not ticker or units is None:
+        return None
+    type_code = ((sym.get("type") or {}).get("code") or "").lower()
+    return ticker[:20], {
+        "security_name": (sym.get("description") or "")[:255] or None,
+        "security_type": SECURITY_TYPES.get(type_code, type_code or None),
+        "units": units,
+        "price": dec(position.get("price"), None),
+        "cost": dec(position.get("average_purchase_price"), None),
+    }
+
+
+def merge_positions(positions: list[dict]) -> dict[str, dict]:
+    """Holdings rows by ticker, with repeated tickers (several lots) summed at
+    their unit-weighted average cost."""
+    merged: dict[str, dict] = {}
+    for position in positions:
+        parsed = position_values(position)
+        if parsed is None:
+            continue
+        ticker, p = parsed
+        m = merged.get(ticker)
+        if m is None:
+            merged[ticker] = {**p, "cost_total": p["cost"] * p["units"] if p["cost"] is not None else None}
+            continue
+        m["units"] += p["units"]
+        m["price"] = p["price"] if p["price"] is not None else m["price"]
+        m["cost_total"] = (m["cost_total"] + p["cost"] * p["units"]
+                           if m["cost_total"] is not None and p["cost"] is not None else None)
+        m["security_name"] = m["security_name"] or p["security_name"]
+        m["security_type"] = m["security_type"] or p["security_type"]
+    rows = {}
+    for ticker, m in merged.items():
+        if not m["units"]:
+            continue
+        value = m["units"] * m["price"] if m["price"] is not None else None
+        cost_total = m["cost_total"]
+        gain = value - cost_total if value is not None and cost_total is not None else None
+        pct = gain / cost_total * 100 if gain is not None and cost_total else None
+        raw = {
+            "security_name": m["security_name"],
+            "security_type": m["security_type"],
+            "quantity": m["units"],
+            "cost_basis_per_share": cost_total / m["units"] if cost_total is not None else None,
+            "cost_basis_total": cost_total,
+            "market_price": m["price"],
+            "market_value": value,
+            "unrealized_gain_loss": gain,
+            "unrealized_gain_loss_pct": pct if pct is None or abs(pct) < PCT_LIMIT else None,
+        }
+        rows[ticker] = {k: dec(v, FIELDS[k]) if FIELDS[k] is not None else v for k, v in raw.items()}
+    return rows
+
+
+def parse_payload(payload, account_id: str | None = None) -> dict[str, dict]:
+    """{snaptrade_account_id: {"positions": {ticker: fields}, "total_value": Decimal | None}}."""
+    if account_id is not None:
+        positions = payload.get("positions", []) if isinstance(payload, dict) else payload
+        return {account_id: {"positions": merge_positions(positions or []), "total_value": None}}
+    if isinstance(payload, dict):
+        payload = payload.get("accounts", [payload])
+    accounts = {}
+    for entry in payload or []:
+        account = entry.get("account") or {}
+        ext = account.get("id")
+        if not ext:
+            continue
+        total = (entry.get("total_value") or {}).get("value")
+        if total is None:
+            total = ((account.get("balance") or {}).get("total") or {}).get("amount")
+        accounts[ext] = {"positions": merge_positions(entry.get("positions") or []),
+                         "total_value": dec(total, 4)}
+    return accounts
+
+
+def diff(current: dict[tuple, list[tuple]], incoming: dict[tuple, dict]) -> dict:
+    """Minimal changes turning `current` into `incoming`.
+
+    current:  {(account_uuid, ticker): [(holding_id, {field: value}), ...]}
+    incoming: {(account_uuid, ticker): {field: value}}
+
+    Returns {"insert": [(key, fields)], "update": [(holding_id, key, fields)],
+    "delete": [(holding_id, key)], "unchanged": int}. When a key has several
+    stored rows the first is kept and the rest deleted.
+    """
+    changes = {"insert": [], "update": [], "delete": [], "unchanged": 0}
+    for key, rows in current.items():
+        new = incoming.get(key)
+        keep = rows[0] if new is not None else None
+        for holding_id, _ in rows:
+            if keep is None or holding_id != keep[0]:
+                changes["delete"].append((holding_id, key))
+        if keep is not None:
+            if any(keep[1].get(f) != new[f] for f in FIELDS):
+                changes["update"].append((keep[0], key, new))
+            else:
+                changes["unchanged"] += 1
+    for key, new in incoming.items():
+        if key not in current:
+            changes["insert"].append((key, new))
+    return changes
+
+
+def load_holdings(cur, account_uuids: list[str]) -> dict[tuple, list[tuple]]:
+    """Current holdings of the given accounts, locked for the rest of the transaction."""
+    cur.execute(f"""
+        SELECT id, account_id, ticker_symbol, {", ".join(FIELDS)}
+        FROM holdings
+        WHERE account_id = ANY(%s::uuid[])
+        ORDER BY account_id, ticker_symbol, last_updated DESC NULLS LAST, id
+        FOR UPDATE
+    """, [account_uuids])
+    current: dict[tuple, list[tuple]] = {}
+    for holding_id, account, ticker, *values in cur.fetchall():
+        current.setdefault((str(account), ticker), []).append((str(holding_id), dict(zip(FIELDS, values))))
+    return current
+
+
+def apply(cur, changes: dict) -> None:
+    columns = list(FIELDS)
+    casts = ", ".join("%s" if FIELDS[c] is None else "%s::numeric" for c in columns)
+    if changes["insert"]:
+        execute_values(cur, f"""
+            INSERT INTO holdings (account_id, ticker_symbol, {", ".join(columns)})
+            VALUES %s
+        """, [(account, ticker, *(fields[c] for c in columns)) for (account, ticker), fields in changes["insert"]],
+            template=f"(%s::uuid, %s, {casts})")
+    if changes["update"]:
+        execute_values(cur, f"""
+            UPDATE holdings h
+            SET {", ".join(f"{c} = v.{c}" for c in columns)}, last_updated = NOW()
+            FROM (VALUES %s) AS v(id, {", ".join(columns)})
+            WHERE h.id = v.id
+        """, [(holding_id, *(fields[c] for c in columns)) for holding_id, _, fields in changes["update"]],
+            template=f"(%s::uuid, {casts})")
+    if changes["delete"]:
+        cur.execute("DELETE FROM holdings WHERE id = ANY(%s::uuid[])",
+                    [[holding_id for holding_id, _ in changes["delete"]]])
+
+
+def update_balances(cur, balances: list[tuple[str, Decimal]]) -> int:
+    if not balances:
+        return 0
+    execute_values(cur, """
+        UPDATE accounts a
+        SET balance_current = v.balance, updated_at = NOW()
+        FROM (VALUES %s) AS v(id, balance)
+        WHERE a.id = v.id AND a.balance_current IS DISTINCT FROM v.balance
+    """, balances, template="(%s::uuid, %s::numeric)")
+    return cur.rowcount
+
+
+def sync(cur, accounts: dict[str, dict]) -> dict:
+    """Diffs and applies the parsed payload; returns delta counts and the changed positions."""
+    cur.execute("""
+        SELECT external_id, id, account_name
+        FROM accounts
+        WHERE api_source = 'snaptrade' AND is_active = true AND external_id = ANY(%s)
+    """, [list(accounts)])
+    known = {ext: (str(uuid), name) for ext, uuid, name in cur.fetchall()}
+    unknown = sorted(set(accounts) - set(known))
+
+    incoming = {(known[ext][0], ticker): fields
+                for ext, acct in accounts.items() if ext in known
+                for ticker, fields in acct["positions"].items()}
+    changes = diff(load_holdings(cur, [uuid for uuid, _ in known.values()]), incoming)
+    apply(cur, changes)
+    balances_updated = update_balances(cur, [(known[ext][0], acct["total_value"]) for ext, acct in accounts.items()
+                                             if ext in known and acct["total_value"] is not None])
+
+    changed = ([{"account_id": a, "ticker": t, "change": "insert"} for (a, t), _ in changes["insert"]]
+               + [{"account_id": a, "ticker": t, "change": "update"} for _, (a, t), _ in changes["update"]]
+               + [{"account_id": a, "ticker": t, "change": "delete"} for _, (a, t) in changes["delete"]])
+    return {
+        "accounts": len(known),
+        "inserted": len(changes["insert"]),
+        "updated": len(changes["update"]),
+        "deleted": len(changes["delete"]),
+        "unchanged": changes["unchanged"],
+        "balances_updated": balances_updated,
+        "changed_tickers": sorted({c["ticker"] for c in changed}),
+        "changed": changed,
+        "unknown_accounts": unknown or None,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--data", type=str, help="get_holdings JSON from the skill (stdin alternative)")
+    p.add_argument("--account-id", help="SnapTrade account id the get_account_positions payload belongs to")
+    args = p.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    # Accept pre-fetched data via --data flag (passed by the skill after MCP calls)
+    if not args.data and sys.stdin.isatty():
+        print(json.dumps({"status": "error", "message": "No holdings payload: pass --data or pipe JSON on stdin"}))
+        sys.exit(1)
+    try:
+        payload = json.loads(args.data) if args.data else json.load(sys.stdin)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": f"Invalid holdings JSON: {e}"}))
+        sys.exit(1)
+
+    accounts = parse_payload(payload, args.account_id)
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    result = sync(cur, accounts)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    print(json.dumps({"status": "ok", **result}))
+
 
-# TODO (Phase 3):
-# 1. Connect to PostgreSQL
-# 2. SELECT accounts WHERE api_source = 'snaptrade'
-# 3. Call SnapTrade MCP server get_holdings and get_positions
-# 4. Upsert into holdings table
-# 5. Write net_worth_snapshot with investment breakdown
-
-print(json.dumps({
-    "status": "stub",
-    "message": "sync_portfolio.py is a Phase 3 stub. Implement after SnapTrade MCP is built.",
-}))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for api_client.py against a local HTTP/1.1 server (no network).
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, main
+
+import requests
+
+from api_client import ApiClient, LatencyHistogram, endpoint_name
+
+
+class Recorder(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"            # keep-alive
+    lock = threading.Lock()
+    requests_seen: list = []
+    peers: set = set()
+    failures: dict = {}
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_any(self):
+        cls = type(self)
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        with cls.lock:
+            cls.requests_seen.append((self.command, self.path, self.headers.get("Content-Encoding"), raw))
+            cls.peers.add(self.client_address)
+            failures = cls.failures.get(self.path, [])
+            status = failures.pop(0) if failures else None
+        if status:
+            return self.reply(status, {"error": "try again"}, {"Retry-After": "0"} if status == 429 else None)
+        self.reply(200, {"ok": True, "echo": json.loads(raw) if raw else None})
+
+    do_GET = do_POST = handle_any
+
+
+class TestApiClient(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Recorder)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        Recorder.requests_seen, Recorder.peers, Recorder.failures = [], set(), {}
+        self.client = ApiClient(self.base, retries=2, backoff=0.01)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_connections_are_reused(self):
+        for i in range(20):
+            self.assertEqual(self.client.get(f"/api/accounts/{i + 1}").status_code, 200)
+        self.assertEqual(len(Recorder.requests_seen), 20)
+        self.assertEqual(len(Recorder.peers), 1)
+
+    def test_transient_statuses_are_retried(self):
+        Recorder.failures = {"/api/flinks/poll": [429, 503]}
+        resp = self.client.post("/api/flinks/poll", json={"login_id": "x"})
+        self.assertEqual((resp.status_code, resp.json()["echo"]), (200, {"login_id": "x"}))
+        stats = self.client.stats()["POST /api/flinks/poll"]
+        self.assertEqual((stats["count"], stats["errors"], stats["retries"]), (3, 2, 2))
+
+    def test_gives_up_after_retries_and_returns_last_response(self):
+        Recorder.failures = {"/api/flinks/poll": [500, 500, 500, 500]}
+        self.assertEqual(self.client.post("/api/flinks/poll", json={}).status_code, 500)
+        self.assertEqual(len(Recorder.requests_seen), 3)
+
+    def test_per_call_retries_override(self):
+        Recorder.failures = {"/api/flinks/sync/submit": [503]}
+        self.assertEqual(self.client.post("/api/flinks/sync/submit", json={}, retries=0).status_code, 503)
+        self.assertEqual(len(Recorder.requests_seen), 1)
+
+    def test_client_errors_are_not_retried(self):
+        Recorder.failures = {"/api/accounts": [404]}
+        self.assertEqual(self.client.get("/api/accounts").status_code, 404)
+        self.assertEqual(len(Recorder.requests_seen), 1)
+
+    def test_connection_errors_raise_after_retries(self):
+        client = ApiClient("http://127.0.0.1:9", retries=1, backoff=0.01)
+        with self.assertRaises(requests.ConnectionError):
+            client.get("/api/health")
+        self.assertEqual(client.stats()["GET /api/health"]["errors"], 2)
+
+    def test_large_bodies_are_gzipped(self):
+        small = {"login_id": "a"}
+        large = {"rows": [{"description": f"Transaction {i}", "amount": i} for i in range(200)]}
+        self.assertEqual(self.client.post("/api/small", json=small).json()["echo"], small)
+        self.assertEqual(self.client.post("/api/large", json=large).json()["echo"], large)
+        (_, _, small_enc, _), (_, _, large_enc, _) = Recorder.requests_seen
+        self.assertEqual((small_enc, large_enc), (None, "gzip"))
+
+
+class TestStats(TestCase):
+    def test_endpoint_name_collapses_ids(self):
+        self.assertEqual(endpoint_name("get", "/api/accounts/42?limit=5"), "GET /api/accounts/:id")
+        self.assertEqual(endpoint_name("POST", "/api/budgets/3f2b8c1e-9d4a-4e57-a1b2-c3d4e5f60718/alerts"),
+                         "POST /api/budgets/:id/alerts")
+        self.assertEqual(endpoint_name("POST", "/api/flinks/sync/submit"), "POST /api/flinks/sync/submit")
+
+    def test_histogram_quantiles(self):
+        h = LatencyHistogram(buckets_ms=(10, 100, 1000))
+        for seconds in [0.005] * 90 + [0.05] * 8 + [0.5, 2.0]:
+            h.record("GET /x", seconds)
+        h.record("GET /x", 0.001, ok=False, retried=True)
+        s = h.snapshot()["GET /x"]
+        self.assertEqual((s["count"], s["errors"], s["retries"]), (101, 1, 1))
+        self.assertEqual((s["p50_ms"], s["p95_ms"], s["max_ms"]), (10.0, 100.0, 2000.0))
+        self.assertEqual(s["buckets"], {"<=10ms": 91, "<=100ms": 8, "<=1000ms": 1, ">1000ms": 1})
+
+
+if __name__ == "__main__":
+    main()
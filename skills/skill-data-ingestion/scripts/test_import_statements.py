@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for import_statements.py's streaming parsers, sign normalization and
+external ids (no database).
+"""
+
+import io
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+from unittest import TestCase, main
+
+from import_statements import LineStream, StatementError, ofx_elements, parse_amount, read_csv, read_ofx, transaction_rows
+from pg_copy import copy_line
+
+ACCOUNT = "6f1c2b9e-0000-4000-8000-000000000001"
+
+OFX_SGML = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD
+<BANKTRANLIST><DTSTART>20150101<DTEND>20150131
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20150105120000.000[-5:EST]<TRNAMT>-42.17<FITID>2015010501
+<NAME>WHOLE FOODS &amp; CO<MEMO>POS PURCHASE
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20150115<TRNAMT>2500.00<FITID>2015011502<NAME>ACME PAYROLL
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+OFX_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<?OFX OFXHEADER="200" VERSION="220"?>
+<OFX><CREDITCARDMSGSRSV1><CCSTMTTRNRS><CCSTMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>20160302</DTPOSTED><TRNAMT>-9.99</TRNAMT>
+<FITID>A1</FITID><NAME>NETFLIX.COM</NAME></STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20160310</DTPOSTED><TRNAMT>100.00</TRNAMT>
+<FITID>A2</FITID><MEMO>PAYMENT THANK YOU</MEMO></STMTTRN>
+</BANKTRANLIST></CCSTMTRS></CCSTMTRNRS></CREDITCARDMSGSRSV1></OFX>"""
+
+
+def rows(records, cutoff=None):
+    counts = {"invalid": 0, "skipped_overlap": 0}
+    return list(transaction_rows(records, ACCOUNT, cutoff, counts)), counts
+
+
+class TestParsers(TestCase):
+    def test_parse_amount(self):
+        cases = {"$1,234.56": Decimal("1234.56"), "(12.00)": Decimal("-12.00"), "12.00-": Decimal("-12.00"),
+                 "-5": Decimal("-5"), " ": None, "n/a": None}
+        for text, expected in cases.items():
+            self.assertEqual(parse_amount(text), expected, text)
+
+    def test_ofx_sgml_and_xml_in_small_chunks(self):
+        for doc in (OFX_SGML, OFX_XML):
+            self.assertEqual(list(ofx_elements(io.StringIO(doc), chunk_size=7)),
+                             list(ofx_elements(io.StringIO(doc))))
+        first, second = read_ofx(io.StringIO(OFX_SGML))
+        self.assertEqual(first, {"date": date(2015, 1, 5), "amount": Decimal("42.17"), "name": "WHOLE FOODS & CO",
+                                 "merchant": "WHOLE FOODS & CO", "ref": "2015010501"})
+        self.assertEqual(second["amount"], Decimal("-2500.00"))             # income is negative
+        card = list(read_ofx(io.StringIO(OFX_XML)))
+        self.assertEqual([(r["amount"], r["name"]) for r in card],
+                         [(Decimal("9.99"), "NETFLIX.COM"), (Decimal("-100.00"), "PAYMENT THANK YOU")])
+
+    def test_csv_recognised_headers_spend_negative(self):
+        data = "Posting Date,Description,Amount\n01/05/2015,COFFEE,-3.50\n01/06/2015,REFUND,10.00\n\n"
+        records = list(read_csv(io.StringIO(data), {}))
+        self.assertEqual([(r["date"], r["amount"]) for r in records],
+                         [(date(2015, 1, 5), Decimal("3.50")), (date(2015, 1, 6), Decimal("-10.00"))])
+
+    def test_csv_mapping_debit_credit_and_index_columns(self):
+        data = "d;what;out;in\n2015-02-01;RENT;1,200.00;\n2015-02-03;SALARY;;3,000.00\n"
+        mapping = {"date": 0, "description": "what", "debit": "out", "credit": "in", "delimiter": ";"}
+        records = list(read_csv(io.StringIO(data), mapping))
+        self.assertEqual([r["amount"] for r in records], [Decimal("1200.00"), Decimal("-3000.00")])
+
+    def test_csv_spend_positive(self):
+        data = "Date,Payee,Amount\n2015-03-01,AIRLINE,450.00\n"
+        (record,) = read_csv(io.StringIO(data), {"amount_sign": "spend-positive"})
+        self.assertEqual(record["amount"], Decimal("450.00"))
+
+    def test_unmapped_csv_is_rejected(self):
+        with self.assertRaises(StatementError):
+            list(read_csv(io.StringIO("When,What\n2015-01-01,x\n"), {}))
+
+
+class TestRows(TestCase):
+    def test_external_ids_are_deterministic_and_distinguish_repeats(self):
+        data = "Date,Description,Amount\n2015-01-05,COFFEE,-3.50\n2015-01-05,Coffee ,-3.50\n2015-01-06,COFFEE,-3.50\n"
+        first, _ = rows(read_csv(io.StringIO(data), {}))
+        again, _ = rows(read_csv(io.StringIO(data), {}))
+        ids = [r[-1] for r in first]
+        self.assertEqual(ids, [r[-1] for r in again])
+        self.assertEqual(len(set(ids)), 3)                                  # same-day twin gets its own id
+        self.assertTrue(all(i.startswith("stmt_") and len(i) == 45 for i in ids))
+        # the same transactions in a wider export keep their ids
+        wider = "Date,Description,Amount\n2015-01-04,BOOKS,-20\n" + data.split("\n", 1)[1]
+        self.assertEqual([r[-1] for r in rows(read_csv(io.StringIO(wider), {}))[0][1:]], ids)
+
+    def test_cutoff_and_invalid_rows(self):
+        data = "Date,Description,Amount\n2015-01-05,A,-1\nbad-date,B,-1\n2015-01-06,,-1\n2020-01-01,C,-1\n"
+        out, counts = rows(read_csv(io.StringIO(data), {}), cutoff=date(2019, 6, 1))
+        self.assertEqual([r[3] for r in out], ["A"])
+        self.assertEqual(counts, {"invalid": 2, "skipped_overlap": 1})
+        self.assertEqual(out[0][:3], (ACCOUNT, Decimal("1.0000"), date(2015, 1, 5)))
+
+
+class TestStreaming(TestCase):
+    def test_line_stream_reads(self):
+        stream = LineStream(f"row {i}\n" for i in range(1000))
+        out = []
+        while True:
+            chunk = stream.read(100)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 100)
+            out.append(chunk)
+        self.assertEqual("".join(out), "".join(f"row {i}\n" for i in range(1000)))
+        self.assertEqual(stream.rows, 1000)
+
+    def test_pipeline_memory_is_constant(self):
+        def big_csv(n):
+            yield "Date,Description,Amount\n"
+            for i in range(n):
+                yield f"2015-{1 + i % 12:02d}-{1 + i % 28:02d},MERCHANT {i % 500},-{i % 997}.{i % 100:02d}\n"
+
+        def peak(n):
+            counts = {"invalid": 0, "skipped_overlap": 0}
+            stream = LineStream(copy_line(r) for r in transaction_rows(
+                read_csv(big_csv(n), {}), ACCOUNT, None, counts))
+            tracemalloc.start()
+            while stream.read(8192):
+                pass
+            _, top = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.assertEqual(stream.rows, n)
+            return top
+
+        small, large = peak(2_000), peak(20_000)
+        self.assertLess(large, small * 2 + 200_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for pg_copy.py's COPY text formatting (no database).
+"""
+
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import TestCase, main
+
+from pg_copy import copy_line, copy_rows, copy_value
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.copies = []
+
+    def copy_expert(self, sql, buf):
+        self.copies.append((sql, buf.read()))
+
+
+class TestCopyValue(TestCase):
+    def test_escapes_copy_text_specials(self):
+        self.assertEqual(copy_value("a\tb\nc\rd\\e"), "a\\tb\\nc\\rd\\\\e")
+        self.assertEqual(copy_value(None), r"\N")
+        self.assertEqual(copy_value(""), "")
+        self.assertEqual(copy_value(r"\N"), r"\\N")                        # literal text, not NULL
+        self.assertEqual((copy_value(3), copy_value(0.25), copy_value(Decimal("1.50"))), ("3", "0.25", "1.50"))
+        self.assertEqual(copy_value(False), "False")
+
+    def test_dates_and_json(self):
+        self.assertEqual(copy_value(date(2026, 3, 2)), "2026-03-02")
+        self.assertEqual(copy_value(datetime(2026, 3, 2, 13, 5, tzinfo=timezone.utc)), "2026-03-02T13:05:00+00:00")
+        doc = json.dumps({"label": 'say "hi"\tthere', "path": "C:\\x", "note": "line\nbreak"})
+        self.assertEqual(copy_value(doc).replace("\\\\", "\\"), doc)       # COPY un-escapes to the same JSON
+        self.assertNotIn("\t", copy_value(doc))
+
+    def test_copy_line(self):
+        self.assertEqual(copy_line(("a\tb", None, date(2015, 1, 1), Decimal("1.5"), False)),
+                         "a\\tb\t\\N\t2015-01-01\t1.5\tFalse\n")
+
+    def test_copy_rows_appends_seq(self):
+        cur = RecordingCursor()
+        copy_rows(cur, "stage_t", ["a", "b"], [("x\ty", None), ("z", date(2026, 1, 2))])
+        self.assertEqual(cur.copies, [("COPY stage_t (a, b, seq) FROM STDIN", "x\\ty\t\\N\t0\nz\t2026-01-02\t1\n")])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for snapshot_net_worth.py's vectorized history reconstruction (no
+database — a stand-in cursor for backfill()).
+"""
+
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import TestCase, main
+
+import numpy as np
+
+from snapshot_net_worth import SCALE, backfill, group_totals, history_rows, reconstruct
+
+
+def units(*values) -> np.ndarray:
+    return np.array([round(v * SCALE) for v in values], dtype=np.int64)
+
+
+class TestReconstruct(TestCase):
+    def test_reverses_later_transactions(self):
+        # checking: spent 50 on day 2 and was paid 1000 on day 3; card: charged 120 on day 1
+        current = units(2000, 300)
+        liability = np.array([False, True])
+        balances = reconstruct(current, liability, np.array([0, 0, 1]), np.array([2, 3, 1]),
+                               units(50, -1000, 120), n_days=4)
+        np.testing.assert_array_equal(balances[0], units(1050, 1050, 1000, 2000))
+        np.testing.assert_array_equal(balances[1], units(180, 300, 300, 300))
+
+    def test_negative_liability_balances_move_like_assets(self):
+        balances = reconstruct(units(-300), np.array([True]), np.array([0]), np.array([1]), units(120), n_days=2)
+        np.testing.assert_array_equal(balances[0], units(-180, -300))
+
+    def test_matches_a_loop_over_random_data(self):
+        rng = np.random.default_rng(7)
+        n_acc, n_days, n = 6, 400, 3000
+        current = rng.integers(-10**8, 10**9, n_acc)
+        liability = rng.random(n_acc) < 0.4
+        acc, day = rng.integers(0, n_acc, n), rng.integers(0, n_days, n)
+        amounts = rng.integers(-10**7, 10**7, n)
+        balances = reconstruct(current, liability, acc, day, amounts, n_days)
+        for a in range(n_acc):
+            sign = -1 if liability[a] and current[a] >= 0 else 1
+            for d in (0, 1, 57, n_days - 2, n_days - 1):
+                later = amounts[(acc == a) & (day > d)].sum()
+                self.assertEqual(balances[a, d], current[a] + sign * later)
+
+    def test_accounts_without_transactions_stay_flat(self):
+        balances = reconstruct(units(10, 20), np.array([False, False]), np.array([], dtype=np.int64),
+                               np.array([], dtype=np.int64), np.array([], dtype=np.int64), n_days=3)
+        np.testing.assert_array_equal(balances, np.array([units(10, 10, 10), units(20, 20, 20)]))
+
+
+class TestHistoryRows(TestCase):
+    def test_totals_and_breakdown(self):
+        groups = [("u1", "assets", "depository", "checking"), ("u1", "assets", "depository", "savings"),
+                  ("u1", "liabilities", "credit", "credit_card"), ("u2", "assets", "investment", "brokerage")]
+        balances = np.array([units(100, 200), units(50, 50), units(-40, -60), units(10, 10), units(1000, 1100)])
+        liability = np.array([False, False, True, False, False])
+        totals = group_totals(balances, liability, np.array([0, 1, 2, 0, 3]), len(groups))
+        np.testing.assert_array_equal(totals[0], units(110, 210))
+        np.testing.assert_array_equal(totals[2], units(40, 60))
+
+        days = [date(2025, 1, 1) + timedelta(days=d) for d in range(2)]
+        rows = history_rows(days, groups, totals, {"u1": {"etf": 900.0}})
+        self.assertEqual([(r[0], r[1]) for r in rows], [("u1", days[0]), ("u1", days[1]), ("u2", days[0]),
+                                                        ("u2", days[1])])
+        user, day, assets, liabilities, net, breakdown = rows[1]
+        self.assertEqual((assets, liabilities, net), (Decimal("260"), Decimal("60"), Decimal("200")))
+        self.assertEqual(json.loads(breakdown), {"assets": {"depository": {"checking": 210.0, "savings": 50.0}},
+                                                 "liabilities": {"credit": {"credit_card": 60.0}},
+                                                 "securities": {"etf": 900.0}})
+        self.assertEqual(rows[3][2:5], (Decimal("1100"), Decimal("0"), Decimal("1100")))
+        self.assertEqual(json.loads(rows[3][5])["securities"], {})
+
+
+class BackfillCursor:
+    """One checking account; answers the flows query from `transactions` (date -> amount)."""
+
+    def __init__(self, transactions: dict):
+        self.transactions = transactions
+        self.result = []
+        self.staged = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        if "FROM accounts a" in sql:
+            self.result = [("acct-1", "u1", "assets", "depository", "checking", Decimal("2000"))]
+        elif "FROM transactions" in sql:
+            _, after, through = params
+            self.result = [("acct-1", d, a) for d, a in self.transactions.items() if after < d <= through]
+        elif "jsonb_object_agg" in sql:
+            self.result = [("u1", {"equity": 500})]
+        elif sql.lstrip().startswith("INSERT"):
+            self.rowcount = len(self.staged)
+
+    def fetchall(self):
+        return self.result
+
+    def copy_expert(self, sql, buf):
+        self.staged = buf.read().splitlines()
+
+
+class TestBackfill(TestCase):
+    def test_transactions_after_the_range_are_still_reversed(self):
+        today = date(2026, 10, 19)
+        cur = BackfillCursor({date(2026, 10, 16): Decimal("100"), date(2026, 10, 19): Decimal("500")})
+        result = backfill(cur, date(2026, 10, 15), date(2026, 10, 17), today=today)
+        self.assertEqual((result["days"], result["rows_written"]), (3, 3))
+        staged = [line.split("\t") for line in cur.staged]
+        self.assertEqual([(r[1], r[2]) for r in staged],
+                         [("2026-10-15", "2600"), ("2026-10-16", "2500"), ("2026-10-17", "2500")])
+        self.assertEqual(json.loads(staged[0][5])["securities"], {"equity": 500.0})
+
+
+if __name__ == "__main__":
+    main()
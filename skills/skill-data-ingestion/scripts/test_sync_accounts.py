@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the concurrent account sync scheduler (no network, no database).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import subprocess
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from sync_accounts import Job, TransientError, backoff, is_transient, schedule
+from sync_plaid import PlaidError
+
+
+class Probe:
+    """Blocking job bodies that record concurrency overall and per institution."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.total = self.total_peak = 0
+        self.calls: dict[str, int] = {}
+
+    def job(self, key: str, institution: str, seconds: float = 0.05, fail_times: int = 0, exc=TransientError):
+        def run(timeout):
+            with self.lock:
+                self.calls[key] = self.calls.get(key, 0) + 1
+                attempt = self.calls[key]
+                self.active[institution] = self.active.get(institution, 0) + 1
+                self.peak[institution] = max(self.peak.get(institution, 0), self.active[institution])
+                self.total += 1
+                self.total_peak = max(self.total_peak, self.total)
+            try:
+                time.sleep(seconds)
+                if attempt <= fail_times:
+                    raise exc(f"{key} failed")
+                return {"accounts_synced": 1}
+            finally:
+                with self.lock:
+                    self.active[institution] -= 1
+                    self.total -= 1
+        return Job("plaid", key, institution, run)
+
+
+def no_backoff(attempt, base=None, cap=None):
+    return 0.01
+
+
+class TestSchedule(TestCase):
+    def test_caps_overall_and_per_institution(self):
+        probe = Probe()
+        jobs = [probe.job(f"chase-{i}", "Chase") for i in range(6)] + \
+               [probe.job(f"bank{i}", f"Bank {i}") for i in range(6)]
+        started = time.monotonic()
+        outcomes = asyncio.run(schedule(jobs, max_workers=4, per_institution=2, deadline=10))
+        self.assertEqual([o["status"] for o in outcomes], ["success"] * 12)
+        self.assertEqual([o["key"] for o in outcomes], [j.key for j in jobs])
+        self.assertEqual(probe.peak["Chase"], 2)
+        self.assertEqual(probe.total_peak, 4)
+        self.assertLess(time.monotonic() - started, 12 * 0.05)
+        self.assertTrue(all(o["seconds"] >= 0.04 and o["started_at"] <= o["completed_at"] for o in outcomes))
+
+    @patch("sync_accounts.backoff", no_backoff)
+    def test_transient_failures_are_retried_permanent_ones_are_not(self):
+        probe = Probe()
+        jobs = [probe.job("flaky", "A", seconds=0.01, fail_times=2),
+                probe.job("broken", "B", seconds=0.01, fail_times=9),
+                probe.job("relink", "C", seconds=0.01, fail_times=9,
+                          exc=lambda m: PlaidError(400, {"error_code": "ITEM_LOGIN_REQUIRED", "error_message": m}))]
+        flaky, broken, relink = asyncio.run(schedule(jobs, retries=3, deadline=10))
+        self.assertEqual((flaky["status"], flaky["attempts"], flaky["error"]), ("success", 3, None))
+        self.assertEqual((broken["status"], broken["attempts"]), ("error", 4))
+        self.assertEqual((relink["status"], relink["attempts"]), ("error", 1))
+        self.assertIn("ITEM_LOGIN_REQUIRED", relink["error"])
+
+    def test_deadline_times_out_running_jobs_and_skips_queued_ones(self):
+        probe = Probe()
+        jobs = [probe.job("slow", "A", seconds=1.0), probe.job("queued", "A", seconds=0.01),
+                probe.job("fast", "B", seconds=0.01)]
+        started = time.monotonic()
+        slow, queued, fast = asyncio.run(schedule(jobs, max_workers=4, per_institution=1, deadline=0.3))
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(fast["status"], "success")
+        self.assertEqual((slow["status"], slow["attempts"]), ("timeout", 1))
+        self.assertAlmostEqual(slow["seconds"], 0.3, delta=0.1)
+        self.assertEqual((queued["status"], queued["attempts"], queued["started_at"]), ("skipped", 0, None))
+        self.assertNotIn("queued", probe.calls)
+
+    def test_process_exits_at_the_deadline_with_a_job_still_running(self):
+        script = (
+            "import asyncio, time\n"
+            "from sync_accounts import Job, schedule\n"
+            "(o,) = asyncio.run(schedule([Job('plaid', 'stuck', 'A', lambda timeout: time.sleep(6))], deadline=0.5))\n"
+            "print(o['status'])\n"
+        )
+        started = time.monotonic()
+        out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=30,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.strip(), "timeout", out.stderr)
+        self.assertLess(time.monotonic() - started, 3.0)
+
+
+class TestRetryPolicy(TestCase):
+    def test_full_jitter_bounds(self):
+        delays = [backoff(3, base=1.0, cap=5.0) for _ in range(200)]
+        self.assertTrue(all(0 <= d <= 5.0 for d in delays))
+        self.assertGreater(max(delays) - min(delays), 2.0)
+        self.assertTrue(all(0 <= backoff(0, base=1.0) <= 1.0 for _ in range(50)))
+
+    def test_transient_classification(self):
+        self.assertTrue(is_transient(PlaidError(429, {"error_code": "RATE_LIMIT_EXCEEDED"})))
+        self.assertTrue(is_transient(PlaidError(400, {"error_code": "INSTITUTION_DOWN"})))
+        self.assertFalse(is_transient(PlaidError(400, {"error_code": "ITEM_LOGIN_REQUIRED"})))
+        self.assertFalse(is_transient(ValueError("bad data")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the sync_all.py DAG runner with small stand-in stage processes
+(no database).
+"""
+
+import sys
+import time
+import asyncio
+from unittest import TestCase, main
+
+from sync_all import Stage, parse_output, pipeline, run_dag, select, validate
+
+
+def stage(name: str, after: tuple = (), seconds: float = 0.0, exit_code: int = 0, output: str = '{"status": "ok"}',
+          **kw) -> Stage:
+    """A stage whose process sleeps, prints `output` and exits with `exit_code`."""
+    code = f"import sys, time; time.sleep({seconds}); print({output!r}); sys.exit({exit_code})"
+    return Stage(name, [sys.executable, "-c", code], after=after, **kw)
+
+
+class RecordingLog:
+    def __init__(self):
+        self.rows = {}
+
+    def start(self, job_name):
+        self.rows[job_name] = {"status": "running"}
+        return job_name
+
+    def finish(self, execution_id, status, duration_ms, output, error):
+        self.rows[execution_id] = {"status": status, "duration_ms": duration_ms, "output": output, "error": error}
+
+    def blocked(self, job_name, error):
+        self.rows[job_name] = {"status": "error", "error": error}
+
+
+class TestRunDag(TestCase):
+    def test_independent_stages_run_concurrently(self):
+        stages = [stage("a", seconds=0.4), stage("b", seconds=0.4), stage("c", after=("a", "b"), seconds=0.0)]
+        started = time.monotonic()
+        a, b, c = asyncio.run(run_dag(stages, max_parallel=4))
+        elapsed = time.monotonic() - started
+        self.assertEqual([o["status"] for o in (a, b, c)], ["success"] * 3)
+        self.assertLess(elapsed, 0.75)                         # a and b overlapped
+        self.assertGreaterEqual(c["started_at"], max(a["started_at"], b["started_at"]))
+
+    def test_max_parallel_is_respected(self):
+        stages = [stage(f"s{i}", seconds=0.25) for i in range(3)]
+        started = time.monotonic()
+        asyncio.run(run_dag(stages, max_parallel=1))
+        self.assertGreaterEqual(time.monotonic() - started, 0.75)
+
+    def test_failure_blocks_only_its_branch(self):
+        log = RecordingLog()
+        stages = [stage("accounts", exit_code=1, output='{"status": "error", "message": "DATABASE_URL not set"}'),
+                  stage("categorize", after=("accounts",)), stage("budgets", after=("categorize",)),
+                  stage("portfolio", output='{"status": "ok", "inserted": 3, "updated": 1, "changed": []}'),
+                  stage("news", after=("portfolio",), output='{"status": "partial", "articles": 12}')]
+        outcomes = {o["stage"]: o for o in asyncio.run(run_dag(stages, log=log))}
+        self.assertEqual({n: o["status"] for n, o in outcomes.items()},
+                         {"accounts": "error", "categorize": "blocked", "budgets": "blocked",
+                          "portfolio": "success", "news": "success"})
+        self.assertEqual(outcomes["accounts"]["error"], "DATABASE_URL not set")
+        self.assertEqual(outcomes["budgets"]["error"], "dependency failed: categorize")
+        self.assertEqual(outcomes["portfolio"]["counts"], {"inserted": 3, "updated": 1})
+        self.assertEqual(outcomes["news"]["result_status"], "partial")
+
+        self.assertEqual(log.rows["sync_all.accounts"]["status"], "error")
+        self.assertEqual(log.rows["sync_all.categorize"], {"status": "error", "error": "dependency failed: accounts"})
+        self.assertEqual(log.rows["sync_all.portfolio"]["output"]["counts"], {"inserted": 3, "updated": 1})
+        self.assertGreaterEqual(log.rows["sync_all.portfolio"]["duration_ms"], 0)
+
+    def test_timeouts_and_unstartable_stages_fail(self):
+        stages = [stage("slow", seconds=5), Stage("missing", ["/nonexistent/stage"]), stage("next", after=("slow",))]
+        started = time.monotonic()
+        slow, missing, nxt = asyncio.run(run_dag(stages, stage_timeout=0.3))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual((slow["status"], slow["error"]), ("error", "timed out after 0.3s"))
+        self.assertEqual(missing["status"], "error")
+        self.assertEqual(nxt["status"], "blocked")
+
+    def test_skipped_stages_do_not_block(self):
+        stages = [stage("portfolio", skip="no --holdings payload"), stage("news", after=("portfolio",)),
+                  stage("holdings-reader", stdin=b'{"n": 1}', output='{"status": "ok"}')]
+        portfolio, news, reader = asyncio.run(run_dag(stages))
+        self.assertEqual((portfolio["status"], portfolio["started_at"]), ("skipped", None))
+        self.assertEqual((news["status"], reader["status"]), ("success", "success"))
+
+
+class TestPipeline(TestCase):
+    def test_declared_dag_is_valid(self):
+        stages = pipeline()
+        validate(stages)
+        self.assertEqual(next(s for s in stages if s.name == "portfolio").skip, "no --holdings payload")
+        self.assertIsNone(next(s for s in pipeline(b"[]") if s.name == "portfolio").skip)
+
+    def test_validate_rejects_cycles_and_unknown_dependencies(self):
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            validate([Stage("a", [], after=("b",)), Stage("b", [], after=("a",))])
+        with self.assertRaisesRegex(ValueError, "Unknown"):
+            validate([Stage("a", [], after=("zzz",))])
+
+    def test_select_drops_dependencies_outside_the_selection(self):
+        chosen = select(pipeline(), ["categorize", "budgets"])
+        self.assertEqual([(s.name, s.after) for s in chosen], [("categorize", ()), ("budgets", ("categorize",))])
+
+    def test_parse_output_takes_the_last_json_line(self):
+        self.assertEqual(parse_output(b'{"login_id": "a"}\nnoise\n{"summary": true}\n'), {"summary": True})
+        self.assertEqual(parse_output(b"Traceback ...\n"), {})
+
+
+if __name__ == "__main__":
+    main()
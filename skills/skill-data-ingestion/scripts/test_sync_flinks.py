@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for sync_flinks.py job submission and polling against a local stand-in
+ClawFinance API (no network, no database).
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, main
+
+import requests
+
+from api_client import ApiClient
+from sync_flinks import poll_delay, run, submit
+
+# Polls needed before each pending login is ready (None: never)
+READY_AFTER = {"login-fast": 1, "login-slow": 4, "login-stuck": None}
+
+
+class StandInApi(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    polls: dict = {}
+    flaked: set = set()
+    submits = 0
+    submit_failures = 0
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path == "/api/flinks/sync/submit":
+            with cls.lock:
+                cls.submits += 1
+                if cls.submit_failures:
+                    cls.submit_failures -= 1
+                    return self.reply(503, {"error": "Service unavailable"})
+            jobs = [{"login_id": "login-ready", "institution": "FlinksCapital", "status": "connected",
+                     "request_id": "r-ready", "accounts_synced": 2},
+                    {"login_id": "login-bad", "institution": "BadBank", "status": "error",
+                     "error": "Authorize failed: INVALID_LOGIN"}]
+            jobs += [{"login_id": login, "institution": f"Bank {login}", "status": "pending", "request_id": f"r-{login}"}
+                     for login in READY_AFTER]
+            if body.get("login_id"):
+                jobs = [j for j in jobs if j["login_id"] == body["login_id"]]
+            return self.reply(202, {"status": "submitted", "jobs": jobs})
+        if self.path == "/api/flinks/poll":
+            login = body["login_id"]
+            if login == "login-gone":
+                return self.reply(404, {"error": "Unknown request_id"})
+            with cls.lock:
+                if login == "login-slow" and login not in cls.flaked:
+                    cls.flaked.add(login)
+                    return self.reply(500, {"error": "Internal server error"})
+                cls.polls[login] = cls.polls.get(login, 0) + 1
+                n = cls.polls[login]
+            ready = READY_AFTER[login]
+            if ready is not None and n >= ready:
+                return self.reply(200, {"status": "connected", "accounts_synced": 1})
+            return self.reply(200, {"status": "pending", "request_id": body["request_id"]})
+        self.reply(404, {"error": "not found"})
+
+
+class TestSyncFlinks(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInApi)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        StandInApi.polls = {}
+        StandInApi.flaked = set()
+        StandInApi.submits = StandInApi.submit_failures = 0
+        self.client = ApiClient(self.base, backoff=0.01)
+
+    def test_results_stream_as_each_login_finishes(self):
+        jobs = submit(self.client)
+        self.assertEqual(len(jobs), 5)
+        started = time.monotonic()
+        seen = []
+        for job in run(self.client, jobs, timeout=1.0, initial=0.02, cap=0.05):
+            seen.append((job["login_id"], job["status"], round(time.monotonic() - started, 2)))
+        order = [login for login, _, _ in seen]
+        self.assertEqual(order[:2], ["login-ready", "login-bad"])        # final at submit: no waiting
+        self.assertEqual(order[2:], ["login-fast", "login-slow", "login-stuck"])
+        statuses = {login: status for login, status, _ in seen}
+        self.assertEqual(statuses, {"login-ready": "connected", "login-bad": "error", "login-fast": "connected",
+                                    "login-slow": "connected", "login-stuck": "timeout"})
+        at = {login: t for login, _, t in seen}
+        self.assertLess(at["login-fast"], 0.3)
+        self.assertLess(at["login-slow"], at["login-stuck"])
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(StandInApi.polls["login-slow"], 4)             # the 500 was retried
+        self.assertEqual(self.client.stats()["POST /api/flinks/poll"]["retries"], 1)
+
+    def test_single_login(self):
+        jobs = submit(self.client, "login-fast")
+        self.assertEqual([j["login_id"] for j in jobs], ["login-fast"])
+        (job,) = run(self.client, jobs, timeout=1.0, initial=0.01, cap=0.01)
+        self.assertEqual((job["status"], job["accounts_synced"], job["polls"]), ("connected", 1, 1))
+
+    def test_submit_is_not_retried(self):
+        StandInApi.submit_failures = 1
+        with self.assertRaises(requests.HTTPError):
+            submit(self.client)
+        self.assertEqual(StandInApi.submits, 1)
+
+    def test_rejected_poll_ends_only_that_job(self):
+        jobs = [{"login_id": "login-gone", "institution": "GoneBank", "status": "pending", "request_id": "r-gone"},
+                {"login_id": "login-fast", "institution": "Bank login-fast", "status": "pending",
+                 "request_id": "r-login-fast"}]
+        results = {j["login_id"]: j for j in run(self.client, jobs, timeout=1.0, initial=0.01, cap=0.01)}
+        self.assertEqual(results["login-gone"]["status"], "error")
+        self.assertIn("404", results["login-gone"]["error"])
+        self.assertEqual(results["login-gone"]["polls"], 1)
+        self.assertEqual(results["login-fast"]["status"], "connected")
+
+    def test_poll_delay_grows_with_jitter_up_to_cap(self):
+        for attempt, (lo, hi) in enumerate([(1, 2), (2, 4), (4, 8), (8, 16), (15, 30), (15, 30)]):
+            delays = [poll_delay(attempt) for _ in range(50)]
+            self.assertTrue(all(lo <= d <= hi for d in delays), attempt)
+
+
+if __name__ == "__main__":
+    main()
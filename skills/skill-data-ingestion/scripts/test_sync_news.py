@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for the sync_news.py fetch pipeline against local stand-in Finnhub and
+SEC servers (no network, no database).
+"""
+
+import json
+import time
+import asyncio
+import threading
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, main
+from urllib.parse import parse_qs, urlsplit
+
+from sync_news import Provider, TokenBucket, sync
+
+TODAY = date(2026, 3, 6)
+MARK = datetime(2026, 3, 4, 12, 0, tzinfo=timezone.utc)
+TICKERS = [f"T{i}" for i in range(8)] + ["RETRY", "NOCIK"]
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Finnhub /company-news and SEC tickers/submissions endpoints with request accounting."""
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    calls: list = []
+    rejected: set = set()
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body, headers: dict | None = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            cls.calls.append((time.monotonic(), self.path))
+        try:
+            time.sleep(0.02)
+            url = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/company-news":
+                symbol = query["symbol"]
+                if symbol == "RETRY" and symbol not in cls.rejected:
+                    cls.rejected.add(symbol)
+                    return self.reply(429, {"error": "API limit reached"}, {"Retry-After": "0"})
+                old, new = int(MARK.timestamp()) - 3600, int(MARK.timestamp()) + 3600
+                return self.reply(200, [
+                    {"headline": f"{symbol} old story", "url": f"https://x.com/{symbol}/old", "datetime": old},
+                    {"headline": f"{symbol} new story", "url": f"https://x.com/{symbol}/new", "datetime": new,
+                     "from": query["from"]},
+                ])
+            if url.path == "/files/company_tickers.json":
+                return self.reply(200, {str(i): {"cik_str": 1000 + i, "ticker": t}
+                                        for i, t in enumerate(TICKERS) if t != "NOCIK"})
+            if url.path.startswith("/submissions/CIK"):
+                return self.reply(200, {"filings": {"recent": {
+                    "form": ["8-K", "4", "10-Q", "8-K"],
+                    "filingDate": ["2026-03-05", "2026-03-05", "2026-03-01", "2025-10-01"],
+                    "accessionNumber": ["a-3", "a-2", "a-1", "a-0"],
+                    "primaryDocument": ["d3.htm", "d2.xml", "d1.htm", "d0.htm"],
+                }}})
+            self.reply(404, {"error": "not found"})
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+class ListSink:
+    def __init__(self):
+        self.items, self.flushed, self.threads = [], 0, set()
+
+    def add(self, kind, ticker, items):
+        self.threads.add(threading.get_ident())
+        self.items.append((kind, ticker, items))
+
+    def flush(self):
+        self.flushed += 1
+
+
+class FailingSink(ListSink):
+    def add(self, kind, ticker, items):
+        raise RuntimeError("insert failed")
+
+
+class TestSyncNews(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.urls = {"finnhub": base, "sec_data": base, "sec_tickers": f"{base}/files/company_tickers.json"}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandIn.calls, StandIn.rejected, StandIn.max_active = [], set(), 0
+
+    def run_sync(self, finnhub_rate=1000.0, max_in_flight=3, news_marks=None, filing_marks=None,
+                 sink=None, tickers=TICKERS):
+        providers = {"finnhub": Provider("finnhub", finnhub_rate, pool_size=max_in_flight, params={"token": "t"}),
+                     "sec": Provider("sec", 1000.0, burst=1000.0, pool_size=max_in_flight)}
+        sink = sink or ListSink()
+        result = asyncio.run(sync(tickers, news_marks or {}, filing_marks or {}, providers, sink,
+                                  max_in_flight=max_in_flight, today=TODAY, urls=self.urls))
+        return result, sink
+
+    def test_only_items_past_the_high_water_marks_are_kept(self):
+        result, sink = self.run_sync(news_marks={"T0": MARK}, filing_marks={"T0": date(2026, 3, 2)})
+        news = {t: items for kind, t, items in sink.items if kind == "news"}
+        filings = {t: items for kind, t, items in sink.items if kind == "filings"}
+
+        self.assertEqual([a["headline"] for a in news["T0"]], ["T0 new story"])
+        self.assertEqual(news["T0"][0]["from"], "2026-03-04")
+        self.assertEqual(len(news["T1"]), 2)                              # no mark: lookback window
+        self.assertEqual([f["accession"] for f in filings["T0"]], ["a-3"])
+        self.assertEqual([f["accession"] for f in filings["T1"]], ["a-3", "a-1"])
+        self.assertNotIn("NOCIK", filings)
+        self.assertEqual(sink.flushed, 1)
+        self.assertEqual(len(sink.threads), 1)                            # one writer thread
+
+    def test_rate_limit_retry_and_errors(self):
+        result, _ = self.run_sync()
+        self.assertEqual(result["requests"]["finnhub"], {"requests": len(TICKERS) + 1, "retries": 1})
+        self.assertEqual(result["errors"], [{"ticker": "NOCIK", "provider": "sec", "message": "CIK not found"}])
+
+    def test_in_flight_requests_are_bounded(self):
+        self.run_sync(max_in_flight=2)
+        self.assertLessEqual(StandIn.max_active, 2)
+
+    def test_sink_error_is_raised_instead_of_hanging(self):
+        outcome = {}
+
+        def target():
+            try:
+                self.run_sync(max_in_flight=2, sink=FailingSink(), tickers=[f"X{i}" for i in range(40)])
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(20)
+        self.assertFalse(thread.is_alive(), "sync() hung after the sink failed")
+        self.assertEqual(str(outcome.get("error")), "insert failed")
+
+    def test_token_bucket_paces_a_provider(self):
+        self.run_sync(finnhub_rate=50.0, max_in_flight=8)
+        times = [t for t, path in StandIn.calls if path.startswith("/company-news")]
+        # 11 requests at 50/s with a burst of 1: at least 10 intervals of 20ms
+        self.assertGreaterEqual(times[-1] - times[0], 10 / 50 * 0.9)
+
+    def test_token_bucket_burst(self):
+        async def acquire_all(bucket, n):
+            start = time.monotonic()
+            for _ in range(n):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(acquire_all(TokenBucket(10.0, burst=5), 5)), 0.05)
+        self.assertGreaterEqual(asyncio.run(acquire_all(TokenBucket(10.0, burst=5), 7)), 0.18)
+
+
+if __name__ == "__main__":
+    main()
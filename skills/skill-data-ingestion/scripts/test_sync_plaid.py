@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for sync_plaid.py's /transactions/sync client against a local mock Plaid
+server (no network, no database).
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, main
+
+import requests
+
+from sync_plaid import MUTATION_DURING_PAGINATION, PlaidClient, PlaidError, pull, transaction_row
+
+
+def txn(tid: str, account: str, amount: float, day: str, **extra) -> dict:
+    return {"transaction_id": tid, "account_id": account, "amount": amount, "date": day,
+            "name": f"Purchase {tid}", "pending": False, **extra}
+
+
+class MockPlaid(BaseHTTPRequestHandler):
+    """/transactions/sync over a per-account change log; a cursor is "<account>:<offset>"."""
+
+    log: dict = {}
+    balances: dict = {}
+    requests: list = []
+    fail_once: set = set()
+    delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls.requests.append(body)
+        time.sleep(cls.delay)
+        if self.path != "/transactions/sync":
+            return self.reply(404, {"error_code": "NOT_FOUND"})
+        if (body.get("client_id"), body.get("secret")) != ("cid", "sec"):
+            return self.reply(400, {"error_code": "INVALID_API_KEYS", "error_message": "bad keys"})
+        if body["access_token"] == "access-expired":
+            return self.reply(400, {"error_code": "ITEM_LOGIN_REQUIRED", "error_message": "relink"})
+        account = body["options"]["account_id"]
+        offset = int(body.get("cursor", f"{account}:0").split(":")[1])
+        for failure in ("500", MUTATION_DURING_PAGINATION):
+            if (account, offset, failure) in cls.fail_once:
+                cls.fail_once.discard((account, offset, failure))
+                if failure == "500":
+                    return self.reply(500, {"error_code": "INTERNAL_SERVER_ERROR"})
+                return self.reply(400, {"error_code": failure, "error_message": "mutated"})
+
+        events = cls.log[account][offset:offset + body["count"]]
+        page = {"added": [], "modified": [], "removed": []}
+        for kind, item in events:
+            page[kind].append({"transaction_id": item["transaction_id"], "account_id": account}
+                              if kind == "removed" else item)
+        end = offset + len(events)
+        self.reply(200, {**page, "next_cursor": f"{account}:{end}", "has_more": end < len(cls.log[account]),
+                         "accounts": [{"account_id": account, "balances": cls.balances[account]}]})
+
+
+class TestPull(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockPlaid)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.client = PlaidClient(f"http://127.0.0.1:{cls.server.server_port}", "cid", "sec")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.server.shutdown()
+
+    def setUp(self):
+        MockPlaid.log = {
+            "acc-1": [("added", txn(f"t{i}", "acc-1", 10 + i, "2026-03-01")) for i in range(7)]
+                     + [("modified", txn("t2", "acc-1", 99, "2026-03-01")), ("removed", txn("t3", "acc-1", 0, ""))],
+            "acc-2": [("added", txn("u0", "acc-2", -500, "2026-03-02"))],
+        }
+        MockPlaid.balances = {"acc-1": {"current": 1200.5, "available": 1100, "limit": None},
+                              "acc-2": {"current": 80, "available": 80, "limit": 5000}}
+        MockPlaid.requests = []
+        MockPlaid.fail_once = set()
+        MockPlaid.delay = 0.0
+
+    def test_pages_until_has_more_is_false(self):
+        changes = pull(self.client, "access-1", None, "acc-1", page_size=4)
+        self.assertEqual(changes["pages"], 3)
+        self.assertEqual([t["transaction_id"] for t in changes["added"]], [f"t{i}" for i in range(7)])
+        self.assertEqual([t["amount"] for t in changes["modified"]], [99])
+        self.assertEqual(changes["removed"], ["t3"])
+        self.assertEqual(changes["next_cursor"], "acc-1:9")
+        self.assertEqual(changes["accounts"][0]["balances"]["current"], 1200.5)
+        self.assertNotIn("cursor", MockPlaid.requests[0])
+        self.assertEqual(MockPlaid.requests[1]["cursor"], "acc-1:4")
+        self.assertEqual(MockPlaid.requests[0]["options"], {"account_id": "acc-1"})
+
+    def test_stored_cursor_pulls_only_deltas(self):
+        MockPlaid.log["acc-2"].append(("added", txn("u1", "acc-2", 12.5, "2026-03-03")))
+        changes = pull(self.client, "access-2", "acc-2:1", "acc-2")
+        self.assertEqual([t["transaction_id"] for t in changes["added"]], ["u1"])
+        self.assertEqual((changes["pages"], changes["next_cursor"]), (1, "acc-2:2"))
+        unchanged = pull(self.client, "access-2", "acc-2:2", "acc-2")
+        self.assertEqual((unchanged["added"], unchanged["next_cursor"]), ([], "acc-2:2"))
+
+    def test_mutation_during_pagination_restarts_from_stored_cursor(self):
+        MockPlaid.fail_once = {("acc-1", 4, MUTATION_DURING_PAGINATION), ("acc-1", 8, "500")}
+        changes = pull(self.client, "access-1", None, "acc-1", page_size=4)
+        self.assertEqual(len(changes["added"]), 7)          # first page not counted twice
+        self.assertEqual(changes["pages"], 3)
+        self.assertEqual([r.get("cursor") for r in MockPlaid.requests],
+                         [None, "acc-1:4", None, "acc-1:4", "acc-1:8", "acc-1:8"])
+
+    def test_item_errors_surface_with_plaid_code(self):
+        with self.assertRaises(PlaidError) as ctx:
+            pull(self.client, "access-expired", None, "acc-1")
+        self.assertEqual((ctx.exception.status, ctx.exception.code), (400, "ITEM_LOGIN_REQUIRED"))
+
+    def test_deadline_stops_paging(self):
+        MockPlaid.delay = 0.1
+        started = time.monotonic()
+        # stops between pages, or as a request capped to the remaining time times out
+        with self.assertRaises((TimeoutError, requests.Timeout)):
+            pull(self.client, "access-1", None, "acc-1", page_size=1, deadline=started + 0.25)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertLess(len(MockPlaid.requests), 9)
+        with self.assertRaises(TimeoutError):
+            pull(self.client, "access-1", None, "acc-1", deadline=time.monotonic())
+
+
+class TestTransactionRow(TestCase):
+    def test_maps_plaid_fields(self):
+        row = transaction_row("uuid-1", txn("t1", "acc-1", 4.5, "2026-03-01", merchant_name="Starbucks",
+                                            authorized_date="2026-02-28", pending=True,
+                                            personal_finance_category={"primary": "FOOD_AND_DRINK",
+                                                                       "detailed": "FOOD_AND_DRINK_COFFEE"}))
+        self.assertEqual(row, ("t1", "uuid-1", 4.5, "2026-03-01", "2026-02-28", "Purchase t1", "Starbucks",
+                               "FOOD_AND_DRINK", "FOOD_AND_DRINK_COFFEE", True))
+
+    def test_legacy_category_and_missing_name(self):
+        row = transaction_row("uuid-1", {"transaction_id": "t9", "amount": -20, "date": "2026-03-01",
+                                         "category": ["Transfer", "Payroll"]})
+        self.assertEqual(row[5:9], ("Unknown", None, "Transfer", "Payroll"))
+
+
+if __name__ == "__main__":
+    main()
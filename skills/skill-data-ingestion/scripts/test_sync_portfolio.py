@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for sync_portfolio.py's SnapTrade payload parsing and holdings diff
+(no network, no database).
+"""
+
+from decimal import Decimal
+from unittest import TestCase, main
+
+from sync_portfolio import FIELDS, diff, merge_positions, parse_payload
+
+
+def position(ticker: str, units, price, cost=None, code="cs", description=None) -> dict:
+    """A get_holdings / get_account_positions position, nested the way SnapTrade returns it."""
+    return {"symbol": {"id": f"sym-{ticker}", "symbol": {"symbol": ticker, "raw_symbol": ticker,
+                                                          "description": description or f"{ticker} Inc",
+                                                          "type": {"code": code, "description": code}}},
+            "units": units, "price": price, "open_pnl": None, "average_purchase_price": cost}
+
+
+# Stand-in for the snaptrade MCP server's get_holdings output
+HOLDINGS = [
+    {"account": {"id": "st-1", "name": "Individual", "number": "XXXX1234", "institution_name": "Questrade",
+                 "balance": {"total": {"amount": 99999, "currency": "USD"}}},
+     "positions": [position("AAPL", 10, 190.5, 150), position("VTI", 4.5, 250.123456789, 200, code="et"),
+                   position("AAPL", 5, 190.5, 180)],
+     "total_value": {"value": 3983.06, "currency": "USD"}},
+    {"account": {"id": "st-2", "name": "TFSA", "institution_name": "Wealthsimple"},
+     "positions": [position("BTC", "0.12345678", 60000, 30000, code="crypto"), position("", 1, 1),
+                   position("GONE", 0, 10)]},
+]
+
+
+class TestParse(TestCase):
+    def test_get_holdings_payload(self):
+        accounts = parse_payload(HOLDINGS)
+        self.assertEqual(set(accounts), {"st-1", "st-2"})
+        self.assertEqual(accounts["st-1"]["total_value"], Decimal("3983.0600"))   # total_value wins over balance
+        self.assertIsNone(accounts["st-2"]["total_value"])
+        self.assertEqual(set(accounts["st-2"]["positions"]), {"BTC"})                # blank and zero-unit dropped
+
+        aapl = accounts["st-1"]["positions"]["AAPL"]                                 # two lots merged
+        self.assertEqual(aapl["quantity"], Decimal("15"))
+        self.assertEqual(aapl["cost_basis_total"], Decimal("2400.0000"))
+        self.assertEqual(aapl["cost_basis_per_share"], Decimal("160.000000"))
+        self.assertEqual(aapl["market_value"], Decimal("2857.5000"))
+        self.assertEqual(aapl["unrealized_gain_loss"], Decimal("457.5000"))
+        self.assertEqual(aapl["unrealized_gain_loss_pct"], Decimal("19.0625"))
+        self.assertEqual((aapl["security_type"], aapl["security_name"]), ("equity", "AAPL Inc"))
+
+        vti = accounts["st-1"]["positions"]["VTI"]
+        self.assertEqual((vti["security_type"], vti["market_price"]), ("etf", Decimal("250.123457")))
+        self.assertEqual(set(vti), set(FIELDS))
+
+    def test_account_positions_payload(self):
+        accounts = parse_payload([position("MSFT", 2, 400)], account_id="st-9")
+        self.assertEqual(list(accounts), ["st-9"])
+        msft = accounts["st-9"]["positions"]["MSFT"]
+        self.assertEqual((msft["market_value"], msft["cost_basis_total"], msft["unrealized_gain_loss"]),
+                         (Decimal("800.0000"), None, None))
+
+    def test_lots_with_unknown_cost_leave_cost_basis_unknown(self):
+        merged = merge_positions([position("X", 1, 10, 5), position("X", 1, 10, None)])
+        self.assertEqual(merged["X"]["quantity"], Decimal("2"))
+        self.assertIsNone(merged["X"]["cost_basis_total"])
+
+
+class TestDiff(TestCase):
+    def setUp(self):
+        self.incoming = {("acct", t): f for t, f in parse_payload(HOLDINGS)["st-1"]["positions"].items()}
+
+    def stored(self, fields: dict) -> dict:
+        """Fields as psycopg2 returns them: numerics padded to the column scale."""
+        return {k: v.quantize(Decimal(1).scaleb(-FIELDS[k])) if isinstance(v, Decimal) else v
+                for k, v in fields.items()}
+
+    def test_first_sync_inserts_everything(self):
+        changes = diff({}, self.incoming)
+        self.assertEqual(sorted(k[1] for k, _ in changes["insert"]), ["AAPL", "VTI"])
+        self.assertEqual((changes["update"], changes["delete"], changes["unchanged"]), ([], [], 0))
+
+    def test_unchanged_rows_are_not_touched(self):
+        current = {k: [(f"id-{k[1]}", self.stored(f))] for k, f in self.incoming.items()}
+        changes = diff(current, self.incoming)
+        self.assertEqual((changes["insert"], changes["update"], changes["delete"]), ([], [], []))
+        self.assertEqual(changes["unchanged"], 2)
+
+    def test_minimal_insert_update_delete(self):
+        aapl = {**self.stored(self.incoming[("acct", "AAPL")]), "market_price": Decimal("180.000000")}
+        current = {("acct", "AAPL"): [("id-aapl", aapl), ("id-aapl-dup", aapl)],
+                   ("acct", "TSLA"): [("id-tsla", {f: None for f in FIELDS})]}
+        changes = diff(current, self.incoming)
+        self.assertEqual([(k, f["market_price"]) for _, k, f in changes["update"]],
+                         [(("acct", "AAPL"), Decimal("190.500000"))])
+        self.assertEqual(changes["update"][0][0], "id-aapl")
+        self.assertEqual([k for k, _ in changes["insert"]], [("acct", "VTI")])
+        self.assertEqual(sorted(changes["delete"]), [("id-aapl-dup", ("acct", "AAPL")), ("id-tsla", ("acct", "TSLA"))])
+        self.assertEqual(changes["unchanged"], 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,21 @@ find_tax_loss_harvest.py — Identifies tax-loss harvesting opportunities.
 
 Finds positions with unrealized losses > $1,000 and checks for wash-sale risk
 (same security purchased within 30 days before or after any potential sale).
-Estimates tax savings based on short-term vs long-term capital gains rates.
+Estimates tax savings against the household's projected federal tax position
+(current-year tax documents, brackets, standard deduction, NIIT and the
+$3,000 capital-loss offset), evaluating every candidate in one vectorized
+call.
+
+Usage:
+  python3 find_tax_loss_harvest.py [--carryforward 0]
 """
-import os, sys, json
+import os, sys, json, argparse
 from datetime import date, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "skill-tax", "scripts"))
+from tax_engine import np, federal_params, federal_tax_vec
+from estimate_liability import fetch_year_aggregates, empty_aggregates, load_tables
+
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -16,20 +26,78 @@ except ImportError:
     print(json.dumps({"status": "error", "message": "pip install psycopg2-binary"}))
     sys.exit(1)
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
-    sys.exit(1)
-
-# Approximate tax rates for estimation
-SHORT_TERM_RATE = 0.37  # Highest bracket for worst-case
-LONG_TERM_RATE = 0.20   # Highest LTCG rate
+FILING_STATUS = os.environ.get("FILING_STATUS", "single")
 
 def d(v) -> float:
     return float(v) if v is not None else 0.0
 
+def harvest_savings(agg: dict, losses, is_long_term, params: dict, carryforward: float = 0.0) -> dict:
+    """Current-year tax saved by harvesting each loss, alone and in ranked order.
+
+    `incremental` is what each loss adds when harvested after every better one.
+    `losses` are positive amounts. Realized 1099-B gains are treated as
+    long-term (as in estimate_liability.py); an existing carryforward offsets
+    long-term gains first.
+    """
+    losses = np.asarray(losses, dtype=float)
+    is_long_term = np.asarray(is_long_term, dtype=bool)
+    ordinary = agg["w2_wages"] + agg["interest"] + agg["dividends"]
+    investment = agg["interest"] + agg["dividends"]
+    base_lt = agg["proceeds"] - agg["cost_basis"] - carryforward
+    itemized = agg["itemized"]
+
+    base = federal_tax_vec(ordinary, 0.0, base_lt, params, itemized, investment)
+
+    # Each candidate on its own
+    st = np.where(is_long_term, 0.0, -losses)
+    lt = base_lt - np.where(is_long_term, losses, 0.0)
+    alone = federal_tax_vec(ordinary, st, lt, params, itemized, investment)
+    savings = base["total"] - alone["total"]
+
+    # Harvesting the best candidates first, cumulatively
+    order = np.argsort(-savings, kind="stable")
+    cum_st = np.cumsum(st[order])
+    cum_lt = base_lt + np.cumsum(np.where(is_long_term, -losses, 0.0)[order])
+    cumulative = federal_tax_vec(ordinary, cum_st, cum_lt, params, itemized, investment)
+    cum_saved = base["total"] - cumulative["total"]
+    incremental = np.empty_like(savings)
+    incremental[order] = np.diff(np.concatenate([[0.0], cum_saved]))
+
+    return {
+        "base": base,
+        "savings": savings,
+        "carryforward_created": alone["carryforward"] - base["carryforward"],
+        "incremental": incremental,
+        "order": order,
+        "cumulative": cumulative,
+    }
+
+def wash_sale_counts(cur, tickers, today: date) -> dict:
+    """Purchases of each ticker within 30 days either side of `today`, in one query."""
+    cur.execute("""
+        SELECT x.ticker, COUNT(t.id) AS cnt
+        FROM unnest(%s::text[]) AS x(ticker)
+        LEFT JOIN transactions t
+          ON t.name ILIKE '%%' || x.ticker || '%%'
+         AND t.amount < 0
+         AND t.date >= %s
+         AND t.date <= %s
+        GROUP BY x.ticker
+    """, [sorted(set(tickers)), today - timedelta(days=30), today + timedelta(days=30)])
+    return {r["ticker"]: r["cnt"] or 0 for r in cur.fetchall()}
+
 def main():
-    conn = psycopg2.connect(DATABASE_URL)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--carryforward", type=float, default=0.0,
+                        help="Capital loss carried forward from prior years")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     today = date.today()
 
@@ -47,49 +115,68 @@ def main():
     """)
     loss_positions = cur.fetchall()
 
+    # Wash-sale check for all tickers at once: any buy of same ticker within ±30 days
+    wash_counts = wash_sale_counts(cur, [p["ticker_symbol"] for p in loss_positions], today)
+
+    # Household tax position from current-year tax documents
+    agg = fetch_year_aggregates(cur, [today.year], []).get(today.year, empty_aggregates())
+
+    cur.close()
+    conn.close()
+
+    params = federal_params(load_tables(today.year), FILING_STATUS)
+    losses = np.array([abs(d(p["unrealized_gain_loss"])) for p in loss_positions])
+    long_term = np.array([bool(p["acquisition_date"] and (today - p["acquisition_date"]).days > 365)
+                          for p in loss_positions], dtype=bool)
+    wash_risk = np.array([wash_counts.get(p["ticker_symbol"], 0) > 0 for p in loss_positions], dtype=bool)
+
+    # Each candidate alone, then every actionable one together (the $3,000 offset is shared)
+    result = harvest_savings(agg, losses, long_term, params, args.carryforward)
+    actionable_idx = np.flatnonzero(~wash_risk)
+    combined = harvest_savings(agg, losses[actionable_idx], long_term[actionable_idx], params, args.carryforward)
+    incremental = dict(zip(actionable_idx.tolist(), combined["incremental"].tolist()))
+
     opportunities = []
-    for pos in loss_positions:
-        loss = abs(d(pos["unrealized_gain_loss"]))
+    for i, pos in enumerate(loss_positions):
         acq_date = pos["acquisition_date"]
-        is_long_term = acq_date and (today - acq_date).days > 365 if acq_date else False
-        tax_rate = LONG_TERM_RATE if is_long_term else SHORT_TERM_RATE
-        estimated_savings = round(loss * tax_rate, 2)
-
-        # Wash-sale check: any buy of same ticker in last 30 days
-        cur.execute("""
-            SELECT COUNT(*) AS cnt FROM transactions
-            WHERE name ILIKE %s
-              AND amount < 0
-              AND date >= %s
-              AND date <= %s
-        """, [f"%{pos['ticker_symbol']}%", today - timedelta(days=30), today + timedelta(days=30)])
-        wash_row = cur.fetchone()
-        wash_sale_risk = (wash_row["cnt"] or 0) > 0
-
         opportunities.append({
             "ticker": pos["ticker_symbol"],
             "security_name": pos["security_name"],
             "unrealized_loss": round(d(pos["unrealized_gain_loss"]), 2),
             "market_value": round(d(pos["market_value"]), 2),
             "holding_period_days": (today - acq_date).days if acq_date else None,
-            "is_long_term": is_long_term,
-            "estimated_tax_savings": estimated_savings,
-            "wash_sale_risk": wash_sale_risk,
+            "is_long_term": bool(long_term[i]),
+            "estimated_tax_savings": round(float(result["savings"][i]), 2),
+            "incremental_tax_savings": round(incremental[i], 2) if i in incremental else None,
+            "carryforward_created": round(float(result["carryforward_created"][i]), 2),
+            "wash_sale_risk": bool(wash_risk[i]),
             "account": pos["account_name"],
         })
-
-    cur.close()
-    conn.close()
+    opportunities.sort(key=lambda o: o["estimated_tax_savings"], reverse=True)
 
     actionable = [o for o in opportunities if not o["wash_sale_risk"]]
-    total_potential_savings = sum(o["estimated_tax_savings"] for o in actionable)
+    base = result["base"]
+    if len(actionable_idx):
+        total_potential_savings = float(base["total"] - combined["cumulative"]["total"][-1])
+        carryforward_after = float(combined["cumulative"]["carryforward"][-1])
+    else:
+        total_potential_savings, carryforward_after = 0.0, float(base["carryforward"])
 
     print(json.dumps({
         "status": "ok",
+        "filing_status": FILING_STATUS,
+        "tax_position": {
+            "agi": round(float(base["agi"]), 2),
+            "taxable_income": round(float(base["taxable_income"]), 2),
+            "projected_federal_tax": round(float(base["total"]), 2),
+            "prior_carryforward": round(args.carryforward, 2),
+        },
         "opportunities": opportunities,
         "actionable_count": len(actionable),
         "total_potential_tax_savings": round(total_potential_savings, 2),
-        "note": "Wash-sale rule: avoid buying the same security 30 days before/after harvesting.",
+        "carryforward_after_harvest": round(carryforward_after, 2),
+        "note": "Wash-sale rule: avoid buying the same security 30 days before/after harvesting. "
+                "Savings are current-year federal tax; losses beyond the $3,000 offset carry forward.",
     }))
 
 if __name__ == "__main__":
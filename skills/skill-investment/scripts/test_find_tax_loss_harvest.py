@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for find_tax_loss_harvest.py: harvest savings checked against the
+independent federal reference in skill-tax's tax_reference.py, and the
+batched wash-sale query (no database — a recording stand-in cursor).
+"""
+
+from datetime import date, timedelta
+from unittest import TestCase, main
+
+from find_tax_loss_harvest import harvest_savings, wash_sale_counts
+import tax_reference as ref
+from estimate_liability import empty_aggregates, load_tables
+from tax_engine import np, federal_params
+
+TABLES = load_tables(2026)
+PARAMS = federal_params(TABLES, "single")
+
+
+def household(wages=150_000.0, interest=0.0, dividends=0.0, gain=0.0) -> dict:
+    agg = empty_aggregates()
+    agg.update(w2_wages=wages, interest=interest, dividends=dividends, proceeds=100_000.0 + gain,
+               cost_basis=100_000.0)
+    return agg
+
+
+def ref_total(agg: dict, capital_gain: float) -> float:
+    """Reference liability with every gain/loss netted into one long-term figure."""
+    return float(ref.liability("single", TABLES, agg["w2_wages"], agg["interest"], agg["dividends"],
+                               capital_gain)["total"])
+
+
+class TestNetting(TestCase):
+    def test_short_and_long_term_losses_net_against_gains(self):
+        agg = household(gain=20_000)
+        result = harvest_savings(agg, [5_000, 5_000], [False, True], PARAMS)
+        expected = ref_total(agg, 20_000) - ref_total(agg, 15_000)
+        self.assertAlmostEqual(float(result["base"]["total"]), ref_total(agg, 20_000), places=6)
+        np.testing.assert_allclose(result["savings"], [expected, expected], atol=1e-6)
+        np.testing.assert_array_equal(result["carryforward_created"], [0.0, 0.0])
+
+    def test_net_investment_income_tax(self):
+        agg = household(wages=260_000, interest=5_000, dividends=15_000, gain=40_000)
+        result = harvest_savings(agg, [12_000], [True], PARAMS)
+        self.assertGreater(float(result["base"]["niit"]), 0.0)
+        self.assertAlmostEqual(float(result["savings"][0]), ref_total(agg, 40_000) - ref_total(agg, 28_000), places=6)
+
+
+class TestLossLimit(TestCase):
+    def test_3000_offset_and_the_rest_carries_forward(self):
+        agg = household()
+        result = harvest_savings(agg, [10_000], [True], PARAMS)
+        self.assertAlmostEqual(float(result["savings"][0]), ref_total(agg, 0) - ref_total(agg, -10_000), places=6)
+        self.assertEqual(float(result["carryforward_created"][0]), 7_000.0)
+
+    def test_prior_carryforward_uses_up_the_offset_first(self):
+        agg = household()
+        result = harvest_savings(agg, [10_000], [False], PARAMS, carryforward=2_000)
+        self.assertAlmostEqual(float(result["savings"][0]), ref_total(agg, -2_000) - ref_total(agg, -12_000), places=6)
+        self.assertEqual(float(result["carryforward_created"][0]), 9_000.0)
+
+    def test_carryforward_offsets_gains(self):
+        agg = household(gain=8_000)
+        result = harvest_savings(agg, [2_000], [True], PARAMS, carryforward=5_000)
+        self.assertAlmostEqual(float(result["base"]["total"]), ref_total(agg, 3_000), places=6)
+        self.assertAlmostEqual(float(result["savings"][0]), ref_total(agg, 3_000) - ref_total(agg, 1_000), places=6)
+
+
+class TestCumulative(TestCase):
+    def test_ranked_order_and_incremental_savings(self):
+        agg = household(gain=4_000)
+        losses, long_term = [1_000, 5_000, 2_500], [True, False, True]
+        result = harvest_savings(agg, losses, long_term, PARAMS)
+        self.assertEqual(result["order"].tolist(), [1, 2, 0])
+
+        # Harvested best-first: 5,000, then 2,500, then 1,000
+        remaining = [4_000, -1_000, -3_500, -4_500]
+        steps = [ref_total(agg, a) - ref_total(agg, b) for a, b in zip(remaining, remaining[1:])]
+        np.testing.assert_allclose(result["incremental"][result["order"]], steps, atol=1e-6)
+        self.assertAlmostEqual(float(result["cumulative"]["total"][-1]), ref_total(agg, -4_500), places=6)
+        self.assertEqual(float(result["cumulative"]["carryforward"][-1]), 1_500.0)
+
+    def test_incremental_savings_add_up_to_the_total(self):
+        agg = household(wages=90_000, gain=6_000)
+        result = harvest_savings(agg, [4_000, 4_000, 3_000], [True, False, False], PARAMS)
+        self.assertAlmostEqual(float(result["incremental"].sum()),
+                               float(result["base"]["total"] - result["cumulative"]["total"][-1]), places=6)
+
+
+class WashSaleCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def execute(self, sql, params):
+        self.calls.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class TestWashSaleQuery(TestCase):
+    def test_one_query_for_every_ticker(self):
+        today = date(2026, 10, 19)
+        cur = WashSaleCursor([{"ticker": "AAPL", "cnt": 2}, {"ticker": "MSFT", "cnt": 0}])
+        counts = wash_sale_counts(cur, ["MSFT", "AAPL", "MSFT"], today)
+        self.assertEqual(counts, {"AAPL": 2, "MSFT": 0})
+        [(sql, params)] = cur.calls
+        self.assertIn("unnest(%s::text[])", sql)
+        self.assertIn("ILIKE '%%' || x.ticker || '%%'", sql)
+        self.assertEqual(params, [["AAPL", "MSFT"], today - timedelta(days=30), today + timedelta(days=30)])
+
+
+if __name__ == "__main__":
+    main()
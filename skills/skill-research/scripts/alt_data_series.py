@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+alt_data_series.py
+
+Whole-series storage and aligned reads for alt_data_metrics.
+
+Writing: series_rows() turns every point of a fetched series (e.g. the
+Google Trends timeline) into an alt_data_metrics row; upsert_sql() is the
+shared set-based upsert. Points that fall inside a period already compacted
+to a coarser granularity (see compact_alt_data.py) are skipped, so refetching
+an overlapping window never re-creates daily rows that were folded away.
+
+Reading: load_aligned() returns, per ticker, one array of shape
+(periods, metrics) on a common day / week / month calendar — finer rows are
+averaged into each period and coarser (compacted) rows cover every day of
+their period — ready for np.corrcoef and friends. Missing values are NaN.
+
+Usage:
+    python3 alt_data_series.py --tickers AAPL,MSFT [--metrics google_trends,app_ranking]
+                               [--start 2025-01-01] [--end 2026-03-01] [--freq week] [--correlate]
+
+Output: JSON to stdout
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "numpy not installed. Run: pip install numpy"}))
+    sys.exit(1)
+
+GRANULARITIES = ("day", "week", "month")
+DEFAULT_LOOKBACK_DAYS = 365
+MIN_CORRELATION_POINTS = 3
+
+# Google Trends labels: "Mar 2, 2026", "Mar 2 – 8, 2026", "Dec 29, 2025 – Jan 4, 2026", "Jan 2021"
+_DAY = re.compile(r"^([A-Z][a-z]{2}) (\d{1,2}), (\d{4})$")
+_RANGE = re.compile(r"^([A-Z][a-z]{2}) (\d{1,2})(?:, (\d{4}))?\s*[–—-]\s*(?:[A-Z][a-z]{2} )?\d{1,2}, (\d{4})$")
+_MONTH = re.compile(r"^([A-Z][a-z]{2}) (\d{4})$")
+_MONTHS = {m: i + 1 for i, m in enumerate(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])}
+
+
+def parse_point_date(point: dict) -> tuple[date, str] | None:
+    """(period start, granularity) of a series point, from its "date" label or "timestamp"."""
+    label = re.sub(r"[\u2009\u202f\xa0]", " ", str(point.get("date") or "")).strip()
+    try:
+        if re.match(r"^\d{4}-\d{2}-\d{2}$", label):
+            return date.fromisoformat(label), "day"
+        if m := _DAY.match(label):
+            return date(int(m[3]), _MONTHS[m[1]], int(m[2])), "day"
+        if m := _RANGE.match(label):
+            return date(int(m[3] or m[4]), _MONTHS[m[1]], int(m[2])), "week"
+        if m := _MONTH.match(label):
+            return date(int(m[2]), _MONTHS[m[1]], 1), "month"
+        if point.get("timestamp"):
+            return datetime.fromtimestamp(int(point["timestamp"]), tz=timezone.utc).date(), "day"
+    except (KeyError, ValueError):
+        pass
+    return None
+
+
+def series_rows(ticker: str, metric_type: str, points: list[dict]) -> list[tuple]:
+    """alt_data_metrics rows (ALT_COLUMNS order) for every dated point with a value."""
+    rows = []
+    for point in points or []:
+        value = point.get("value")
+        parsed = parse_point_date(point)
+        if value is None or parsed is None:
+            continue
+        day, granularity = parsed
+        label = f"Google Trends {value}/100" if metric_type == "google_trends" else None
+        rows.append((ticker, day, metric_type, value, label, "{}", granularity))
+    return rows
+
+
+def upsert_sql(source: str) -> str:
+    """Upsert from `source` — a staging table or VALUES list aliased `s`, with
+    ALT_COLUMNS plus seq — into alt_data_metrics; the highest seq wins per
+    (ticker, date, type)."""
+    return f"""
+        INSERT INTO alt_data_metrics
+          (ticker_symbol, metric_date, metric_type, metric_value, metric_label, metadata, granularity)
+        SELECT DISTINCT ON (ticker_symbol, metric_date, metric_type)
+               ticker_symbol, metric_date, metric_type, metric_value, metric_label, metadata, granularity
+        FROM {source}
+        WHERE NOT EXISTS (
+          SELECT 1 FROM alt_data_metrics c
+          WHERE c.ticker_symbol = s.ticker_symbol AND c.metric_type = s.metric_type
+            AND array_position(ARRAY['day', 'week', 'month'], c.granularity::text)
+                > array_position(ARRAY['day', 'week', 'month'], s.granularity::text)
+            AND s.metric_date >= c.metric_date
+            AND s.metric_date < c.metric_date
+                + CASE c.granularity WHEN 'week' THEN INTERVAL '7 days' ELSE INTERVAL '1 month' END
+        )
+        ORDER BY ticker_symbol, metric_date, metric_type, seq DESC
+        ON CONFLICT (ticker_symbol, metric_date, metric_type) DO UPDATE SET
+          metric_value = EXCLUDED.metric_value,
+          metric_label = EXCLUDED.metric_label,
+          metadata = EXCLUDED.metadata,
+          granularity = EXCLUDED.granularity,
+          sample_count = 1
+    """
+
+
+# ── Aligned reads ──────────────────────────────────────────────────────────────
+
+def _period_starts(days, freq: str):
+    """Start of the day / ISO week / month containing each datetime64[D] in `days`."""
+    if freq == "day":
+        return days
+    if freq == "week":
+        return days - ((days.astype(np.int64) - 4) % 7)        # 1970-01-01 was a Thursday
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _period_ends(starts, granularity):
+    ends = starts + 1
+    ends = np.where(granularity == 1, starts + 7, ends)
+    months = (starts.astype("datetime64[M]") + 1).astype("datetime64[D]")
+    return np.where(granularity == 2, months, ends)
+
+
+def align(rows: list[tuple], tickers: list[str], metrics: list[str], start: date, end: date,
+          freq: str = "day") -> dict:
+    """Aligns (ticker, metric_type, metric_date, granularity, value) rows.
+
+    Returns {"tickers", "metrics", "dates": datetime64[D] period starts,
+    "values": float array (tickers, periods, metrics)}. Every row covers its
+    whole period; each calendar day takes the mean of the rows covering it and
+    each output period the mean of its days.
+    """
+    first, last = np.datetime64(start, "D"), np.datetime64(end, "D")
+    n_days = int((last - first).astype(int)) + 1
+    t_of, m_of = {t: i for i, t in enumerate(tickers)}, {m: i for i, m in enumerate(metrics)}
+    rows = [r for r in rows if r[0] in t_of and r[1] in m_of and r[4] is not None]
+
+    sums = np.zeros((len(tickers), len(metrics), n_days))
+    counts = np.zeros_like(sums)
+    if rows:
+        t_idx = np.array([t_of[r[0]] for r in rows])
+        m_idx = np.array([m_of[r[1]] for r in rows])
+        starts = np.array([r[2] for r in rows], dtype="datetime64[D]")
+        gran = np.array([GRANULARITIES.index(r[3] or "day") for r in rows])
+        values = np.array([float(r[4]) for r in rows])
+
+        lo = (np.maximum(starts, first) - first).astype(np.int64)
+        hi = (np.minimum(_period_ends(starts, gran), last + 1) - first).astype(np.int64)
+        length = np.maximum(hi - lo, 0)
+        # One entry per (row, covered day)
+        owner = np.repeat(np.arange(len(rows)), length)
+        offset = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length, length)
+        flat = np.ravel_multi_index((t_idx[owner], m_idx[owner], lo[owner] + offset), sums.shape)
+        sums += np.bincount(flat, weights=values[owner], minlength=sums.size).reshape(sums.shape)
+        counts += np.bincount(flat, minlength=sums.size).reshape(sums.shape)
+
+    days = first + np.arange(n_days)
+    periods = _period_starts(days, freq)
+    boundaries = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    with np.errstate(invalid="ignore"):
+        daily = sums / counts                                   # NaN where nothing covers a day
+    observed = ~np.isnan(daily)
+    period_sums = np.add.reduceat(np.where(observed, daily, 0.0), boundaries, axis=2)
+    period_counts = np.add.reduceat(observed, boundaries, axis=2)
+    with np.errstate(invalid="ignore"):
+        means = period_sums / period_counts
+    return {"tickers": tickers, "metrics": metrics, "dates": periods[boundaries],
+            "values": np.transpose(means, (0, 2, 1))}
+
+
+def load_aligned(cur, tickers: list[str], metrics: list[str] | None = None, start: date | None = None,
+                 end: date | None = None, freq: str = "day") -> dict:
+    """align() over alt_data_metrics; `metrics` defaults to every type stored for `tickers`."""
+    end = end or date.today()
+    start = start or end - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    cur = cur.connection.cursor()
+    cur.execute("""
+        SELECT ticker_symbol, metric_type, metric_date, granularity, metric_value
+        FROM alt_data_metrics
+        WHERE ticker_symbol = ANY(%s)
+          AND (%s::text[] IS NULL OR metric_type = ANY(%s::text[]))
+          AND metric_date <= %s
+          AND metric_date >= %s::date - INTERVAL '1 month'
+        ORDER BY ticker_symbol, metric_type, metric_date
+    """, (tickers, metrics, metrics, end, start))
+    rows = cur.fetchall()
+    cur.close()
+    metrics = metrics or sorted({r[1] for r in rows})
+    return align(rows, tickers, metrics, start, end, freq)
+
+
+def correlations(values) -> list[list[float | None]]:
+    """Pairwise-complete Pearson correlation between the columns of a (periods, metrics) array."""
+    n = values.shape[1]
+    result = [[None] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i, n):
+            both = ~np.isnan(values[:, i]) & ~np.isnan(values[:, j])
+            if both.sum() < MIN_CORRELATION_POINTS:
+                continue
+            a, b = values[both, i], values[both, j]
+            if a.std() == 0 or b.std() == 0:
+                continue
+            result[i][j] = result[j][i] = round(float(np.corrcoef(a, b)[0, 1]), 4)
+    return result
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tickers", required=True, help="Comma-separated tickers")
+    p.add_argument("--metrics", help="Comma-separated metric types (default: all stored)")
+    p.add_argument("--start", type=date.fromisoformat)
+    p.add_argument("--end", type=date.fromisoformat)
+    p.add_argument("--freq", choices=GRANULARITIES, default="week")
+    p.add_argument("--correlate", action="store_true", help="Add metric x metric correlations per ticker")
+    args = p.parse_args()
+
+    try:
+        import psycopg2
+    except ImportError:
+        print(json.dumps({"status": "error", "message": "psycopg2 not installed"}))
+        sys.exit(1)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    metrics = [m.strip() for m in args.metrics.split(",")] if args.metrics else None
+    conn = psycopg2.connect(database_url)
+    aligned = load_aligned(conn.cursor(), tickers, metrics, args.start, args.end, args.freq)
+    conn.close()
+
+    out = {}
+    for i, ticker in enumerate(tickers):
+        values = aligned["values"][i]
+        out[ticker] = {m: [None if np.isnan(v) else round(float(v), 4) for v in values[:, j]]
+                       for j, m in enumerate(aligned["metrics"])}
+        if args.correlate:
+            out[ticker]["correlation"] = correlations(values)
+    print(json.dumps({
+        "status": "ok",
+        "freq": args.freq,
+        "metrics": aligned["metrics"],
+        "dates": [str(d) for d in aligned["dates"]],
+        "tickers": out,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,15 @@
 analyze_sentiment.py
 
 Reads sentiment_snapshots and company_news tables to produce a sentiment
-trend report for a given ticker over N days.
+trend report for one ticker, a list of tickers, or every held ticker over
+N days. Multi-ticker modes read each table once (ticker_symbol = ANY(%s))
+and limit news per ticker with a ROW_NUMBER() window. Trend signals (EWMA,
+z-score, slope) come precomputed from sentiment_daily_rollups.
 
 Usage:
     python3 analyze_sentiment.py --ticker AAPL [--days 30]
+    python3 analyze_sentiment.py --tickers AAPL,MSFT,NVDA [--days 30] [--news-limit 20]
+    python3 analyze_sentiment.py --portfolio [--days 30] [--news-limit 5]
 
 Output: JSON to stdout
 """
@@ -24,53 +29,98 @@ except ImportError:
     print(json.dumps({"status": "error", "message": "psycopg2 not installed"}))
     sys.exit(1)
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
-    sys.exit(1)
-
 
 def parse_args():
     p = argparse.ArgumentParser()
-    p.add_argument("--ticker", required=True)
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--ticker")
+    target.add_argument("--tickers", help="Comma-separated tickers")
+    target.add_argument("--portfolio", action="store_true", help="Every ticker in active accounts' holdings")
     p.add_argument("--days", type=int, default=30)
+    p.add_argument("--news-limit", type=int, default=20, help="Most recent headlines per ticker")
     return p.parse_args()
 
 
-def main():
-    args = parse_args()
-    ticker = args.ticker.upper()
-    since = (date.today() - timedelta(days=args.days)).isoformat()
+def parse_tickers(spec: str) -> list[str]:
+    """'aapl, MSFT,,aapl' -> ['AAPL', 'MSFT']"""
+    return sorted({t.strip().upper() for t in spec.split(",") if t.strip()})
 
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
 
-    # Sentiment trend
+def portfolio_tickers(cur) -> list[str]:
     cur.execute("""
-        SELECT snapshot_date, twitter_sentiment, composite_score,
+        SELECT DISTINCT h.ticker_symbol
+        FROM holdings h
+        JOIN accounts a ON h.account_id = a.id
+        WHERE a.is_active = true
+        ORDER BY h.ticker_symbol
+    """)
+    return [r["ticker_symbol"] for r in cur.fetchall()]
+
+
+def fetch_snapshots(cur, tickers: list[str], since: str) -> dict[str, list]:
+    cur.execute("""
+        SELECT ticker_symbol, snapshot_date, twitter_sentiment, composite_score,
                tweet_volume, bull_tweets, bear_tweets, article_count
         FROM sentiment_snapshots
-        WHERE ticker_symbol = %s AND snapshot_date >= %s
-        ORDER BY snapshot_date ASC
-    """, (ticker, since))
-    snapshots = [dict(r) for r in cur.fetchall()]
+        WHERE ticker_symbol = ANY(%s) AND snapshot_date >= %s
+        ORDER BY ticker_symbol, snapshot_date ASC
+    """, (tickers, since))
+    by_ticker: dict[str, list] = {t: [] for t in tickers}
+    for r in cur.fetchall():
+        row = dict(r)
+        for k in ("twitter_sentiment", "composite_score"):
+            row[k] = float(row[k]) if row[k] is not None else None
+        by_ticker[row.pop("ticker_symbol")].append(row)
+    return by_ticker
 
-    # News summary — top headlines and average sentiment
+
+def fetch_news(cur, tickers: list[str], since: str, limit: int) -> dict[str, list]:
     cur.execute("""
-        SELECT headline, source, published_at, sentiment_score, source_type
-        FROM company_news
-        WHERE ticker_symbol = %s AND published_at >= %s::timestamptz
-        ORDER BY published_at DESC
-        LIMIT 20
-    """, (ticker, since))
-    news = []
+        SELECT ticker_symbol, headline, source, published_at, sentiment_score, source_type
+        FROM (
+          SELECT ticker_symbol, headline, source, published_at, sentiment_score, source_type,
+                 ROW_NUMBER() OVER (PARTITION BY ticker_symbol ORDER BY published_at DESC) AS rn
+          FROM company_news
+          WHERE ticker_symbol = ANY(%s) AND published_at >= %s::timestamptz
+        ) ranked
+        WHERE rn <= %s
+        ORDER BY ticker_symbol, published_at DESC
+    """, (tickers, since, limit))
+    by_ticker: dict[str, list] = {t: [] for t in tickers}
     for r in cur.fetchall():
         row = dict(r)
         if row["published_at"]:
             row["published_at"] = row["published_at"].isoformat()
-        news.append(row)
+        if row["sentiment_score"] is not None:
+            row["sentiment_score"] = float(row["sentiment_score"])
+        by_ticker[row.pop("ticker_symbol")].append(row)
+    return by_ticker
+
+
+def fetch_signals(cur, tickers: list[str], since: str) -> dict[str, dict]:
+    """Latest sentiment_daily_rollups row per ticker within the window."""
+    cur.execute("""
+        SELECT DISTINCT ON (ticker_symbol)
+               ticker_symbol, rollup_date, ewma, zscore, slope_per_day, trend, observations
+        FROM sentiment_daily_rollups
+        WHERE ticker_symbol = ANY(%s) AND rollup_date >= %s
+        ORDER BY ticker_symbol, rollup_date DESC
+    """, (tickers, since))
+    signals = {}
+    for r in cur.fetchall():
+        row = dict(r)
+        for k in ("ewma", "zscore", "slope_per_day"):
+            row[k] = float(row[k]) if row[k] is not None else None
+        signals[row.pop("ticker_symbol")] = row
+    return signals
+
+
+def summarize(snapshots: list, news: list, signals: dict | None = None) -> dict:
+    """Average, label and trend for one ticker.
 
-    # Sentiment stats
+    The trend comes from the precomputed rollup (least-squares slope) when
+    there is one, else from comparing the first and second half of the scores.
+    """
     scores = [s["composite_score"] for s in snapshots if s["composite_score"] is not None]
     avg_score = sum(scores) / len(scores) if scores else None
     trend = None
@@ -79,14 +129,10 @@ def main():
         first_half = sum(scores[:half]) / half
         second_half = sum(scores[half:]) / (len(scores) - half)
         trend = "improving" if second_half > first_half + 0.05 else "worsening" if second_half < first_half - 0.05 else "stable"
+    if signals and signals["trend"]:
+        trend = signals["trend"]
 
-    cur.close()
-    conn.close()
-
-    print(json.dumps({
-        "status": "ok",
-        "ticker": ticker,
-        "days": args.days,
+    return {
         "sentiment_avg": round(avg_score, 3) if avg_score is not None else None,
         "sentiment_label": (
             "bullish" if (avg_score or 0) > 0.2
@@ -94,9 +140,64 @@ def main():
             else "neutral"
         ),
         "trend": trend,
+        "signals": signals,
         "daily_snapshots": snapshots,
         "recent_news": news,
-    }))
+    }
+
+
+def build_report(tickers: list[str], days: int, snapshots: dict, news: dict, signals: dict) -> dict:
+    """Multi-ticker report: each ticker's summary keyed by symbol, plus label/trend/no-data lists."""
+    reports = {t: summarize(snapshots[t], news[t], signals.get(t)) for t in tickers}
+    by_label: dict[str, list] = {"bullish": [], "neutral": [], "bearish": []}
+    for t, r in reports.items():
+        by_label[r["sentiment_label"]].append(t)
+    return {
+        "status": "ok",
+        "days": days,
+        "ticker_count": len(tickers),
+        "summary": {
+            **by_label,
+            "worsening": [t for t, r in reports.items() if r["trend"] == "worsening"],
+            "no_data": [t for t, r in reports.items() if not r["daily_snapshots"] and not r["recent_news"]],
+        },
+        "tickers": reports,
+    }
+
+
+def main():
+    args = parse_args()
+    since = (date.today() - timedelta(days=args.days)).isoformat()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    if args.portfolio:
+        tickers = portfolio_tickers(cur)
+    elif args.tickers:
+        tickers = parse_tickers(args.tickers)
+    else:
+        tickers = [args.ticker.upper()]
+
+    snapshots = fetch_snapshots(cur, tickers, since)
+    news = fetch_news(cur, tickers, since, args.news_limit)
+    signals = fetch_signals(cur, tickers, since)
+
+    cur.close()
+    conn.close()
+
+    if args.ticker:
+        ticker = tickers[0]
+        report = summarize(snapshots[ticker], news[ticker], signals.get(ticker))
+        print(json.dumps({"status": "ok", "ticker": ticker, "days": args.days, **report}, default=str))
+        return
+
+    print(json.dumps(build_report(tickers, args.days, snapshots, news, signals), default=str))
 
 
 if __name__ == "__main__":
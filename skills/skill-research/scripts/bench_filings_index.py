@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+bench_filings_index.py — Search latency for the local filings index.
+
+Builds an in-memory index of synthetic filings (a few paragraphs of filler
+per document, one topic sentence each), checks that every query finds the
+filings it should, then reports milliseconds per query.
+
+Usage:
+  python3 bench_filings_index.py [--filings 3000] [--tickers 100] [--repeat 20]
+"""
+import sys, json, time, argparse
+
+from filings_index import FilingsIndex
+
+FORMS = ["10-Q", "10-K", "8-K"]
+TOPICS = ["New tariffs on imported components raised our cost of sales.",
+          "Supply chain constraints limited shipments in the quarter.",
+          "Cloud revenue grew on strong enterprise demand.",
+          "Export controls restricted sales to certain customers."]
+FILLER = "Revenue and operating income are discussed in the results of operations section. " * 200
+QUERIES = [  # name, FTS5 query, filters, topic sentence it must find
+    ("keyword", "tariffs", {}, TOPICS[0]),
+    ("phrase", '"supply chain"', {}, TOPICS[1]),
+    ("near", "NEAR(export restricted, 5)", {}, TOPICS[3]),
+    ("latest_10q", "tariffs", {"forms": ["10-Q"], "latest": True, "limit": 50}, TOPICS[0]),
+]
+
+def build(n: int, tickers: int) -> FilingsIndex:
+    index = FilingsIndex(":memory:")
+    for i in range(n):
+        meta = {"ticker": f"T{i % tickers}", "form": FORMS[i % len(FORMS)],
+                "filed": f"{2020 + i // 1200}-{1 + i // 100 % 12:02d}-15", "accession": f"x-{i}",
+                "primary_doc": "doc.htm"}
+        index.add(meta, f"<html><body><p>{TOPICS[i % len(TOPICS)]}</p><p>{FILLER}</p></body></html>")
+    index.commit()
+    index.optimize()
+    return index
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filings", type=int, default=3000)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build(args.filings, args.tickers)
+    build_seconds = time.perf_counter() - start
+
+    results = []
+    for name, query, filters, topic in QUERIES:
+        hits = index.search(query, **filters)
+        # filings.id follows insertion order, so x-<i> is row i + 1
+        if not hits or any(topic not in index.text(int(h["accession"][2:]) + 1) for h in hits):
+            print(json.dumps({"status": "mismatch", "query": query, "hits": len(hits)}))
+            sys.exit(1)
+        seconds = timed(lambda: index.search(query, **filters), args.repeat)
+        results.append({"query": name, "hits": len(hits), "ms": round(seconds * 1000, 3)})
+    print(json.dumps({"status": "ok", "build_seconds": round(build_seconds, 3), **index.stats(),
+                      "results": results}, indent=2))
+    index.close()
+
+if __name__ == "__main__":
+    main()
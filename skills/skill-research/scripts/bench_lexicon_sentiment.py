@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+bench_lexicon_sentiment.py — Texts per second for the lexicon sentiment scorers.
+
+Both scorers run on the same synthetic headline + summary texts; the batch
+scorer must agree with the per-text reference before it is timed.
+
+Usage:
+  python3 bench_lexicon_sentiment.py [--texts 200000] [--batch-size 5000] [--repeat 3]
+"""
+import sys, json, time, argparse
+
+import numpy as np
+
+from lexicon_sentiment import INTENSIFIERS, LEXICON, NEGATIONS, score_text, score_texts
+
+SCALAR_SAMPLE_CAP = 50_000      # the per-text loop is timed on at most this many texts
+FILLER = ("the company said quarter revenue shares analysts investors market year results guidance "
+          "sales stock price report earnings ceo new deal plan billion percent after on in of as").split()
+
+def random_texts(rng, n: int, words: int = 40) -> list[str]:
+    """Headline-plus-summary sized texts, roughly one in four words a lexicon term."""
+    vocab = np.array(FILLER * 4 + sorted(LEXICON) + sorted(NEGATIONS) + sorted(INTENSIFIERS), dtype=object)
+    picks = vocab[rng.integers(0, len(vocab), (n, words))]
+    return [" ".join(row) for row in picks]
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def batched(texts: list[str], batch_size: int):
+    return np.concatenate([score_texts(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=20260301)
+    args = parser.parse_args()
+
+    texts = random_texts(np.random.default_rng(args.seed), args.texts)
+    sample = texts[:SCALAR_SAMPLE_CAP]
+    expected = np.array([score_text(t) for t in sample])
+    err = float(np.max(np.abs(batched(sample, args.batch_size) - expected)))
+    if err > 1e-9:
+        print(json.dumps({"status": "mismatch", "max_abs_error": err}))
+        sys.exit(1)
+
+    results = []
+    for name, fn, n in (("score_text", lambda: [score_text(t) for t in sample], len(sample)),
+                        ("score_texts", lambda: batched(texts, args.batch_size), len(texts))):
+        seconds = timed(fn, args.repeat)
+        results.append({"implementation": name, "texts": n, "seconds": round(seconds, 4),
+                        "texts_per_sec": round(n / seconds) if seconds > 0 else None})
+    print(json.dumps({"status": "ok", "batch_size": args.batch_size, "max_abs_error": err,
+                      "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+compact_alt_data.py
+
+Downsamples old alt_data_metrics rows so full series can be kept without
+the table growing without bound:
+
+    day   rows older than ALT_DATA_DAILY_DAYS  (default 90)  -> one 'week' row per ISO week
+    week  rows older than ALT_DATA_WEEKLY_DAYS (default 730) -> one 'month' row per month
+
+A compacted row is dated at the start of its period and holds the mean of
+the rows it replaces, weighted by their sample_count, with min/max in
+metadata; folding into an existing row of the same period merges the
+weighted means. Cutoffs are aligned to period boundaries so a period is
+never split between granularities. Each ticker is compacted in its own
+transaction, so the job can be interrupted and re-run at any time.
+alt_data_series.upsert_sql() skips refetched points inside compacted periods.
+
+Usage:
+    python3 compact_alt_data.py [--ticker AAPL] [--daily-days 90] [--weekly-days 730] [--dry-run]
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+
+try:
+    import psycopg2
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+    sys.exit(1)
+
+ALT_DATA_DAILY_DAYS = int(os.environ.get("ALT_DATA_DAILY_DAYS", "90"))
+ALT_DATA_WEEKLY_DAYS = int(os.environ.get("ALT_DATA_WEEKLY_DAYS", "730"))
+
+
+def passes(today: date, daily_days: int, weekly_days: int) -> list[tuple[str, str, date]]:
+    """(source granularity, target granularity, cutoff) in the order they must run."""
+    day_cutoff = today - timedelta(days=daily_days)
+    month_cutoff = today - timedelta(days=weekly_days)
+    return [
+        ("day", "week", day_cutoff - timedelta(days=day_cutoff.weekday())),
+        ("week", "month", month_cutoff.replace(day=1)),
+    ]
+
+
+def compact_ticker(cur, ticker: str, source: str, target: str, cutoff: date) -> dict:
+    params = {"ticker": ticker, "source": source, "target": target, "cutoff": cutoff}
+    cur.execute("""
+        CREATE TEMP TABLE alt_compact AS
+        SELECT ticker_symbol, metric_type, date_trunc(%(target)s, metric_date)::date AS period,
+               SUM(metric_value * sample_count) AS total,
+               SUM(sample_count) FILTER (WHERE metric_value IS NOT NULL) AS samples,
+               MIN(metric_value) AS lo, MAX(metric_value) AS hi
+        FROM alt_data_metrics
+        WHERE ticker_symbol = %(ticker)s AND granularity = %(source)s AND metric_date < %(cutoff)s
+        GROUP BY ticker_symbol, metric_type, period
+    """, params)
+    cur.execute("""
+        DELETE FROM alt_data_metrics
+        WHERE ticker_symbol = %(ticker)s AND granularity = %(source)s AND metric_date < %(cutoff)s
+    """, params)
+    removed = cur.rowcount
+    # A coarser row already at the same date (possible only for hand-loaded data) is left as is
+    cur.execute("""
+        INSERT INTO alt_data_metrics
+          (ticker_symbol, metric_date, metric_type, metric_value, metadata, granularity, sample_count)
+        SELECT ticker_symbol, period, metric_type, ROUND(total / samples, 2),
+               jsonb_build_object('min', lo, 'max', hi), %(target)s, samples
+        FROM alt_compact
+        WHERE samples > 0
+        ON CONFLICT (ticker_symbol, metric_date, metric_type) DO UPDATE SET
+          metric_value = ROUND(
+            (alt_data_metrics.metric_value * alt_data_metrics.sample_count
+             + EXCLUDED.metric_value * EXCLUDED.sample_count)
+            / (alt_data_metrics.sample_count + EXCLUDED.sample_count), 2),
+          sample_count = alt_data_metrics.sample_count + EXCLUDED.sample_count,
+          metadata = jsonb_build_object(
+            'min', LEAST((alt_data_metrics.metadata->>'min')::numeric, (EXCLUDED.metadata->>'min')::numeric),
+            'max', GREATEST((alt_data_metrics.metadata->>'max')::numeric, (EXCLUDED.metadata->>'max')::numeric))
+        WHERE alt_data_metrics.granularity = EXCLUDED.granularity
+    """, params)
+    written = cur.rowcount
+    cur.execute("DROP TABLE alt_compact")
+    return {"rows_removed": removed, "rows_written": written}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--ticker", help="Only this ticker (default: all)")
+    p.add_argument("--daily-days", type=int, default=ALT_DATA_DAILY_DAYS, help="Keep daily rows this long")
+    p.add_argument("--weekly-days", type=int, default=ALT_DATA_WEEKLY_DAYS, help="Keep weekly rows this long")
+    p.add_argument("--dry-run", action="store_true", help="Count rows that would be compacted")
+    args = p.parse_args()
+    if args.weekly_days <= args.daily_days:
+        print(json.dumps({"status": "error", "message": "--weekly-days must be greater than --daily-days"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+    report = []
+    for source, target, cutoff in passes(date.today(), args.daily_days, args.weekly_days):
+        cur.execute("""
+            SELECT ticker_symbol, COUNT(*)
+            FROM alt_data_metrics
+            WHERE granularity = %s AND metric_date < %s AND (%s::text IS NULL OR ticker_symbol = %s)
+            GROUP BY ticker_symbol
+            ORDER BY ticker_symbol
+        """, (source, cutoff, args.ticker, args.ticker))
+        eligible = cur.fetchall()
+        totals = {"from": source, "to": target, "cutoff": cutoff.isoformat(), "tickers": len(eligible),
+                  "rows_eligible": sum(n for _, n in eligible), "rows_removed": 0, "rows_written": 0}
+        if not args.dry_run:
+            for ticker, _ in eligible:
+                result = compact_ticker(cur, ticker, source, target, cutoff)
+                conn.commit()
+                totals["rows_removed"] += result["rows_removed"]
+                totals["rows_written"] += result["rows_written"]
+        report.append(totals)
+
+    cur.close()
+    conn.close()
+    print(json.dumps({"status": "ok", "dry_run": args.dry_run, "passes": report}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+company_intel_archive.py
+
+Retention for the ever-growing JSONB arrays in company_intelligence
+(news, sec_filings, earnings_transcripts). Every update rewrites the whole
+TOASTed value, so the live arrays are capped:
+
+    keep   entries dated within INTEL_KEEP_DAYS (default 365), newest first,
+           at most INTEL_KEEP_MAX (default 200) per array — and always the
+           newest entry, which sync_news.py uses as its high-water mark
+    move   everything else to COMPANY_INTEL_ARCHIVE_DIR/<TICKER>/<column>.ndjson.gz
+
+Archive files are appended one gzip member per run (a valid multi-member
+gzip stream), written and fsynced before the row is trimmed; a run that dies
+between the two re-archives the same entries next time, and readers drop
+the duplicates by entry key. Each ticker is compacted in its own transaction
+with the row locked, so concurrent syncs are not lost.
+
+history() is the reader for callers that want the full record: live and
+archived entries merged, de-duplicated and sorted newest first.
+
+Usage:
+    python3 company_intel_archive.py compact [--ticker AAPL] [--keep-days 365] [--keep-max 200] [--dry-run]
+    python3 company_intel_archive.py history --ticker AAPL --column sec_filings [--since 2020-01-01] [--limit 50]
+
+Output: JSON to stdout
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+COMPANY_INTEL_ARCHIVE_DIR = os.environ.get("COMPANY_INTEL_ARCHIVE_DIR", "./data/company_intel_archive")
+INTEL_KEEP_DAYS = int(os.environ.get("INTEL_KEEP_DAYS", "365"))
+INTEL_KEEP_MAX = int(os.environ.get("INTEL_KEEP_MAX", "200"))
+ARRAY_COLUMNS = ("news", "sec_filings", "earnings_transcripts")
+
+# First field present wins
+DATE_FIELDS = ("filed", "published_at", "datetime", "date", "report_date", "published")
+KEY_FIELDS = ("accession", "id", "url", "fingerprint")
+
+
+def entry_date(entry) -> str:
+    """ISO date of an array entry ("" when undated); epoch seconds are accepted."""
+    if not isinstance(entry, dict):
+        return ""
+    for field in DATE_FIELDS:
+        value = entry.get(field)
+        if value in (None, ""):
+            continue
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc).date().isoformat()
+        return str(value)[:10]
+    return ""
+
+
+def entry_key(entry) -> str:
+    if isinstance(entry, dict):
+        for field in KEY_FIELDS:
+            if entry.get(field):
+                return f"{field}:{entry[field]}"
+    return json.dumps(entry, sort_keys=True)
+
+
+def split_entries(entries: list, cutoff: str, keep_max: int) -> tuple[list, list]:
+    """(kept, archived): kept are the newest entries dated on or after `cutoff`,
+    at most `keep_max` and at least one; both lists are newest first."""
+    ordered = sorted(entries or [], key=entry_date, reverse=True)
+    n = sum(1 for e in ordered if entry_date(e) >= cutoff)
+    n = max(1, min(n, keep_max)) if ordered else 0
+    return ordered[:n], ordered[n:]
+
+
+# ── Archive files ──────────────────────────────────────────────────────────────
+
+def archive_path(ticker: str, column: str, base: str | None = None) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+    return os.path.join(base or COMPANY_INTEL_ARCHIVE_DIR, safe, f"{column}.ndjson.gz")
+
+
+def append_archive(ticker: str, column: str, entries: list, base: str | None = None) -> int:
+    """Appends `entries` as one gzip member and fsyncs; returns the compressed bytes written."""
+    if not entries:
+        return 0
+    path = archive_path(ticker, column, base)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries).encode()
+    member = gzip.compress(payload, compresslevel=6)
+    with open(path, "ab") as f:
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(member)
+
+
+def read_archive(ticker: str, column: str, base: str | None = None):
+    """Yields archived entries, oldest run first; nothing when there is no archive."""
+    path = archive_path(ticker, column, base)
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge(live: list, archived, since: str | None = None) -> list:
+    """Live entries plus archived ones not already present, newest first, optionally dated >= `since`."""
+    seen, merged = set(), []
+    for entry in list(live or []) + list(archived):
+        key = entry_key(entry)
+        if key in seen or (since and entry_date(entry) < since):
+            continue
+        seen.add(key)
+        merged.append(entry)
+    return sorted(merged, key=entry_date, reverse=True)
+
+
+def history(cur, ticker: str, column: str, since: str | None = None, base: str | None = None) -> list:
+    """Full `column` history of `ticker`: live company_intelligence entries and the archive."""
+    if column not in ARRAY_COLUMNS:
+        raise ValueError(f"Unknown array column {column}")
+    cur = cur.connection.cursor()
+    cur.execute(f"SELECT {column} FROM company_intelligence WHERE ticker_symbol = %s", (ticker,))
+    row = cur.fetchone()
+    cur.close()
+    return merge(row[0] if row else [], read_archive(ticker, column, base), since)
+
+
+# ── Compaction ─────────────────────────────────────────────────────────────────
+
+def compact_ticker(cur, ticker: str, cutoff: str, keep_max: int, dry_run: bool = False,
+                   base: str | None = None) -> dict:
+    cur.execute(f"""
+        SELECT {", ".join(ARRAY_COLUMNS)}
+        FROM company_intelligence
+        WHERE ticker_symbol = %s
+        {"" if dry_run else "FOR UPDATE"}
+    """, (ticker,))
+    row = cur.fetchone()
+    result = {"entries_archived": 0, "archive_bytes": 0, "columns": {}}
+    if row is None:
+        return result
+
+    trimmed = {}
+    for column, entries in zip(ARRAY_COLUMNS, row):
+        if not isinstance(entries, list):
+            continue
+        kept, archived = split_entries(entries, cutoff, keep_max)
+        if not archived:
+            continue
+        result["columns"][column] = len(archived)
+        result["entries_archived"] += len(archived)
+        if not dry_run:
+            result["archive_bytes"] += append_archive(ticker, column, archived, base)
+            trimmed[column] = json.dumps(kept)
+    if trimmed:
+        cur.execute(f"""
+            UPDATE company_intelligence
+            SET {", ".join(f"{c} = %({c})s::jsonb" for c in trimmed)}
+            WHERE ticker_symbol = %(ticker)s
+        """, {**trimmed, "ticker": ticker})
+    return result
+
+
+def main():
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+    compact = sub.add_parser("compact", help="Move old array entries to the archive")
+    compact.add_argument("--ticker", help="Only this ticker (default: all)")
+    compact.add_argument("--keep-days", type=int, default=INTEL_KEEP_DAYS)
+    compact.add_argument("--keep-max", type=int, default=INTEL_KEEP_MAX)
+    compact.add_argument("--dry-run", action="store_true", help="Count entries that would be archived")
+    read = sub.add_parser("history", help="Live + archived entries of one array")
+    read.add_argument("--ticker", required=True)
+    read.add_argument("--column", choices=ARRAY_COLUMNS, required=True)
+    read.add_argument("--since", help="Only entries dated on or after YYYY-MM-DD")
+    read.add_argument("--limit", type=int)
+    args = p.parse_args()
+
+    try:
+        import psycopg2
+    except ImportError:
+        print(json.dumps({"status": "error", "message": "psycopg2 not installed"}))
+        sys.exit(1)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    if args.command == "history":
+        entries = history(cur, args.ticker.upper(), args.column, args.since)
+        conn.close()
+        print(json.dumps({"status": "ok", "ticker": args.ticker.upper(), "column": args.column,
+                          "total": len(entries), "entries": entries[:args.limit] if args.limit else entries},
+                         default=str))
+        return
+
+    cutoff = (date.today() - timedelta(days=args.keep_days)).isoformat()
+    only = args.ticker.upper() if args.ticker else None
+    cur.execute("""
+        SELECT ticker_symbol FROM company_intelligence
+        WHERE %s::text IS NULL OR ticker_symbol = %s
+        ORDER BY ticker_symbol
+    """, (only, only))
+    tickers = [r[0] for r in cur.fetchall()]
+    conn.commit()
+    totals = {"entries_archived": 0, "archive_bytes": 0, "tickers_compacted": 0, "columns": {}}
+    for ticker in tickers:
+        result = compact_ticker(cur, ticker, cutoff, args.keep_max, args.dry_run)
+        conn.commit()
+        if result["entries_archived"]:
+            totals["tickers_compacted"] += 1
+        totals["entries_archived"] += result["entries_archived"]
+        totals["archive_bytes"] += result["archive_bytes"]
+        for column, n in result["columns"].items():
+            totals["columns"][column] = totals["columns"].get(column, 0) + n
+    cur.close()
+    conn.close()
+    print(json.dumps({"status": "ok", "dry_run": args.dry_run, "cutoff": cutoff,
+                      "tickers": len(tickers), **totals}))
+
+
+if __name__ == "__main__":
+    main()
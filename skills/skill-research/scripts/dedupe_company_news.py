@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+dedupe_company_news.py
+
+One-off migration tool: backfills company_news.fingerprint for rows written
+before migration 021 and deletes duplicates, so the unique index
+(ticker_symbol, fingerprint) covers the whole table.
+
+Rows are processed in keyset-paginated batches, one transaction per batch,
+so the table stays writable while it runs and an interrupted run resumes
+where it stopped (only rows with a NULL fingerprint are visited). Per
+(ticker, fingerprint) the row that already holds the fingerprint wins, else
+the oldest one in the batch (preferring rows that carry a sentiment score).
+Rows with neither a URL nor a headline are deleted. --dry-run fingerprints
+nothing, so it only counts duplicates within a batch or against
+already-fingerprinted rows.
+
+Usage:
+    python3 dedupe_company_news.py [--batch-size 5000] [--dry-run]
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from news_fingerprint import fingerprint
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+    sys.exit(1)
+
+
+def plan_batch(rows: list[tuple]) -> tuple[list[tuple], list]:
+    """Splits (id, ticker, url, headline, created_at, has_score) rows into
+    (id, ticker, fingerprint) keepers and ids to delete."""
+    keep: dict[tuple, tuple] = {}
+    delete, unfingerprintable = [], []
+    for row_id, ticker, url, headline, created_at, has_score in rows:
+        fp = fingerprint(url, headline)
+        if fp is None:
+            unfingerprintable.append(row_id)
+            continue
+        rank = (not has_score, created_at is None, created_at, str(row_id))
+        best = keep.get((ticker, fp))
+        if best is None or rank < best[1]:
+            if best is not None:
+                delete.append(best[0])
+            keep[(ticker, fp)] = (row_id, rank)
+        else:
+            delete.append(row_id)
+    updates = [(row_id, ticker, fp) for (ticker, fp), (row_id, _) in keep.items()]
+    return updates, delete + unfingerprintable
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.add_argument("--dry-run", action="store_true", help="Count duplicates without changing anything")
+    args = p.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+    last_id = None
+    totals = {"batches": 0, "scanned": 0, "fingerprinted": 0, "deleted": 0}
+
+    while True:
+        cur.execute("""
+            SELECT id, ticker_symbol, url, headline, created_at, sentiment_score IS NOT NULL
+            FROM company_news
+            WHERE fingerprint IS NULL AND (%s::uuid IS NULL OR id > %s::uuid)
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, last_id, args.batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates, delete = plan_batch(rows)
+
+        # Keepers whose fingerprint is already taken by a fingerprinted row are duplicates too
+        taken_ids = set()
+        if updates:
+            taken = execute_values(cur, """
+                SELECT b.id
+                FROM (VALUES %s) AS b(id, ticker_symbol, fingerprint)
+                JOIN company_news n
+                  ON n.ticker_symbol = b.ticker_symbol AND n.fingerprint = b.fingerprint
+            """, updates, fetch=True)
+            taken_ids = {r[0] for r in taken}
+        delete += [u[0] for u in updates if u[0] in taken_ids]
+        updates = [(row_id, fp) for row_id, _, fp in updates if row_id not in taken_ids]
+
+        totals["batches"] += 1
+        totals["scanned"] += len(rows)
+        totals["fingerprinted"] += len(updates)
+        totals["deleted"] += len(delete)
+        if args.dry_run:
+            conn.rollback()
+            continue
+
+        if delete:
+            cur.execute("DELETE FROM company_news WHERE id = ANY(%s::uuid[])", (delete,))
+        if updates:
+            execute_values(cur, """
+                UPDATE company_news n SET fingerprint = b.fingerprint
+                FROM (VALUES %s) AS b(id, fingerprint)
+                WHERE n.id = b.id::uuid
+            """, updates)
+        conn.commit()
+
+    cur.close()
+    conn.close()
+    print(json.dumps({"status": "ok", "dry_run": args.dry_run, **totals}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+event_study.py
+
+Tests whether sentiment leads price for the portfolio's tickers.
+
+Events come from the database:
+    sentiment  sentiment_daily_rollups days with |zscore| >= --z-threshold
+               (direction = sign of the z-score)
+    news       company_news articles with |sentiment_score| >= --news-threshold,
+               one event per ticker and trading day (direction = sign of the
+               day's mean score); articles after the 16:00 ET close count for
+               the next trading day
+Daily closes (tickers plus a benchmark, default SPY) come from --prices, a CSV
+with ticker,date,close columns or JSON {"TICKER": [{"date", "close"}, ...]};
+"-" reads the JSON from stdin. The database has no price history table.
+
+For every event the engine gathers log returns over [-pre, +post] trading
+days, subtracts expected returns from a market model fitted on an estimation
+window ending `gap` days before the event (or the benchmark return, or the
+ticker's mean), and reports mean abnormal returns, CARs and cross-sectional
+t-stats for positive and negative events. Lagged cross-correlations between
+daily sentiment (sentiment_snapshots.composite_score) and next-k-day returns
+are computed per ticker and pooled. All of it is array arithmetic over
+(events x window) and (tickers x days) matrices — no per-event Python loops.
+
+Usage:
+    python3 event_study.py --prices prices.csv [--tickers AAPL,MSFT | (default: holdings)]
+                           [--benchmark SPY] [--pre 5] [--post 10] [--estimation 120] [--gap 10]
+                           [--model market|market_adjusted|mean] [--max-lag 5]
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "numpy not installed. Run: pip install numpy"}))
+    sys.exit(1)
+
+MODELS = ("market", "market_adjusted", "mean")
+MIN_ESTIMATION_DAYS = 30
+MARKET_CLOSE_UTC_HOUR = 21          # 16:00 ET (EDT); a conservative cutoff in winter as well
+MIN_XCORR_POINTS = 10
+
+
+# ── Panels ─────────────────────────────────────────────────────────────────────
+
+def price_panel(prices: dict[str, list[tuple]], tickers: list[str]):
+    """(trading days as datetime64[D], closes of shape (tickers, days) with NaN gaps).
+    The calendar is the union of dates seen across all series."""
+    all_days = sorted({np.datetime64(d, "D") for series in prices.values() for d, _ in series})
+    days = np.array(all_days, dtype="datetime64[D]")
+    closes = np.full((len(tickers), len(days)), np.nan)
+    for i, ticker in enumerate(tickers):
+        series = prices.get(ticker) or []
+        if series:
+            at = np.searchsorted(days, np.array([d for d, _ in series], dtype="datetime64[D]"))
+            closes[i, at] = [float(c) for _, c in series]
+    return days, closes
+
+
+def log_returns(closes):
+    """Daily log returns; day 0 and days after a gap are NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.full_like(closes, np.nan)
+        returns[..., 1:] = np.log(closes[..., 1:] / closes[..., :-1])
+    return returns
+
+
+def event_day_index(days, event_days) -> np.ndarray:
+    """Index of the first trading day on or after each event day (len(days) when past the end)."""
+    return np.searchsorted(days, np.asarray(event_days, dtype="datetime64[D]"), side="left")
+
+
+def daily_panel(days, ticker_idx, event_days, values, n_tickers: int):
+    """Mean of `values` per (ticker, trading day) on the `days` calendar; NaN where none."""
+    col = event_day_index(days, event_days)
+    keep = col < len(days)
+    sums = np.zeros((n_tickers, len(days)))
+    counts = np.zeros_like(sums)
+    np.add.at(sums, (ticker_idx[keep], col[keep]), values[keep])
+    np.add.at(counts, (ticker_idx[keep], col[keep]), 1)
+    with np.errstate(invalid="ignore"):
+        return sums / counts
+
+
+# ── Abnormal returns ───────────────────────────────────────────────────────────
+
+def _gather(matrix, rows, cols):
+    """matrix[rows, cols] with NaN where cols fall outside the matrix."""
+    valid = (cols >= 0) & (cols < matrix.shape[1])
+    out = np.full(cols.shape, np.nan)
+    rows = np.broadcast_to(rows, cols.shape)
+    out[valid] = matrix[rows[valid], cols[valid]]
+    return out
+
+
+def abnormal_returns(returns, market, ticker_idx, day_idx, pre: int = 5, post: int = 10,
+                     estimation: int = 120, gap: int = 10, model: str = "market"):
+    """Abnormal returns of shape (events, pre + post + 1) for window offsets -pre..post.
+
+    Expected returns: "market" fits r = alpha + beta * m by OLS over the
+    `estimation` days ending `gap` days before each window; "market_adjusted"
+    uses the benchmark return; "mean" the ticker's mean over the estimation
+    window. Events with fewer than MIN_ESTIMATION_DAYS usable estimation days
+    get NaN rows.
+    """
+    ticker_idx, day_idx = np.asarray(ticker_idx), np.asarray(day_idx)
+    window = day_idx[:, None] + np.arange(-pre, post + 1)
+    r_win = _gather(returns, ticker_idx[:, None], window)
+    m_win = _gather(market[None, :], np.zeros_like(ticker_idx)[:, None], window)
+    if model == "market_adjusted":
+        return r_win - m_win
+
+    est = day_idx[:, None] - pre - gap - estimation + np.arange(estimation)
+    r_est = _gather(returns, ticker_idx[:, None], est)
+    m_est = _gather(market[None, :], np.zeros_like(ticker_idx)[:, None], est)
+    usable = ~np.isnan(r_est) & ~np.isnan(m_est)
+    n = usable.sum(axis=1)
+    r_est, m_est = np.where(usable, r_est, 0.0), np.where(usable, m_est, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r_mean, m_mean = r_est.sum(axis=1) / n, m_est.sum(axis=1) / n
+        if model == "mean":
+            expected = np.broadcast_to(r_mean[:, None], r_win.shape)
+        else:
+            dm = np.where(usable, m_est - m_mean[:, None], 0.0)
+            dr = np.where(usable, r_est - r_mean[:, None], 0.0)
+            beta = (dm * dr).sum(axis=1) / (dm * dm).sum(axis=1)
+            alpha = r_mean - beta * m_mean
+            expected = alpha[:, None] + beta[:, None] * m_win
+    ar = r_win - expected
+    ar[n < MIN_ESTIMATION_DAYS] = np.nan
+    return ar
+
+
+def summarize(ar, offsets) -> dict:
+    """Mean AR / CAR per offset and cross-sectional t-stat of the CAR, over events with a full window."""
+    complete = ~np.isnan(ar).any(axis=1)
+    ar = ar[complete]
+    n = len(ar)
+    if n == 0:
+        return {"events": 0}
+    car = np.cumsum(ar, axis=1)
+    mean_car = car.mean(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = mean_car / (car.std(axis=0, ddof=1) / np.sqrt(n)) if n > 1 else np.full(len(offsets), np.nan)
+
+    def rounded(a, digits=5):
+        return [None if not np.isfinite(v) else round(float(v), digits) for v in a]
+
+    return {
+        "events": int(n),
+        "offsets": [int(o) for o in offsets],
+        "mean_ar": rounded(ar.mean(axis=0)),
+        "mean_car": rounded(mean_car),
+        "t_car": rounded(t, 2),
+        "final_car": rounded(mean_car[-1:])[0],
+        "final_t": rounded(t[-1:], 2)[0],
+    }
+
+
+def study(ar, direction, offsets) -> dict:
+    direction = np.asarray(direction)
+    return {
+        "all": summarize(ar * np.where(direction < 0, -1.0, 1.0)[:, None], offsets),   # signed: + = predicted
+        "positive": summarize(ar[direction > 0], offsets),
+        "negative": summarize(ar[direction < 0], offsets),
+    }
+
+
+# ── Lead/lag ───────────────────────────────────────────────────────────────────
+
+def lagged_xcorr(signal, returns, max_lag: int = 5):
+    """Pearson correlation of signal[t] with returns[t + k] for k = -max_lag..max_lag,
+    per row (ticker), over pairwise-complete days. Positive k: the signal leads.
+
+    Returns (per-row correlations of shape (rows, lags), pooled correlations of
+    within-row demeaned data of shape (lags,))."""
+    lags = np.arange(-max_lag, max_lag + 1)
+    per_row = np.full((signal.shape[0], len(lags)), np.nan)
+    pooled = np.full(len(lags), np.nan)
+    d = signal.shape[1]
+    for j, k in enumerate(lags):
+        if abs(k) >= d:
+            continue
+        s = signal[:, max(0, -k):d - max(0, k)]
+        r = returns[:, max(0, k):d - max(0, -k)]
+        both = ~np.isnan(s) & ~np.isnan(r)
+        n = both.sum(axis=1)
+        s0, r0 = np.where(both, s, 0.0), np.where(both, r, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ds = np.where(both, s0 - (s0.sum(axis=1) / n)[:, None], 0.0)
+            dr = np.where(both, r0 - (r0.sum(axis=1) / n)[:, None], 0.0)
+            cov, vs, vr = (ds * dr).sum(axis=1), (ds * ds).sum(axis=1), (dr * dr).sum(axis=1)
+            per_row[:, j] = np.where(n >= MIN_XCORR_POINTS, cov / np.sqrt(vs * vr), np.nan)
+            ok = n >= MIN_XCORR_POINTS
+            pooled[j] = cov[ok].sum() / np.sqrt(vs[ok].sum() * vr[ok].sum()) if ok.any() else np.nan
+    return lags, per_row, pooled
+
+
+# ── Loading ────────────────────────────────────────────────────────────────────
+
+def load_prices(path: str) -> dict[str, list[tuple]]:
+    """{TICKER: [(date, close), ...]} from a ticker,date,close CSV or {ticker: [{date, close}]} JSON."""
+    if path == "-":
+        data = json.load(sys.stdin)
+    elif path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        prices: dict[str, list] = {}
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("close") not in (None, ""):
+                    prices.setdefault(row["ticker"].upper(), []).append(
+                        (date.fromisoformat(row["date"][:10]), float(row["close"])))
+        return prices
+    return {t.upper(): [(date.fromisoformat(p["date"][:10]), float(p["close"])) for p in series
+                        if p.get("close") is not None]
+            for t, series in data.items()}
+
+
+def load_events(cur, tickers: list[str], since: date, z_threshold: float, news_threshold: float) -> dict:
+    cur.execute("""
+        SELECT ticker_symbol, rollup_date, zscore
+        FROM sentiment_daily_rollups
+        WHERE ticker_symbol = ANY(%s) AND rollup_date >= %s AND ABS(zscore) >= %s
+    """, (tickers, since, z_threshold))
+    sentiment = cur.fetchall()
+    # Articles after the close move the next session
+    cur.execute("""
+        SELECT ticker_symbol,
+               (published_at AT TIME ZONE 'UTC')::date
+                 + CASE WHEN EXTRACT(HOUR FROM published_at AT TIME ZONE 'UTC') >= %s THEN 1 ELSE 0 END,
+               sentiment_score
+        FROM company_news
+        WHERE ticker_symbol = ANY(%s) AND published_at >= %s AND ABS(sentiment_score) >= %s
+    """, (MARKET_CLOSE_UTC_HOUR, tickers, since, news_threshold))
+    news = cur.fetchall()
+    cur.execute("""
+        SELECT ticker_symbol, snapshot_date, composite_score
+        FROM sentiment_snapshots
+        WHERE ticker_symbol = ANY(%s) AND snapshot_date >= %s AND composite_score IS NOT NULL
+    """, (tickers, since))
+    snapshots = cur.fetchall()
+    return {"sentiment": sentiment, "news": news, "snapshots": snapshots}
+
+
+def event_arrays(rows, ticker_of: dict, days, per_day: bool):
+    """(ticker_idx, day_idx, direction) for (ticker, day, score) rows on the trading calendar;
+    with `per_day`, rows sharing a ticker and trading day become one event (mean score)."""
+    rows = [r for r in rows if r[0] in ticker_of and r[2] is not None]
+    if not rows:
+        return np.zeros(0, int), np.zeros(0, int), np.zeros(0)
+    t_idx = np.array([ticker_of[r[0]] for r in rows])
+    d_idx = event_day_index(days, np.array([r[1] for r in rows], dtype="datetime64[D]"))
+    score = np.array([float(r[2]) for r in rows])
+    keep = d_idx < len(days)
+    t_idx, d_idx, score = t_idx[keep], d_idx[keep], score[keep]
+    if per_day and len(t_idx):
+        key = t_idx * len(days) + d_idx
+        uniq, inverse = np.unique(key, return_inverse=True)
+        score = np.bincount(inverse, weights=score) / np.bincount(inverse)
+        t_idx, d_idx = uniq // len(days), uniq % len(days)
+    return t_idx, d_idx, np.sign(score)
+
+
+def run(prices: dict, tickers: list[str], benchmark: str, events: dict, args) -> dict:
+    tickers = [t for t in tickers if prices.get(t)]
+    days, closes = price_panel(prices, tickers + [benchmark])
+    returns = log_returns(closes)
+    stock, market = returns[:-1], returns[-1]
+    ticker_of = {t: i for i, t in enumerate(tickers)}
+    offsets = np.arange(-args.pre, args.post + 1)
+
+    results = {}
+    for kind, per_day in (("sentiment", False), ("news", True)):
+        t_idx, d_idx, direction = event_arrays(events[kind], ticker_of, days, per_day)
+        ar = abnormal_returns(stock, market, t_idx, d_idx, args.pre, args.post, args.estimation, args.gap,
+                              args.model) if len(t_idx) else np.zeros((0, len(offsets)))
+        results[kind] = study(ar, direction, offsets)
+
+    snap = [r for r in events["snapshots"] if r[0] in ticker_of]
+    signal = daily_panel(days, np.array([ticker_of[r[0]] for r in snap], dtype=int),
+                         np.array([r[1] for r in snap], dtype="datetime64[D]"),
+                         np.array([float(r[2]) for r in snap]), len(tickers)) if snap else \
+        np.full(stock.shape, np.nan)
+    lags, per_ticker, pooled = lagged_xcorr(signal, stock, args.max_lag)
+
+    def rounded(a):
+        return [None if not np.isfinite(v) else round(float(v), 4) for v in a]
+
+    return {
+        "tickers": tickers,
+        "benchmark": benchmark,
+        "trading_days": len(days),
+        "model": args.model,
+        "events": results,
+        "cross_correlation": {
+            "lags": [int(k) for k in lags],
+            "pooled": rounded(pooled),
+            "tickers": {t: rounded(per_ticker[i]) for i, t in enumerate(tickers)},
+        },
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--prices", required=True, help="CSV (ticker,date,close) or JSON file, - for JSON on stdin")
+    p.add_argument("--tickers", help="Comma-separated tickers (default: every ticker in holdings)")
+    p.add_argument("--benchmark", default="SPY")
+    p.add_argument("--days", type=int, default=730, help="History to study")
+    p.add_argument("--pre", type=int, default=5)
+    p.add_argument("--post", type=int, default=10)
+    p.add_argument("--estimation", type=int, default=120, help="Market model estimation window (trading days)")
+    p.add_argument("--gap", type=int, default=10, help="Trading days between estimation and event windows")
+    p.add_argument("--model", choices=MODELS, default="market")
+    p.add_argument("--z-threshold", type=float, default=2.0, help="Sentiment shock |z-score|")
+    p.add_argument("--news-threshold", type=float, default=0.3, help="Minimum |sentiment_score| of news events")
+    p.add_argument("--max-lag", type=int, default=5)
+    args = p.parse_args()
+
+    try:
+        import psycopg2
+    except ImportError:
+        print(json.dumps({"status": "error", "message": "psycopg2 not installed"}))
+        sys.exit(1)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    start = time.perf_counter()
+    prices = load_prices(args.prices)
+    benchmark = args.benchmark.upper()
+    if not prices.get(benchmark):
+        print(json.dumps({"status": "error", "message": f"No prices for benchmark {benchmark}"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    if args.tickers:
+        tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    else:
+        cur.execute("SELECT DISTINCT ticker_symbol FROM holdings WHERE ticker_symbol IS NOT NULL ORDER BY 1")
+        tickers = [r[0] for r in cur.fetchall()]
+    events = load_events(cur, tickers, date.today() - timedelta(days=args.days),
+                         args.z_threshold, args.news_threshold)
+    cur.close()
+    conn.close()
+
+    result = run(prices, tickers, benchmark, events, args)
+    missing = sorted(set(tickers) - set(result["tickers"]))
+    print(json.dumps({"status": "ok", **result, "tickers_without_prices": missing,
+                      "seconds": round(time.perf_counter() - start, 3)}))
+
+
+if __name__ == "__main__":
+    main()
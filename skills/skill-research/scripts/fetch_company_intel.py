@@ -7,6 +7,7 @@ snapshots + alt data metrics into the database.
 
 Usage:
     python3 fetch_company_intel.py --ticker AAPL [--days 7]
+    python3 fetch_company_intel.py --ndjson < watchlist.ndjson
 
 Reads from:
     - GET /api/research/:ticker (aggregated data already fetched by skill)
@@ -14,8 +15,22 @@ Reads from:
 
 Writes to:
     - company_news table
-    - sentiment_snapshots table
-    - alt_data_metrics table
+    - sentiment_snapshots table (+ sentiment_daily_rollups, incrementally)
+    - alt_data_metrics table (every point of each alt data series, see alt_data_series.py)
+
+NDJSON mode reads one payload per line, each with a "ticker" key and the
+same fields as the single-ticker payload (optionally "snapshot_date").
+Rows are accumulated per table and flushed with COPY into temp staging
+tables followed by one set-based upsert per table, over one connection.
+Each flush is committed on its own: a batch the database rejects is rolled
+back and reported with its line range, and the run carries on with the
+next one.
+
+Syndicated copies of a story already stored (or seen earlier in the same
+run) are collapsed by near_duplicates.py: only the canonical row is
+inserted, the copies' fingerprints are appended to its
+syndicated_fingerprints, and sentiment_snapshots.article_count counts
+distinct stories rather than raw articles.
 """
 
 import os
@@ -24,6 +39,14 @@ import json
 import argparse
 from datetime import datetime, date, timezone
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "skill-data-ingestion", "scripts"))
+from pg_copy import copy_rows
+from sentiment_trends import update_rollups
+from news_fingerprint import fingerprint
+from near_duplicates import NearDuplicateIndex, article_text, collapse, load_recent
+from lexicon_sentiment import score_texts
+from alt_data_series import series_rows, upsert_sql
+
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor, execute_values
@@ -31,24 +54,113 @@ except ImportError:
     print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
     sys.exit(1)
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
-    sys.exit(1)
+FLUSH_ROWS = int(os.environ.get("INTEL_FLUSH_ROWS", "5000"))   # staged rows per COPY batch
 
-API_URL = os.environ.get("API_URL", "http://localhost:3001")
+NEWS_COLUMNS = ["ticker_symbol", "headline", "summary", "source", "url", "published_at", "sentiment_score",
+                "source_type", "fingerprint"]
+SENTIMENT_COLUMNS = ["ticker_symbol", "snapshot_date", "twitter_sentiment", "composite_score",
+                     "tweet_volume", "bull_tweets", "bear_tweets", "article_count"]
+ALT_COLUMNS = ["ticker_symbol", "metric_date", "metric_type", "metric_value", "metric_label", "metadata",
+               "granularity"]
 
 
 def parse_args():
     p = argparse.ArgumentParser()
-    p.add_argument("--ticker", required=True, help="Stock ticker symbol")
+    mode = p.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--ticker", help="Stock ticker symbol")
+    mode.add_argument("--ndjson", action="store_true", help="Read one payload per line from stdin (many tickers)")
     p.add_argument("--days", type=int, default=7, help="Days of news to fetch")
     p.add_argument("--data", type=str, help="JSON payload from skill (stdin alternative)")
     return p.parse_args()
 
 
-def upsert_sentiment(cur, ticker: str, score: float | None, tweet_vol: int, bull: int, bear: int, article_count: int):
-    today = date.today().isoformat()
+# ── Row builders (shared by single-ticker and NDJSON modes) ───────────────────
+
+def news_rows(ticker: str, articles: list[dict]) -> list[tuple]:
+    """company_news rows, one per distinct fingerprint; articles with neither URL nor headline are dropped.
+    Articles without a sentiment_score get the offline lexicon score."""
+    rows, seen = [], set()
+    for a in articles:
+        headline = a.get("headline", a.get("title", ""))[:500]
+        fp = fingerprint(a.get("url"), headline)
+        if fp is None or fp in seen:
+            continue
+        seen.add(fp)
+        rows.append((
+            ticker,
+            headline,
+            a.get("summary", ""),
+            a.get("source", ""),
+            a.get("url", ""),
+            a.get("datetime") and datetime.fromtimestamp(a["datetime"], tz=timezone.utc),
+            a.get("sentiment_score"),
+            a.get("source_type", "news"),
+            fp,
+        ))
+    unscored = [i for i, r in enumerate(rows) if r[6] is None]
+    if unscored:
+        scores = score_texts([article_text(rows[i][1], rows[i][2]) for i in unscored])
+        for i, score in zip(unscored, scores):
+            rows[i] = rows[i][:6] + (float(score),) + rows[i][7:]
+    return rows
+
+
+def sentiment_row(ticker: str, payload: dict, day: str, article_count: int) -> tuple | None:
+    sentiment_data = payload.get("twitter_sentiment", {})
+    if not sentiment_data:
+        return None
+    score = sentiment_data.get("sentiment_score")
+    bull, bear = sentiment_data.get("bull_tweets", 0), sentiment_data.get("bear_tweets", 0)
+    return (ticker, day, score, score, bull + bear, bull, bear, article_count)
+
+
+def alt_rows(ticker: str, payload: dict) -> list[tuple]:
+    """Every point of every alt data series in the payload (e.g. the whole Google Trends timeline)."""
+    rows = []
+    for metric_type, points in (payload.get("alt_data") or {}).items():
+        if isinstance(points, list):
+            rows.extend(series_rows(ticker, metric_type, points))
+    return rows
+
+
+def upsert_alt_rows(cur, rows: list[tuple]) -> int:
+    if not rows:
+        return 0
+    execute_values(cur, upsert_sql(f"(VALUES %s) AS s({', '.join(ALT_COLUMNS)}, seq)"),
+                   [(*row, seq) for seq, row in enumerate(rows)],
+                   template="(%s, %s::date, %s, %s::numeric, %s, %s::jsonb, %s, %s)", page_size=len(rows))
+    return cur.rowcount
+
+
+def collapse_news(cur, index: NearDuplicateIndex, ticker: str, rows: list[tuple]) -> tuple[list[tuple], dict, int]:
+    """news_rows() minus syndicated near-duplicates (see near_duplicates.collapse).
+    The kept rows are added to `index`, so call it only once the payload is known to be stored."""
+    if not index.has_ticker(ticker):
+        load_recent(cur, index, ticker)
+    return collapse(index, ticker, rows)
+
+
+def record_syndication(cur, syndicated: dict) -> int:
+    """Merges {(ticker, canonical fingerprint): [copy fingerprints]} into the canonical rows."""
+    if not syndicated:
+        return 0
+    execute_values(cur, """
+        UPDATE company_news n
+        SET syndicated_fingerprints = m.merged,
+            syndicated_count = cardinality(m.merged)
+        FROM (
+          SELECT c.id, ARRAY(SELECT DISTINCT unnest(c.syndicated_fingerprints || b.copies)) AS merged
+          FROM (VALUES %s) AS b(ticker_symbol, fingerprint, copies)
+          JOIN company_news c ON c.ticker_symbol = b.ticker_symbol AND c.fingerprint = b.fingerprint
+        ) m
+        WHERE n.id = m.id
+    """, [(t, fp, copies) for (t, fp), copies in syndicated.items()], template="(%s, %s, %s::text[])")
+    return sum(len(copies) for copies in syndicated.values())
+
+
+# ── Single-ticker mode ─────────────────────────────────────────────────────────
+
+def upsert_sentiment(cur, row: tuple):
     cur.execute("""
         INSERT INTO sentiment_snapshots
           (ticker_symbol, snapshot_date, twitter_sentiment, composite_score,
@@ -61,92 +173,231 @@ def upsert_sentiment(cur, ticker: str, score: float | None, tweet_vol: int, bull
           bull_tweets = EXCLUDED.bull_tweets,
           bear_tweets = EXCLUDED.bear_tweets,
           article_count = EXCLUDED.article_count
-    """, (ticker, today, score, score, tweet_vol, bull, bear, article_count))
+    """, row)
 
 
-def insert_news_articles(cur, ticker: str, articles: list[dict]):
-    if not articles:
+def insert_news_articles(cur, rows: list[tuple]):
+    if not rows:
         return 0
-    rows = []
-    for a in articles:
-        rows.append((
-            ticker,
-            a.get("headline", a.get("title", ""))[:500],
-            a.get("summary", ""),
-            a.get("source", ""),
-            a.get("url", ""),
-            a.get("datetime") and datetime.fromtimestamp(a["datetime"], tz=timezone.utc),
-            a.get("sentiment_score"),
-            a.get("source_type", "news"),
-        ))
-    execute_values(cur, """
+    inserted = execute_values(cur, """
         INSERT INTO company_news
-          (ticker_symbol, headline, summary, source, url, published_at, sentiment_score, source_type)
+          (ticker_symbol, headline, summary, source, url, published_at, sentiment_score, source_type, fingerprint)
         VALUES %s
-        ON CONFLICT DO NOTHING
-    """, rows)
-    return len(rows)
+        ON CONFLICT (ticker_symbol, fingerprint) DO NOTHING
+        RETURNING 1
+    """, rows, fetch=True)
+    return len(inserted)
 
 
-def main():
-    args = parse_args()
-    ticker = args.ticker.upper()
-
-    # Accept pre-fetched data via --data flag (passed by the skill after MCP calls)
-    payload: dict = {}
-    if args.data:
-        payload = json.loads(args.data)
-    elif not sys.stdin.isatty():
-        payload = json.load(sys.stdin)
+def run_single(cur, ticker: str, payload: dict) -> dict:
+    """Raises ValueError/KeyError/TypeError/AttributeError on a malformed payload, before writing anything."""
+    today = date.today().isoformat()
+    news = news_rows(ticker, payload.get("news", []))
+    row = sentiment_row(ticker, payload, today, 0)
+    alt = alt_rows(ticker, payload)
 
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    rows, syndicated, stories = collapse_news(cur, NearDuplicateIndex(), ticker, news)
+    articles_inserted = insert_news_articles(cur, rows)
+    syndicated_copies = record_syndication(cur, {(ticker, fp): copies for fp, copies in syndicated.items()})
 
-    articles_inserted = 0
     sentiment_updated = False
+    if row:
+        upsert_sentiment(cur, row[:-1] + (stories,))            # article_count
+        update_rollups(cur, ticker, since=date.today())
+        sentiment_updated = True
 
-    # Persist news articles if provided
-    news = payload.get("news", [])
-    if news:
-        articles_inserted = insert_news_articles(cur, ticker, news)
+    alt_metrics_upserted = upsert_alt_rows(cur, alt)
 
-    # Persist Twitter sentiment if provided
-    sentiment_data = payload.get("twitter_sentiment", {})
-    if sentiment_data:
-        upsert_sentiment(
-            cur, ticker,
-            score=sentiment_data.get("sentiment_score"),
-            tweet_vol=sentiment_data.get("bull_tweets", 0) + sentiment_data.get("bear_tweets", 0),
-            bull=sentiment_data.get("bull_tweets", 0),
-            bear=sentiment_data.get("bear_tweets", 0),
-            article_count=len(news),
-        )
-        sentiment_updated = True
+    return {"ticker": ticker, "articles_inserted": articles_inserted,
+            "syndicated_copies_collapsed": syndicated_copies, "sentiment_updated": sentiment_updated,
+            "alt_metrics_upserted": alt_metrics_upserted}
+
+
+# ── NDJSON bulk mode ───────────────────────────────────────────────────────────
+
+def create_staging(cur):
+    cur.execute("""
+        CREATE TEMP TABLE stage_company_news (
+          ticker_symbol VARCHAR(20), headline TEXT, summary TEXT, source VARCHAR(100), url TEXT,
+          published_at TIMESTAMPTZ, sentiment_score NUMERIC(4,3), source_type VARCHAR(20),
+          fingerprint VARCHAR(34), seq INTEGER
+        ) ON COMMIT DELETE ROWS;
+        CREATE TEMP TABLE stage_sentiment_snapshots (
+          ticker_symbol VARCHAR(20), snapshot_date DATE, twitter_sentiment NUMERIC(4,3),
+          composite_score NUMERIC(4,3), tweet_volume INTEGER, bull_tweets INTEGER,
+          bear_tweets INTEGER, article_count INTEGER, seq INTEGER
+        ) ON COMMIT DELETE ROWS;
+        CREATE TEMP TABLE stage_alt_data_metrics (
+          ticker_symbol VARCHAR(20), metric_date DATE, metric_type VARCHAR(50),
+          metric_value NUMERIC(12,2), metric_label VARCHAR(100), metadata JSONB, granularity VARCHAR(5),
+          seq INTEGER
+        ) ON COMMIT DELETE ROWS;
+    """)
 
-    # Persist alt data if provided
-    alt_data = payload.get("alt_data", {})
-    if alt_data.get("google_trends"):
-        trend_val = alt_data["google_trends"][-1]["value"] if alt_data["google_trends"] else None
-        if trend_val is not None:
-            cur.execute("""
-                INSERT INTO alt_data_metrics
-                  (ticker_symbol, metric_date, metric_type, metric_value, metric_label, metadata)
-                VALUES (%s, %s, 'google_trends', %s, %s, %s)
-                ON CONFLICT (ticker_symbol, metric_date, metric_type) DO UPDATE SET
-                  metric_value = EXCLUDED.metric_value,
-                  metric_label = EXCLUDED.metric_label
-            """, (ticker, date.today().isoformat(), trend_val, f"Google Trends {trend_val}/100", json.dumps(alt_data["google_trends"][-5:])))
 
+def flush(cur, buffers: dict) -> dict:
+    """COPYs buffered rows into staging and upserts them set-based; returns the
+    batch's counts. Staging is emptied by the caller's commit."""
+    counts = {"articles_inserted": 0, "syndicated_copies_collapsed": 0, "snapshots_upserted": 0,
+              "alt_metrics_upserted": 0}
+    if buffers["news"]:
+        copy_rows(cur, "stage_company_news", NEWS_COLUMNS, buffers["news"])
+        cur.execute("""
+            INSERT INTO company_news
+              (ticker_symbol, headline, summary, source, url, published_at, sentiment_score, source_type, fingerprint)
+            SELECT DISTINCT ON (ticker_symbol, fingerprint)
+                   ticker_symbol, headline, summary, source, url, published_at, sentiment_score, source_type, fingerprint
+            FROM stage_company_news
+            ORDER BY ticker_symbol, fingerprint, seq
+            ON CONFLICT (ticker_symbol, fingerprint) DO NOTHING
+        """)
+        counts["articles_inserted"] = cur.rowcount
+    counts["syndicated_copies_collapsed"] = record_syndication(cur, buffers["syndicated"])
+
+    if buffers["sentiment"]:
+        copy_rows(cur, "stage_sentiment_snapshots", SENTIMENT_COLUMNS, buffers["sentiment"])
+        # A ticker/day may appear on several lines: the last one wins
+        cur.execute("""
+            INSERT INTO sentiment_snapshots
+              (ticker_symbol, snapshot_date, twitter_sentiment, composite_score,
+               tweet_volume, bull_tweets, bear_tweets, article_count)
+            SELECT DISTINCT ON (ticker_symbol, snapshot_date)
+                   ticker_symbol, snapshot_date, twitter_sentiment, composite_score,
+                   tweet_volume, bull_tweets, bear_tweets, article_count
+            FROM stage_sentiment_snapshots
+            ORDER BY ticker_symbol, snapshot_date, seq DESC
+            ON CONFLICT (ticker_symbol, snapshot_date) DO UPDATE SET
+              twitter_sentiment = EXCLUDED.twitter_sentiment,
+              composite_score = EXCLUDED.composite_score,
+              tweet_volume = EXCLUDED.tweet_volume,
+              bull_tweets = EXCLUDED.bull_tweets,
+              bear_tweets = EXCLUDED.bear_tweets,
+              article_count = EXCLUDED.article_count
+        """)
+        counts["snapshots_upserted"] = cur.rowcount
+
+    if buffers["alt"]:
+        copy_rows(cur, "stage_alt_data_metrics", ALT_COLUMNS, buffers["alt"])
+        cur.execute(upsert_sql("stage_alt_data_metrics s"))
+        counts["alt_metrics_upserted"] = cur.rowcount
+    return counts
+
+
+def run_ndjson(cur, lines) -> dict:
+    """Ingests NDJSON payloads, committing after every flush of FLUSH_ROWS rows."""
+    conn = cur.connection
+    create_staging(cur)
+    conn.commit()
+    buffers = {"news": [], "sentiment": [], "alt": [], "syndicated": {}}
+    counts = {"payloads": 0, "articles_inserted": 0, "syndicated_copies_collapsed": 0,
+              "snapshots_upserted": 0, "alt_metrics_upserted": 0}
+    index = NearDuplicateIndex()
+    rollup_since: dict[str, date] = {}
+    tickers: set[str] = set()
+    errors = []
+    batch = {"first": None, "last": None, "payloads": 0, "tickers": set(), "rollups": {}}
+
+    def commit_batch():
+        nonlocal index
+        try:
+            written = flush(cur, buffers)
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            errors.append({"lines": [batch["first"], batch["last"]], "message": str(e).strip()})
+            index = NearDuplicateIndex()          # it holds fingerprints that were never stored
+        else:
+            counts["payloads"] += batch["payloads"]
+            for key, n in written.items():
+                counts[key] += n
+            tickers.update(batch["tickers"])
+            for ticker, day in batch["rollups"].items():
+                rollup_since[ticker] = min(day, rollup_since.get(ticker, day))
+        for rows in buffers.values():
+            rows.clear()
+        batch.update(first=None, last=None, payloads=0, tickers=set(), rollups={})
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+            ticker = payload["ticker"].upper()
+            day = date.fromisoformat(payload.get("snapshot_date") or date.today().isoformat())
+            news = news_rows(ticker, payload.get("news", []))
+            sentiment = sentiment_row(ticker, payload, day.isoformat(), 0)
+            alt = alt_rows(ticker, payload)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            errors.append({"line": line_no, "message": str(e)})
+            continue
+
+        # Only a payload that parsed completely may add its articles to the shared index
+        news, syndicated, stories = collapse_news(cur, index, ticker, news)
+        if sentiment:
+            sentiment = sentiment[:-1] + (stories,)             # article_count
+
+        batch["first"] = batch["first"] or line_no
+        batch["last"] = line_no
+        batch["payloads"] += 1
+        batch["tickers"].add(ticker)
+        buffers["news"].extend(news)
+        buffers["alt"].extend(alt)
+        for fp, copies in syndicated.items():
+            buffers["syndicated"].setdefault((ticker, fp), []).extend(copies)
+        if sentiment:
+            buffers["sentiment"].append(sentiment)
+            batch["rollups"][ticker] = min(day, batch["rollups"].get(ticker, day))
+        if sum(len(rows) for rows in buffers.values()) >= FLUSH_ROWS:
+            commit_batch()
+
+    if batch["payloads"]:
+        commit_batch()
+    counts["rollup_rows_written"] = sum(update_rollups(cur, t, since=d) for t, d in rollup_since.items())
+    return {"mode": "ndjson", "tickers": len(tickers), **counts, "errors": errors}
+
+
+def main():
+    args = parse_args()
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    if args.ndjson:
+        conn = psycopg2.connect(database_url)
+        cur = conn.cursor()
+        result = run_ndjson(cur, sys.stdin)
+        conn.commit()
+        cur.close()
+        conn.close()
+        failed = any("lines" in e for e in result["errors"])
+        print(json.dumps({"status": "partial" if failed else "ok", **result}))
+        return
+
+    # Accept pre-fetched data via --data flag (passed by the skill after MCP calls)
+    payload: dict = {}
+    try:
+        if args.data:
+            payload = json.loads(args.data)
+        elif not sys.stdin.isatty():
+            payload = json.load(sys.stdin)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": f"Invalid JSON payload: {e}"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        result = run_single(cur, args.ticker.upper(), payload)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        conn.close()
+        print(json.dumps({"status": "error", "message": f"Invalid payload: {e}"}))
+        sys.exit(1)
     conn.commit()
     cur.close()
     conn.close()
 
-    print(json.dumps({
-        "status": "ok",
-        "ticker": ticker,
-        "articles_inserted": articles_inserted,
-        "sentiment_updated": sentiment_updated,
-    }))
+    print(json.dumps({"status": "ok", **result}))
 
 
 if __name__ == "__main__":
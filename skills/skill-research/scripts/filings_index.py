@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+filings_index.py
+
+Local, offline full-text index of SEC filings for held tickers, so research
+questions ("which of my companies mentioned tariffs in their last 10-Q?")
+are answered in milliseconds without calling mcp-sec.
+
+Storage is one SQLite file (FILINGS_INDEX_PATH):
+    filings       one row per filing: ticker, form, filed, accession, source
+                  URL and the document's plain text, zlib-compressed
+    filings_fts   contentless FTS5 index (porter stemming, full positions for
+                  phrase and NEAR queries) keyed by filings.id; the text is
+                  stored once, compressed, and only the index is kept by FTS5
+
+`build` reads filing metadata synced by sync_news.py from
+company_intelligence.sec_filings for tickers in holdings, downloads the
+primary documents that are not indexed yet (SEC rate limit and in-flight cap
+shared with sync_news.py), strips HTML and indexes them. `search` takes an
+FTS5 query — keywords, "quoted phrases", AND/OR/NOT, NEAR(...) — ranks hits
+with BM25 and returns a snippet per hit; it needs no database or network.
+
+Usage:
+    python3 filings_index.py build [--forms 10-Q,10-K,8-K] [--since 2025-01-01] [--max-in-flight 4]
+    python3 filings_index.py search "tariffs" [--form 10-Q] [--latest] [--tickers AAPL,MSFT] [--limit 20]
+    python3 filings_index.py stats
+
+Output: JSON to stdout
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import argparse
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+
+FILINGS_INDEX_PATH = os.environ.get("FILINGS_INDEX_PATH", "./data/sec_filings.sqlite")
+SEC_ARCHIVES_URL = os.environ.get("SEC_ARCHIVES_URL", "https://www.sec.gov/Archives/edgar/data")
+DEFAULT_FORMS = ["10-Q", "10-K", "8-K"]
+COMPRESSION_LEVEL = 6
+COMMIT_EVERY = 50                       # documents per SQLite transaction while building
+SNIPPET_CHARS = 160
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+  id INTEGER PRIMARY KEY,
+  ticker TEXT NOT NULL,
+  cik TEXT,
+  form TEXT NOT NULL,
+  filed TEXT NOT NULL,
+  accession TEXT NOT NULL UNIQUE,
+  url TEXT,
+  text_bytes INTEGER NOT NULL,
+  body BLOB NOT NULL,
+  indexed_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE INDEX IF NOT EXISTS idx_filings_ticker_form_filed ON filings(ticker, form, filed DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS filings_fts USING fts5(
+  body, content='', tokenize='porter unicode61', detail=full
+);
+"""
+
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "head", "title", "ix:header"}
+    BLOCK = {"p", "div", "br", "tr", "li", "table", "h1", "h2", "h3", "h4", "h5", "h6", "section"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+        elif tag == "td":
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML / inline-XBRL filing, one paragraph per line."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = re.sub(r"[ \t\r\f\v\xa0]+", " ", "".join(parser.parts))
+    return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+
+def document_url(cik: str, accession: str, primary_doc: str, base_url: str = SEC_ARCHIVES_URL) -> str:
+    return f"{base_url}/{int(cik)}/{accession.replace('-', '')}/{primary_doc}"
+
+
+class FilingsIndex:
+    def __init__(self, path: str = FILINGS_INDEX_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Written from the build's writer thread only, read from the main thread otherwise
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def accessions(self) -> set[str]:
+        return {r[0] for r in self.conn.execute("SELECT accession FROM filings")}
+
+    def add(self, filing: dict, document: str) -> int:
+        """Indexes one filing's document (HTML unless the name ends in .txt); returns its text size."""
+        is_text = (filing.get("primary_doc") or "").lower().endswith(".txt")
+        text = document if is_text else html_to_text(document)
+        raw = text.encode("utf-8")
+        cur = self.conn.execute("""
+            INSERT INTO filings (ticker, cik, form, filed, accession, url, text_bytes, body)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (accession) DO NOTHING
+        """, (filing["ticker"], filing.get("cik"), filing["form"], filing["filed"], filing["accession"],
+              filing.get("url"), len(raw), zlib.compress(raw, COMPRESSION_LEVEL)))
+        if cur.rowcount:
+            self.conn.execute("INSERT INTO filings_fts (rowid, body) VALUES (?, ?)", (cur.lastrowid, text))
+        return len(raw)
+
+    def commit(self):
+        self.conn.commit()
+
+    def optimize(self):
+        """Merges FTS5 index segments; run after a large build."""
+        self.conn.execute("INSERT INTO filings_fts (filings_fts) VALUES ('optimize')")
+        self.conn.commit()
+
+    def text(self, filing_id: int) -> str:
+        row = self.conn.execute("SELECT body FROM filings WHERE id = ?", (filing_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else ""
+
+    def search(self, query: str, tickers: list[str] | None = None, forms: list[str] | None = None,
+               latest: bool = False, limit: int = 20) -> list[dict]:
+        """BM25-ranked filings matching an FTS5 query; `latest` keeps only each
+        ticker's most recent filing of each form."""
+        filters, params = [], [query]
+        if tickers:
+            filters.append(f"f.ticker IN ({','.join('?' * len(tickers))})")
+            params += tickers
+        if forms:
+            filters.append(f"f.form IN ({','.join('?' * len(forms))})")
+            params += forms
+        if latest:
+            filters.append("""f.id IN (
+                SELECT id FROM (
+                  SELECT id, ROW_NUMBER() OVER (PARTITION BY ticker, form ORDER BY filed DESC, accession DESC) AS rn
+                  FROM filings
+                ) WHERE rn = 1)""")
+        rows = self.conn.execute(f"""
+            WITH hits AS (
+              SELECT rowid AS id, bm25(filings_fts) AS rank FROM filings_fts WHERE filings_fts MATCH ?
+            )
+            SELECT f.id, f.ticker, f.form, f.filed, f.accession, f.url, h.rank
+            FROM hits h
+            JOIN filings f ON f.id = h.id
+            {"WHERE " + " AND ".join(filters) if filters else ""}
+            ORDER BY h.rank
+            LIMIT ?
+        """, params + [limit]).fetchall()
+        return [{
+            "ticker": ticker, "form": form, "filed": filed, "accession": accession, "url": url,
+            "score": round(-rank, 3), "snippet": snippet(self.text(filing_id), query),
+        } for filing_id, ticker, form, filed, accession, url, rank in rows]
+
+    def stats(self) -> dict:
+        count, text_bytes, stored = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(text_bytes), 0), COALESCE(SUM(LENGTH(body)), 0) FROM filings").fetchone()
+        tickers = self.conn.execute("SELECT COUNT(DISTINCT ticker) FROM filings").fetchone()[0]
+        return {"filings": count, "tickers": tickers, "text_bytes": text_bytes, "stored_bytes": stored,
+                "compression_ratio": round(text_bytes / stored, 2) if stored else None}
+
+
+_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
+
+
+def snippet(text: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """Text around the first phrase or keyword of `query` found in `text`."""
+    lowered = text.lower()
+    needles = [p.lower() for p in re.findall(r'"([^"]+)"', query)]
+    needles += [w.lower() for w in re.findall(r"[A-Za-z0-9]+", query) if w.upper() not in _OPERATORS]
+    # Porter stemming matches inflections the literal term may not; fall back to the stem-ish prefix
+    needles += [n[:5] for n in needles if len(n) > 5]
+    for needle in needles:
+        at = lowered.find(needle)
+        if at >= 0:
+            start = max(0, at - width // 2)
+            end = min(len(text), at + len(needle) + width // 2)
+            return ("…" if start else "") + text[start:end].replace("\n", " ") + ("…" if end < len(text) else "")
+    return text[:width].replace("\n", " ")
+
+
+# ── Build ──────────────────────────────────────────────────────────────────────
+
+def held_filings(cur, forms: list[str], since: str | None) -> list[dict]:
+    """Filing metadata for tickers in holdings: company_intelligence.sec_filings
+    plus entries moved to the archive by company_intel_archive.py."""
+    from company_intel_archive import merge, read_archive
+
+    cur.execute("""
+        SELECT h.ticker_symbol, COALESCE(ci.sec_filings, '[]'::jsonb)
+        FROM (SELECT DISTINCT ticker_symbol FROM holdings WHERE ticker_symbol IS NOT NULL) h
+        LEFT JOIN company_intelligence ci ON ci.ticker_symbol = h.ticker_symbol
+    """)
+    return [
+        {**f, "ticker": ticker}
+        for ticker, live in cur.fetchall()
+        for f in merge(live, read_archive(ticker, "sec_filings"), since)
+        if f.get("form") in forms and f.get("accession") and f.get("primary_doc")
+    ]
+
+
+async def download(index: FilingsIndex, todo: list[dict], max_in_flight: int) -> dict:
+    from sync_news import Fetcher, Provider, fetch_cik_map, SEC_RATE_PER_SEC, SEC_USER_AGENT
+
+    sec = Provider("sec", SEC_RATE_PER_SEC, burst=SEC_RATE_PER_SEC, pool_size=max_in_flight,
+                   headers={"User-Agent": SEC_USER_AGENT})
+    fetcher = Fetcher(max_in_flight)
+    writer = ThreadPoolExecutor(1, thread_name_prefix="filings-index")
+    loop = asyncio.get_running_loop()
+    counts = {"indexed": 0, "text_bytes": 0}
+    errors: list[dict] = []
+
+    if any(not f.get("cik") for f in todo):
+        ciks = await fetch_cik_map(fetcher, sec)
+        for f in todo:
+            f["cik"] = f.get("cik") or ciks.get(f["ticker"])
+
+    def store(filing: dict, document: str):
+        counts["text_bytes"] += index.add(filing, document)
+        counts["indexed"] += 1
+        if counts["indexed"] % COMMIT_EVERY == 0:
+            index.commit()
+
+    async def one(filing: dict):
+        if not filing.get("cik"):
+            errors.append({"accession": filing["accession"], "ticker": filing["ticker"], "message": "CIK not found"})
+            return
+        filing["url"] = document_url(filing["cik"], filing["accession"], filing["primary_doc"])
+        try:
+            document = await fetcher.get_text(sec, filing["url"])
+        except Exception as e:
+            errors.append({"accession": filing["accession"], "ticker": filing["ticker"], "message": str(e)})
+            return
+        await loop.run_in_executor(writer, store, filing, document)
+
+    try:
+        await asyncio.gather(*(one(f) for f in todo))
+    finally:
+        fetcher.close()
+        await loop.run_in_executor(writer, index.commit)
+        writer.shutdown(wait=True)
+    return {**counts, "requests": sec.stats, "errors": errors}
+
+
+def run_build(args) -> dict:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "skill-data-ingestion", "scripts"))
+    try:
+        import psycopg2
+    except ImportError:
+        print(json.dumps({"status": "error", "message": "psycopg2 not installed"}))
+        sys.exit(1)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    filings = held_filings(cur, [f.strip() for f in args.forms.split(",")], args.since)
+    cur.close()
+    conn.close()
+
+    index = FilingsIndex(args.index)
+    known = index.accessions()
+    todo = list({f["accession"]: f for f in filings if f["accession"] not in known}.values())
+    start = time.perf_counter()
+    result = asyncio.run(download(index, todo, args.max_in_flight))
+    if result["indexed"]:
+        index.optimize()
+    stats = index.stats()
+    index.close()
+    return {"status": "ok" if not result["errors"] else "partial", "candidates": len(filings),
+            "already_indexed": len(filings) - len(todo), **result, "index": stats,
+            "seconds": round(time.perf_counter() - start, 2)}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--index", default=FILINGS_INDEX_PATH, help="SQLite index file")
+    sub = p.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Download and index filings of held tickers")
+    build.add_argument("--forms", default=",".join(DEFAULT_FORMS))
+    build.add_argument("--since", help="Only filings filed on or after YYYY-MM-DD")
+    build.add_argument("--max-in-flight", type=int, default=4)
+    search = sub.add_parser("search", help="Ranked full-text search")
+    search.add_argument("query", help='FTS5 query, e.g. tariffs, "supply chain", tariff* NOT china')
+    search.add_argument("--tickers", help="Comma-separated tickers")
+    search.add_argument("--form", help="Comma-separated forms, e.g. 10-Q")
+    search.add_argument("--latest", action="store_true", help="Only each ticker's latest filing per form")
+    search.add_argument("--limit", type=int, default=20)
+    sub.add_parser("stats", help="Index size and compression")
+    args = p.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(run_build(args)))
+        return
+
+    index = FilingsIndex(args.index)
+    if args.command == "stats":
+        print(json.dumps({"status": "ok", **index.stats()}))
+        return
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",")] if args.tickers else None
+    forms = [f.strip().upper() for f in args.form.split(",")] if args.form else None
+    start = time.perf_counter()
+    try:
+        results = index.search(args.query, tickers, forms, args.latest, args.limit)
+    except sqlite3.OperationalError as e:
+        print(json.dumps({"status": "error", "message": f"Invalid search query: {e}"}))
+        sys.exit(1)
+    print(json.dumps({
+        "status": "ok",
+        "query": args.query,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        "tickers": list(dict.fromkeys(r["ticker"] for r in results)),
+        "results": results,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+lexicon_sentiment.py
+
+Offline finance-lexicon sentiment for news headlines and summaries, on the
+same -1.0..1.0 scale as company_news.sentiment_score. No network, no model.
+
+Each text is lowercased and split into word tokens. A LEXICON word's
+valence is
+  - scaled by the intensifier directly before it ("sharply lower"),
+  - flipped and damped by NEGATION_SCALE when a negator occurs within the
+    NEGATION_WINDOW tokens before it ("did not beat", "no longer profitable"),
+then the valences of a text are summed and squashed with s / sqrt(s^2 + ALPHA)
+(as in VADER), so one strong word lands around +/-0.6.
+
+score_texts() tokenizes a whole batch in one pass and does the window
+lookups and per-text sums as NumPy operations over the flattened tokens;
+score_text() is the plain per-text version used to check it.
+"""
+
+import sys
+import json
+import math
+from itertools import repeat
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "numpy not installed. Run: pip install numpy"}))
+    sys.exit(1)
+
+NEGATION_WINDOW = 3
+NEGATION_SCALE = -0.75
+ALPHA = 15.0
+
+LEXICON = {
+    # strongly positive
+    "surge": 3, "surges": 3, "surged": 3, "soar": 3, "soars": 3, "soared": 3, "skyrocket": 3,
+    "skyrockets": 3, "record": 2, "blowout": 3, "upgrade": 2.5, "upgrades": 2.5, "upgraded": 2.5,
+    "outperform": 2.5, "outperforms": 2.5, "outperformed": 2.5, "beat": 2, "beats": 2, "topped": 2,
+    "tops": 2, "exceeds": 2, "exceeded": 2, "breakthrough": 2.5, "rally": 2, "rallies": 2, "rallied": 2,
+    # positive
+    "gain": 1.5, "gains": 1.5, "gained": 1.5, "rise": 1.5, "rises": 1.5, "rose": 1.5, "jump": 2,
+    "jumps": 2, "jumped": 2, "climb": 1.5, "climbs": 1.5, "climbed": 1.5, "growth": 1.5, "grow": 1.5,
+    "grows": 1.5, "grew": 1.5, "profit": 1.5, "profits": 1.5, "profitable": 1.5, "profitability": 1.5,
+    "strong": 1.5, "stronger": 1.5, "strength": 1.5, "robust": 1.5, "bullish": 2, "buy": 1,
+    "boost": 1.5, "boosts": 1.5, "boosted": 1.5, "expand": 1, "expands": 1, "expansion": 1,
+    "improve": 1.5, "improves": 1.5, "improved": 1.5, "improvement": 1.5, "recover": 1.5,
+    "recovers": 1.5, "recovery": 1.5, "rebound": 1.5, "rebounds": 1.5, "raise": 1, "raises": 1,
+    "raised": 1, "dividend": 0.5, "buyback": 1, "approval": 1.5, "approved": 1.5, "approves": 1.5,
+    "win": 1.5, "wins": 1.5, "won": 1.5, "optimistic": 1.5, "optimism": 1.5, "upbeat": 1.5,
+    "positive": 1, "higher": 1, "upside": 1.5, "momentum": 1, "partnership": 1, "launch": 0.5,
+    "launches": 0.5, "innovative": 1, "resilient": 1, "accelerate": 1, "accelerates": 1,
+    "exceed": 2, "success": 1.5, "successful": 1.5, "favorable": 1.5, "opportunity": 1,
+    # negative
+    "fall": -1.5, "falls": -1.5, "fell": -1.5, "drop": -1.5, "drops": -1.5, "dropped": -1.5,
+    "decline": -1.5, "declines": -1.5, "declined": -1.5, "slip": -1, "slips": -1, "slipped": -1,
+    "lower": -1, "loss": -1.5, "losses": -1.5, "lose": -1.5, "loses": -1.5, "lost": -1.5,
+    "weak": -1.5, "weaker": -1.5, "weakness": -1.5, "miss": -2, "misses": -2, "missed": -2,
+    "cut": -1.5, "cuts": -1.5, "downgrade": -2.5, "downgrades": -2.5, "downgraded": -2.5,
+    "bearish": -2, "sell": -1, "underperform": -2, "underperforms": -2, "concern": -1,
+    "concerns": -1, "worry": -1.5, "worries": -1.5, "risk": -1, "risks": -1, "risky": -1,
+    "slowdown": -1.5, "slow": -1, "slows": -1, "slowing": -1, "delay": -1, "delays": -1,
+    "delayed": -1, "headwind": -1.5, "headwinds": -1.5, "pressure": -1, "volatile": -1,
+    "volatility": -1, "uncertain": -1, "uncertainty": -1, "negative": -1, "pessimistic": -1.5,
+    "warning": -1.5, "warns": -1.5, "warned": -1.5, "layoffs": -1.5, "layoff": -1.5,
+    "shortfall": -2, "disappointing": -2, "disappoints": -2, "disappointed": -2, "lawsuit": -1.5,
+    "sued": -1.5, "probe": -1.5, "investigation": -1.5, "recall": -1.5, "recalls": -1.5,
+    "debt": -0.5, "dilution": -1.5, "downside": -1.5, "unprofitable": -1.5, "struggle": -1.5,
+    "struggles": -1.5, "struggling": -1.5, "tumble": -2, "tumbles": -2, "tumbled": -2,
+    # strongly negative
+    "plunge": -3, "plunges": -3, "plunged": -3, "crash": -3, "crashes": -3, "crashed": -3,
+    "collapse": -3, "collapses": -3, "collapsed": -3, "plummet": -3, "plummets": -3,
+    "plummeted": -3, "sink": -2, "sinks": -2, "sank": -2, "bankruptcy": -3, "bankrupt": -3,
+    "default": -2.5, "defaults": -2.5, "fraud": -3, "scandal": -2.5, "selloff": -2.5,
+    "slump": -2, "slumps": -2, "slumped": -2, "halt": -2, "halted": -2, "delisted": -3,
+    "restatement": -2.5, "impairment": -2, "writedown": -2, "insolvency": -3,
+}
+
+NEGATIONS = {"not", "no", "never", "without", "neither", "nor", "cannot", "isnt", "wasnt",
+             "arent", "dont", "doesnt", "didnt", "wont", "cant", "fails", "failed", "fail"}
+
+INTENSIFIERS = {
+    "very": 1.3, "sharply": 1.5, "significantly": 1.4, "strongly": 1.4, "substantially": 1.4,
+    "dramatically": 1.6, "massive": 1.5, "huge": 1.5, "steep": 1.4, "steeply": 1.4, "deep": 1.3,
+    "deeply": 1.3, "extremely": 1.6, "record": 1.3, "biggest": 1.4, "major": 1.2, "heavy": 1.3,
+    "slightly": 0.5, "modest": 0.6, "modestly": 0.6, "marginally": 0.5, "somewhat": 0.7,
+    "mild": 0.6, "mildly": 0.6, "small": 0.7, "little": 0.7,
+}
+
+# Tokenizing is a byte translate + split: ASCII letters are lowercased, apostrophes
+# dropped ("didn't" -> "didnt") and every other byte except NUL becomes a space
+_BYTE_MAP = bytes(c + 32 if 65 <= c <= 90 else c if 97 <= c <= 122 or c == 0 else 32 for c in range(256))
+_SEPARATOR_TOKEN = b"\x00"                           # between texts in a batch; not whitespace
+
+# Every term gets an integer code; per-code lookup tables turn a batch of codes into arrays
+_TERMS = sorted(set(LEXICON) | NEGATIONS | set(INTENSIFIERS))
+_CODE = {t.encode(): i + 1 for i, t in enumerate(_TERMS)}     # 0: not a term
+_SEPARATOR = len(_TERMS) + 1
+_CODE[_SEPARATOR_TOKEN] = _SEPARATOR
+_VALENCE = np.array([0.0] + [float(LEXICON.get(t, 0.0)) for t in _TERMS] + [0.0])
+_NEGATES = np.array([False] + [t in NEGATIONS for t in _TERMS] + [False])
+_INTENSITY = np.array([1.0] + [float(INTENSIFIERS.get(t, 1.0)) for t in _TERMS] + [1.0])
+
+
+def _byte_tokens(text: str) -> list[bytes]:
+    return text.replace("\u2019", "'").encode("utf-8").translate(_BYTE_MAP, b"'").split()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return [t.decode() for t in _byte_tokens(text or "")]
+
+
+def squash(total: float) -> float:
+    return total / math.sqrt(total * total + ALPHA)
+
+
+def score_text(text: str | None) -> float:
+    """Reference per-text scorer; score_texts() must agree with it."""
+    tokens = tokenize(text)
+    total = 0.0
+    for i, token in enumerate(tokens):
+        valence = LEXICON.get(token)
+        if valence is None:
+            continue
+        if i > 0 and tokens[i - 1] in INTENSIFIERS:
+            valence *= INTENSIFIERS[tokens[i - 1]]
+        if any(t in NEGATIONS for t in tokens[max(0, i - NEGATION_WINDOW):i]):
+            valence *= NEGATION_SCALE
+        total += valence
+    return round(squash(total), 3)
+
+
+def score_texts(texts: list[str | None]):
+    """Scores for a batch of texts as a float64 array, rounded to 3 decimals.
+
+    The batch is tokenized in one pass over the joined texts; after the
+    token -> code lookup everything else is array arithmetic.
+    """
+    if not texts:
+        return np.zeros(0)
+    tokens = _byte_tokens(" \x00 ".join(text or "" for text in texts))
+    codes = np.fromiter(map(_CODE.get, tokens, repeat(0)), dtype=np.int32, count=len(tokens))
+    doc = np.cumsum(codes == _SEPARATOR)
+
+    valence = _VALENCE[codes]
+    # Intensifier directly before, within the same text (separators have intensity 1)
+    multiplier = np.ones(len(codes))
+    multiplier[1:] = _INTENSITY[codes[:-1]]
+
+    negates = _NEGATES[codes]
+    negated = np.zeros(len(codes), dtype=bool)
+    for k in range(1, NEGATION_WINDOW + 1):
+        negated[k:] |= negates[:-k] & (doc[:-k] == doc[k:])
+
+    contribution = valence * multiplier * np.where(negated, NEGATION_SCALE, 1.0)
+    totals = np.bincount(doc, weights=contribution, minlength=len(texts))
+    return np.round(totals / np.sqrt(totals * totals + ALPHA), 3)
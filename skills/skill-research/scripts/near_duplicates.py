@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+near_duplicates.py
+
+In-process MinHash/LSH index that spots syndicated copies of the same wire
+story (different URL, lightly edited headline) at ingest time.
+
+Each article's normalized headline + summary is cut into word 3-shingles,
+hashed with CRC32 and reduced to a NUM_PERM-value MinHash signature using
+multiply-shift hashing (one NumPy expression per article). Signatures are
+split into LSH_BANDS bands; articles sharing any band are candidates, and
+a candidate is a near-duplicate when the estimated Jaccard similarity is at
+least NEAR_DUP_THRESHOLD. Articles with no headline or summary text have no
+signature and are never matched or indexed.
+
+The index is bounded: per ticker it keeps at most NEAR_DUP_MAX_PER_TICKER
+entries from the last NEAR_DUP_WINDOW_HOURS, evicting the oldest first, so
+a lookup touches a handful of buckets no matter how large company_news grows.
+"""
+
+import os
+import sys
+import json
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from news_fingerprint import normalize_headline
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "numpy not installed. Run: pip install numpy"}))
+    sys.exit(1)
+
+NUM_PERM = 64
+LSH_BANDS = 16                      # 16 bands x 4 rows: candidates from ~0.5 Jaccard
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.6"))
+NEAR_DUP_WINDOW_HOURS = int(os.environ.get("NEAR_DUP_WINDOW_HOURS", "72"))
+NEAR_DUP_MAX_PER_TICKER = int(os.environ.get("NEAR_DUP_MAX_PER_TICKER", "2000"))
+SHINGLE_SIZE = 3
+
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)   # odd multipliers
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str) -> set[str]:
+    words = normalize_headline(text).split()
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str):
+    """NUM_PERM-value signature: min over shingles of the high 32 bits of a*h + b (mod 2^64);
+    None when the text has no words."""
+    tokens = shingles(text)
+    if not tokens:
+        return None
+    h = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+    return ((h[:, None] * _A + _B) >> np.uint64(32)).min(axis=0)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+    """Bounded per-ticker LSH index of recent articles, keyed by fingerprint."""
+
+    def __init__(self, window_hours: int = NEAR_DUP_WINDOW_HOURS, max_per_ticker: int = NEAR_DUP_MAX_PER_TICKER):
+        self.window = timedelta(hours=window_hours)
+        self.max_per_ticker = max_per_ticker
+        self.rows_per_band = NUM_PERM // LSH_BANDS
+        self._entries: dict[str, dict] = {}       # ticker -> {fingerprint: (signature, published_at, keys, copies)}
+        self._order: dict[str, deque] = {}        # ticker -> fingerprints, oldest first
+        self._buckets: dict[str, dict] = {}       # ticker -> {band key: set(fingerprints)}
+        self._copies: dict[str, dict] = {}        # ticker -> {syndicated copy fingerprint: canonical}
+
+    def has_ticker(self, ticker: str) -> bool:
+        return ticker in self._entries
+
+    def contains(self, ticker: str, fp: str) -> bool:
+        """True for indexed articles and for syndicated copies already attributed to one."""
+        return self.is_canonical(ticker, fp) or fp in self._copies.get(ticker, {})
+
+    def is_canonical(self, ticker: str, fp: str) -> bool:
+        return fp in self._entries.get(ticker, {})
+
+    def canonical_of(self, ticker: str, fp: str) -> str:
+        return fp if self.is_canonical(ticker, fp) else self._copies[ticker][fp]
+
+    def ensure_ticker(self, ticker: str):
+        self._entries.setdefault(ticker, {})
+        self._order.setdefault(ticker, deque())
+        self._buckets.setdefault(ticker, {})
+        self._copies.setdefault(ticker, {})
+
+    def _band_keys(self, sig) -> list[tuple]:
+        r = self.rows_per_band
+        return [(band, sig[band * r:(band + 1) * r].tobytes()) for band in range(LSH_BANDS)]
+
+    def add(self, ticker: str, fp: str, text: str, published_at: datetime | None, sig=None, copies=()):
+        self.ensure_ticker(ticker)
+        entries, order, buckets = self._entries[ticker], self._order[ticker], self._buckets[ticker]
+        if fp in entries:
+            return
+        sig = minhash(text) if sig is None else sig
+        if sig is None:
+            return
+        keys = self._band_keys(sig)
+        entries[fp] = (sig, published_at or datetime.now(timezone.utc), keys, set())
+        order.append(fp)
+        for copy in copies:
+            self.add_copy(ticker, fp, copy)
+        for key in keys:
+            buckets.setdefault(key, set()).add(fp)
+        while len(order) > self.max_per_ticker:
+            self._evict(ticker, order.popleft())
+
+    def add_copy(self, ticker: str, canonical: str, fp: str):
+        self._entries[ticker][canonical][3].add(fp)
+        self._copies[ticker][fp] = canonical
+
+    def _evict(self, ticker: str, fp: str):
+        _, _, keys, copies = self._entries[ticker].pop(fp)
+        for copy in copies:
+            self._copies[ticker].pop(copy, None)
+        buckets = self._buckets[ticker]
+        for key in keys:
+            members = buckets.get(key)
+            if members:
+                members.discard(fp)
+                if not members:
+                    del buckets[key]
+
+    def expire(self, ticker: str, now: datetime):
+        order = self._order.get(ticker)
+        while order and self._entries[ticker][order[0]][1] < now - self.window:
+            self._evict(ticker, order.popleft())
+
+    def match(self, ticker: str, text: str, published_at: datetime | None) -> tuple[str | None, object]:
+        """(fingerprint of the closest near-duplicate within the window or None, signature)."""
+        sig = minhash(text)
+        buckets = self._buckets.get(ticker)
+        if not buckets or sig is None:
+            return None, sig
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates |= buckets.get(key, set())
+        when = published_at or datetime.now(timezone.utc)
+        best, best_sim = None, NEAR_DUP_THRESHOLD
+        for fp in candidates:
+            other, other_when, _, _ = self._entries[ticker][fp]
+            if abs(other_when - when) > self.window:
+                continue
+            sim = similarity(sig, other)
+            if sim >= best_sim:
+                best, best_sim = fp, sim
+        return best, sig
+
+
+def article_text(headline: str | None, summary: str | None) -> str:
+    return f"{headline or ''} {summary or ''}"
+
+
+def load_recent(cur, index: NearDuplicateIndex, ticker: str):
+    """Seeds `index` with `ticker`'s canonical articles from the current window."""
+    cur = cur.connection.cursor()           # tuple rows whatever the caller's cursor_factory
+    cur.execute("""
+        SELECT fingerprint, headline, summary, published_at, syndicated_fingerprints
+        FROM company_news
+        WHERE ticker_symbol = %s AND fingerprint IS NOT NULL
+          AND COALESCE(published_at, created_at) >= NOW() - %s * INTERVAL '1 hour'
+        ORDER BY COALESCE(published_at, created_at) DESC
+        LIMIT %s
+    """, (ticker, int(index.window.total_seconds() // 3600), index.max_per_ticker))
+    rows = cur.fetchall()
+    cur.close()
+    index.ensure_ticker(ticker)             # loaded, even when there is nothing recent
+    for fp, headline, summary, published_at, copies in reversed(rows):
+        index.add(ticker, fp, article_text(headline, summary), published_at, copies=copies or ())
+
+
+def collapse(index: NearDuplicateIndex, ticker: str, rows: list[tuple]) -> tuple[list[tuple], dict, int]:
+    """Splits company_news rows (fetch_company_intel.NEWS_COLUMNS order) into
+    rows to insert, {canonical fingerprint: [new syndicated copy fingerprints]}
+    and the number of distinct stories among `rows`.
+
+    Rows are considered oldest first, so the earliest copy of a story is the
+    canonical one. A row whose fingerprint is already indexed is the same
+    article re-fetched and is passed through for ON CONFLICT to skip; a copy
+    already attributed to a canonical row is dropped without counting again.
+    """
+    keep, syndicated, stories = [], {}, set()
+    rows = sorted(rows, key=lambda r: r[5] or datetime.max.replace(tzinfo=timezone.utc))
+    for row in rows:
+        headline, summary, published_at, fp = row[1], row[2], row[5], row[8]
+        index.expire(ticker, published_at or datetime.now(timezone.utc))
+        if index.is_canonical(ticker, fp):
+            keep.append(row)
+            stories.add(fp)
+            continue
+        if index.contains(ticker, fp):
+            stories.add(index.canonical_of(ticker, fp))
+            continue
+        canonical, sig = index.match(ticker, article_text(headline, summary), published_at)
+        if canonical is not None:
+            index.add_copy(ticker, canonical, fp)
+            syndicated.setdefault(canonical, []).append(fp)
+            stories.add(canonical)
+            continue
+        index.add(ticker, fp, "", published_at, sig=sig)
+        keep.append(row)
+        stories.add(fp)
+    return keep, syndicated, len(stories)
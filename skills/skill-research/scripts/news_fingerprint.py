@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+news_fingerprint.py
+
+Normalized identity for company_news rows, backing the unique index
+(ticker_symbol, fingerprint):
+
+    u:<hash>  canonical URL — lowercase scheme/host, no "www.", no fragment,
+              tracking parameters (utm_*, fbclid, gclid, ...) dropped, the
+              remaining query parameters sorted, trailing slash removed
+    h:<hash>  normalized headline (NFKC, casefolded, punctuation and
+              whitespace collapsed) when there is no usable URL
+
+Every writer of company_news computes fingerprints here so the values agree.
+"""
+
+import re
+import hashlib
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "cmpid", "ncid", "ref", "src", "guccounter"}
+_PUNCT = re.compile(r"[^\w\s]+")
+_SPACE = re.compile(r"\s+")
+
+
+def canonical_url(url: str | None) -> str | None:
+    """Canonical form of an http(s) URL, or None when it is missing or unusable."""
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS)
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def normalize_headline(headline: str | None) -> str:
+    text = unicodedata.normalize("NFKC", headline or "").casefold()
+    return _SPACE.sub(" ", _PUNCT.sub(" ", text)).strip()
+
+
+def fingerprint(url: str | None, headline: str | None) -> str | None:
+    """'u:' + hash of the canonical URL, else 'h:' + hash of the headline, else None."""
+    canonical = canonical_url(url)
+    if canonical:
+        return "u:" + hashlib.sha256(canonical.encode()).hexdigest()[:32]
+    text = normalize_headline(headline)
+    if text:
+        return "h:" + hashlib.sha256(text.encode()).hexdigest()[:32]
+    return None
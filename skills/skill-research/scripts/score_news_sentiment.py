@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+score_news_sentiment.py
+
+Backfills company_news.sentiment_score for rows that arrived without one,
+using the offline lexicon scorer in lexicon_sentiment.py (no network).
+
+Rows with a NULL score are read in keyset-paginated batches, each batch is
+scored with one score_texts() call and written back with one set-based
+UPDATE, one transaction per batch, so an interrupted run resumes where it
+stopped. Scores are only written where sentiment_score is still NULL, so a
+score that arrived from the feed meanwhile is never overwritten.
+
+Usage:
+    python3 score_news_sentiment.py [--ticker AAPL] [--batch-size 5000] [--dry-run]
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from lexicon_sentiment import score_texts
+from near_duplicates import article_text
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:
+    print(json.dumps({"status": "error", "message": "psycopg2 not installed. Run: pip install psycopg2-binary"}))
+    sys.exit(1)
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+    sys.exit(1)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--ticker", help="Only this ticker (default: all)")
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.add_argument("--dry-run", action="store_true", help="Score without writing")
+    args = p.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+    last_id = None
+    totals = {"batches": 0, "scored": 0, "updated": 0, "positive": 0, "negative": 0, "neutral": 0}
+    scoring_seconds = 0.0
+
+    while True:
+        cur.execute("""
+            SELECT id, headline, summary
+            FROM company_news
+            WHERE sentiment_score IS NULL
+              AND (%s::text IS NULL OR ticker_symbol = %s)
+              AND (%s::uuid IS NULL OR id > %s::uuid)
+            ORDER BY id
+            LIMIT %s
+        """, (args.ticker, args.ticker, last_id, last_id, args.batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        start = time.perf_counter()
+        scores = score_texts([article_text(headline, summary) for _, headline, summary in rows])
+        scoring_seconds += time.perf_counter() - start
+
+        totals["batches"] += 1
+        totals["scored"] += len(rows)
+        totals["positive"] += int((scores > 0.05).sum())
+        totals["negative"] += int((scores < -0.05).sum())
+        totals["neutral"] += int((abs(scores) <= 0.05).sum())
+        if args.dry_run:
+            conn.rollback()
+            continue
+
+        execute_values(cur, """
+            UPDATE company_news n SET sentiment_score = b.score
+            FROM (VALUES %s) AS b(id, score)
+            WHERE n.id = b.id::uuid AND n.sentiment_score IS NULL
+        """, [(row_id, float(score)) for (row_id, _, _), score in zip(rows, scores)],
+            page_size=args.batch_size)
+        totals["updated"] += cur.rowcount
+        conn.commit()
+
+    cur.close()
+    conn.close()
+    print(json.dumps({
+        "status": "ok",
+        "dry_run": args.dry_run,
+        **totals,
+        "scoring_rows_per_sec": round(totals["scored"] / scoring_seconds) if scoring_seconds > 0 else None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
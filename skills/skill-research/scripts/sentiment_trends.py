@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+sentiment_trends.py
+
+Computes trend signals over each ticker's composite sentiment series and
+persists them to sentiment_daily_rollups:
+
+    ewma           exponentially weighted mean (SENTIMENT_EWMA_ALPHA)
+    zscore         today's score against the rolling mean/std of the window
+    slope_per_day  least-squares slope over the window, x = calendar days
+    trend          improving | worsening | stable from the projected change
+
+All signals are computed for the whole series at once with NumPy (rolling
+sums via cumulative sums, EWMA in closed form). Updates are incremental:
+only dates >= `since` are recomputed, warmed up with the preceding window
+of snapshots and seeded with the stored EWMA of the previous day.
+fetch_company_intel.py calls update_rollups() after every snapshot upsert.
+
+Usage:
+    python3 sentiment_trends.py --ticker AAPL [--since 2026-01-01]
+    python3 sentiment_trends.py --all          # full rebuild for every ticker
+
+Output: JSON to stdout
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "numpy not installed. Run: pip install numpy"}))
+    sys.exit(1)
+
+EWMA_ALPHA = float(os.environ.get("SENTIMENT_EWMA_ALPHA", "0.3"))
+WINDOW = int(os.environ.get("SENTIMENT_TREND_WINDOW", "14"))   # snapshots
+MIN_PERIODS = 3
+TREND_HORIZON_DAYS = 14
+TREND_THRESHOLD = 0.05        # same cut-off the half-vs-half comparison used
+
+
+def ewma(values, alpha: float = EWMA_ALPHA, seed: float | None = None):
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1], with y[-1] = seed (or x[0]).
+
+    Evaluated in closed form, y[k] = d^(k+1) * y[-1] + alpha * d^k * cumsum(x[j] / d^j),
+    over blocks short enough that d^-k stays finite.
+    """
+    x = np.asarray(values, dtype=float)
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    if alpha >= 1.0:
+        return x.copy()
+    decay = 1.0 - alpha
+    block = max(1, int(150 / -np.log10(decay)))
+    prev = x[0] if seed is None else float(seed)
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        powers = decay ** np.arange(len(chunk))
+        out[start:start + len(chunk)] = decay * powers * prev + alpha * powers * np.cumsum(chunk / powers)
+        prev = out[start + len(chunk) - 1]
+    return out
+
+
+def rolling_sum(values, window: int):
+    """Sum of the last `window` values at every position (shorter at the start)."""
+    c = np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+    idx = np.arange(1, len(c))
+    return c[idx] - c[np.maximum(idx - window, 0)]
+
+
+def compute_signals(days, scores, window: int = WINDOW, alpha: float = EWMA_ALPHA,
+                    seed_ewma: float | None = None, start: int = 0) -> dict:
+    """Trend signals for one ticker's series.
+
+    `days` are day ordinals (date.toordinal()), ascending; `scores` the
+    composite scores. Rows before `start` only warm up the rolling window;
+    the EWMA starts at `start` from `seed_ewma`.
+    """
+    t = np.asarray(days, dtype=float)
+    y = np.asarray(scores, dtype=float)
+    n = np.minimum(np.arange(1, len(y) + 1), window).astype(float)
+    if len(t):
+        t = t - t[0]
+
+    s_y, s_yy = rolling_sum(y, window), rolling_sum(y * y, window)
+    s_t, s_tt, s_ty = rolling_sum(t, window), rolling_sum(t * t, window), rolling_sum(t * y, window)
+
+    ready = n >= MIN_PERIODS
+    mean = s_y / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.sqrt(np.maximum((s_yy - s_y * mean) / (n - 1), 0.0))
+        zscore = np.where(ready & (std > 1e-9), (y - mean) / std, np.nan)
+        denom = n * s_tt - s_t * s_t
+        slope = np.where(ready & (denom > 0), (n * s_ty - s_t * s_y) / denom, np.nan)
+
+    change = slope * TREND_HORIZON_DAYS
+    trend = np.select([np.isnan(change), change > TREND_THRESHOLD, change < -TREND_THRESHOLD],
+                      [None, "improving", "worsening"], "stable")
+
+    smoothed = np.full_like(y, np.nan)
+    smoothed[start:] = ewma(y[start:], alpha, seed_ewma)
+    return {
+        "ewma": smoothed,
+        "rolling_mean": np.where(ready, mean, np.nan),
+        "rolling_std": np.where(ready, std, np.nan),
+        "zscore": zscore,
+        "slope_per_day": slope,
+        "trend": trend,
+        "observations": n.astype(int),
+    }
+
+
+def _num(v):
+    return None if v is None or np.isnan(v) else round(float(v), 6)
+
+
+def update_rollups(cur, ticker: str, since: date | None = None) -> int:
+    """Recomputes sentiment_daily_rollups for `ticker` from `since` (None = all).
+
+    Runs in the caller's transaction; returns the number of rows written.
+    """
+    from psycopg2.extras import execute_values
+
+    cur = cur.connection.cursor()   # tuple rows, whatever cursor_factory the caller uses
+    warmup_from = since
+    seed = None
+    if since is not None:
+        cur.execute("""
+            SELECT MIN(snapshot_date) FROM (
+              SELECT snapshot_date FROM sentiment_snapshots
+              WHERE ticker_symbol = %s AND composite_score IS NOT NULL AND snapshot_date < %s
+              ORDER BY snapshot_date DESC
+              LIMIT %s
+            ) w
+        """, (ticker, since, WINDOW - 1))
+        warmup_from = cur.fetchone()[0] or since
+        cur.execute("""
+            SELECT ewma FROM sentiment_daily_rollups
+            WHERE ticker_symbol = %s AND rollup_date < %s AND ewma IS NOT NULL
+            ORDER BY rollup_date DESC
+            LIMIT 1
+        """, (ticker, since))
+        row = cur.fetchone()
+        seed = float(row[0]) if row else None
+
+    cur.execute("""
+        SELECT snapshot_date, composite_score FROM sentiment_snapshots
+        WHERE ticker_symbol = %s AND composite_score IS NOT NULL
+          AND (%s::date IS NULL OR snapshot_date >= %s::date)
+        ORDER BY snapshot_date
+    """, (ticker, warmup_from, warmup_from))
+    rows = cur.fetchall()
+
+    cur.execute("""
+        DELETE FROM sentiment_daily_rollups
+        WHERE ticker_symbol = %s AND (%s::date IS NULL OR rollup_date >= %s::date)
+    """, (ticker, since, since))
+
+    dates = [r[0] for r in rows]
+    start = next((i for i, d in enumerate(dates) if since is None or d >= since), len(dates))
+    if start == len(dates):
+        cur.close()
+        return 0
+
+    scores = [float(r[1]) for r in rows]
+    sig = compute_signals([d.toordinal() for d in dates], scores, seed_ewma=seed, start=start)
+    values = [
+        (ticker, dates[i], scores[i], _num(sig["ewma"][i]), _num(sig["rolling_mean"][i]),
+         _num(sig["rolling_std"][i]), _num(sig["zscore"][i]), _num(sig["slope_per_day"][i]),
+         sig["trend"][i], WINDOW, int(sig["observations"][i]))
+        for i in range(start, len(dates))
+    ]
+    execute_values(cur, """
+        INSERT INTO sentiment_daily_rollups
+          (ticker_symbol, rollup_date, composite_score, ewma, rolling_mean, rolling_std,
+           zscore, slope_per_day, trend, window_size, observations)
+        VALUES %s
+    """, values)
+    cur.close()
+    return len(values)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--ticker")
+    target.add_argument("--all", action="store_true", help="Rebuild every ticker with snapshots")
+    p.add_argument("--since", type=date.fromisoformat, help="Recompute from this date (default: full rebuild)")
+    args = p.parse_args()
+
+    try:
+        import psycopg2
+    except ImportError:
+        print(json.dumps({"status": "error", "message": "psycopg2 not installed"}))
+        sys.exit(1)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    if args.all:
+        cur.execute("SELECT DISTINCT ticker_symbol FROM sentiment_snapshots ORDER BY ticker_symbol")
+        tickers = [r[0] for r in cur.fetchall()]
+    else:
+        tickers = [args.ticker.upper()]
+
+    written = {t: update_rollups(cur, t, args.since) for t in tickers}
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    print(json.dumps({"status": "ok", "rows_written": written, "window": WINDOW, "ewma_alpha": EWMA_ALPHA}))
+
+
+if __name__ == "__main__":
+    main()
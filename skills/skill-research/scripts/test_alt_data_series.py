@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for alt_data_metrics series parsing and aligned reads.
+"""
+
+from datetime import date
+from unittest import TestCase, main
+
+import numpy as np
+
+from alt_data_series import align, correlations, parse_point_date, series_rows
+from fetch_company_intel import alt_rows
+
+
+class TestSeriesRows(TestCase):
+    def test_google_trends_labels(self):
+        cases = {
+            "Mar 2, 2026": (date(2026, 3, 2), "day"),
+            "Mar 2 – 8, 2026": (date(2026, 3, 2), "week"),
+            "Dec 28, 2025 – Jan 3, 2026": (date(2025, 12, 28), "week"),
+            "Jan 2021": (date(2021, 1, 1), "month"),
+            "2026-03-01": (date(2026, 3, 1), "day"),
+        }
+        for label, expected in cases.items():
+            with self.subTest(label=label):
+                self.assertEqual(parse_point_date({"date": label}), expected)
+        self.assertIsNone(parse_point_date({"date": "sometime"}))
+
+    def test_whole_series_is_kept(self):
+        payload = {"alt_data": {
+            "google_trends": [{"date": f"Mar {d}, 2026", "value": 50 + d} for d in range(1, 31)] + [{"date": "x"}],
+            "web_traffic": {"sources": []},
+        }}
+        rows = alt_rows("AAPL", payload)
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[-1], ("AAPL", date(2026, 3, 30), "google_trends", 80, "Google Trends 80/100", "{}", "day"))
+        self.assertEqual(series_rows("AAPL", "app_ranking", [{"date": "2026-03-01", "value": 3}])[0][4], None)
+
+
+class TestAlign(TestCase):
+    ROWS = [
+        ("AAPL", "google_trends", date(2026, 1, 5), "day", 10),
+        ("AAPL", "google_trends", date(2026, 1, 6), "day", 20),
+        ("AAPL", "google_trends", date(2025, 12, 1), "month", 5),
+        ("AAPL", "app_ranking", date(2026, 1, 5), "week", 3),
+        ("MSFT", "google_trends", date(2026, 1, 7), "day", None),
+    ]
+
+    def test_weekly_alignment_mixes_granularities(self):
+        aligned = align(self.ROWS, ["AAPL", "MSFT"], ["google_trends", "app_ranking"],
+                        date(2025, 12, 29), date(2026, 1, 11), "week")
+        self.assertEqual([str(d) for d in aligned["dates"]], ["2025-12-29", "2026-01-05"])
+        self.assertEqual(aligned["values"].shape, (2, 2, 2))
+        np.testing.assert_array_equal(aligned["values"][0], [[5.0, np.nan], [15.0, 3.0]])
+        self.assertTrue(np.isnan(aligned["values"][1]).all())
+
+    def test_daily_alignment_expands_coarse_rows(self):
+        aligned = align(self.ROWS, ["AAPL"], ["google_trends", "app_ranking"], date(2025, 12, 31), date(2026, 1, 12))
+        values = aligned["values"][0]
+        self.assertEqual(len(aligned["dates"]), 13)
+        self.assertEqual(values[0, 0], 5.0)                                   # December monthly average
+        np.testing.assert_array_equal(values[5:7, 0], [10.0, 20.0])
+        np.testing.assert_array_equal(values[5:12, 1], [3.0] * 7)             # weekly row covers 7 days
+        self.assertTrue(np.isnan(values[12, 1]))
+
+    def test_monthly_alignment(self):
+        aligned = align(self.ROWS, ["AAPL"], ["google_trends"], date(2025, 12, 1), date(2026, 1, 31), "month")
+        self.assertEqual([str(d) for d in aligned["dates"]], ["2025-12-01", "2026-01-01"])
+        np.testing.assert_array_equal(aligned["values"][0, :, 0], [5.0, 15.0])
+
+    def test_correlations_use_pairwise_complete_points(self):
+        values = np.array([[1, 2], [2, 4], [3, np.nan], [4, 8], [5, 10.5]])
+        matrix = correlations(values)
+        self.assertEqual(matrix[0][0], 1.0)
+        self.assertGreater(matrix[0][1], 0.99)
+        self.assertIsNone(correlations(np.array([[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]))[0][1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for analyze_sentiment.py's multi-ticker mode (--tickers / --portfolio):
+one ANY(%s) query per table, the per-ticker news limit and the keyed report
+(no database — a stand-in cursor with canned rows per table).
+"""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import TestCase, main
+
+from analyze_sentiment import build_report, fetch_news, fetch_signals, fetch_snapshots, parse_tickers, \
+    portfolio_tickers
+
+TICKERS = ["AAPL", "MSFT", "NVDA"]
+SINCE = "2026-09-19"
+
+
+def snapshot(ticker, day, score):
+    return {"ticker_symbol": ticker, "snapshot_date": date(2026, 10, day), "twitter_sentiment": None,
+            "composite_score": Decimal(str(score)), "tweet_volume": 10, "bull_tweets": 6, "bear_tweets": 4,
+            "article_count": 2}
+
+
+def article(ticker, day, headline):
+    return {"ticker_symbol": ticker, "headline": headline, "source": "Reuters",
+            "published_at": datetime(2026, 10, day, 14, tzinfo=timezone.utc), "sentiment_score": Decimal("0.1"),
+            "source_type": "news"}
+
+
+ROWS = {
+    "holdings": [{"ticker_symbol": "AAPL"}, {"ticker_symbol": "NVDA"}],
+    "sentiment_snapshots": [snapshot("AAPL", 1, 0.45), snapshot("AAPL", 2, 0.47), snapshot("NVDA", 1, -0.3)],
+    "company_news": [article("AAPL", 3, "Apple beats"), article("AAPL", 2, "Apple guides up"),
+                     article("NVDA", 3, "Nvidia export curbs")],
+    "sentiment_daily_rollups": [{"ticker_symbol": "NVDA", "rollup_date": date(2026, 10, 1), "ewma": Decimal("-0.3"),
+                                 "zscore": Decimal("-1.5"), "slope_per_day": Decimal("-0.02"),
+                                 "trend": "worsening", "observations": 14}],
+}
+
+
+class CannedCursor:
+    """Answers each query with the canned rows of the table it reads."""
+
+    def __init__(self):
+        self.calls = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.calls.append((sql, params))
+        self.result = next(rows for table, rows in ROWS.items() if f"FROM {table}" in sql)
+
+    def fetchall(self):
+        return self.result
+
+
+class TestQueries(TestCase):
+    def test_one_any_query_per_table(self):
+        cur = CannedCursor()
+        snapshots = fetch_snapshots(cur, TICKERS, SINCE)
+        fetch_news(cur, TICKERS, SINCE, 20)
+        fetch_signals(cur, TICKERS, SINCE)
+        self.assertEqual(len(cur.calls), 3)
+        for sql, params in cur.calls:
+            self.assertIn("ticker_symbol = ANY(%s)", sql)
+            self.assertEqual(params[:2], (TICKERS, SINCE))
+        self.assertEqual([s["composite_score"] for s in snapshots["AAPL"]], [0.45, 0.47])
+        self.assertEqual(snapshots["MSFT"], [])
+
+    def test_news_limited_per_ticker(self):
+        cur = CannedCursor()
+        news = fetch_news(cur, TICKERS, SINCE, 5)
+        [(sql, params)] = cur.calls
+        self.assertIn("ROW_NUMBER() OVER (PARTITION BY ticker_symbol ORDER BY published_at DESC) AS rn", sql)
+        self.assertIn("WHERE rn <= %s", sql)
+        self.assertEqual(params, (TICKERS, SINCE, 5))
+        self.assertEqual([n["headline"] for n in news["AAPL"]], ["Apple beats", "Apple guides up"])
+        self.assertEqual(news["NVDA"][0]["published_at"], "2026-10-03T14:00:00+00:00")
+        self.assertEqual(news["MSFT"], [])
+
+    def test_ticker_lists(self):
+        self.assertEqual(parse_tickers("nvda, AAPL,,aapl ,msft"), TICKERS)
+        self.assertEqual(portfolio_tickers(CannedCursor()), ["AAPL", "NVDA"])
+
+
+class TestReport(TestCase):
+    def test_keyed_multi_ticker_report(self):
+        cur = CannedCursor()
+        report = build_report(TICKERS, 30, fetch_snapshots(cur, TICKERS, SINCE), fetch_news(cur, TICKERS, SINCE, 20),
+                              fetch_signals(cur, TICKERS, SINCE))
+        self.assertEqual((report["status"], report["days"], report["ticker_count"]), ("ok", 30, 3))
+        self.assertEqual(list(report["tickers"]), TICKERS)
+        self.assertEqual(report["summary"], {"bullish": ["AAPL"], "neutral": ["MSFT"], "bearish": ["NVDA"],
+                                             "worsening": ["NVDA"], "no_data": ["MSFT"]})
+        aapl, nvda = report["tickers"]["AAPL"], report["tickers"]["NVDA"]
+        self.assertEqual((aapl["sentiment_avg"], aapl["trend"], aapl["signals"]), (0.46, "stable", None))
+        self.assertEqual(nvda["signals"]["zscore"], -1.5)
+        self.assertEqual(len(aapl["recent_news"]), 2)
+
+
+if __name__ == "__main__":
+    main()
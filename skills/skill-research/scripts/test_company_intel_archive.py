@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for company_intelligence array retention and the archive reader.
+"""
+
+import gzip
+import tempfile
+from unittest import TestCase, main
+
+from company_intel_archive import (append_archive, archive_path, entry_date, merge, read_archive,
+                                   split_entries)
+
+
+def filing(accession: str, filed: str) -> dict:
+    return {"form": "10-Q", "filed": filed, "accession": accession, "primary_doc": "q.htm"}
+
+
+class TestSplit(TestCase):
+    def test_entry_dates(self):
+        self.assertEqual(entry_date({"filed": "2026-03-02"}), "2026-03-02")
+        self.assertEqual(entry_date({"datetime": 1772409600}), "2026-03-02")
+        self.assertEqual(entry_date({"published_at": "2026-03-02T14:00:00Z"}), "2026-03-02")
+        self.assertEqual(entry_date({"title": "undated"}), "")
+
+    def test_keeps_recent_window_capped(self):
+        entries = [filing(f"a-{i}", f"2026-0{i}-01") for i in range(1, 10)]
+        kept, archived = split_entries(entries, "2026-05-01", keep_max=10)
+        self.assertEqual([e["accession"] for e in kept], ["a-9", "a-8", "a-7", "a-6", "a-5"])
+        self.assertEqual([e["accession"] for e in archived], ["a-4", "a-3", "a-2", "a-1"])
+        kept, archived = split_entries(entries, "2026-05-01", keep_max=2)
+        self.assertEqual((len(kept), len(archived)), (2, 7))
+
+    def test_newest_entry_is_always_kept(self):
+        kept, archived = split_entries([filing("old", "2019-01-01"), {"title": "undated"}], "2026-01-01", 200)
+        self.assertEqual(kept, [filing("old", "2019-01-01")])
+        self.assertEqual(archived, [{"title": "undated"}])
+        self.assertEqual(split_entries([], "2026-01-01", 200), ([], []))
+
+
+class TestArchive(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_appends_are_one_readable_stream(self):
+        self.assertEqual(list(read_archive("BRK/B", "sec_filings", self.base)), [])
+        append_archive("BRK/B", "sec_filings", [filing("a-1", "2020-01-01")], self.base)
+        append_archive("BRK/B", "sec_filings", [filing("a-2", "2021-01-01"), filing("a-3", "2021-02-01")], self.base)
+        path = archive_path("BRK/B", "sec_filings", self.base)
+        self.assertTrue(path.endswith("BRK_B/sec_filings.ndjson.gz"))
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+        self.assertEqual([e["accession"] for e in read_archive("BRK/B", "sec_filings", self.base)],
+                         ["a-1", "a-2", "a-3"])
+
+    def test_merge_prefers_live_and_drops_rearchived_duplicates(self):
+        # A run that died after archiving but before trimming archives a-2 twice
+        append_archive("AAPL", "sec_filings", [filing("a-2", "2021-01-01"), filing("a-1", "2020-01-01")], self.base)
+        append_archive("AAPL", "sec_filings", [filing("a-2", "2021-01-01")], self.base)
+        live = [{**filing("a-2", "2021-01-01"), "note": "live"}, filing("a-3", "2026-01-01")]
+        merged = merge(live, read_archive("AAPL", "sec_filings", self.base))
+        self.assertEqual([e["accession"] for e in merged], ["a-3", "a-2", "a-1"])
+        self.assertEqual(merged[1]["note"], "live")
+        since = merge(live, read_archive("AAPL", "sec_filings", self.base), since="2021-01-01")
+        self.assertEqual([e["accession"] for e in since], ["a-3", "a-2"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized sentiment-vs-price event study.
+"""
+
+from argparse import Namespace
+from datetime import date, timedelta
+from unittest import TestCase, main
+
+import numpy as np
+
+from event_study import abnormal_returns, event_arrays, lagged_xcorr, log_returns, price_panel, run
+
+
+def reference_ar(returns, market, t, d, pre, post, estimation, gap):
+    """Per-event market model, the slow way."""
+    est = range(d - pre - gap - estimation, d - pre - gap)
+    r = np.array([returns[t, i] for i in est])
+    m = np.array([market[i] for i in est])
+    ok = ~np.isnan(r) & ~np.isnan(m)
+    beta, alpha = np.polyfit(m[ok], r[ok], 1)
+    return np.array([returns[t, i] - alpha - beta * market[i] for i in range(d - pre, d + post + 1)])
+
+
+class TestAbnormalReturns(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.market = rng.normal(0, 0.01, 600)
+        self.returns = 0.0002 + np.array([0.8, 1.2, 1.5])[:, None] * self.market + rng.normal(0, 0.01, (3, 600))
+        self.returns[1, 100:110] = np.nan
+
+    def test_matches_per_event_regression(self):
+        t_idx, d_idx = np.array([0, 1, 2, 1]), np.array([300, 250, 599 - 10, 180])
+        ar = abnormal_returns(self.returns, self.market, t_idx, d_idx, pre=3, post=10, estimation=120, gap=5)
+        self.assertEqual(ar.shape, (4, 14))
+        for e, (t, d) in enumerate(zip(t_idx, d_idx)):
+            with self.subTest(event=e):
+                np.testing.assert_allclose(ar[e], reference_ar(self.returns, self.market, t, d, 3, 10, 120, 5))
+
+    def test_short_history_and_window_past_the_end(self):
+        ar = abnormal_returns(self.returns, self.market, np.array([0, 0]), np.array([30, 595]),
+                              pre=2, post=10, estimation=120, gap=5)
+        self.assertTrue(np.isnan(ar[0]).all())
+        self.assertTrue(np.isnan(ar[1, -6:]).all())
+        self.assertFalse(np.isnan(ar[1, :7]).any())
+
+    def test_market_adjusted_and_mean_models(self):
+        ar = abnormal_returns(self.returns, self.market, np.array([2]), np.array([300]), pre=1, post=1,
+                              model="market_adjusted")
+        np.testing.assert_allclose(ar[0], self.returns[2, 299:302] - self.market[299:302])
+        ar = abnormal_returns(self.returns, self.market, np.array([2]), np.array([300]), pre=1, post=1,
+                              estimation=50, gap=0, model="mean")
+        np.testing.assert_allclose(ar[0], self.returns[2, 299:302] - self.returns[2, 249:299].mean())
+
+
+class TestLaggedXcorr(TestCase):
+    def test_peak_at_injected_lead(self):
+        rng = np.random.default_rng(3)
+        signal = rng.normal(size=(4, 400))
+        returns = rng.normal(size=(4, 400)) * 0.5
+        returns[:, 2:] += signal[:, :-2]             # sentiment leads returns by two days
+        signal[0, ::7] = np.nan
+        lags, per_ticker, pooled = lagged_xcorr(signal, returns, max_lag=4)
+        self.assertEqual(list(lags), [-4, -3, -2, -1, 0, 1, 2, 3, 4])
+        self.assertTrue((per_ticker.argmax(axis=1) == 6).all())
+        self.assertEqual(int(np.nanargmax(pooled)), 6)
+        self.assertGreater(pooled[6], 0.8)
+        both = ~np.isnan(signal[1, :-2])
+        self.assertAlmostEqual(per_ticker[1, 6], np.corrcoef(signal[1, :-2][both], returns[1, 2:][both])[0, 1])
+
+
+class TestRun(TestCase):
+    def test_detects_post_event_drift(self):
+        rng = np.random.default_rng(11)
+        start = date(2024, 1, 1)
+        days = [start + timedelta(days=i) for i in range(700) if (start + timedelta(days=i)).weekday() < 5]
+        market = rng.normal(0, 0.01, len(days))
+        tickers = ["AAA", "BBB", "CCC"]
+        log_prices = {"SPY": np.cumsum(market)}
+        news, sentiment = [], []
+        for k, t in enumerate(tickers):
+            r = market + rng.normal(0, 0.005, len(days))
+            for j, i in enumerate(range(200, len(days) - 20, 15)):
+                sign = 1 if (j + k) % 2 == 0 else -1
+                r[i:i + 3] += sign * 0.01                # +/-3% drift over days 0..2
+                sentiment.append((t, days[i], 2.5 * sign))
+                news += [(t, days[i], 0.6 * sign), (t, days[i], 0.2 * sign)]
+            log_prices[t] = np.cumsum(r)
+        prices = {t: list(zip(days, 100 * np.exp(lp))) for t, lp in log_prices.items()}
+        events = {"sentiment": sentiment, "news": news, "snapshots": []}
+        args = Namespace(pre=2, post=5, estimation=100, gap=5, model="market", max_lag=3)
+
+        result = run(prices, tickers + ["ZZZ"], "SPY", events, args)
+        self.assertEqual(result["tickers"], tickers)
+        for kind in ("sentiment", "news"):
+            with self.subTest(kind=kind):
+                study = result["events"][kind]
+                self.assertEqual(study["all"]["events"], 57)
+                self.assertAlmostEqual(study["all"]["final_car"], 0.03, delta=0.005)
+                self.assertGreater(study["all"]["final_t"], 10)
+                self.assertAlmostEqual(study["positive"]["mean_car"][1], 0, delta=0.003)
+                self.assertLess(study["negative"]["final_car"], -0.02)
+        self.assertEqual(result["cross_correlation"]["lags"], [-3, -2, -1, 0, 1, 2, 3])
+
+    def test_news_collapses_to_one_event_per_trading_day(self):
+        days = np.array(["2026-03-02", "2026-03-03", "2026-03-04"], dtype="datetime64[D]")
+        rows = [("A", date(2026, 3, 1), 0.5), ("A", date(2026, 3, 2), -0.9), ("A", date(2026, 3, 3), 0.4),
+                ("B", date(2026, 3, 9), 0.5), ("X", date(2026, 3, 2), 0.5)]
+        t_idx, d_idx, direction = event_arrays(rows, {"A": 0, "B": 1}, days, per_day=True)
+        self.assertEqual(list(zip(t_idx, d_idx, direction)), [(0, 0, -1.0), (0, 1, 1.0)])
+
+    def test_price_panel_gaps(self):
+        days, closes = price_panel({"A": [(date(2026, 3, 2), 10), (date(2026, 3, 4), 11)],
+                                    "B": [(date(2026, 3, 3), 5)]}, ["A", "B"])
+        self.assertEqual(len(days), 3)
+        self.assertTrue(np.isnan(log_returns(closes)).all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for fetch_company_intel.py's NDJSON mode: buffering and per-batch
+commits (no database — a recording stand-in connection). COPY formatting is
+covered by skill-data-ingestion's test_pg_copy.py.
+"""
+
+import json
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import psycopg2
+
+import fetch_company_intel
+from fetch_company_intel import run_ndjson, run_single
+
+
+class FakeConnection:
+    """Records the rows COPYed per committed transaction; COPY number `fail_on` raises."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.copies = 0
+        self.pending: list = []
+        self.committed: list = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed.append(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pending = []
+
+
+class FakeCursor:
+    def __init__(self, conn: FakeConnection):
+        self.connection = conn
+        self.rowcount = 0
+        self.staged = 0
+
+    def execute(self, sql, params=None):
+        self.rowcount = self.staged if sql.lstrip().startswith("INSERT") else 0
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+    def copy_expert(self, sql, buf):
+        conn = self.connection
+        conn.copies += 1
+        if conn.copies in conn.fail_on:
+            raise psycopg2.DataError("value too long for type character varying(20)")
+        lines = buf.read().splitlines()
+        conn.pending.append((sql.split()[1], lines))
+        self.staged = len(lines)
+
+
+def payload(ticker: str, n: int) -> str:
+    return json.dumps({"ticker": ticker, "news": [
+        {"headline": f"{ticker} story {i} about quarterly results and guidance",
+         "url": f"https://example.com/{ticker}/{i}", "datetime": 1772450000 + i, "sentiment_score": 0.1}
+        for i in range(n)]})
+
+
+@patch.object(fetch_company_intel, "FLUSH_ROWS", 5)
+class TestNdjsonBatches(TestCase):
+    def test_each_flush_is_its_own_transaction(self):
+        conn = FakeConnection()
+        lines = [payload("AAPL", 3), "", payload("MSFT", 3), payload("NVDA", 1)]
+        result = run_ndjson(conn.cursor(), lines)
+        # create_staging, then AAPL+MSFT (6 rows >= 5), then NVDA
+        self.assertEqual([len(c) for c in conn.committed], [0, 1, 1])
+        self.assertEqual([len(rows) for _, rows in conn.committed[1]], [6])
+        self.assertEqual((result["payloads"], result["tickers"], result["articles_inserted"]), (3, 3, 7))
+        self.assertEqual(result["errors"], [])
+
+    def test_rejected_batch_is_reported_and_the_run_continues(self):
+        conn = FakeConnection(fail_on={1})
+        lines = [payload("AAPL", 5), "not json", payload("MSFT", 2), payload("NVDA", 4)]
+        result = run_ndjson(conn.cursor(), lines)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(result["errors"], [
+            {"lines": [1, 1], "message": "value too long for type character varying(20)"},
+            {"line": 2, "message": "Expecting value: line 1 column 1 (char 0)"},
+        ])
+        self.assertEqual((result["payloads"], result["tickers"], result["articles_inserted"]), (2, 2, 6))
+        stored = [row.split("\t")[0] for c in conn.committed for _, rows in c for row in rows]
+        self.assertEqual(sorted(set(stored)), ["MSFT", "NVDA"])
+
+    def test_rejected_line_does_not_swallow_a_later_syndicated_copy(self):
+        story = {"headline": "Apple to invest $500 billion in US manufacturing over four years",
+                 "summary": "The iPhone maker said the plan includes a new server factory in Texas.",
+                 "datetime": 1772450000}
+        bad = json.dumps({"ticker": "AAPL", "news": [{**story, "url": "https://wire.example.com/a"}],
+                          "alt_data": {"google_trends": ["not a point"]}})
+        copy = json.dumps({"ticker": "AAPL", "news": [{**story, "url": "https://paper.example.com/b",
+                                                       "headline": story["headline"] + " - report"}]})
+        conn = FakeConnection()
+        result = run_ndjson(conn.cursor(), [bad, copy])
+        self.assertEqual([e["line"] for e in result["errors"]], [1])
+        self.assertEqual((result["articles_inserted"], result["syndicated_copies_collapsed"]), (1, 0))
+        stored = [row.split("\t")[4] for c in conn.committed for table, rows in c if table == "stage_company_news"
+                  for row in rows]
+        self.assertEqual(stored, ["https://paper.example.com/b"])
+
+
+class TestSinglePayload(TestCase):
+    def test_malformed_alt_point_raises_before_writing(self):
+        conn = FakeConnection()
+        with self.assertRaises(AttributeError):
+            run_single(conn.cursor(), "AAPL", {"news": json.loads(payload("AAPL", 1))["news"],
+                                               "alt_data": {"google_trends": ["not a point"]}})
+        self.assertEqual((conn.copies, conn.pending), (0, []))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the local SEC filings full-text index.
+"""
+
+from unittest import TestCase, main
+
+from filings_index import FilingsIndex, document_url, html_to_text
+
+FILLER = "Revenue and operating income are discussed in the results of operations section. " * 400
+
+
+def filing(ticker, form, filed, accession, body):
+    return {"ticker": ticker, "form": form, "filed": filed, "accession": accession, "cik": "0000320193",
+            "primary_doc": "doc.htm"}, f"<html><body><p>{body}</p><p>{FILLER}</p></body></html>"
+
+
+DOCS = [
+    filing("AAPL", "10-Q", "2026-01-30", "a-2", "New tariffs on imported components raised our cost of sales."),
+    filing("AAPL", "10-Q", "2025-10-31", "a-1", "Tariff risk was not material. Supply chain remained stable."),
+    filing("MSFT", "10-Q", "2026-01-28", "m-2", "Cloud revenue grew; we expect tariffs and tariffs again to matter."),
+    filing("NVDA", "10-K", "2026-02-20", "n-1", "Export controls and supply chain constraints limited shipments."),
+    filing("NVDA", "8-K", "2026-02-21", "n-2", "Announcement of a new director."),
+]
+
+
+class TestFilingsIndex(TestCase):
+    def setUp(self):
+        self.index = FilingsIndex(":memory:")
+        for meta, html in DOCS:
+            self.index.add(meta, html)
+        self.index.commit()
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_html_to_text(self):
+        html = ("<html><head><title>x</title><style>p{}</style></head><body><ix:header>hidden</ix:header>"
+                "<div>Net&nbsp;sales</div><table><tr><td>Q1</td><td>$1.2</td></tr></table></body></html>")
+        self.assertEqual(html_to_text(html), "Net sales\nQ1 $1.2")
+
+    def test_keyword_search_is_ranked_and_stemmed(self):
+        results = self.index.search("tariffs")
+        self.assertEqual([r["accession"] for r in results][:1], ["m-2"])          # most mentions ranks first
+        self.assertEqual({r["accession"] for r in results}, {"a-1", "a-2", "m-2"})  # "Tariff" stems too
+        self.assertIn("tariffs", results[0]["snippet"])
+
+    def test_phrase_and_filters(self):
+        self.assertEqual({r["ticker"] for r in self.index.search('"supply chain"')}, {"AAPL", "NVDA"})
+        self.assertEqual([r["accession"] for r in self.index.search('"supply chain"', forms=["10-K"])], ["n-1"])
+        latest = self.index.search("tariffs", forms=["10-Q"], latest=True)
+        self.assertEqual({r["accession"] for r in latest}, {"a-2", "m-2"})
+        self.assertEqual(self.index.search("tariffs", tickers=["NVDA"]), [])
+
+    def test_text_is_stored_compressed_and_readded_once(self):
+        meta, html = DOCS[0]
+        self.index.add(meta, html)
+        stats = self.index.stats()
+        self.assertEqual(stats["filings"], len(DOCS))
+        self.assertGreater(stats["compression_ratio"], 5)
+        self.assertIn("New tariffs on imported components", self.index.text(1))
+
+    def test_latest_keeps_one_filing_per_ticker_after_optimize(self):
+        for i in range(300):
+            meta, html = filing(f"T{i % 30}", "10-Q", f"2025-{1 + i % 12:02d}-15", f"x-{i}", f"Item {i} tariffs")
+            self.index.add(meta, html)
+        self.index.optimize()
+        results = self.index.search("tariffs", forms=["10-Q"], latest=True, limit=50)
+        self.assertEqual(len(results), 32)
+        self.assertEqual(len({r["ticker"] for r in results}), 32)
+
+    def test_document_url(self):
+        self.assertEqual(document_url("0000320193", "0000320193-26-000010", "aapl-20251227.htm", "https://x"),
+                         "https://x/320193/000032019326000010/aapl-20251227.htm")
+
+
+if __name__ == "__main__":
+    main()
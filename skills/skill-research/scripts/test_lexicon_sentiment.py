@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline lexicon sentiment scorer.
+"""
+
+from unittest import TestCase, main
+
+import numpy as np
+
+from bench_lexicon_sentiment import random_texts
+from lexicon_sentiment import score_text, score_texts, tokenize
+
+
+class TestLexiconSentiment(TestCase):
+    def test_polarity(self):
+        scores = score_texts(["Apple beats estimates as iPhone sales surge",
+                              "Tesla shares plunge after recall probe",
+                              "Company names new chief financial officer", "", None])
+        self.assertGreater(scores[0], 0.5)
+        self.assertLess(scores[1], -0.5)
+        self.assertEqual(list(scores[2:]), [0.0, 0.0, 0.0])
+        self.assertTrue(np.all(np.abs(scores) <= 1.0))
+
+    def test_negation_flips_within_window(self):
+        self.assertLess(score_text("Revenue did not beat estimates"), 0)
+        self.assertLess(score_text("Revenue didn't beat estimates"), 0)
+        self.assertGreater(score_text("Supplier says shortage is no longer a risk"), 0)
+        self.assertGreater(score_text("Not the first quarter that revenue beat estimates"), 0)
+
+    def test_intensifiers_scale(self):
+        plain, sharp, slight = score_texts(["Shares fell", "Shares fell sharply", "Shares slightly fell"])
+        self.assertEqual(plain, score_text("Shares fell"))
+        self.assertEqual(sharp, score_text("Shares fell sharply"))
+        self.assertLess(score_text("Shares sharply fell"), plain)
+        self.assertGreater(slight, plain)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Q1 EPS: didn’t MISS, re-rated"), ["q", "eps", "didnt", "miss", "re", "rated"])
+
+    def test_batch_matches_reference(self):
+        texts = random_texts(np.random.default_rng(7), 5000)
+        texts += ["", "not", "sharply", "no no no gains", "gains not"]
+        expected = np.array([score_text(t) for t in texts])
+        np.testing.assert_array_equal(score_texts(texts), expected)
+
+
+if __name__ == "__main__":
+    main()
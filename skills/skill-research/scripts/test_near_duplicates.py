@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for syndicated near-duplicate collapsing.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase, main
+
+from near_duplicates import NearDuplicateIndex, collapse, minhash, similarity
+from news_fingerprint import fingerprint
+
+T0 = datetime(2026, 3, 2, 13, 0, tzinfo=timezone.utc)
+
+
+def row(url, headline, summary="", minutes=0):
+    return ("AAPL", headline, summary, "", url, T0 + timedelta(minutes=minutes), None, "news",
+            fingerprint(url, headline))
+
+
+STORY = [
+    row("https://reuters.com/apple-q1", "Apple beats first-quarter estimates as iPhone sales jump",
+        "Apple reported revenue above analyst expectations on strong iPhone demand in China", 0),
+    row("https://finance.yahoo.com/news/apple-q1", "Apple beats first quarter estimates as iPhone sales jump",
+        "Apple reported revenue above analyst expectations on strong iPhone demand in China", 5),
+    row("https://marketwatch.com/story/apple-q1", "UPDATE 1-Apple beats first-quarter estimates as iPhone sales jump",
+        "Apple reported revenue above analyst expectations on strong iPhone demand in China", 9),
+]
+OTHER = row("https://reuters.com/apple-vision", "Apple delays Vision headset launch to next year",
+            "The company pushed back its mixed reality device citing supply constraints", 3)
+
+
+class TestNearDuplicates(TestCase):
+    def test_similarity_orders_related_text(self):
+        a = minhash(STORY[0][1] + " " + STORY[0][2])
+        self.assertGreater(similarity(a, minhash(STORY[2][1] + " " + STORY[2][2])), 0.6)
+        self.assertLess(similarity(a, minhash(OTHER[1] + " " + OTHER[2])), 0.2)
+
+    def test_copies_collapse_onto_the_earliest_article(self):
+        keep, syndicated, stories = collapse(NearDuplicateIndex(), "AAPL", [STORY[2], OTHER, STORY[1], STORY[0]])
+        self.assertEqual([r[8] for r in keep], [STORY[0][8], OTHER[8]])
+        self.assertEqual(syndicated, {STORY[0][8]: [STORY[1][8], STORY[2][8]]})
+        self.assertEqual(stories, 2)
+
+    def test_refetch_counts_copies_once(self):
+        index = NearDuplicateIndex()
+        collapse(index, "AAPL", STORY)
+        keep, syndicated, stories = collapse(index, "AAPL", STORY)
+        self.assertEqual([r[8] for r in keep], [STORY[0][8]])
+        self.assertEqual(syndicated, {})
+        self.assertEqual(stories, 1)
+
+    def test_articles_without_text_are_not_collapsed(self):
+        bare = [row("https://example.com/a", "", minutes=1), row("https://example.com/b", "", minutes=2)]
+        self.assertNotEqual(bare[0][8], bare[1][8])
+        index = NearDuplicateIndex()
+        keep, syndicated, stories = collapse(index, "AAPL", bare + [STORY[0]])
+        self.assertEqual([r[8] for r in keep], [STORY[0][8], bare[0][8], bare[1][8]])
+        self.assertEqual((syndicated, stories), ({}, 3))
+        self.assertIsNone(minhash(""))
+        self.assertEqual(list(index._entries["AAPL"]), [STORY[0][8]])
+
+    def test_index_is_bounded_by_window_and_size(self):
+        index = NearDuplicateIndex(window_hours=1, max_per_ticker=2)
+        collapse(index, "AAPL", [STORY[0]])
+        late = row("https://example.com/late", STORY[1][1], STORY[1][2], minutes=120)
+        keep, syndicated, _ = collapse(index, "AAPL", [late])
+        self.assertEqual((len(keep), syndicated), (1, {}))
+
+        for i in range(5):
+            collapse(index, "MSFT", [("MSFT", f"unrelated headline number {i} about cloud", "", "",
+                                      f"https://example.com/{i}", T0, None, "news", f"h:{i}")])
+        self.assertEqual(len(index._entries["MSFT"]), 2)
+
+
+if __name__ == "__main__":
+    main()
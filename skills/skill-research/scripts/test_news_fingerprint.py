@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for company_news fingerprint normalization.
+"""
+
+from unittest import TestCase, main
+
+from news_fingerprint import canonical_url, fingerprint
+
+
+class TestNewsFingerprint(TestCase):
+    def test_url_variants_share_a_fingerprint(self):
+        variants = [
+            "https://www.reuters.com/markets/apple-earnings/",
+            "http://reuters.com/markets/apple-earnings?utm_source=twitter&utm_medium=social",
+            "https://REUTERS.com/markets//apple-earnings#comments",
+            "https://reuters.com/markets/apple-earnings?fbclid=abc",
+        ]
+        self.assertEqual(len({fingerprint(u, f"headline {i}") for i, u in enumerate(variants)}), 1)
+
+    def test_meaningful_query_parameters_are_kept_and_sorted(self):
+        self.assertEqual(canonical_url("https://x.com/a?b=2&a=1&utm_campaign=z"), "https://x.com/a?a=1&b=2")
+        self.assertNotEqual(fingerprint("https://x.com/a?id=1", ""), fingerprint("https://x.com/a?id=2", ""))
+
+    def test_headline_fallback_without_usable_url(self):
+        a = fingerprint("", "Apple beats Q1 estimates!")
+        b = fingerprint("not a url", "  apple BEATS q1 estimates ")
+        self.assertTrue(a.startswith("h:"))
+        self.assertEqual(a, b)
+        self.assertIsNone(fingerprint(None, "  "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized sentiment trend signals against naive loops.
+"""
+
+from unittest import TestCase, main
+
+import numpy as np
+
+from sentiment_trends import compute_signals, ewma
+
+
+class TestSentimentTrends(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.scores = rng.uniform(-1, 1, 400)
+        self.days = np.cumsum(rng.integers(1, 4, 400)) + 738000   # gaps between snapshots
+
+    def test_ewma_matches_recursion_over_long_series(self):
+        x = np.random.default_rng(1).uniform(-1, 1, 5000)
+        expected, prev = [], 0.25
+        for v in x:
+            prev = 0.3 * v + 0.7 * prev
+            expected.append(prev)
+        np.testing.assert_allclose(ewma(x, 0.3, seed=0.25), expected, atol=1e-12)
+
+    def test_rolling_zscore_and_slope_match_per_window_fit(self):
+        sig = compute_signals(self.days, self.scores, window=14)
+        for i in (2, 13, 14, 200, 399):
+            w = slice(max(i - 13, 0), i + 1)
+            x, y = self.days[w].astype(float), self.scores[w]
+            self.assertAlmostEqual(sig["slope_per_day"][i], np.polyfit(x, y, 1)[0], places=9)
+            self.assertAlmostEqual(sig["zscore"][i], (y[-1] - y.mean()) / y.std(ddof=1), places=9)
+        self.assertTrue(np.isnan(sig["slope_per_day"][1]))
+        self.assertIsNone(sig["trend"][1])
+
+    def test_incremental_update_matches_full_recompute(self):
+        full = compute_signals(self.days, self.scores)
+        # Recompute from row 300, warmed up with the 13 rows before it and seeded with row 299's EWMA
+        part = compute_signals(self.days[287:], self.scores[287:], seed_ewma=full["ewma"][299], start=13)
+        for key in ("ewma", "zscore", "slope_per_day"):
+            np.testing.assert_allclose(part[key][13:], full[key][300:], atol=1e-12)
+        self.assertEqual(list(part["trend"][13:]), list(full["trend"][300:]))
+
+    def test_trend_labels(self):
+        days = np.arange(20)
+        self.assertEqual(compute_signals(days, np.linspace(-0.5, 0.5, 20))["trend"][-1], "improving")
+        self.assertEqual(compute_signals(days, np.linspace(0.5, -0.5, 20))["trend"][-1], "worsening")
+        self.assertEqual(compute_signals(days, np.full(20, 0.3))["trend"][-1], "stable")
+
+
+if __name__ == "__main__":
+    main()
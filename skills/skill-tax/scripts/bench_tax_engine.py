@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+bench_tax_engine.py — Evaluations per second for each tax implementation.
+
+Every implementation is first checked against the independent reference in
+tax_reference.py on the same randomized households; one that disagrees is
+reported as a mismatch and not timed. To try a faster bracket routine, add
+it to BRACKET_IMPLEMENTATIONS and run this script.
+
+Usage:
+  python3 bench_tax_engine.py [--samples 1000000] [--filing-status single] [--repeat 3]
+"""
+import sys, json, time, argparse
+from datetime import date
+from unittest import mock
+
+import estimate_liability
+import tax_reference as ref
+from estimate_liability import calc_tax_from_brackets, compute_liability, empty_aggregates, load_tables
+from tax_engine import np, bracket_arrays, federal_params, federal_tax_vec, tax_from_brackets_vec
+
+SCALAR_SAMPLE_CAP = 200_000      # pure-Python loops are timed on at most this many households
+
+def scalar_brackets(incomes, brackets):
+    return np.array([calc_tax_from_brackets(x, brackets) for x in incomes])
+
+def clip_sum_brackets(incomes, brackets):
+    return tax_from_brackets_vec(incomes, *bracket_arrays(brackets))
+
+def worksheet_brackets(incomes, brackets):
+    return ref.bracket_tax_vec(incomes, *ref.worksheet_arrays(brackets))
+
+# name -> (fn(incomes, brackets) -> taxes, is_scalar)
+BRACKET_IMPLEMENTATIONS = {
+    "calc_tax_from_brackets": (scalar_brackets, True),
+    "tax_from_brackets_vec": (clip_sum_brackets, False),
+    "worksheet_searchsorted": (worksheet_brackets, False),
+}
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def report(name: str, n: int, seconds: float, max_error: float) -> dict:
+    return {"implementation": name, "evaluations": n, "seconds": round(seconds, 4),
+            "evals_per_sec": round(n / seconds) if seconds > 0 else None,
+            "max_abs_error": max_error, "status": "ok"}
+
+def bench_brackets(incomes, brackets: list, repeat: int) -> list[dict]:
+    expected = worksheet_brackets(incomes, brackets)
+    results = []
+    for name, (fn, is_scalar) in BRACKET_IMPLEMENTATIONS.items():
+        sample = incomes[:SCALAR_SAMPLE_CAP] if is_scalar else incomes
+        err = float(np.max(np.abs(fn(sample, brackets) - expected[:len(sample)])))
+        if err > 1e-6:
+            results.append({"implementation": name, "status": "mismatch", "max_abs_error": err})
+            continue
+        results.append(report(name, len(sample), timed(lambda: fn(sample, brackets), repeat), err))
+    return results
+
+def bench_liability(households: dict, tables: dict, status: str, repeat: int) -> list[dict]:
+    expected = ref.liability_vec(status, tables, **households)["total"]
+    params = federal_params(tables, status)
+    h = households
+    ordinary, investment = h["wages"] + h["interest"] + h["dividends"], h["interest"] + h["dividends"]
+
+    def vectorized():
+        return federal_tax_vec(ordinary, 0.0, h["capital_gain"], params, h["itemized"], investment)["total"]
+
+    n_scalar = min(len(h["wages"]), SCALAR_SAMPLE_CAP // 20)
+    aggs = []
+    for i in range(n_scalar):
+        agg = empty_aggregates()
+        gain = float(h["capital_gain"][i])
+        agg.update(w2_wages=float(h["wages"][i]), interest=float(h["interest"][i]),
+                   dividends=float(h["dividends"][i]), itemized=float(h["itemized"][i]),
+                   proceeds=max(gain, 0.0), cost_basis=max(-gain, 0.0))
+        aggs.append(agg)
+
+    def scalar():
+        with mock.patch.object(estimate_liability, "FILING_STATUS", status):
+            return np.array([compute_liability(2026, a, tables, date.today())["tax"]["total_federal"] for a in aggs])
+
+    vec_err = float(np.max(np.abs(vectorized() - expected)))
+    scalar_err = float(np.max(np.abs(scalar() - expected[:n_scalar])))   # output is rounded to cents
+    results = []
+    for name, fn, n, err, tolerance in (("compute_liability", scalar, n_scalar, scalar_err, 0.011),
+                                        ("federal_tax_vec", vectorized, len(expected), vec_err, 1e-6)):
+        if err > tolerance:
+            results.append({"implementation": name, "status": "mismatch", "max_abs_error": err})
+        else:
+            results.append(report(name, n, timed(fn, repeat), err))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--filing-status", default="single")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=20260415)
+    args = parser.parse_args()
+
+    tables = load_tables(2026)
+    if args.filing_status not in tables["federal_brackets"]:
+        print(json.dumps({"status": "error", "message": f"Unknown filing status: {args.filing_status}"}))
+        sys.exit(1)
+
+    households = ref.random_households(np.random.default_rng(args.seed), args.samples)
+    brackets = tables["federal_brackets"][args.filing_status]
+    print(json.dumps({
+        "status": "ok",
+        "filing_status": args.filing_status,
+        "samples": args.samples,
+        "brackets": bench_brackets(households["wages"], brackets, args.repeat),
+        "liability": bench_liability(households, tables, args.filing_status, args.repeat),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
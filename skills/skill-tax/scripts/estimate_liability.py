@@ -4,24 +4,38 @@ estimate_liability.py — Deterministic federal + state tax liability estimation
 
 Reads all tax documents for the current year from the database, applies
 2026 federal brackets, and returns a JSON tax summary. Never uses LLM math.
+
+Usage:
+  python3 estimate_liability.py                    # current year
+  python3 estimate_liability.py --years all        # every year with tax data
+  python3 estimate_liability.py --years 2022-2025  # range (or 2023,2025)
+
+Multi-year mode aggregates each table once, grouped by year, and caches
+closed years in agent_state (task_name = 'tax_estimate_year').
 """
-import os, sys, json
+import os, sys, json, argparse
 from datetime import date
 
+from tax_engine import federal_params, federal_tax_vec, marginal_rate_vec
+from state_tax import load_state_tables, build_state_matrix, resident_tax, part_year_tax, parse_residency
+
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
 except ImportError:
     print(json.dumps({"status": "error", "message": "pip install psycopg2-binary"}))
     sys.exit(1)
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
-    sys.exit(1)
 
 FILING_STATUS = os.environ.get("FILING_STATUS", "single")
-TAX_TABLES_PATH = os.path.join(os.path.dirname(__file__), "tax_tables_2026.json")
+TAX_STATE = os.environ.get("TAX_STATE", "").upper()          # resident state, e.g. CA
+TAX_PART_YEAR = os.environ.get("TAX_PART_YEAR", "")          # part-year, e.g. CA:120,NY:245
+TAX_TABLES_DIR = os.path.dirname(__file__)
+TAX_TABLES_PATH = os.path.join(TAX_TABLES_DIR, "tax_tables_2026.json")
+CACHE_TASK = "tax_estimate_year"
+QUARTER_DUE_DATES = [(0, 4, 15), (0, 6, 15), (0, 9, 15), (1, 1, 15)]   # (year offset, month, day)
+HIGH_INCOME_AGI = {"married_filing_separately": 75000}                 # 110% safe-harbor threshold
 
 def d(v) -> float:
     return float(v) if v is not None else 0.0
@@ -38,104 +52,247 @@ def calc_tax_from_brackets(income: float, brackets: list) -> float:
         tax += taxable_in_bracket * rate
     return tax
 
-def main():
-    with open(TAX_TABLES_PATH) as f:
-        tables = json.load(f)
+def load_tables(year: int) -> dict:
+    """Tax tables for `year`, falling back to the 2026 tables when none are published."""
+    path = os.path.join(TAX_TABLES_DIR, f"tax_tables_{year}.json")
+    with open(path if os.path.exists(path) else TAX_TABLES_PATH) as f:
+        return json.load(f)
 
-    brackets = tables["federal_brackets"].get(FILING_STATUS, tables["federal_brackets"]["single"])
-    ltcg_rates = tables["long_term_capital_gains_rates"].get(FILING_STATUS, tables["long_term_capital_gains_rates"]["single"])
-    std_deduction = tables["standard_deduction"].get(FILING_STATUS, tables["standard_deduction"]["single"])
+def parse_years(spec: str | None, today: date) -> list[int] | None:
+    """'2024' | '2022-2025' | '2022,2024' -> list of years; 'all' -> None.
+    Raises ValueError on anything else."""
+    if not spec:
+        return [today.year]
+    if spec == "all":
+        return None
+    years: set[int] = set()
+    for part in spec.split(","):
+        lo, _, hi = part.strip().partition("-")
+        try:
+            first, last = int(lo), int(hi or lo)
+            if first > last:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"Invalid --years {spec!r}: expected 'all', a year, a range (2022-2025) or a list") from None
+        years.update(range(first, last + 1))
+    return sorted(years)
 
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    year = date.today().year
+def is_closed_year(year: int, today: date) -> bool:
+    """A year is closed once its extended filing deadline has passed."""
+    return today > date(year + 1, 10, 15)
+
+def cache_key() -> str:
+    return f"{FILING_STATUS}|{TAX_STATE}|{TAX_PART_YEAR}"
+
+def empty_aggregates() -> dict:
+    return {
+        "w2_wages": 0.0, "interest": 0.0, "dividends": 0.0, "proceeds": 0.0, "cost_basis": 0.0,
+        "withheld": 0.0, "state_withheld": 0.0, "es_by_quarter": {}, "itemized": 0.0,
+    }
+
+def fetch_year_aggregates(cur, years: list[int] | None, exclude: list[int]) -> dict:
+    """One grouped query per table for all requested years.
+
+    Returns {year: aggregates} in the same shape as a tax_year_summaries row
+    (see empty_aggregates). `years=None` means every year present in the tables.
+    """
+    if years is None:
+        where, params = "NOT (year = ANY(%s))", [exclude]
+    else:
+        where, params = "year = ANY(%s) AND NOT (year = ANY(%s))", [years, exclude]
+    data: dict[int, dict] = {}
+
+    def year_entry(y: int) -> dict:
+        return data.setdefault(y, empty_aggregates())
 
     # Aggregate income from tax documents
-    cur.execute("""
-        SELECT form_type,
+    cur.execute(f"""
+        SELECT year, form_type,
                COALESCE(SUM((extracted_data->>'wages_tips_other_compensation')::numeric), 0) AS w2_wages,
                COALESCE(SUM((extracted_data->>'interest_income')::numeric), 0)              AS interest,
                COALESCE(SUM((extracted_data->>'ordinary_dividends')::numeric), 0)           AS dividends,
                COALESCE(SUM((extracted_data->>'net_proceeds')::numeric), 0)                 AS proceeds,
                COALESCE(SUM((extracted_data->>'cost_basis')::numeric), 0)                   AS cost_basis,
-               COALESCE(SUM(total_tax_withheld), 0)                                         AS withheld
+               COALESCE(SUM(total_tax_withheld), 0)                                         AS withheld,
+               COALESCE(SUM(state_tax), 0)                                                  AS state_withheld
         FROM tax_documents
-        WHERE year = %s
-        GROUP BY form_type
-    """, [year])
-    rows = {r["form_type"]: r for r in cur.fetchall()}
-
-    w2_wages     = d(rows.get("W-2",      {}).get("w2_wages", 0))
-    interest     = d(rows.get("1099-INT", {}).get("interest", 0))
-    dividends    = d(rows.get("1099-DIV", {}).get("dividends", 0))
-    gross_1099b  = d(rows.get("1099-B",   {}).get("proceeds", 0))
-    basis_1099b  = d(rows.get("1099-B",   {}).get("cost_basis", 0))
-    capital_gains = max(gross_1099b - basis_1099b, 0)   # simplified: all treated as LTCG
-    total_withheld = sum(d(r.get("withheld", 0)) for r in rows.values())
+        WHERE {where}
+        GROUP BY year, form_type
+    """, params)
+    for r in cur.fetchall():
+        agg = year_entry(r["year"])
+        if r["form_type"] == "W-2":
+            agg["w2_wages"] += d(r["w2_wages"])
+        elif r["form_type"] == "1099-INT":
+            agg["interest"] += d(r["interest"])
+        elif r["form_type"] == "1099-DIV":
+            agg["dividends"] += d(r["dividends"])
+        elif r["form_type"] == "1099-B":
+            agg["proceeds"] += d(r["proceeds"])
+            agg["cost_basis"] += d(r["cost_basis"])
+        agg["withheld"] += d(r["withheld"])
+        agg["state_withheld"] += d(r["state_withheld"])
 
     # Estimated payments
-    cur.execute("""
-        SELECT COALESCE(SUM(amount_paid), 0) AS total_es
-        FROM estimated_tax_payments WHERE year = %s
-    """, [year])
-    es_row = cur.fetchone()
-    total_estimated_payments = d(es_row["total_es"]) if es_row else 0.0
+    cur.execute(f"""
+        SELECT year, quarter, COALESCE(SUM(amount_paid), 0) AS paid
+        FROM estimated_tax_payments
+        WHERE {where}
+        GROUP BY year, quarter
+    """, params)
+    for r in cur.fetchall():
+        year_entry(r["year"])["es_by_quarter"][r["quarter"]] = d(r["paid"])
 
     # Deductions
-    cur.execute("""
-        SELECT COALESCE(SUM(amount), 0) AS itemized FROM deductions WHERE year = %s
-    """, [year])
-    ded_row = cur.fetchone()
-    itemized = d(ded_row["itemized"]) if ded_row else 0.0
-    deduction = max(itemized, std_deduction)
+    cur.execute(f"""
+        SELECT year, COALESCE(SUM(amount), 0) AS itemized
+        FROM deductions
+        WHERE {where}
+        GROUP BY year
+    """, params)
+    for r in cur.fetchall():
+        year_entry(r["year"])["itemized"] = d(r["itemized"])
+    return data
 
-    gross_income = w2_wages + interest + dividends
-    taxable_income = max(gross_income - deduction, 0)
+def safe_harbor_schedule(year: int, current_tax: float, withheld: float, es_by_quarter: dict,
+                         today: date, prior_tax: float | None = None, prior_agi: float = 0.0) -> dict:
+    """Estimated-payment plan that avoids the underpayment penalty.
+
+    The required annual payment is the smaller of 90% of this year's tax and
+    100% of last year's (110% above $150k prior AGI). Withholding counts as paid
+    evenly across the four due dates. Upcoming quarters catch up any earlier
+    shortfall first, then cover their own 25% installment.
+    """
+    if prior_tax is None:
+        required, basis = 0.9 * current_tax, "current_year_90"
+    else:
+        high_income = prior_agi > HIGH_INCOME_AGI.get(FILING_STATUS, 150000)
+        prior_required = prior_tax * (1.10 if high_income else 1.00)
+        if prior_required < 0.9 * current_tax:
+            required, basis = prior_required, "prior_year_110" if high_income else "prior_year_100"
+        else:
+            required, basis = 0.9 * current_tax, "current_year_90"
+    if current_tax - withheld < 1000:
+        required, basis = 0.0, "under_1000_owed"
 
-    # Federal ordinary income tax
-    federal_tax = calc_tax_from_brackets(taxable_income, brackets)
+    quarters = []
+    es_cumulative = 0.0
+    recommended_total = 0.0
+    for q, (offset, month, day) in enumerate(QUARTER_DUE_DATES, start=1):
+        due = date(year + offset, month, day)
+        paid = d(es_by_quarter.get(q, es_by_quarter.get(str(q))))
+        es_cumulative += paid
+        required_cumulative = required * q / 4
+        credited = withheld * q / 4 + es_cumulative
+        entry = {
+            "quarter": q,
+            "due_date": due.isoformat(),
+            "required_cumulative": round(required_cumulative, 2),
+            "paid": round(paid, 2),
+            "credited_cumulative": round(credited, 2),
+        }
+        if due < today:
+            shortfall = max(required_cumulative - credited, 0.0)
+            entry.update({"status": "underpaid" if shortfall > 0.005 else "paid",
+                          "shortfall": round(shortfall, 2), "recommended_payment": 0.0})
+        else:
+            recommended = max(required_cumulative - credited - recommended_total, 0.0)
+            recommended_total += recommended
+            entry.update({"status": "upcoming", "shortfall": 0.0, "recommended_payment": round(recommended, 2)})
+        quarters.append(entry)
 
-    # LTCG tax (simplified: all capital gains treated as long-term)
-    ltcg_tax = calc_tax_from_brackets(capital_gains, ltcg_rates)
+    upcoming = [q for q in quarters if q["status"] == "upcoming"]
+    return {
+        "required_annual_payment": round(required, 2),
+        "safe_harbor_basis": basis,
+        "prior_year_tax": round(prior_tax, 2) if prior_tax is not None else None,
+        "remaining_to_pay": round(recommended_total, 2),
+        "quarters": quarters,
+        "next_payment": upcoming[0] if upcoming else None,
+    }
 
-    # NIIT (3.8% on net investment income above threshold)
-    niit_threshold = tables["niit_threshold"].get(FILING_STATUS, 200000)
-    niit = max(gross_income + capital_gains - niit_threshold, 0) * tables["net_investment_income_tax_rate"]
+def compute_liability(year: int, agg: dict, tables: dict, today: date, prior: dict | None = None) -> dict:
+    """Federal (+ optional state) liability for one year's aggregates.
 
-    total_federal = federal_tax + ltcg_tax + niit
+    `prior` is the previous year's result; when given, the quarterly schedule
+    uses the prior-year safe harbor.
+    """
+    params = federal_params(tables, FILING_STATUS)
+
+    w2_wages     = d(agg["w2_wages"])
+    interest     = d(agg["interest"])
+    dividends    = d(agg["dividends"])
+    gross_1099b  = d(agg["proceeds"])
+    basis_1099b  = d(agg["cost_basis"])
+    capital_gains = gross_1099b - basis_1099b           # simplified: all treated as LTCG
+    total_withheld = d(agg["withheld"])
+    state_withheld = d(agg["state_withheld"])
+
+    total_estimated_payments = sum(agg["es_by_quarter"].values())
+
+    itemized = d(agg["itemized"])
+    deduction = max(itemized, params["standard_deduction"])
+    gross_income = w2_wages + interest + dividends
+
+    # Ordinary brackets, LTCG stacked on top, capital-loss offset, NIIT on the
+    # lesser of net investment income and MAGI over the threshold
+    fed = federal_tax_vec(gross_income, 0.0, capital_gains, params, itemized, interest + dividends)
+    taxable_income = float(fed["taxable_income"])
+    federal_tax = float(fed["ordinary_tax"])
+    ltcg_tax = float(fed["ltcg_tax"])
+    niit = float(fed["niit"])
+    total_federal = float(fed["total"])
 
     # Effective and marginal rates
-    total_income = gross_income + capital_gains
+    total_income = float(fed["agi"])
     effective_rate = total_federal / total_income * 100 if total_income > 0 else 0.0
-    marginal_rate = 0.0
-    for b in reversed(brackets):
-        if taxable_income > b["min"]:
-            marginal_rate = b["rate"] * 100
-            break
+    lo, _, rate = params["ordinary"]
+    marginal_rate = float(marginal_rate_vec(fed["taxable_ordinary"], lo, rate)) * 100
 
     balance_due = total_federal - total_withheld - total_estimated_payments
 
-    cur.close()
-    conn.close()
+    # State tax (resident or part-year) on AGI
+    state = None
+    if TAX_STATE or TAX_PART_YEAR:
+        states = load_state_tables()
+        matrix = build_state_matrix(states, FILING_STATUS)
+        if TAX_PART_YEAR:
+            allocation = part_year_tax(total_income, parse_residency(TAX_PART_YEAR, states), matrix)
+        elif TAX_STATE in states:
+            allocation = [{"state": TAX_STATE, "days": 365, "allocated_income": round(total_income, 2),
+                           "tax": round(resident_tax(total_income, TAX_STATE, matrix), 2)}]
+        else:
+            raise ValueError(f"Unknown state: {TAX_STATE}")
+        state_total = sum(a["tax"] for a in allocation)
+        state = {
+            "allocation": allocation,
+            "state_tax": round(state_total, 2),
+            "withholding": round(state_withheld, 2),
+            "balance_due": round(state_total - state_withheld, 2),
+        }
 
-    # Quarterly payment schedule
-    q_dates = {1:"April 15",2:"June 16",3:"September 15",4:"January 15"}
-    q_amount = total_federal / 4
-    today = date.today()
-    quarters_remaining = sum(1 for q in [date(year,4,15),date(year,6,16),date(year,9,15),date(year+1,1,15)] if q >= today)
+    # Quarterly payment schedule (safe harbor, net of withholding and payments made)
+    if prior and prior["income"]["gross_income"] <= 0 and prior["tax"]["total_federal"] <= 0:
+        prior = None   # no prior-year data on file
+    schedule = safe_harbor_schedule(
+        year, total_federal, total_withheld, agg["es_by_quarter"], today,
+        prior_tax=prior["tax"]["total_federal"] if prior else None,
+        prior_agi=prior["income"]["gross_income"] if prior else 0.0,
+    )
+    next_payment = schedule["next_payment"]
 
-    print(json.dumps({
-        "status": "ok",
+    return {
         "year": year,
         "filing_status": FILING_STATUS,
+        "tables_year": tables["year"],
         "income": {
             "w2_wages": round(w2_wages, 2),
             "interest": round(interest, 2),
             "dividends": round(dividends, 2),
             "capital_gains": round(capital_gains, 2),
-            "gross_income": round(gross_income + capital_gains, 2),
+            "gross_income": round(total_income, 2),
         },
-        "deduction": {"amount": round(deduction, 2), "type": "itemized" if itemized > std_deduction else "standard"},
+        "deduction": {"amount": round(deduction, 2), "type": "itemized" if itemized > params["standard_deduction"] else "standard"},
         "taxable_income": round(taxable_income, 2),
         "tax": {
             "federal_ordinary": round(federal_tax, 2),
@@ -143,13 +300,116 @@ def main():
             "niit": round(niit, 2),
             "total_federal": round(total_federal, 2),
         },
+        "state": state,
         "effective_rate_pct": round(effective_rate, 2),
         "marginal_rate_pct": round(marginal_rate, 1),
         "withholding": round(total_withheld, 2),
         "estimated_payments_paid": round(total_estimated_payments, 2),
         "balance_due": round(balance_due, 2),
-        "quarterly_payment": round(q_amount, 2),
-        "quarters_remaining": quarters_remaining,
+        "quarterly_payment": next_payment["recommended_payment"] if next_payment else 0.0,
+        "quarters_remaining": sum(1 for q in schedule["quarters"] if q["status"] == "upcoming"),
+        "estimated_payment_plan": schedule,
+    }
+
+def load_cached_years(cur, years: list[int] | None) -> dict[int, dict]:
+    cur.execute("""
+        SELECT DISTINCT ON ((metadata->>'year')::int) metadata
+        FROM agent_state
+        WHERE agent_name = 'skill-tax' AND task_name = %s AND status = 'success'
+          AND metadata->>'cache_key' = %s
+          AND (%s::int[] IS NULL OR (metadata->>'year')::int = ANY(%s::int[]))
+        ORDER BY (metadata->>'year')::int, started_at DESC
+    """, [CACHE_TASK, cache_key(), years, years])
+    return {int(r["metadata"]["year"]): r["metadata"]["result"] for r in cur.fetchall()}
+
+def invalidate_cached_year(cur, year: int):
+    """Drops `year`'s cached results for every filing status and state."""
+    cur.execute("""
+        DELETE FROM agent_state
+        WHERE agent_name = 'skill-tax' AND task_name = %s AND (metadata->>'year')::int = %s
+    """, [CACHE_TASK, year])
+
+def store_cached_years(cur, results: list[dict]):
+    if not results:
+        return
+    cur.execute("""
+        DELETE FROM agent_state
+        WHERE agent_name = 'skill-tax' AND task_name = %s
+          AND metadata->>'cache_key' = %s AND (metadata->>'year')::int = ANY(%s)
+    """, [CACHE_TASK, cache_key(), [r["year"] for r in results]])
+    execute_values(cur, """
+        INSERT INTO agent_state (agent_name, task_name, status, completed_at, metadata)
+        VALUES %s
+    """, [("skill-tax", CACHE_TASK, "success",
+           json.dumps({"year": r["year"], "cache_key": cache_key(), "result": r})) for r in results],
+        template="(%s, %s, %s, NOW(), %s::jsonb)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", help="'all', a year, a range (2022-2025) or a list (2023,2025)")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached closed years")
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    today = date.today()
+    try:
+        years = parse_years(args.years, today)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}))
+        sys.exit(1)
+    # The prior year is always loaded so the current year gets its safe harbor
+    query_years = None if years is None else sorted(set(years) | {min(years) - 1})
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    cached = {} if args.refresh or not args.years else load_cached_years(cur, query_years)
+    aggregates = fetch_year_aggregates(cur, query_years, list(cached))
+    for y in years or []:
+        if y not in cached:
+            aggregates.setdefault(y, empty_aggregates())
+
+    try:
+        results_by_year = dict(cached)
+        computed = []
+        for y in sorted(aggregates):
+            result = compute_liability(y, aggregates[y], load_tables(y), today, prior=results_by_year.get(y - 1))
+            results_by_year[y] = result
+            computed.append(result)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}))
+        sys.exit(1)
+
+    if args.years:
+        store_cached_years(cur, [r for r in computed if is_closed_year(r["year"], today)])
+        conn.commit()
+    cur.close()
+    conn.close()
+
+    if not args.years:
+        print(json.dumps({"status": "ok", **results_by_year[today.year]}))
+        return
+
+    requested = set(results_by_year) if years is None else set(years)
+    results = [results_by_year[y] for y in sorted(results_by_year) if y in requested]
+    print(json.dumps({
+        "status": "ok",
+        "filing_status": FILING_STATUS,
+        "years": results,
+        "history": [
+            {
+                "year": r["year"],
+                "gross_income": r["income"]["gross_income"],
+                "total_federal": r["tax"]["total_federal"],
+                "effective_rate_pct": r["effective_rate_pct"],
+                "marginal_rate_pct": r["marginal_rate_pct"],
+                "cached": r["year"] in cached,
+            }
+            for r in results
+        ],
     }))
 
 if __name__ == "__main__":
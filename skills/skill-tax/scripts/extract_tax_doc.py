@@ -8,6 +8,8 @@ Usage:
 import os, sys, json, argparse
 from datetime import date
 
+from estimate_liability import invalidate_cached_year
+
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -53,6 +55,9 @@ def main():
     """, [args.year, args.form, issuer_name, args.file,
           json.dumps(extracted_data), total_income, total_withheld])
     row = cur.fetchone()
+
+    # A new document reopens the year: drop estimate_liability.py's cached result
+    invalidate_cached_year(cur, args.year)
     conn.commit()
     cur.close()
     conn.close()
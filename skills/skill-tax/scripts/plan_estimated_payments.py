@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+plan_estimated_payments.py — Safe-harbor estimated tax payment planner.
+
+Reads the year's running aggregates from tax_year_summaries (kept current by
+triggers on tax_documents, estimated_tax_payments and deductions) together
+with the prior year's row, then recomputes what is due each quarter. No tax
+documents are rescanned. Never uses LLM math.
+
+Usage:
+  python3 plan_estimated_payments.py [--year 2026] [--prior-year-tax 18250 --prior-year-agi 140000]
+"""
+import os, sys, json, argparse
+from datetime import date
+
+from estimate_liability import compute_liability, empty_aggregates, load_tables, d
+
+try:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+except ImportError:
+    print(json.dumps({"status": "error", "message": "pip install psycopg2-binary"}))
+    sys.exit(1)
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+    sys.exit(1)
+
+SUMMARY_FIELDS = ["w2_wages", "interest", "dividends", "proceeds", "cost_basis", "withheld", "state_withheld"]
+
+def summary_to_aggregates(row: dict | None) -> dict:
+    """Maps a tax_year_summaries row onto estimate_liability's aggregate shape."""
+    agg = empty_aggregates()
+    if row:
+        for field in SUMMARY_FIELDS:
+            agg[field] = d(row[field])
+        agg["es_by_quarter"] = {q: d(row[f"es_q{q}"]) for q in range(1, 5)}
+        agg["itemized"] = d(row["itemized_deductions"])
+    return agg
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--prior-year-tax", type=float,
+                        help="Prior-year total tax from the filed 1040 (overrides the computed figure)")
+    parser.add_argument("--prior-year-agi", type=float, help="Prior-year AGI (decides the 110%% rule)")
+    args = parser.parse_args()
+    today = date.today()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    # Household totals, as estimate_liability.py sums every user's documents
+    cur.execute("""
+        SELECT year, SUM(w2_wages) AS w2_wages, SUM(interest) AS interest, SUM(dividends) AS dividends,
+               SUM(proceeds) AS proceeds, SUM(cost_basis) AS cost_basis, SUM(withheld) AS withheld,
+               SUM(state_withheld) AS state_withheld, SUM(es_q1) AS es_q1, SUM(es_q2) AS es_q2,
+               SUM(es_q3) AS es_q3, SUM(es_q4) AS es_q4, SUM(itemized_deductions) AS itemized_deductions,
+               SUM(document_count) AS document_count, MAX(updated_at) AS updated_at
+        FROM tax_year_summaries
+        WHERE year IN (%s, %s)
+        GROUP BY year
+    """, [args.year - 1, args.year])
+    rows = {r["year"]: r for r in cur.fetchall()}
+    cur.close()
+    conn.close()
+
+    try:
+        prior = None
+        prior_row = rows.get(args.year - 1)
+        if prior_row and prior_row["document_count"] > 0:
+            prior = compute_liability(args.year - 1, summary_to_aggregates(prior_row),
+                                      load_tables(args.year - 1), today)
+        if args.prior_year_tax is not None:
+            prior_agi = args.prior_year_agi if args.prior_year_agi is not None else (
+                prior["income"]["gross_income"] if prior else 0.0)
+            prior = {"income": {"gross_income": prior_agi}, "tax": {"total_federal": args.prior_year_tax}}
+
+        current = compute_liability(args.year, summary_to_aggregates(rows.get(args.year)),
+                                    load_tables(args.year), today, prior=prior)
+    except (ValueError, OSError) as e:
+        print(json.dumps({"status": "error", "message": str(e)}))
+        sys.exit(1)
+
+    summary = rows.get(args.year)
+    print(json.dumps({
+        "status": "ok",
+        "year": args.year,
+        "filing_status": current["filing_status"],
+        "current_year_tax": current["tax"]["total_federal"],
+        "withholding": current["withholding"],
+        "estimated_payments_paid": current["estimated_payments_paid"],
+        **current["estimated_payment_plan"],
+        "summary_updated_at": summary["updated_at"].isoformat() if summary and summary["updated_at"] else None,
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+state_tax.py — Deterministic state income tax estimation.
+
+Uses the compact per-state tables in state_tax_tables_2026.json. Supports a
+resident estimate, part-year allocation across several states, and a
+comparison mode that taxes the same income in every state in one vectorized
+call (relocation questions). Never uses LLM math.
+
+Usage:
+  python3 state_tax.py --state CA [--income 150000]
+  python3 state_tax.py --part-year CA:120,NY:245 [--income 150000]
+  python3 state_tax.py --compare [--income 90000,150000] [--top 10]
+
+Without --income, AGI and state withholding (tax_documents.state_tax) are
+read from the database for --year.
+"""
+import os, sys, json, argparse
+from datetime import date
+
+from tax_engine import np, stack_brackets, tax_matrix
+
+FILING_STATUS = os.environ.get("FILING_STATUS", "single")
+STATE_TABLES_PATH = os.path.join(os.path.dirname(__file__), "state_tax_tables_2026.json")
+CAPITAL_LOSS_LIMIT = 3000.0                                     # net capital loss deductible against income
+
+
+def d(v) -> float:
+    return float(v) if v is not None else 0.0
+
+
+def load_state_tables(path: str = STATE_TABLES_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)["states"]
+
+
+def build_state_matrix(states: dict, filing_status: str) -> dict:
+    """Stacks every state's brackets for one filing status into padded arrays."""
+    codes = sorted(states)
+    tables = [states[c]["brackets"].get(filing_status, states[c]["brackets"]["single"]) for c in codes]
+    deductions = [states[c]["standard_deduction"].get(filing_status, states[c]["standard_deduction"]["single"])
+                  for c in codes]
+    lo, hi, rate = stack_brackets(tables)
+    return {
+        "codes": codes,
+        "names": [states[c]["name"] for c in codes],
+        "index": {c: i for i, c in enumerate(codes)},
+        "lo": lo, "hi": hi, "rate": rate,
+        "deduction": np.array(deductions, dtype=float),
+    }
+
+
+def compare_states(agi, matrix: dict):
+    """State tax on each AGI in every state at once: shape (len(agi), states)."""
+    agi = np.atleast_1d(np.asarray(agi, dtype=float))
+    taxable = np.maximum(agi[:, None] - matrix["deduction"][None, :], 0.0)
+    return tax_matrix(taxable, matrix["lo"], matrix["hi"], matrix["rate"])
+
+
+def resident_tax(agi: float, state: str, matrix: dict) -> float:
+    return float(compare_states([agi], matrix)[0, matrix["index"][state]])
+
+
+def part_year_tax(agi: float, residency: dict, matrix: dict,
+                  sourced_income: dict | None = None, year_days: int = 365) -> list[dict]:
+    """Allocates tax across the states lived in during the year.
+
+    Each state computes tax on the full-year AGI at its own rates, then keeps
+    the share of income sourced to it (the common ratio method). Income is
+    prorated by days of residency unless `sourced_income` gives amounts.
+    """
+    codes = list(residency)
+    full_year = compare_states([agi], matrix)[0, [matrix["index"][c] for c in codes]]
+    if sourced_income:
+        allocated = np.array([d(sourced_income.get(c)) for c in codes])
+    else:
+        allocated = agi * np.array([residency[c] for c in codes], dtype=float) / year_days
+    ratio = np.clip(allocated / agi, 0.0, 1.0) if agi > 0 else np.zeros(len(codes))
+    tax = full_year * ratio
+    return [
+        {
+            "state": c,
+            "days": residency[c],
+            "allocated_income": round(float(allocated[i]), 2),
+            "full_year_tax": round(float(full_year[i]), 2),
+            "tax": round(float(tax[i]), 2),
+        }
+        for i, c in enumerate(codes)
+    ]
+
+
+def parse_residency(spec: str, states: dict) -> dict:
+    """Parses 'CA:120,NY:245' into {'CA': 120, 'NY': 245}."""
+    residency = {}
+    for part in spec.split(","):
+        code, _, days = part.strip().partition(":")
+        code = code.upper()
+        if code not in states:
+            raise ValueError(f"Unknown state: {code}")
+        residency[code] = int(days)
+    if sum(residency.values()) > 366:
+        raise ValueError("Residency days exceed one year")
+    return residency
+
+
+def load_income_from_db(year: int) -> tuple[float, float]:
+    """Returns (agi, state_withheld) for the year, using estimate_liability's income rules."""
+    try:
+        import psycopg2
+    except ImportError:
+        print(json.dumps({"status": "error", "message": "pip install psycopg2-binary"}))
+        sys.exit(1)
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print(json.dumps({"status": "error", "message": "DATABASE_URL not set"}))
+        sys.exit(1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+          COALESCE(SUM((extracted_data->>'wages_tips_other_compensation')::numeric) FILTER (WHERE form_type = 'W-2'), 0)
+        + COALESCE(SUM((extracted_data->>'interest_income')::numeric) FILTER (WHERE form_type = '1099-INT'), 0)
+        + COALESCE(SUM((extracted_data->>'ordinary_dividends')::numeric) FILTER (WHERE form_type = '1099-DIV'), 0),
+          COALESCE(SUM((extracted_data->>'net_proceeds')::numeric) FILTER (WHERE form_type = '1099-B'), 0)
+        - COALESCE(SUM((extracted_data->>'cost_basis')::numeric) FILTER (WHERE form_type = '1099-B'), 0),
+          COALESCE(SUM(state_tax), 0)
+        FROM tax_documents
+        WHERE year = %s
+    """, [year])
+    ordinary, net_gains, state_withheld = cur.fetchone()
+    cur.close()
+    conn.close()
+    return d(ordinary) + max(d(net_gains), -CAPITAL_LOSS_LIMIT), d(state_withheld)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--state", help="Resident state code (e.g. CA)")
+    mode.add_argument("--part-year", help="State:days pairs, e.g. CA:120,NY:245")
+    mode.add_argument("--compare", action="store_true", help="Tax the income in every state")
+    parser.add_argument("--income", help="AGI (comma-separated list allowed with --compare)")
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--top", type=int, default=0, help="With --compare, only show the N cheapest states")
+    args = parser.parse_args()
+
+    states = load_state_tables()
+    matrix = build_state_matrix(states, FILING_STATUS)
+
+    state_withheld = None
+    if args.income:
+        incomes = [float(x) for x in args.income.split(",")]
+    else:
+        agi, state_withheld = load_income_from_db(args.year)
+        incomes = [agi]
+
+    result = {"status": "ok", "year": args.year, "filing_status": FILING_STATUS}
+
+    if args.compare:
+        taxes = compare_states(incomes, matrix)
+        comparisons = []
+        for row, agi in enumerate(incomes):
+            order = np.argsort(taxes[row], kind="stable")
+            if args.top > 0:
+                order = order[:args.top]
+            comparisons.append({
+                "agi": round(agi, 2),
+                "states": [
+                    {
+                        "state": matrix["codes"][i],
+                        "name": matrix["names"][i],
+                        "tax": round(float(taxes[row, i]), 2),
+                        "effective_rate_pct": round(float(taxes[row, i]) / agi * 100, 2) if agi > 0 else 0.0,
+                    }
+                    for i in order
+                ],
+            })
+        result["comparisons"] = comparisons
+        print(json.dumps(result))
+        return
+
+    agi = incomes[0]
+    try:
+        if args.state:
+            code = args.state.upper()
+            if code not in states:
+                raise ValueError(f"Unknown state: {code}")
+            allocation = [{"state": code, "days": 365, "allocated_income": round(agi, 2),
+                           "tax": round(resident_tax(agi, code, matrix), 2)}]
+        else:
+            allocation = part_year_tax(agi, parse_residency(args.part_year, states), matrix)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}))
+        sys.exit(1)
+
+    total = sum(a["tax"] for a in allocation)
+    result.update({
+        "agi": round(agi, 2),
+        "allocation": allocation,
+        "state_tax": round(total, 2),
+        "effective_rate_pct": round(total / agi * 100, 2) if agi > 0 else 0.0,
+    })
+    if state_withheld is not None:
+        result["state_withholding"] = round(state_withheld, 2)
+        result["state_balance_due"] = round(total - state_withheld, 2)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
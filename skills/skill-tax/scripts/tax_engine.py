@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+tax_engine.py — Vectorized bracket math shared by the tax scripts.
+
+Brackets are turned into (lo, hi, rate) arrays once, then any number of
+incomes are taxed in a single NumPy expression. Stacking several bracket
+tables (one row per state) gives an (incomes x tables) result in one call.
+"""
+import sys, json
+
+try:
+    import numpy as np
+except ImportError:
+    print(json.dumps({"status": "error", "message": "pip install numpy"}))
+    sys.exit(1)
+
+
+def bracket_arrays(brackets: list) -> tuple:
+    """Converts tax-table brackets into (lo, hi, rate) float arrays.
+
+    Accepts the federal format ({"min", "max", "rate"} dicts, max=None for the
+    top bracket) and the compact state format ([min, rate] pairs, where each
+    bracket ends at the next one's min).
+    """
+    if brackets and isinstance(brackets[0], dict):
+        lo = [b["min"] for b in brackets]
+        hi = [b["max"] if b["max"] is not None else np.inf for b in brackets]
+        rate = [b["rate"] for b in brackets]
+    else:
+        lo = [b[0] for b in brackets]
+        hi = lo[1:] + [np.inf]
+        rate = [b[1] for b in brackets]
+    return np.array(lo, dtype=float), np.array(hi, dtype=float), np.array(rate, dtype=float)
+
+
+def stack_brackets(tables: list) -> tuple:
+    """Stacks several bracket tables into padded (T, K) lo/hi/rate matrices.
+
+    Padding brackets have zero width and zero rate, so they never add tax.
+    An empty table (no income tax) becomes a row of padding.
+    """
+    arrays = [bracket_arrays(t) for t in tables]
+    width = max([len(a[0]) for a in arrays] + [1])
+    lo = np.zeros((len(arrays), width))
+    hi = np.zeros((len(arrays), width))
+    rate = np.zeros((len(arrays), width))
+    for i, (l, h, r) in enumerate(arrays):
+        lo[i, :len(l)] = l
+        hi[i, :len(h)] = h
+        rate[i, :len(r)] = r
+    return lo, hi, rate
+
+
+def tax_from_brackets_vec(income, lo, hi, rate):
+    """Tax on each income for one bracket table (1-D lo/hi/rate).
+
+    `income` may be a scalar or any-shaped array; the result has its shape.
+    """
+    income = np.asarray(income, dtype=float)
+    in_bracket = np.clip(income[..., None] - lo, 0.0, hi - lo)
+    return (in_bracket * rate).sum(axis=-1)
+
+
+def tax_matrix(income, lo, hi, rate):
+    """Tax on every income under every stacked table: shape (N, T).
+
+    `income` is either (N,) — the same income under each table — or (N, T)
+    when each table gets its own taxable income (e.g. different deductions).
+    """
+    income = np.asarray(income, dtype=float)
+    if income.ndim == 1:
+        income = income[:, None]
+    in_bracket = np.clip(income[..., None] - lo[None], 0.0, (hi - lo)[None])
+    return (in_bracket * rate[None]).sum(axis=-1)
+
+
+def marginal_rate_vec(income, lo, rate):
+    """Marginal rate for each income under one bracket table."""
+    income = np.asarray(income, dtype=float)
+    idx = np.searchsorted(lo, income, side="left") - 1
+    return np.where(idx >= 0, rate[np.clip(idx, 0, len(rate) - 1)], 0.0)
+
+
+def federal_params(tables: dict, filing_status: str) -> dict:
+    """Pre-built bracket arrays and thresholds for one filing status."""
+    def pick(key, default=None):
+        table = tables[key]
+        return table.get(filing_status, table["single"] if default is None else default)
+
+    return {
+        "ordinary": bracket_arrays(pick("federal_brackets")),
+        "ltcg": bracket_arrays(pick("long_term_capital_gains_rates")),
+        "standard_deduction": float(pick("standard_deduction")),
+        "niit_threshold": float(pick("niit_threshold", 200000)),
+        "niit_rate": float(tables["net_investment_income_tax_rate"]),
+        "loss_limit": float(tables.get("capital_loss_limit", 3000)),
+    }
+
+
+def federal_tax_vec(ordinary_income, st_gains, lt_gains, params: dict,
+                    itemized=0.0, investment_income=0.0) -> dict:
+    """Federal income tax + NIIT for arrays of households/scenarios.
+
+    ordinary_income: wages, interest, dividends (all taxed as ordinary).
+    st_gains / lt_gains: net short- and long-term capital gain (negative = loss)
+    after any carryforward. Gains are netted across terms, a net loss offsets
+    ordinary income up to the capital loss limit and the rest carries forward,
+    and net long-term gain is stacked on top of ordinary income in the LTCG
+    brackets. investment_income is the non-gain part of NII (interest,
+    dividends). All inputs broadcast against each other.
+    """
+    ordinary_income = np.asarray(ordinary_income, dtype=float)
+    st = np.asarray(st_gains, dtype=float)
+    lt = np.asarray(lt_gains, dtype=float)
+
+    net = st + lt
+    preferential = np.maximum(np.minimum(lt, net), 0.0)
+    ordinary_gain = np.maximum(net, 0.0) - preferential
+    loss_deduction = np.minimum(np.maximum(-net, 0.0), params["loss_limit"])
+    carryforward = np.maximum(-net, 0.0) - loss_deduction
+
+    agi = ordinary_income + ordinary_gain + preferential - loss_deduction
+    deduction = np.maximum(np.asarray(itemized, dtype=float), params["standard_deduction"])
+    taxable = np.maximum(agi - deduction, 0.0)
+    taxable_ordinary = np.maximum(taxable - preferential, 0.0)
+
+    ordinary_tax = tax_from_brackets_vec(taxable_ordinary, *params["ordinary"])
+    ltcg_tax = (tax_from_brackets_vec(taxable, *params["ltcg"])
+                - tax_from_brackets_vec(taxable_ordinary, *params["ltcg"]))
+
+    net_investment_income = np.maximum(np.asarray(investment_income, dtype=float) + np.maximum(net, -loss_deduction), 0.0)
+    niit = params["niit_rate"] * np.minimum(net_investment_income,
+                                            np.maximum(agi - params["niit_threshold"], 0.0))
+
+    return {
+        "agi": agi,
+        "taxable_income": taxable,
+        "taxable_ordinary": taxable_ordinary,
+        "ordinary_tax": ordinary_tax,
+        "ltcg_tax": ltcg_tax,
+        "niit": niit,
+        "total": ordinary_tax + ltcg_tax + niit,
+        "loss_deduction": loss_deduction,
+        "carryforward": carryforward,
+    }
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+tax_reference.py — Independent reference implementation of the federal tax math.
+
+Used only by test_tax_engine.py and bench_tax_engine.py to check the
+production code (calc_tax_from_brackets, tax_engine, compute_liability).
+It deliberately shares no code with them and uses different formulations:
+
+- Bracket tax is "base tax of the bracket + rate x excess", with the base
+  amounts precomputed per table (the IRS Tax Computation Worksheet), instead
+  of summing every bracket slice.
+- Capital gains follow the Qualified Dividends and Capital Gain Tax Worksheet:
+  each LTCG bracket taxes the part of the gain that falls between that
+  bracket's bounds once stacked on ordinary income.
+
+The scalar functions use Decimal so they are exact to the cent; the
+vectorized ones (NumPy searchsorted) exist so millions of cases can be
+checked in seconds.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from tax_engine import np
+
+CENT = Decimal("0.01")
+
+
+def _dec(v) -> Decimal:
+    return v if isinstance(v, Decimal) else Decimal(repr(float(v)))
+
+
+def worksheet(brackets: list) -> list:
+    """[(lo, hi, rate, base_tax)] with base_tax = tax on income exactly `lo`."""
+    rows, base = [], Decimal(0)
+    for b in brackets:
+        lo, rate = _dec(b["min"]), _dec(b["rate"])
+        hi = _dec(b["max"]) if b["max"] is not None else None
+        rows.append((lo, hi, rate, base))
+        if hi is not None:
+            base += (hi - lo) * rate
+    return rows
+
+
+def bracket_tax(income, rows: list) -> Decimal:
+    """Tax on `income` from a worksheet() table."""
+    income = _dec(income)
+    if income <= 0:
+        return Decimal(0)
+    for lo, hi, rate, base in reversed(rows):
+        if income > lo:
+            return base + rate * (income - lo)
+    return Decimal(0)
+
+
+def liability(filing_status: str, tables: dict, wages=0, interest=0, dividends=0,
+              capital_gain=0, itemized=0) -> dict:
+    """Federal liability for one household; every 1099-B gain is long-term."""
+    def pick(key):
+        return tables[key].get(filing_status, tables[key]["single"])
+
+    wages, interest, dividends = _dec(wages), _dec(interest), _dec(dividends)
+    gain, itemized = _dec(capital_gain), _dec(itemized)
+    loss_limit = _dec(tables.get("capital_loss_limit", 3000))
+
+    allowed_gain = max(gain, -loss_limit)              # Schedule D line 21
+    agi = wages + interest + dividends + allowed_gain
+    deduction = max(itemized, _dec(pick("standard_deduction")))
+    taxable = max(agi - deduction, Decimal(0))
+
+    qualified = min(max(gain, Decimal(0)), taxable)    # worksheet lines 1-5
+    ordinary_taxable = taxable - qualified
+    ordinary_tax = bracket_tax(ordinary_taxable, worksheet(pick("federal_brackets")))
+
+    ltcg_tax = Decimal(0)
+    for b in pick("long_term_capital_gains_rates"):
+        lo = _dec(b["min"])
+        hi = _dec(b["max"]) if b["max"] is not None else taxable
+        portion = min(taxable, hi) - max(ordinary_taxable, lo)
+        if portion > 0:
+            ltcg_tax += portion * _dec(b["rate"])
+
+    nii = max(interest + dividends + allowed_gain, Decimal(0))
+    excess_magi = max(agi - _dec(tables["niit_threshold"].get(filing_status, 200000)), Decimal(0))
+    niit = min(nii, excess_magi) * _dec(tables["net_investment_income_tax_rate"])
+
+    return {
+        "agi": agi,
+        "taxable_income": taxable,
+        "ordinary_tax": ordinary_tax,
+        "ltcg_tax": ltcg_tax,
+        "niit": niit,
+        "total": ordinary_tax + ltcg_tax + niit,
+        "carryforward": max(-gain - loss_limit, Decimal(0)),
+    }
+
+
+def to_cents(v: Decimal) -> float:
+    return float(v.quantize(CENT, rounding=ROUND_HALF_UP))
+
+
+def worksheet_arrays(brackets: list) -> tuple:
+    """(lo, rate, base_tax) float arrays for bracket_tax_vec."""
+    rows = worksheet(brackets)
+    return (np.array([float(r[0]) for r in rows]),
+            np.array([float(r[2]) for r in rows]),
+            np.array([float(r[3]) for r in rows]))
+
+
+def bracket_tax_vec(income, lo, rate, base):
+    """Vectorized worksheet lookup: one searchsorted per array of incomes."""
+    income = np.maximum(np.asarray(income, dtype=float), 0.0)
+    idx = np.clip(np.searchsorted(lo, income, side="left") - 1, 0, len(lo) - 1)
+    return np.where(income > 0, base[idx] + rate[idx] * (income - lo[idx]), 0.0)
+
+
+def liability_vec(filing_status: str, tables: dict, wages, interest, dividends,
+                  capital_gain, itemized) -> dict:
+    """Array version of liability() for large randomized comparisons."""
+    def pick(key):
+        return tables[key].get(filing_status, tables[key]["single"])
+
+    interest = np.asarray(interest, dtype=float)
+    dividends = np.asarray(dividends, dtype=float)
+    gain = np.asarray(capital_gain, dtype=float)
+    loss_limit = float(tables.get("capital_loss_limit", 3000))
+
+    allowed_gain = np.maximum(gain, -loss_limit)
+    agi = np.asarray(wages, dtype=float) + interest + dividends + allowed_gain
+    deduction = np.maximum(np.asarray(itemized, dtype=float), float(pick("standard_deduction")))
+    taxable = np.maximum(agi - deduction, 0.0)
+    qualified = np.minimum(np.maximum(gain, 0.0), taxable)
+    ordinary_taxable = taxable - qualified
+    ordinary_tax = bracket_tax_vec(ordinary_taxable, *worksheet_arrays(pick("federal_brackets")))
+
+    ltcg_tax = np.zeros_like(taxable)
+    for b in pick("long_term_capital_gains_rates"):
+        hi = np.inf if b["max"] is None else float(b["max"])
+        ltcg_tax += np.maximum(np.minimum(taxable, hi) - np.maximum(ordinary_taxable, float(b["min"])), 0.0) * b["rate"]
+
+    nii = np.maximum(interest + dividends + allowed_gain, 0.0)
+    excess_magi = np.maximum(agi - float(tables["niit_threshold"].get(filing_status, 200000)), 0.0)
+    niit = np.minimum(nii, excess_magi) * float(tables["net_investment_income_tax_rate"])
+
+    return {
+        "agi": agi,
+        "taxable_income": taxable,
+        "ordinary_tax": ordinary_tax,
+        "ltcg_tax": ltcg_tax,
+        "niit": niit,
+        "total": ordinary_tax + ltcg_tax + niit,
+        "carryforward": np.maximum(-gain - loss_limit, 0.0),
+    }
+
+
+def random_households(rng, n: int) -> dict:
+    """Randomized income/gain/deduction mixes, log-uniform so every bracket is hit.
+
+    About a tenth of the gains are losses (some beyond the $3,000 limit) and a
+    tenth of households itemize above the standard deduction.
+    """
+    def log_uniform(hi, size):
+        return np.expm1(rng.uniform(0.0, np.log1p(hi), size))
+
+    gain = log_uniform(2_000_000, n)
+    gain[rng.random(n) < 0.1] *= -0.05
+    itemized = np.where(rng.random(n) < 0.1, log_uniform(120_000, n), 0.0)
+    return {
+        "wages": np.round(log_uniform(3_000_000, n), 2),
+        "interest": np.round(np.where(rng.random(n) < 0.5, log_uniform(150_000, n), 0.0), 2),
+        "dividends": np.round(np.where(rng.random(n) < 0.5, log_uniform(400_000, n), 0.0), 2),
+        "capital_gain": np.round(gain, 2),
+        "itemized": np.round(itemized, 2),
+    }
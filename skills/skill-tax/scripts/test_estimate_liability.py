@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for estimate_liability.py: the safe-harbor schedule, state output,
+--years parsing and the closed-year cache (no database — a stand-in
+agent_state cursor).
+"""
+
+import json
+from datetime import date
+from unittest import TestCase, main, mock
+
+import estimate_liability
+from estimate_liability import (compute_liability, empty_aggregates, invalidate_cached_year, is_closed_year,
+                                load_cached_years, load_tables, parse_years, safe_harbor_schedule,
+                                store_cached_years)
+
+JANUARY = date(2026, 1, 5)          # before every 2026 due date
+
+
+class AgentStateCursor:
+    """Just enough of agent_state for the cache's DELETE / SELECT statements."""
+
+    def __init__(self):
+        self.rows: list[dict] = []          # metadata documents
+        self.result: list[dict] = []
+
+    def execute(self, sql, params):
+        if sql.lstrip().startswith("DELETE"):
+            if "cache_key" in sql:
+                _, key, years = params
+                self.rows = [m for m in self.rows if not (m["cache_key"] == key and m["year"] in years)]
+            else:
+                _, year = params
+                self.rows = [m for m in self.rows if m["year"] != year]
+        else:
+            _, key, years, _ = params
+            self.result = [{"metadata": m} for m in self.rows
+                           if m["cache_key"] == key and (years is None or m["year"] in years)]
+
+    def fetchall(self):
+        return self.result
+
+
+def insert_rows(cur, sql, rows, template=None):
+    cur.rows += [json.loads(metadata) for _, _, _, metadata in rows]
+
+
+class TestSafeHarborBasis(TestCase):
+    def basis(self, current_tax, prior_tax=None, prior_agi=0.0, withheld=0.0):
+        plan = safe_harbor_schedule(2026, current_tax, withheld, {}, JANUARY, prior_tax, prior_agi)
+        return plan["safe_harbor_basis"], plan["required_annual_payment"]
+
+    def test_current_year_90_without_prior_year(self):
+        self.assertEqual(self.basis(20_000), ("current_year_90", 18_000.0))
+
+    def test_prior_year_100_or_110_by_agi(self):
+        self.assertEqual(self.basis(20_000, 10_000, 150_000), ("prior_year_100", 10_000.0))
+        self.assertEqual(self.basis(20_000, 10_000, 150_000.01), ("prior_year_110", 11_000.0))
+
+    def test_married_filing_separately_uses_75k_threshold(self):
+        with mock.patch.object(estimate_liability, "FILING_STATUS", "married_filing_separately"):
+            self.assertEqual(self.basis(20_000, 10_000, 80_000), ("prior_year_110", 11_000.0))
+
+    def test_smaller_of_prior_and_current(self):
+        self.assertEqual(self.basis(10_000, 9_500, 100_000), ("current_year_90", 9_000.0))
+        self.assertEqual(self.basis(10_000, 9_000, 100_000), ("current_year_90", 9_000.0))   # tie keeps 90%
+        self.assertEqual(self.basis(10_000, 8_999, 100_000), ("prior_year_100", 8_999.0))
+
+    def test_nothing_required_when_under_1000_owed(self):
+        self.assertEqual(self.basis(20_000, 10_000, 100_000, withheld=19_000.01), ("under_1000_owed", 0.0))
+        self.assertEqual(self.basis(20_000, 10_000, 100_000, withheld=19_000), ("prior_year_100", 10_000.0))
+
+
+class TestQuarterSplit(TestCase):
+    def test_even_installments_net_of_withholding(self):
+        plan = safe_harbor_schedule(2026, 20_000, 4_000, {}, JANUARY, prior_tax=10_000, prior_agi=100_000)
+        q = plan["quarters"]
+        self.assertEqual([x["due_date"] for x in q], ["2026-04-15", "2026-06-15", "2026-09-15", "2027-01-15"])
+        self.assertEqual([x["required_cumulative"] for x in q], [2_500.0, 5_000.0, 7_500.0, 10_000.0])
+        self.assertEqual([x["credited_cumulative"] for x in q], [1_000.0, 2_000.0, 3_000.0, 4_000.0])
+        self.assertEqual([x["recommended_payment"] for x in q], [1_500.0] * 4)
+        self.assertEqual(plan["remaining_to_pay"], 6_000.0)
+        self.assertEqual(plan["next_payment"]["quarter"], 1)
+
+    def test_missed_quarters_are_caught_up_next(self):
+        plan = safe_harbor_schedule(2026, 20_000, 4_000, {1: 1_500}, date(2026, 7, 1),
+                                    prior_tax=10_000, prior_agi=100_000)
+        q = plan["quarters"]
+        self.assertEqual([x["status"] for x in q], ["paid", "underpaid", "upcoming", "upcoming"])
+        self.assertEqual(q[1]["shortfall"], 1_500.0)
+        self.assertEqual([x["recommended_payment"] for x in q], [0.0, 0.0, 3_000.0, 1_500.0])
+        self.assertEqual(plan["remaining_to_pay"], 4_500.0)
+        self.assertEqual(plan["next_payment"]["quarter"], 3)
+
+    def test_payments_keyed_by_string_quarter(self):
+        """Results read back from the JSON cache have string keys."""
+        plan = safe_harbor_schedule(2026, 20_000, 0, {"1": 5_000, "2": 5_000}, JANUARY, 10_000, 100_000)
+        self.assertEqual([x["paid"] for x in plan["quarters"]], [5_000.0, 5_000.0, 0.0, 0.0])
+        self.assertEqual([x["recommended_payment"] for x in plan["quarters"]], [0.0, 0.0, 0.0, 0.0])
+
+    def test_after_the_last_due_date(self):
+        plan = safe_harbor_schedule(2026, 20_000, 0, {}, date(2027, 2, 1), prior_tax=10_000, prior_agi=100_000)
+        self.assertEqual(plan["remaining_to_pay"], 0.0)
+        self.assertIsNone(plan["next_payment"])
+        self.assertEqual([x["shortfall"] for x in plan["quarters"]], [2_500.0, 5_000.0, 7_500.0, 10_000.0])
+
+
+class TestStateOutput(TestCase):
+    def liability(self, **env):
+        agg = empty_aggregates()
+        agg.update(w2_wages=100_000, state_withheld=4_000)
+        with mock.patch.multiple(estimate_liability, **env):
+            return compute_liability(2026, agg, load_tables(2026), JANUARY)
+
+    def test_state_is_reported_once(self):
+        result = self.liability(TAX_STATE="CA")
+        self.assertNotIn("state", result["tax"])
+        self.assertEqual(result["state"]["allocation"][0]["state"], "CA")
+        self.assertEqual(result["state"]["state_tax"], 5_327.14)
+        self.assertEqual(result["state"]["balance_due"], 1_327.14)
+
+    def test_no_state_configured(self):
+        self.assertIsNone(self.liability(TAX_STATE="", TAX_PART_YEAR="")["state"])
+
+    def test_unknown_state(self):
+        with self.assertRaisesRegex(ValueError, "Unknown state: ZZ"):
+            self.liability(TAX_STATE="ZZ", TAX_PART_YEAR="")
+
+
+class TestParseYears(TestCase):
+    def test_forms(self):
+        today = date(2026, 3, 1)
+        self.assertEqual(parse_years(None, today), [2026])
+        self.assertIsNone(parse_years("all", today))
+        self.assertEqual(parse_years("2024", today), [2024])
+        self.assertEqual(parse_years("2022-2025", today), [2022, 2023, 2024, 2025])
+        self.assertEqual(parse_years("2025, 2021-2022,2022", today), [2021, 2022, 2025])
+
+    def test_invalid_specs(self):
+        for spec in ("2024-abc", "abc", "2025-2022", "2024,", "2022-2023-2024", "-2024"):
+            with self.subTest(spec=spec), self.assertRaisesRegex(ValueError, "Invalid --years"):
+                parse_years(spec, date(2026, 3, 1))
+
+
+@mock.patch.object(estimate_liability, "execute_values", insert_rows)
+class TestYearCache(TestCase):
+    def test_closed_years(self):
+        self.assertFalse(is_closed_year(2025, date(2026, 10, 15)))
+        self.assertTrue(is_closed_year(2025, date(2026, 10, 16)))
+
+    def test_store_replaces_and_load_filters(self):
+        cur = AgentStateCursor()
+        store_cached_years(cur, [{"year": 2023, "v": 1}, {"year": 2024, "v": 1}])
+        store_cached_years(cur, [{"year": 2024, "v": 2}])
+        self.assertEqual(len(cur.rows), 2)
+        self.assertEqual(load_cached_years(cur, None), {2023: {"year": 2023, "v": 1}, 2024: {"year": 2024, "v": 2}})
+        self.assertEqual(list(load_cached_years(cur, [2024, 2025])), [2024])
+
+    def test_cache_is_per_filing_status(self):
+        cur = AgentStateCursor()
+        store_cached_years(cur, [{"year": 2024, "v": 1}])
+        with mock.patch.object(estimate_liability, "FILING_STATUS", "married_filing_jointly"):
+            self.assertEqual(load_cached_years(cur, None), {})
+
+    def test_new_document_invalidates_its_year_for_every_filing_status(self):
+        cur = AgentStateCursor()
+        store_cached_years(cur, [{"year": 2023, "v": 1}, {"year": 2024, "v": 1}])
+        with mock.patch.object(estimate_liability, "FILING_STATUS", "married_filing_jointly"):
+            store_cached_years(cur, [{"year": 2024, "v": 1}])
+        invalidate_cached_year(cur, 2024)
+        self.assertEqual([m["year"] for m in cur.rows], [2023])
+        self.assertEqual(list(load_cached_years(cur, None)), [2023])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for state_tax.py against hand-computed 2026 state results.
+"""
+
+from unittest import TestCase, main
+
+from state_tax import build_state_matrix, compare_states, load_state_tables, parse_residency, part_year_tax, \
+    resident_tax
+from tax_engine import np
+
+STATES = load_state_tables()
+SINGLE = build_state_matrix(STATES, "single")
+JOINT = build_state_matrix(STATES, "married_filing_jointly")
+
+
+class TestBrackets(TestCase):
+    def test_progressive_flat_and_no_tax_states(self):
+        # CA: $100k - $5,540 deduction = $94,460 through six brackets
+        self.assertAlmostEqual(resident_tax(100_000, "CA", SINGLE), 5_327.14, places=2)
+        self.assertAlmostEqual(resident_tax(100_000, "IL", SINGLE), 4_812.64, places=2)     # 4.95% flat
+        self.assertEqual(resident_tax(100_000, "TX", SINGLE), 0.0)
+
+    def test_bracket_edges_and_deduction(self):
+        deduction = STATES["CA"]["standard_deduction"]["single"]
+        self.assertEqual(resident_tax(deduction, "CA", SINGLE), 0.0)
+        self.assertAlmostEqual(resident_tax(deduction + 10_756, "CA", SINGLE), 107.56, places=6)
+        self.assertAlmostEqual(resident_tax(deduction + 10_757, "CA", SINGLE), 107.58, places=6)
+
+    def test_compare_matches_resident_tax(self):
+        taxes = compare_states([60_000, 250_000], SINGLE)
+        self.assertEqual(taxes.shape, (2, len(STATES)))
+        for code in ("CA", "NY", "MA", "TX"):
+            self.assertAlmostEqual(taxes[1, SINGLE["index"][code]], resident_tax(250_000, code, SINGLE), places=6)
+
+
+class TestFilingStatus(TestCase):
+    def test_joint_falls_back_to_single_brackets(self):
+        self.assertNotIn("married_filing_jointly", STATES["IL"]["brackets"])
+        # single brackets, joint deduction: ($100k - $5,550) * 4.95%
+        self.assertAlmostEqual(resident_tax(100_000, "IL", JOINT), 4_675.28, places=2)
+
+    def test_joint_brackets_are_used_when_present(self):
+        # CA joint: $200k - $11,080 deduction = $188,920 through six joint brackets
+        self.assertAlmostEqual(resident_tax(200_000, "CA", JOINT), 10_654.28, places=2)
+
+    def test_unknown_status_uses_single(self):
+        other = build_state_matrix(STATES, "head_of_household")
+        np.testing.assert_array_equal(compare_states([80_000], other), compare_states([80_000], SINGLE))
+
+
+class TestPartYear(TestCase):
+    def test_prorated_by_days(self):
+        ca, ny = part_year_tax(150_000, {"CA": 120, "NY": 245}, SINGLE)
+        self.assertEqual((ca["state"], ca["days"], ny["days"]), ("CA", 120, 245))
+        self.assertAlmostEqual(ca["allocated_income"], round(150_000 * 120 / 365, 2))
+        self.assertAlmostEqual(ca["full_year_tax"], round(resident_tax(150_000, "CA", SINGLE), 2))
+        self.assertAlmostEqual(ca["tax"], round(resident_tax(150_000, "CA", SINGLE) * 120 / 365, 2))
+        self.assertAlmostEqual(ny["tax"], round(resident_tax(150_000, "NY", SINGLE) * 245 / 365, 2))
+
+    def test_sourced_income_overrides_days_and_is_capped(self):
+        ca, ny = part_year_tax(100_000, {"CA": 180, "NY": 185}, SINGLE, sourced_income={"CA": 25_000, "NY": 150_000})
+        self.assertAlmostEqual(ca["tax"], round(resident_tax(100_000, "CA", SINGLE) * 0.25, 2))
+        self.assertAlmostEqual(ny["tax"], ny["full_year_tax"])                              # ratio clipped at 1
+
+    def test_no_income(self):
+        self.assertEqual([a["tax"] for a in part_year_tax(0.0, {"CA": 100, "NY": 265}, SINGLE)], [0.0, 0.0])
+
+    def test_parse_residency(self):
+        self.assertEqual(parse_residency("ca:120, NY:245", STATES), {"CA": 120, "NY": 245})
+        with self.assertRaisesRegex(ValueError, "Unknown state: ZZ"):
+            parse_residency("CA:100,ZZ:100", STATES)
+        with self.assertRaisesRegex(ValueError, "exceed one year"):
+            parse_residency("CA:200,NY:200", STATES)
+
+
+if __name__ == "__main__":
+    main()
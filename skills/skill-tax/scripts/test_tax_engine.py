@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Golden and randomized tests for the federal tax math.
+
+Every filing status in tax_tables_2026.json is checked against the
+independent reference in tax_reference.py:
+
+- hand-computed golden households,
+- every bracket edge (and a cent either side) of every table,
+- randomized households through compute_liability (scalar, exact to the cent),
+- millions of randomized households through the vectorized engine.
+
+Sample counts can be raised for a soak run:
+  TAX_FUZZ_SAMPLES=5000000 TAX_GOLDEN_SAMPLES=20000 python -m pytest -q test_tax_engine.py
+Throughput is measured by bench_tax_engine.py.
+"""
+
+import os
+from datetime import date
+from unittest import TestCase, main, mock
+
+import estimate_liability
+import tax_reference as ref
+from estimate_liability import calc_tax_from_brackets, compute_liability, empty_aggregates, load_tables
+from tax_engine import np, bracket_arrays, federal_params, federal_tax_vec, tax_from_brackets_vec
+
+
+TABLES = load_tables(2026)
+FILING_STATUSES = list(TABLES["federal_brackets"])
+FUZZ_SAMPLES = int(os.environ.get("TAX_FUZZ_SAMPLES", 2_000_000))      # vectorized, split across statuses
+GOLDEN_SAMPLES = int(os.environ.get("TAX_GOLDEN_SAMPLES", 1_000))     # compute_liability, per status
+SEED = int(os.environ.get("TAX_TEST_SEED", 20260415))
+TODAY = date(2026, 10, 19)
+
+
+def engine_for(status: str, wages=0.0, interest=0.0, dividends=0.0, capital_gain=0.0, itemized=0.0) -> dict:
+    result = federal_tax_vec(wages + interest + dividends, 0.0, capital_gain, federal_params(TABLES, status),
+                             itemized, interest + dividends)
+    return {k: float(v) for k, v in result.items()}
+
+
+def liability_for(status: str, wages=0.0, interest=0.0, dividends=0.0, capital_gain=0.0, itemized=0.0) -> dict:
+    agg = empty_aggregates()
+    agg.update(w2_wages=wages, interest=interest, dividends=dividends, itemized=itemized)
+    if capital_gain >= 0:
+        agg.update(proceeds=capital_gain, cost_basis=0.0)
+    else:
+        agg.update(proceeds=0.0, cost_basis=-capital_gain)
+    with mock.patch.object(estimate_liability, "FILING_STATUS", status):
+        return compute_liability(2026, agg, TABLES, TODAY)
+
+
+def bracket_edges(brackets: list) -> list:
+    edges = sorted({b["min"] for b in brackets} | {b["max"] for b in brackets if b["max"] is not None})
+    return [max(x + delta, 0.0) for x in edges for delta in (-0.01, 0.0, 0.01)]
+
+
+class TestGoldenHouseholds(TestCase):
+    """Hand-computed results (2026 tables) that must never drift."""
+
+    CASES = [
+        # status, inputs, total federal tax
+        ("single", {"wages": 100_000}, 13_841.00),
+        ("single", {"wages": 50_000, "capital_gain": -10_000}, 3_656.00),
+        ("single", {"wages": 250_000, "interest": 20_000}, 60_524.75),
+        ("married_filing_jointly", {"wages": 200_000, "capital_gain": 50_000}, 35_182.00),
+        ("head_of_household", {"wages": 40_000, "capital_gain": 30_000}, 1_841.00),
+        ("married_filing_separately", {"wages": 400_000}, 105_660.75),
+    ]
+
+    def test_golden_totals(self):
+        for status, inputs, expected in self.CASES:
+            with self.subTest(status=status, **inputs):
+                self.assertEqual(ref.to_cents(ref.liability(status, TABLES, **inputs)["total"]), expected)
+                self.assertAlmostEqual(engine_for(status, **inputs)["total"], expected, places=6)
+                self.assertEqual(liability_for(status, **inputs)["tax"]["total_federal"], expected)
+
+    def test_zero_income(self):
+        for status in FILING_STATUSES:
+            self.assertEqual(engine_for(status)["total"], 0.0)
+            result = liability_for(status)
+            self.assertEqual(result["tax"]["total_federal"], 0.0)
+            self.assertEqual(result["marginal_rate_pct"], 0.0)
+
+
+class TestBracketEdges(TestCase):
+    def test_every_edge_of_every_table(self):
+        for key in ("federal_brackets", "long_term_capital_gains_rates"):
+            for status in FILING_STATUSES:
+                brackets = TABLES[key][status]
+                incomes = bracket_edges(brackets)
+                rows = ref.worksheet(brackets)
+                vec = tax_from_brackets_vec(incomes, *bracket_arrays(brackets))
+                for income, vec_tax in zip(incomes, vec):
+                    with self.subTest(table=key, status=status, income=income):
+                        expected = float(ref.bracket_tax(income, rows))
+                        self.assertAlmostEqual(calc_tax_from_brackets(income, brackets), expected, places=6)
+                        self.assertAlmostEqual(float(vec_tax), expected, places=6)
+
+    def test_ltcg_threshold_straddles(self):
+        """Gains that cross each 0%/15%/20% threshold once stacked on wages."""
+        for status in FILING_STATUSES:
+            deduction = TABLES["standard_deduction"][status]
+            for b in TABLES["long_term_capital_gains_rates"][status][1:]:
+                for ordinary_taxable in (b["min"] - 5_000, b["min"] - 0.01, b["min"], b["min"] + 0.01):
+                    inputs = {"wages": ordinary_taxable + deduction, "capital_gain": 10_000}
+                    with self.subTest(status=status, threshold=b["min"], ordinary_taxable=ordinary_taxable):
+                        expected = ref.liability(status, TABLES, **inputs)
+                        actual = engine_for(status, **inputs)
+                        self.assertAlmostEqual(actual["ltcg_tax"], float(expected["ltcg_tax"]), places=6)
+                        self.assertAlmostEqual(actual["total"], float(expected["total"]), places=6)
+                        printed = liability_for(status, **inputs)["tax"]
+                        self.assertAlmostEqual(printed["ltcg"], ref.to_cents(expected["ltcg_tax"]), delta=0.011)
+                        self.assertAlmostEqual(printed["total_federal"], ref.to_cents(expected["total"]), delta=0.011)
+
+    def test_capital_loss_limit_edge(self):
+        limit = TABLES["capital_loss_limit"]
+        for loss in (limit - 0.01, limit, limit + 0.01, 10 * limit):
+            params = federal_params(TABLES, "single")
+            result = federal_tax_vec(80_000, 0.0, -loss, params)
+            self.assertAlmostEqual(float(result["loss_deduction"]), min(loss, limit), places=6)
+            self.assertAlmostEqual(float(result["carryforward"]), max(loss - limit, 0.0), places=6)
+
+
+class TestRandomizedComputeLiability(TestCase):
+    """compute_liability (what the CLI prints) against the Decimal reference."""
+
+    def test_matches_reference_to_the_cent(self):
+        rng = np.random.default_rng(SEED)
+        for status in FILING_STATUSES:
+            households = ref.random_households(rng, GOLDEN_SAMPLES)
+            for i in range(GOLDEN_SAMPLES):
+                inputs = {k: float(v[i]) for k, v in households.items()}
+                expected = ref.liability(status, TABLES, **inputs)
+                actual = liability_for(status, **inputs)
+                with self.subTest(status=status, **inputs):
+                    self.assertAlmostEqual(actual["tax"]["total_federal"], ref.to_cents(expected["total"]), delta=0.011)
+                    self.assertAlmostEqual(actual["tax"]["niit"], ref.to_cents(expected["niit"]), delta=0.011)
+                    self.assertAlmostEqual(actual["taxable_income"], ref.to_cents(expected["taxable_income"]), delta=0.011)
+                    self.assertAlmostEqual(actual["income"]["gross_income"], ref.to_cents(expected["agi"]), delta=0.011)
+
+
+class TestRandomizedVectorized(TestCase):
+    """tax_engine against the vectorized reference over millions of households."""
+
+    CHUNK = 250_000
+
+    def test_federal_tax_vec_matches_reference(self):
+        rng = np.random.default_rng(SEED + 1)
+        per_status = max(FUZZ_SAMPLES // len(FILING_STATUSES), 1)
+        for status in FILING_STATUSES:
+            params = federal_params(TABLES, status)
+            for start in range(0, per_status, self.CHUNK):
+                h = ref.random_households(rng, min(self.CHUNK, per_status - start))
+                expected = ref.liability_vec(status, TABLES, **h)
+                actual = federal_tax_vec(h["wages"] + h["interest"] + h["dividends"], 0.0, h["capital_gain"],
+                                         params, h["itemized"], h["interest"] + h["dividends"])
+                for key in ("agi", "taxable_income", "ordinary_tax", "ltcg_tax", "niit", "total", "carryforward"):
+                    worst = int(np.argmax(np.abs(actual[key] - expected[key])))
+                    with self.subTest(status=status, field=key, household={k: float(v[worst]) for k, v in h.items()}):
+                        np.testing.assert_allclose(actual[key], expected[key], rtol=1e-9, atol=1e-6)
+
+    def test_reference_vec_agrees_with_decimal_reference(self):
+        """Pins the fast reference to the exact one, so it can be trusted at scale."""
+        rng = np.random.default_rng(SEED + 2)
+        for status in FILING_STATUSES:
+            h = ref.random_households(rng, 2_000)
+            fast = ref.liability_vec(status, TABLES, **h)
+            for i in range(2_000):
+                exact = ref.liability(status, TABLES, **{k: float(v[i]) for k, v in h.items()})
+                self.assertAlmostEqual(float(fast["total"][i]), float(exact["total"]), places=6)
+
+    def test_bracket_tax_matches_scalar_function(self):
+        rng = np.random.default_rng(SEED + 3)
+        incomes = ref.random_households(rng, 20_000)["wages"]
+        for status in FILING_STATUSES:
+            brackets = TABLES["federal_brackets"][status]
+            vec = tax_from_brackets_vec(incomes, *bracket_arrays(brackets))
+            scalar = np.array([calc_tax_from_brackets(x, brackets) for x in incomes])
+            np.testing.assert_allclose(vec, scalar, rtol=1e-9, atol=1e-6)
+
+    def test_tax_is_monotonic_in_income(self):
+        for status in FILING_STATUSES:
+            incomes = np.linspace(0, 2_000_000, 200_001)
+            tax = federal_tax_vec(incomes, 0.0, 0.0, federal_params(TABLES, status))["total"]
+            self.assertTrue(np.all(np.diff(tax) >= -1e-9), status)
+
+
+if __name__ == "__main__":
+    main()